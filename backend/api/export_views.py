@@ -0,0 +1,52 @@
+"""
+Endpoint de exportação em massa (CSV/NDJSON) para contabilidade e BI.
+"""
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .exportacao import FORMATOS, blocos_assincronos, exportar, nome_arquivo
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def exportar_dados(request, recurso):
+    """
+    Exporta vendas, itens de venda, movimentações ou contas a receber.
+    
+    GET /api/v1/exportar/<recurso>/?formato=csv|ndjson&gzip=1&<filtros>
+    
+    Recursos: vendas, itens-venda, movimentacoes, contas-receber.
+    Os filtros são os mesmos dos endpoints de listagem (api/filters.py).
+    A resposta é transmitida em streaming, sem paginação.
+    """
+    usuario = request.user
+    if not (usuario.is_gerente or usuario.pode_acessar_financeiro()):
+        return Response(
+            {'error': 'Sem permissão para exportar dados.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    formato = request.query_params.get('formato', 'csv')
+    comprimir = request.query_params.get('gzip') in ('1', 'true')
+    try:
+        blocos = exportar(
+            recurso, usuario.empresa_id, request.query_params,
+            formato=formato, comprimir=comprimir, request=request
+        )
+    except ValidationError as e:
+        erro = e.message_dict if hasattr(e, 'error_dict') else e.messages
+        return Response({'error': erro}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if isinstance(request._request, ASGIRequest):
+        # Sob ASGI um iterador síncrono seria lido inteiro antes do envio
+        blocos = blocos_assincronos(blocos)
+    response = StreamingHttpResponse(blocos, content_type=FORMATOS[formato])
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo(recurso, formato, comprimir)}"'
+    if comprimir:
+        response['Content-Type'] = 'application/gzip'
+    return response
@@ -0,0 +1,231 @@
+"""
+Exportação em massa (CSV/NDJSON, opcionalmente gzip) para contabilidade e BI.
+
+As linhas saem direto do banco via values_list().iterator(chunk_size=...)
+(cursor do lado do servidor no PostgreSQL), sem instanciar models nem
+serializers: a memória fica constante em exportações de milhões de linhas
+e o gargalo é o banco. A seleção reaproveita os FilterSets de api/filters.py.
+
+Usado pelo endpoint /api/v1/exportar/<recurso>/ (api/export_views.py;
+sob ASGI os blocos saem por blocos_assincronos),
+pelo comando manage.py exportar_dados e pelo arquivamento de
+movimentações (stock: arquivar_movimentacoes).
+"""
+import csv
+import zlib
+from datetime import date, datetime
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from sales.models import Venda, ItemVenda
+from stock.models import Movimentacao
+from financial.models import ContaReceber
+from .filters import VendaFilter, ItemVendaFilter, MovimentacaoFilter, ContaReceberFilter
+
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Linhas por ida ao banco e bytes por bloco enviado ao cliente/arquivo
+CHUNK_SIZE = 2000
+TAMANHO_BLOCO = 64 * 1024
+
+
+class Exportacao:
+    """
+    Recurso exportável: model, FilterSet e colunas (cabeçalho, caminho no
+    values_list).
+    """
+
+    def __init__(self, modelo, filterset_class, colunas):
+        self.modelo = modelo
+        self.filterset_class = filterset_class
+        self.colunas = colunas
+
+    @property
+    def cabecalhos(self):
+        return [cabecalho for cabecalho, _ in self.colunas]
+
+    def queryset(self, empresa_id, params=None, request=None):
+        """
+        Linhas (tuplas) da empresa filtradas pelo FilterSet, em ordem estável.
+
+        Raises:
+            ValidationError: se os filtros forem inválidos
+        """
+        qs = self.modelo.objects.filter(empresa_id=empresa_id)
+        filterset = self.filterset_class(params or {}, queryset=qs, request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return self.valores(filterset.qs)
+
+    def valores(self, queryset):
+        """Tuplas das colunas do queryset, em ordem estável."""
+        caminhos = [caminho for _, caminho in self.colunas]
+        return queryset.order_by('created_at', 'id').values_list(*caminhos)
+
+
+EXPORTACOES = {
+    'vendas': Exportacao(Venda, VendaFilter, (
+        ('id', 'id'),
+        ('numero', 'numero'),
+        ('data_emissao', 'data_emissao'),
+        ('data_finalizacao', 'data_finalizacao'),
+        ('status', 'status'),
+        ('tipo_pagamento', 'tipo_pagamento'),
+        ('cliente_id', 'cliente_id'),
+        ('cliente_nome', 'cliente__nome'),
+        ('cliente_cpf_cnpj', 'cliente__cpf_cnpj'),
+        ('vendedor', 'vendedor__username'),
+        ('total_bruto', 'total_bruto'),
+        ('total_desconto', 'total_desconto'),
+        ('total_liquido', 'total_liquido'),
+        ('comissao_valor', 'comissao_valor'),
+        ('sessao_caixa_id', 'sessao_caixa_id'),
+    )),
+    'itens-venda': Exportacao(ItemVenda, ItemVendaFilter, (
+        ('id', 'id'),
+        ('venda_id', 'venda_id'),
+        ('venda_numero', 'venda__numero'),
+        ('data_emissao', 'venda__data_emissao'),
+        ('produto_id', 'produto_id'),
+        ('produto_nome', 'produto__nome'),
+        ('produto_sku', 'produto__sku'),
+        ('quantidade', 'quantidade'),
+        ('preco_unitario', 'preco_unitario'),
+        ('custo_unitario', 'custo_unitario'),
+        ('desconto', 'desconto'),
+        ('subtotal', 'subtotal'),
+    )),
+    'movimentacoes': Exportacao(Movimentacao, MovimentacaoFilter, (
+        ('id', 'id'),
+        ('created_at', 'created_at'),
+        ('tipo', 'tipo'),
+        ('produto_id', 'produto_id'),
+        ('produto_nome', 'produto__nome'),
+        ('deposito_id', 'deposito_id'),
+        ('deposito_nome', 'deposito__nome'),
+        ('lote', 'lote__codigo_lote'),
+        ('quantidade', 'quantidade'),
+        ('valor_unitario', 'valor_unitario'),
+        ('documento', 'documento'),
+        ('usuario', 'usuario'),
+    )),
+    'contas-receber': Exportacao(ContaReceber, ContaReceberFilter, (
+        ('id', 'id'),
+        ('venda_id', 'venda_id'),
+        ('cliente_id', 'cliente_id'),
+        ('cliente_nome', 'cliente__nome'),
+        ('descricao', 'descricao'),
+        ('valor_original', 'valor_original'),
+        ('valor_juros', 'valor_juros'),
+        ('valor_multa', 'valor_multa'),
+        ('valor_desconto', 'valor_desconto'),
+        ('data_emissao', 'data_emissao'),
+        ('data_vencimento', 'data_vencimento'),
+        ('data_pagamento', 'data_pagamento'),
+        ('status', 'status'),
+        ('tipo_pagamento', 'tipo_pagamento'),
+    )),
+}
+
+
+class _Eco:
+    """Arquivo falso para o csv.writer: devolve a linha em vez de gravá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def linhas_csv(cabecalhos, linhas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(cabecalhos)
+    for linha in linhas:
+        yield escritor.writerow([_valor_csv(valor) for valor in linha])
+
+
+def linhas_ndjson(cabecalhos, linhas):
+    codificador = DjangoJSONEncoder(ensure_ascii=False)
+    for linha in linhas:
+        yield codificador.encode(dict(zip(cabecalhos, linha))) + '\n'
+
+
+def em_blocos(linhas, comprimir=False):
+    """
+    Agrupa as linhas em blocos de bytes (~TAMANHO_BLOCO), comprimidos em
+    gzip se pedido.
+    """
+    compressor = zlib.compressobj(wbits=31) if comprimir else None  # 31 = gzip
+    buffer, tamanho = [], 0
+    for linha in linhas:
+        buffer.append(linha)
+        tamanho += len(linha)
+        if tamanho >= TAMANHO_BLOCO:
+            bloco = ''.join(buffer).encode()
+            buffer, tamanho = [], 0
+            bloco = compressor.compress(bloco) if compressor else bloco
+            if bloco:
+                yield bloco
+    bloco = ''.join(buffer).encode()
+    if compressor:
+        bloco = compressor.compress(bloco) + compressor.flush()
+    if bloco:
+        yield bloco
+
+
+async def blocos_assincronos(blocos):
+    """
+    Os mesmos blocos como iterador assíncrono, para servir a exportação
+    pelo app ASGI.
+
+    O StreamingHttpResponse consome iteradores síncronos sob ASGI com
+    sync_to_async(list), montando a exportação inteira na memória antes
+    do primeiro byte. Aqui cada bloco é puxado com sync_to_async na thread
+    da requisição (a mesma da conexão e do cursor do banco).
+    """
+    blocos = iter(blocos)
+    proximo = sync_to_async(next)
+    try:
+        while (bloco := await proximo(blocos, None)) is not None:
+            yield bloco
+    finally:
+        # Cliente desconectado: fecha o gerador (e o cursor do servidor)
+        if hasattr(blocos, 'close'):
+            await sync_to_async(blocos.close)()
+
+
+def exportar(recurso, empresa_id, params=None, formato='csv', comprimir=False, request=None):
+    """
+    Gera o conteúdo da exportação em blocos de bytes.
+
+    Os filtros são validados aqui (antes do primeiro bloco); a consulta só
+    é executada quando o gerador é consumido.
+
+    Raises:
+        ValidationError: recurso, formato ou filtros inválidos
+    """
+    exportacao = EXPORTACOES.get(recurso)
+    if exportacao is None:
+        raise ValidationError(f"Recurso de exportação inválido: {recurso}")
+    if formato not in FORMATOS:
+        raise ValidationError(f"Formato inválido: {formato}. Use {', '.join(FORMATOS)}.")
+
+    linhas = exportacao.queryset(empresa_id, params, request).iterator(chunk_size=CHUNK_SIZE)
+    gerar = linhas_csv if formato == 'csv' else linhas_ndjson
+    return em_blocos(gerar(exportacao.cabecalhos, linhas), comprimir)
+
+
+def nome_arquivo(recurso, formato, comprimir=False):
+    return f"{recurso}.{formato}" + ('.gz' if comprimir else '')
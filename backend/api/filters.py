@@ -2,10 +2,10 @@
 Filtros avançados para API usando django-filter.
 """
 from django_filters import rest_framework as filters
-from django.db.models import Q
 
 from sales.models import Venda, ItemVenda
 from catalog.models import Produto, Categoria
+from catalog.services import CatalogService
 from stock.models import Movimentacao, Saldo
 from partners.models import Cliente, Fornecedor
 from financial.models import ContaReceber, ContaPagar
@@ -68,6 +68,37 @@ class VendaFilter(filters.FilterSet):
         }
 
 
+class ItemVendaFilter(filters.FilterSet):
+    """
+    Filtros para itens de venda (pela data e status da venda).
+    
+    Exemplos:
+    - ?data_inicio=2026-01-01&data_fim=2026-01-31
+    - ?venda_status=FINALIZADA&produto=uuid
+    """
+    data_inicio = filters.DateFilter(
+        field_name='venda__data_emissao',
+        lookup_expr='gte',
+        label='Data Início'
+    )
+    data_fim = filters.DateFilter(
+        field_name='venda__data_emissao',
+        lookup_expr='lte',
+        label='Data Fim'
+    )
+    venda_status = filters.CharFilter(
+        field_name='venda__status',
+        label='Status da Venda'
+    )
+    
+    class Meta:
+        model = ItemVenda
+        fields = {
+            'venda': ['exact'],
+            'produto': ['exact'],
+        }
+
+
 class ProdutoFilter(filters.FilterSet):
     """
     Filtros avançados para Produtos.
@@ -104,12 +135,14 @@ class ProdutoFilter(filters.FilterSet):
     )
     
     def filter_search(self, queryset, name, value):
-        """Busca em nome, SKU ou código de barras."""
-        return queryset.filter(
-            Q(nome__icontains=value) |
-            Q(sku__icontains=value) |
-            Q(codigo_barras__icontains=value)
-        )
+        """
+        Busca ranqueada em nome, SKU ou código de barras.
+        
+        Código exato vai direto ao índice; texto usa busca por trigramas
+        (sem acentos, tolerante a erros). Ver CatalogService.buscar_produtos.
+        """
+        empresa_id = getattr(self.request.user, 'empresa_id', None)
+        return CatalogService.buscar_produtos(queryset, value, empresa_id)
     
     class Meta:
         model = Produto
@@ -5,11 +5,11 @@ from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Avg, F
+from django.db.models import Sum
 from django.utils import timezone
-from datetime import timedelta
 
 from sales.models import ItemVenda, Venda, StatusVenda, StatusProducao
+from sales.services import ResumoVendasService
 from financial.models import ContaReceber, ContaPagar, StatusConta
 
 
@@ -135,23 +135,15 @@ def dashboard_resumo_dia(request):
     - ticket_medio: Média por venda
     - ranking_produtos: Top 5 produtos mais vendidos
     - vendas_por_hora: Distribuição ao longo do dia
+    - vendas_por_pagamento: Totais por forma de pagamento
+    
+    As métricas de vendas vêm do rollup horário (ResumoVendasService).
     """
     empresa = request.user.empresa
-    hoje = timezone.now().date()
-    
-    # Vendas finalizadas de hoje
-    vendas_hoje = Venda.objects.filter(
-        empresa=empresa,
-        status=StatusVenda.FINALIZADA,
-        data_finalizacao__date=hoje
-    )
+    hoje = timezone.localdate()
     
-    # Métricas básicas
-    metricas = vendas_hoje.aggregate(
-        total_vendas=Sum('total_liquido'),
-        qtd_pedidos=Count('id'),
-        ticket_medio=Avg('total_liquido')
-    )
+    # Vendas do dia lidas do rollup horário (poucas linhas pré-agregadas)
+    metricas = ResumoVendasService.resumo_periodo(empresa, hoje)
     
     # Financeiro (Hoje)
     fin_receber = ContaReceber.objects.filter(
@@ -166,43 +158,11 @@ def dashboard_resumo_dia(request):
         status=StatusConta.PENDENTE
     ).aggregate(total=Sum('valor_original'))['total'] or 0
 
-    # Top 5 produtos
-    ranking_produtos = ItemVenda.objects.filter(
-        empresa=empresa,
-        venda__status=StatusVenda.FINALIZADA,
-        venda__data_finalizacao__date=hoje
-    ).values(
-        'produto__nome'
-    ).annotate(
-        quantidade_vendida=Sum('quantidade'),
-        valor_total=Sum(F('quantidade') * F('preco_unitario'))
-    ).order_by('-quantidade_vendida')[:5]
-    
-    # Vendas por hora (apenas horas com vendas)
-    vendas_por_hora = []
-    for hora in range(24):
-        inicio = timezone.datetime.combine(
-            hoje,
-            timezone.datetime.min.time()
-        ).replace(hour=hora, tzinfo=timezone.get_current_timezone())
-        fim = inicio + timedelta(hours=1)
-        
-        total_hora = vendas_hoje.filter(
-            data_finalizacao__gte=inicio,
-            data_finalizacao__lt=fim
-        ).aggregate(total=Sum('total_liquido'))['total']
-        
-        if total_hora and total_hora > 0:
-            vendas_por_hora.append({
-                'hora': hora,
-                'total': str(total_hora)
-            })
-    
     return Response({
         'data': str(hoje),
-        'total_vendas': str(metricas['total_vendas'] or 0),
-        'qtd_pedidos': metricas['qtd_pedidos'] or 0,
-        'ticket_medio': str(round(metricas['ticket_medio'] or 0, 2)),
+        'total_vendas': str(metricas['total_vendas']),
+        'qtd_pedidos': metricas['qtd_pedidos'],
+        'ticket_medio': str(round(metricas['ticket_medio'], 2)),
         'contas_receber_hoje': str(fin_receber),
         'contas_pagar_hoje': str(fin_pagar),
         'ranking_produtos': [
@@ -211,7 +171,21 @@ def dashboard_resumo_dia(request):
                 'quantidade': str(item['quantidade_vendida']),
                 'valor_total': str(item['valor_total'])
             }
-            for item in ranking_produtos
+            for item in metricas['ranking_produtos']
+        ],
+        'vendas_por_hora': [
+            {
+                'hora': item['hora'],
+                'total': str(item['total'])
+            }
+            for item in metricas['vendas_por_hora']
         ],
-        'vendas_por_hora': vendas_por_hora
+        'vendas_por_pagamento': [
+            {
+                'tipo_pagamento': item['tipo_pagamento'],
+                'total': str(item['total']),
+                'qtd_pedidos': item['qtd']
+            }
+            for item in metricas['vendas_por_pagamento']
+        ]
     })
@@ -0,0 +1,50 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exportacao import EXPORTACOES, FORMATOS, exportar
+
+
+class Command(BaseCommand):
+    help = 'Exporta vendas, itens de venda, movimentações ou contas a receber em CSV/NDJSON (streaming)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('recurso', choices=sorted(EXPORTACOES))
+        parser.add_argument('--empresa', required=True, help='UUID da empresa')
+        parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Comprime a saída em gzip')
+        parser.add_argument('--saida', help='Arquivo de destino (padrão: stdout)')
+        parser.add_argument(
+            '--filtro', action='append', default=[], metavar='CAMPO=VALOR',
+            help='Filtro do FilterSet da API (ex.: --filtro data_inicio=2026-01-01); pode repetir'
+        )
+
+    def handle(self, *args, **options):
+        filtros = {}
+        for filtro in options['filtro']:
+            campo, sep, valor = filtro.partition('=')
+            if not sep:
+                raise CommandError(f"Filtro inválido (use CAMPO=VALOR): {filtro}")
+            filtros[campo] = valor
+
+        try:
+            blocos = exportar(
+                options['recurso'], options['empresa'], filtros,
+                formato=options['formato'], comprimir=options['gzip']
+            )
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        saida = open(options['saida'], 'wb') if options['saida'] else sys.stdout.buffer
+        total = 0
+        try:
+            for bloco in blocos:
+                saida.write(bloco)
+                total += len(bloco)
+        finally:
+            if options['saida']:
+                saida.close()
+
+        if options['saida']:
+            self.stdout.write(self.style.SUCCESS(f"{total} bytes gravados em {options['saida']}"))
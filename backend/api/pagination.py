@@ -1,9 +1,51 @@
 """
 Paginação customizada para API.
 """
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
-from collections import OrderedDict
+from rest_framework.utils.urls import replace_query_param
+
+
+def contagem_aproximada(queryset):
+    """
+    Número de linhas do queryset estimado pelo planejador (EXPLAIN), sem
+    COUNT(*).
+
+    Returns:
+        int | None: None fora do PostgreSQL (sem estatísticas confiáveis)
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plano = cursor.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return int(plano[0]['Plan']['Plan Rows'])
+
+
+class PaginatorAproximado(Paginator):
+    """Paginator que usa a estimativa do planejador no lugar do COUNT(*)."""
+
+    @cached_property
+    def count(self):
+        estimativa = contagem_aproximada(self.object_list)
+        return super().count if estimativa is None else estimativa
 
 
 class StandardPagination(PageNumberPagination):
@@ -47,3 +89,135 @@ class LargePagination(PageNumberPagination):
     page_size = 100
     page_size_query_param = 'page_size'
     max_page_size = 10000
+
+
+class LedgerPagination(StandardPagination):
+    """
+    Paginação para históricos append-only (Movimentacao, MovimentoCaixa, Venda).
+    
+    Sem ?cursor funciona como StandardPagination (página + COUNT). Com
+    ?cursor (vazio na primeira página) entra no modo keyset sobre
+    (created_at, id): sem COUNT e sem OFFSET, custo constante em qualquer
+    profundidade. O cursor é opaco; a resposta sempre devolve o cursor da
+    última linha, para clientes de sincronização consultarem "tudo depois
+    de X" com ?ordem=asc.
+    
+    Sincronização (?ordem=asc): created_at é atribuído no INSERT, não no
+    COMMIT, então uma linha de uma transação mais longa pode ficar visível
+    depois que o cursor já passou por ela. O asc só entrega linhas criadas
+    antes de agora - JANELA_ATRASO (linhas mais novas podem ter transações
+    ainda abertas à frente delas): o cursor continua com tamanho fixo e
+    sem repetições, ao custo de a sincronização ver cada linha com esse
+    atraso. Linhas que demoram mais que a janela para ficar visíveis
+    continuam sendo puladas.
+    
+    Query params:
+    - cursor: posição (opaco)
+    - ordem: desc (padrão, mais recentes primeiro) ou asc
+    - contagem=aproximada: count estimado pelo planejador (PostgreSQL),
+      também no modo página
+    """
+    cursor_query_param = 'cursor'
+    ordem_query_param = 'ordem'
+    contagem_query_param = 'contagem'
+    invalid_cursor_message = 'Cursor inválido.'
+    
+    # Atraso máximo entre o INSERT e o COMMIT tolerado na sincronização (asc)
+    JANELA_ATRASO = timedelta(seconds=30)
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        aproximada = request.query_params.get(self.contagem_query_param) == 'aproximada'
+        if self.cursor_query_param not in request.query_params:
+            self.keyset = False
+            if aproximada:
+                self.django_paginator_class = PaginatorAproximado
+            return super().paginate_queryset(queryset, request, view)
+        
+        self.keyset = True
+        self.request = request
+        self.tamanho = self.get_page_size(request)
+        crescente = request.query_params.get(self.ordem_query_param) == 'asc'
+        self.contagem = contagem_aproximada(queryset) if aproximada else None
+        
+        if crescente:
+            # Horizonte estável: abaixo dele não há mais INSERT por confirmar
+            queryset = queryset.filter(created_at__lt=timezone.now() - self.JANELA_ATRASO)
+        
+        posicao = self.decodificar_cursor(request.query_params[self.cursor_query_param], queryset.model)
+        if posicao:
+            criado_em, pk = posicao
+            if crescente:
+                queryset = queryset.filter(Q(created_at__gt=criado_em) | Q(created_at=criado_em, id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(created_at__lt=criado_em) | Q(created_at=criado_em, id__lt=pk))
+        ordem = ('created_at', 'id') if crescente else ('-created_at', '-id')
+        
+        # Uma linha a mais indica se há próxima página
+        itens = list(queryset.order_by(*ordem)[:self.tamanho + 1])
+        self.tem_mais = len(itens) > self.tamanho
+        itens = itens[:self.tamanho]
+        
+        if itens:
+            self.cursor = self.codificar_cursor(itens[-1].created_at, itens[-1].pk)
+        else:
+            # Nada novo: o cliente continua do mesmo ponto
+            self.cursor = request.query_params[self.cursor_query_param] or None
+        return itens
+    
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        proxima = None
+        if self.tem_mais:
+            proxima = replace_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param, self.cursor
+            )
+        return Response(OrderedDict([
+            ('count', self.contagem),
+            ('next', proxima),
+            ('cursor', self.cursor),
+            ('page_size', self.tamanho),
+            ('results', data)
+        ]))
+    
+    @staticmethod
+    def codificar_cursor(criado_em, pk):
+        bruto = json.dumps([criado_em.isoformat(), str(pk)]).encode()
+        return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+    
+    def decodificar_cursor(self, cursor, modelo):
+        """(created_at, id) do cursor; None para o início."""
+        if not cursor:
+            return None
+        try:
+            bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            criado_em, pk = json.loads(bruto)
+            return datetime.fromisoformat(criado_em), modelo._meta.pk.to_python(pk)
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+    
+    def get_schema_operation_parameters(self, view):
+        parametros = super().get_schema_operation_parameters(view)
+        return parametros + [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor keyset (vazio para a primeira página).',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.ordem_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'desc (padrão) ou asc, no modo cursor.',
+                'schema': {'type': 'string', 'enum': ['desc', 'asc']},
+            },
+            {
+                'name': self.contagem_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'aproximada: count estimado pelo planejador.',
+                'schema': {'type': 'string', 'enum': ['aproximada']},
+            },
+        ]
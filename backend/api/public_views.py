@@ -1,11 +1,54 @@
+import hashlib
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from django.shortcuts import get_object_or_404
 from tenant.models import Empresa
-from catalog.models import Categoria
+from tenant.services import SequenciaService
+from catalog.models import Categoria, Produto, TipoProduto, GrupoComplemento
 from .serializers.public import PublicEmpresaSerializer, PublicCategoriaSerializer
 
+# Cardápio compilado fica em cache por 1 dia; versões antigas expiram sozinhas
+CARDAPIO_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def compilar_cardapio(empresa_id):
+    """
+    Serializa o cardápio completo da empresa em um único blob JSON.
+    
+    Consultas fixas (categorias, produtos, grupos e complementos via
+    prefetch), independentemente do tamanho do catálogo.
+    
+    Returns:
+        tuple: (conteúdo JSON em bytes, ETag)
+    """
+    produtos = Produto.objects.filter(
+        is_active=True,
+        tipo__in=[TipoProduto.FINAL, TipoProduto.COMPOSTO]
+    ).order_by('nome').prefetch_related(
+        Prefetch(
+            'grupos_complementos',
+            queryset=GrupoComplemento.objects.prefetch_related('complementos')
+        )
+    )
+    categorias = Categoria.objects.filter(
+        empresa_id=empresa_id,
+        is_active=True
+    ).order_by('ordem', 'nome').prefetch_related(
+        Prefetch('produtos', queryset=produtos, to_attr='produtos_publicos')
+    )
+    
+    conteudo = JSONRenderer().render(PublicCategoriaSerializer(categorias, many=True).data)
+    etag = '"%s"' % hashlib.md5(conteudo).hexdigest()
+    return conteudo, etag
+
+
 class PublicMenuViewSet(viewsets.ViewSet):
     """
     API Pública para o Cardápio Digital.
@@ -24,17 +67,32 @@ class PublicMenuViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'], url_path='(?P<slug>[^/.]+)/catalogo')
     def catalogo(self, request, slug=None):
-        """Retorna o catálogo completo (categorias -> produtos) da empresa."""
-        empresa = get_object_or_404(Empresa, slug=slug, is_active=True)
+        """
+        Retorna o catálogo completo (categorias -> produtos) da empresa.
         
-        # Busca categorias ativas
-        categorias = Categoria.objects.filter(
-            empresa=empresa, 
-            is_active=True
-        ).order_by('ordem', 'nome')
+        O cardápio é compilado uma vez por versão (sequência CARDAPIO da
+        empresa, incrementada pelos signals do catálogo) e servido do cache.
+        Suporta ETag/If-None-Match (304 sem corpo).
+        """
+        empresa = Empresa.objects.filter(slug=slug, is_active=True).annotate(
+            versao=SequenciaService.subquery_ultimo_numero(SequenciaService.CHAVE_CARDAPIO)
+        ).values('id', 'versao').first()
+        if empresa is None:
+            return Response({'detail': 'Não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Filtra categorias vazias (opcional, mas bom para UX)
-        # Por performance, vamos retornar todas e o frontend esconde se vazio
+        chave = f"cardapio:{slug}:{empresa['versao']}"
+        compilado = cache.get(chave)
+        if compilado is None:
+            compilado = compilar_cardapio(empresa['id'])
+            cache.set(chave, compilado, CARDAPIO_CACHE_TIMEOUT)
+        conteudo, etag = compilado
         
-        serializer = PublicCategoriaSerializer(categorias, many=True)
-        return Response(serializer.data)
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(conteudo, content_type='application/json')
+        
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
@@ -55,6 +55,14 @@ class FichaTecnicaItemSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError({
                     'componente': 'Um produto não pode ser componente dele mesmo.'
                 })
+            
+            # Ciclos indiretos (consulta única na BOM explodida)
+            from django.core.exceptions import ValidationError as DjangoValidationError
+            from catalog.services import CatalogService
+            try:
+                CatalogService.validar_ciclo_ficha_tecnica(data['produto_pai'], data['componente'])
+            except DjangoValidationError as e:
+                raise serializers.ValidationError({'componente': e.messages})
         return data
 
 
@@ -85,4 +85,8 @@ class SessaoCaixaSerializer(serializers.ModelSerializer):
     class Meta:
         model = SessaoCaixa
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at', 'data_abertura', 'data_fechamento', 'saldo_final_calculado', 'status']
+        read_only_fields = [
+            'id', 'created_at', 'updated_at', 'data_abertura', 'data_fechamento', 'saldo_final_calculado', 'status',
+            'total_suprimentos', 'total_sangrias', 'total_recebimentos', 'total_vendas_dinheiro', 'total_vendas_pix',
+            'total_vendas_cartao_debito', 'total_vendas_cartao_credito', 'total_vendas_outros',
+        ]
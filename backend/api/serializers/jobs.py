@@ -0,0 +1,21 @@
+"""
+Serializers para módulo Jobs (tarefas em segundo plano).
+"""
+from rest_framework import serializers
+from jobs.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer (somente leitura) do status de um Job."""
+    
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'tipo', 'status', 'status_display', 'chave_idempotencia',
+            'tentativas', 'max_tentativas', 'executar_em',
+            'iniciado_em', 'concluido_em', 'resultado', 'erro',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
@@ -10,7 +10,7 @@ class PublicEnderecoSerializer(serializers.ModelSerializer):
 
 class PublicEmpresaSerializer(serializers.ModelSerializer):
     """Serializer público para dados da empresa."""
-    endereco_principal = PublicEnderecoSerializer(read_only=True)
+    endereco_principal = serializers.SerializerMethodField()
     
     class Meta:
         model = Empresa
@@ -21,6 +21,13 @@ class PublicEmpresaSerializer(serializers.ModelSerializer):
             'website', 'email'
         ]
 
+    def get_endereco_principal(self, obj):
+        # Endereço do perfil fiscal memorizado (cache), sem consultar Endereco
+        endereco = obj.perfil_fiscal.endereco
+        if not endereco:
+            return None
+        return {campo: endereco[campo] for campo in PublicEnderecoSerializer.Meta.fields}
+
 class PublicComplementoSerializer(serializers.ModelSerializer):
     """Serializer público para opções de complemento."""
     class Meta:
@@ -56,6 +63,9 @@ class PublicCategoriaSerializer(serializers.ModelSerializer):
         fields = ['id', 'nome', 'descricao', 'ordem', 'produtos']
 
     def get_produtos(self, obj):
-        # Filtra apenas produtos ativos e que não são insumos
-        produtos = obj.produtos.filter(is_active=True, tipo__in=['FINAL', 'COMPOSTO']).order_by('nome')
+        # Usa o prefetch do cardápio compilado quando disponível
+        produtos = getattr(obj, 'produtos_publicos', None)
+        if produtos is None:
+            # Filtra apenas produtos ativos e que não são insumos
+            produtos = obj.produtos.filter(is_active=True, tipo__in=['FINAL', 'COMPOSTO']).order_by('nome')
         return PublicProdutoSerializer(produtos, many=True).data
@@ -4,6 +4,7 @@ Serializers para módulo Sales (Vendas).
 from rest_framework import serializers
 from django.db import transaction
 from sales.models import Venda, ItemVenda, ItemVendaComplemento
+from sales.services import VendaService
 
 
 class ItemVendaComplementoSerializer(serializers.ModelSerializer):
@@ -54,17 +55,18 @@ class ItemVendaSerializer(serializers.ModelSerializer):
             venda_id = self.context.get('request').data.get('venda')
             venda = Venda.objects.get(id=venda_id)
         
-        # Cria item
-        item = ItemVenda.objects.create(venda=venda, **validated_data)
-        
-        # Cria complementos
-        for comp_data in complementos_data:
-            ItemVendaComplemento.objects.create(
-                item_pai=item,
-                empresa=item.empresa,
-                **comp_data
-            )
+        # Cria item e complementos (totais da venda recalculados uma vez)
+        with VendaService.adiar_recalculo_totais():
+            item = ItemVenda.objects.create(venda=venda, **validated_data)
+            
+            for comp_data in complementos_data:
+                ItemVendaComplemento.objects.create(
+                    item_pai=item,
+                    empresa=item.empresa,
+                    **comp_data
+                )
         
+        item.refresh_from_db(fields=['subtotal'])
         return item
     
     @transaction.atomic
@@ -73,24 +75,26 @@ class ItemVendaSerializer(serializers.ModelSerializer):
         # Extra nested data
         complementos_data = validated_data.pop('complementos', None)
         
-        # Atualiza item
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        # Se complementos foram fornecidos, substitui todos
-        if complementos_data is not None:
-            # Remove complementos antigos
-            instance.complementos.all().delete()
+        with VendaService.adiar_recalculo_totais():
+            # Atualiza item
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
             
-            # Cria novos
-            for comp_data in complementos_data:
-                ItemVendaComplemento.objects.create(
-                    item_pai=instance,
-                    empresa=instance.empresa,
-                    **comp_data
-                )
+            # Se complementos foram fornecidos, substitui todos
+            if complementos_data is not None:
+                # Remove complementos antigos
+                instance.complementos.all().delete()
+                
+                # Cria novos
+                for comp_data in complementos_data:
+                    ItemVendaComplemento.objects.create(
+                        item_pai=instance,
+                        empresa=instance.empresa,
+                        **comp_data
+                    )
         
+        instance.refresh_from_db(fields=['subtotal'])
         return instance
 
 
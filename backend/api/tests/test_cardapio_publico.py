@@ -0,0 +1,72 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from decimal import Decimal
+from tenant.models import Empresa
+from catalog.models import Categoria, Produto, TipoProduto, GrupoComplemento, Complemento
+
+
+class CardapioPublicoAPITest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Lanchonete QR',
+            razao_social='Lanchonete QR LTDA',
+            cnpj='11222333000181',
+        )
+        categoria = Categoria.objects.create(empresa=self.empresa, nome='Lanches')
+        self.burger = Produto.objects.create(
+            empresa=self.empresa,
+            nome='Burger',
+            categoria=categoria,
+            tipo=TipoProduto.FINAL,
+            preco_venda=Decimal('30.00'),
+        )
+        grupo = GrupoComplemento.objects.create(empresa=self.empresa, nome='Adicionais')
+        grupo.produtos_vinculados.add(self.burger)
+        Complemento.objects.create(
+            empresa=self.empresa, grupo=grupo, nome='Bacon', preco_adicional=Decimal('4.00'),
+        )
+        self.url = f'/api/v1/public/menu/{self.empresa.slug}/catalogo/'
+
+    def test_cardapio_servido_do_cache(self):
+        primeira = self.client.get(self.url)
+        self.assertEqual(primeira.status_code, 200)
+        produto = primeira.json()[0]['produtos'][0]
+        self.assertEqual(produto['grupos_complementos'][0]['complementos'][0]['nome'], 'Bacon')
+        
+        with CaptureQueriesContext(connection) as ctx:
+            segunda = self.client.get(self.url)
+        self.assertEqual(segunda.content, primeira.content)
+        self.assertEqual(len(ctx.captured_queries), 1)  # apenas a versão da empresa
+
+    def test_etag_e_invalidacao_por_signal(self):
+        resposta = self.client.get(self.url)
+        etag = resposta['ETag']
+        
+        nao_modificado = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(nao_modificado.status_code, 304)
+        self.assertEqual(nao_modificado.content, b'')
+        
+        self.burger.preco_venda = Decimal('32.00')
+        self.burger.save()
+        
+        atualizado = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(atualizado.status_code, 200)
+        self.assertNotEqual(atualizado['ETag'], etag)
+        self.assertEqual(atualizado.json()[0]['produtos'][0]['preco_venda'], '32.00')
+
+    def test_save_da_empresa_nao_regrava_versao_antiga(self):
+        empresa = Empresa.objects.get(id=self.empresa.id)
+        etag = self.client.get(self.url)['ETag']
+
+        self.burger.preco_venda = Decimal('35.00')
+        self.burger.save()
+        empresa.save()  # instância carregada antes da alteração do catálogo
+
+        atualizado = self.client.get(self.url)
+        self.assertNotEqual(atualizado['ETag'], etag)
+        self.assertEqual(atualizado.json()[0]['produtos'][0]['preco_venda'], '35.00')
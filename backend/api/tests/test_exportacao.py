@@ -0,0 +1,127 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import warnings
+from datetime import date, timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.models import CustomUser, TipoCargo
+from catalog.models import Categoria, Produto, TipoProduto
+from stock.models import Deposito
+from stock.services import StockService
+from tenant.models import Empresa
+
+
+class ExportacaoTest(TestCase):
+    url = '/api/v1/exportar/movimentacoes/'
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Export',
+            razao_social='Empresa Export LTDA',
+            cnpj='11222333000181',
+            email='export@empresa.test',
+        )
+        self.gerente = CustomUser.objects.create_user(
+            username='gerente', email='gerente@empresa.test', password='123456',
+            empresa=self.empresa, cargo=TipoCargo.GERENTE,
+        )
+        self.deposito = Deposito.objects.create(empresa=self.empresa, nome='Loja', is_padrao=True)
+        self.produto = Produto.objects.create(
+            empresa=self.empresa,
+            nome='Café',
+            categoria=Categoria.objects.create(empresa=self.empresa, nome='Bebidas'),
+            tipo=TipoProduto.FINAL,
+            preco_venda=Decimal('8.00'),
+        )
+        self._entradas(3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.gerente)
+
+    def _entradas(self, quantidade, inicio=0):
+        for i in range(inicio, inicio + quantidade):
+            StockService.dar_entrada_com_lote(
+                produto=self.produto,
+                deposito=self.deposito,
+                quantidade=Decimal('10.000'),
+                codigo_lote=f'LOTE-{i}',
+                data_validade=date.today() + timedelta(days=30),
+            )
+
+    def _conteudo(self, resposta):
+        return b''.join(resposta.streaming_content)
+
+    def test_csv_com_filtros_da_api(self):
+        resposta = self.client.get(self.url, {'tipo': 'ENTRADA'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('movimentacoes.csv', resposta['Content-Disposition'])
+
+        linhas = list(csv.DictReader(io.StringIO(self._conteudo(resposta).decode())))
+        self.assertEqual(len(linhas), 3)
+        self.assertEqual({linha['lote'] for linha in linhas}, {'LOTE-0', 'LOTE-1', 'LOTE-2'})
+        self.assertEqual(linhas[0]['produto_nome'], 'Café')
+
+        vazio = self.client.get(self.url, {'tipo': 'SAIDA'})
+        self.assertEqual(len(self._conteudo(vazio).decode().splitlines()), 1)  # só o cabeçalho
+
+    def test_ndjson_gzip(self):
+        resposta = self.client.get(self.url, {'formato': 'ndjson', 'gzip': '1'})
+        self.assertEqual(resposta['Content-Type'], 'application/gzip')
+
+        linhas = gzip.decompress(self._conteudo(resposta)).decode().splitlines()
+        registros = [json.loads(linha) for linha in linhas]
+        self.assertEqual(len(registros), 3)
+        self.assertEqual(registros[0]['quantidade'], '10.000')
+
+    def test_consultas_nao_crescem_com_as_linhas(self):
+        with CaptureQueriesContext(connection) as poucas:
+            self._conteudo(self.client.get(self.url))
+        self._entradas(10, inicio=3)
+        with CaptureQueriesContext(connection) as muitas:
+            self._conteudo(self.client.get(self.url))
+        self.assertEqual(len(poucas), len(muitas))
+
+    def test_filtro_invalido_e_permissao(self):
+        self.assertEqual(self.client.get(self.url, {'data_inicio': 'ontem'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/exportar/senhas/').status_code, 400)
+
+        vendedor = CustomUser.objects.create_user(
+            username='vendedor', email='vendedor@empresa.test', password='123456',
+            empresa=self.empresa, cargo=TipoCargo.VENDEDOR,
+        )
+        self.client.force_authenticate(vendedor)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    async def test_streaming_assincrono_sob_asgi(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.gerente).access_token))()
+        resposta = await AsyncClient().get(self.url, headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.is_async)
+
+        with warnings.catch_warnings():
+            # Iterador síncrono sob ASGI: aviso e leitura integral antes do envio
+            warnings.simplefilter('error')
+            conteudo = b''.join([bloco async for bloco in resposta])
+        self.assertEqual(len(conteudo.decode().splitlines()), 4)
+
+    def test_comando_grava_arquivo(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'mov.ndjson')
+            call_command(
+                'exportar_dados', 'movimentacoes',
+                empresa=str(self.empresa.id), formato='ndjson', saida=caminho,
+                filtro=['tipo=ENTRADA'], stdout=io.StringIO(),
+            )
+            with open(caminho) as arquivo:
+                self.assertEqual(len(arquivo.readlines()), 3)
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.pagination import LedgerPagination
+from authentication.models import CustomUser, TipoCargo
+from financial.models import Caixa, MovimentoCaixa, TipoMovimentoCaixa
+from financial.services import CaixaService
+from tenant.models import Empresa
+
+
+class PaginacaoKeysetTest(TestCase):
+    url = '/api/v1/movimentos-caixa/'
+
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Keyset',
+            razao_social='Empresa Keyset LTDA',
+            cnpj='11222333000181',
+            email='keyset@empresa.test',
+        )
+        self.user = CustomUser.objects.create_user(
+            username='operador',
+            email='operador@empresa.test',
+            password='123456',
+            empresa=self.empresa,
+            cargo=TipoCargo.GERENTE,
+        )
+        caixa = Caixa.objects.create(empresa=self.empresa, nome='Caixa 1')
+        self.sessao = CaixaService.abrir_caixa(caixa.id, self.user)
+        self.movimentos = [
+            CaixaService.registrar_movimento(self.sessao, TipoMovimentoCaixa.SUPRIMENTO, Decimal(valor), 'Troco')
+            for valor in range(1, 8)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get(self, url, params, agora=None):
+        # Sincronização (asc): só vê linhas anteriores a agora - JANELA_ATRASO
+        agora = agora or timezone.now() + LedgerPagination.JANELA_ATRASO + timedelta(seconds=1)
+        with mock.patch('api.pagination.timezone.now', return_value=agora):
+            return self.client.get(url, params)
+
+    def _percorrer(self, params):
+        ids, url = [], self.url
+        while url:
+            resposta = self._get(url, params)
+            self.assertEqual(resposta.status_code, 200)
+            dados = resposta.json()
+            ids += [m['id'] for m in dados['results']]
+            url, params = dados['next'], None
+        return ids, dados['cursor']
+
+    def test_percorre_historico_sem_count_nem_repeticao(self):
+        ids, _ = self._percorrer({'cursor': '', 'page_size': 3})
+        esperados = [str(m.id) for m in sorted(self.movimentos, key=lambda m: (m.created_at, m.id), reverse=True)]
+        self.assertEqual(ids, esperados)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url, {'cursor': '', 'page_size': 3})
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_sincronizacao_a_partir_do_cursor(self):
+        _, cursor = self._percorrer({'cursor': '', 'ordem': 'asc', 'page_size': 5})
+
+        novo = CaixaService.registrar_movimento(self.sessao, TipoMovimentoCaixa.SANGRIA, Decimal('2.00'), 'Retirada')
+        dados = self._get(self.url, {'cursor': cursor, 'ordem': 'asc'}).json()
+        self.assertEqual([m['id'] for m in dados['results']], [str(novo.id)])
+
+        # Sem novidades o cursor é devolvido como veio
+        vazio = self._get(self.url, {'cursor': dados['cursor'], 'ordem': 'asc'}).json()
+        self.assertEqual(vazio['results'], [])
+        self.assertEqual(vazio['cursor'], dados['cursor'])
+
+    def test_sincronizacao_espera_a_janela_de_atraso(self):
+        _, cursor = self._percorrer({'cursor': '', 'ordem': 'asc', 'page_size': 5})
+
+        # Linha recente: outra transação mais antiga ainda pode confirmar antes dela
+        novo = CaixaService.registrar_movimento(self.sessao, TipoMovimentoCaixa.SANGRIA, Decimal('2.00'), 'Retirada')
+        recente = self._get(self.url, {'cursor': cursor, 'ordem': 'asc'}, agora=novo.created_at).json()
+        self.assertEqual(recente['results'], [])
+        self.assertEqual(recente['cursor'], cursor)
+
+        # INSERT anterior ao novo que só ficou visível depois da leitura
+        atrasado = CaixaService.registrar_movimento(self.sessao, TipoMovimentoCaixa.SANGRIA, Decimal('1.00'), 'Atraso')
+        ultimo = max(m.created_at for m in self.movimentos)
+        MovimentoCaixa.objects.filter(id=atrasado.id).update(created_at=ultimo + (novo.created_at - ultimo) / 2)
+
+        dados = self._get(self.url, {'cursor': cursor, 'ordem': 'asc'}).json()
+        self.assertEqual([m['id'] for m in dados['results']], [str(atrasado.id), str(novo.id)])
+        self.assertLess(len(dados['cursor']), 200)
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'xyz'}).status_code, 404)
+
+    def test_sem_cursor_mantem_paginacao_por_pagina(self):
+        dados = self.client.get(self.url, {'page_size': 3}).json()
+        self.assertEqual(dados['count'], 7)
+        self.assertEqual(dados['total_pages'], 3)
@@ -11,15 +11,17 @@ from api.views import (
 )
 # Views importadas diretamente dos apps
 from partners.views import ClienteViewSet, FornecedorViewSet, ColaboradorViewSet
-from financial.views import ContaReceberViewSet, ContaPagarViewSet, CaixaViewSet, SessaoCaixaViewSet
-from restaurant.views import SetorImpressaoViewSet, MesaViewSet, ComandaViewSet, KdsViewSet
+from financial.views import ContaReceberViewSet, ContaPagarViewSet, CaixaViewSet, SessaoCaixaViewSet, MovimentoCaixaViewSet
+from restaurant.views import SetorImpressaoViewSet, MesaViewSet, ComandaViewSet, KdsViewSet, kds_stream
 from api.kds_dashboard_views import ProducaoViewSet, dashboard_resumo_dia
 from api.health_views import health_check
+from api.export_views import exportar_dados
 from authentication.models import CustomUser
 from authentication.serializers import UserSerializer
 from locations.models import Endereco
 from api.serializers import EnderecoSerializer
 from tenant.views import EmpresaViewSet
+from jobs.views import JobViewSet
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -53,6 +55,7 @@ router.register(r'contas-receber', ContaReceberViewSet, basename='conta-receber'
 router.register(r'contas-pagar', ContaPagarViewSet, basename='conta-pagar')
 router.register(r'caixas', CaixaViewSet, basename='caixa')
 router.register(r'sessoes-caixa', SessaoCaixaViewSet, basename='sessao-caixa')
+router.register(r'movimentos-caixa', MovimentoCaixaViewSet, basename='movimento-caixa')
 
 # Restaurant (Food Service)
 router.register(r'setores-impressao', SetorImpressaoViewSet, basename='setor-impressao')
@@ -63,6 +66,9 @@ router.register(r'kds', KdsViewSet, basename='kds')
 # KDS (Kitchen Display System)
 router.register(r'producao', ProducaoViewSet, basename='producao')
 
+# Jobs (tarefas em segundo plano)
+router.register(r'jobs', JobViewSet, basename='job')
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
@@ -110,6 +116,9 @@ router.register(r'empresa', EmpresaViewSet, basename='empresa')
 router.register(r'public/menu', PublicMenuViewSet, basename='public-menu')
 
 urlpatterns = [
+    # Feed SSE do KDS (view assíncrona; antes do router para não cair em kds/<pk>/)
+    path('kds/stream/', kds_stream, name='kds-stream'),
+    
     path('', include(router.urls)),
     
     # NFe Import
@@ -118,6 +127,9 @@ urlpatterns = [
     # Dashboard Analytics
     path('dashboard/resumo-dia/', dashboard_resumo_dia, name='dashboard-resumo-dia'),
     
+    # Exportação em massa (CSV/NDJSON)
+    path('exportar/<slug:recurso>/', exportar_dados, name='exportar-dados'),
+    
     # Health Check
     path('health/', health_check, name='health-check'),
 ]
@@ -6,6 +6,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.core.exceptions import ValidationError
 from datetime import timedelta
 
 from catalog.models import Categoria, Produto, FichaTecnicaItem
@@ -25,6 +27,7 @@ from .filters import (
     ClienteFilter, FornecedorFilter, ContaReceberFilter, ContaPagarFilter
 )
 from .throttling import VendaRateThrottle, RelatorioRateThrottle
+from .pagination import LedgerPagination
 
 
 class TenantFilteredViewSet(viewsets.ModelViewSet):
@@ -75,11 +78,17 @@ class ProdutoViewSet(TenantFilteredViewSet):
     """
     queryset = Produto.objects.select_related('categoria')
     filterset_class = ProdutoFilter
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['nome', 'sku', 'codigo_barras', 'descricao']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     ordering_fields = ['nome', 'preco_venda', 'created_at']
     ordering = ['nome']
     
+    def filter_queryset(self, queryset):
+        """Com ?search e sem ?ordering explícito, mantém a ordem por relevância."""
+        queryset = super().filter_queryset(queryset)
+        if 'relevancia' in queryset.query.annotations and not self.request.query_params.get('ordering'):
+            queryset = queryset.order_by('-relevancia', 'nome')
+        return queryset
+    
     def get_serializer_class(self):
         """Retorna serializer baseado na action."""
         if self.action == 'list':
@@ -358,6 +367,46 @@ class SaldoViewSet(viewsets.ReadOnlyModelViewSet):
                 {'error': 'Saldo não encontrado', 'quantidade': 0},
                 status=status.HTTP_404_NOT_FOUND
             )
+    
+    @action(detail=False, methods=['get'], url_path='na-data')
+    def na_data(self, request):
+        """
+        Posição do estoque ao fim de uma data (último fechamento + movimentações).
+        
+        Query params:
+            - data: AAAA-MM-DD (obrigatório)
+            - produto / deposito: UUIDs (opcionais)
+            - por_lote=1: detalha por lote
+        """
+        try:
+            data = parse_date(request.query_params.get('data') or '')
+        except ValueError:
+            data = None
+        if not data:
+            return Response(
+                {'error': 'data é obrigatória (AAAA-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        por_lote = request.query_params.get('por_lote') in ('1', 'true')
+        
+        try:
+            posicao = StockService.saldo_em(
+                request.user.empresa_id, data,
+                produto_id=request.query_params.get('produto'),
+                deposito_id=request.query_params.get('deposito'),
+                por_lote=por_lote
+            )
+        except ValidationError as e:
+            return Response({'error': ' '.join(e.messages)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        campos = ('produto_id', 'deposito_id', 'lote_id') if por_lote else ('produto_id', 'deposito_id')
+        return Response({
+            'data': data,
+            'saldos': [
+                {**dict(zip(campos, chave)), 'quantidade': str(quantidade)}
+                for chave, quantidade in posicao.items()
+            ]
+        })
 
 
 class MovimentacaoViewSet(TenantFilteredViewSet):
@@ -370,12 +419,16 @@ class MovimentacaoViewSet(TenantFilteredViewSet):
     - produto_nome - Buscar por nome do produto
     - documento - Buscar por número do documento
     - lote - UUID do lote (para rastreabilidade)
+    
+    ## Paginação:
+    - ?cursor= ativa o modo keyset (ver LedgerPagination)
     """
     queryset = Movimentacao.objects.select_related('produto', 'deposito', 'lote')
     serializer_class = MovimentacaoSerializer
     filterset_class = MovimentacaoFilter
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     ordering = ['-created_at']
+    pagination_class = LedgerPagination
 
 
 # ==================== SALES ====================
@@ -399,6 +452,7 @@ class VendaViewSet(TenantFilteredViewSet):
     GET /api/vendas/?status=FINALIZADA&data_inicio=2026-01-01
     GET /api/vendas/?valor_min=100&valor_max=1000
     GET /api/vendas/?cliente_nome=João
+    GET /api/vendas/?cursor=&ordem=asc  (keyset, ver LedgerPagination)
     ```
     """
     queryset = Venda.objects.select_related('cliente', 'vendedor').prefetch_related('itens__produto')
@@ -407,6 +461,7 @@ class VendaViewSet(TenantFilteredViewSet):
     search_fields = ['numero', 'cliente__nome', 'observacoes']
     ordering = ['-data_emissao']
     throttle_classes = [VendaRateThrottle]
+    pagination_class = LedgerPagination
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -476,7 +531,7 @@ class VendaViewSet(TenantFilteredViewSet):
             venda = VendaService.finalizar_venda(
                 venda_id=pk,
                 deposito_id=deposito_id,
-                usuario=request.user.username,
+                usuario=request.user,
                 usar_lotes=usar_lotes,
                 gerar_conta_receber=gerar_conta_receber
             )
@@ -8,3 +8,7 @@ class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
     verbose_name = 'Autenticação'
+
+    def ready(self):
+        """Importa signals quando o app estiver pronto."""
+        import authentication.signals  # noqa
@@ -0,0 +1,39 @@
+"""
+Autenticação JWT com contexto de tenant.
+"""
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import contexto
+
+
+class TenantJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que resolve o usuário pelo cache do processo
+    (authentication.contexto) em vez de consultar o banco a cada requisição.
+
+    O usuário já vem com a empresa carregada, então request.user.empresa e
+    os filtros por tenant não geram consultas extras. O claim empresa_id do
+    token precisa conferir com a empresa atual do usuário.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token sem identificação de usuário.')
+
+        user = contexto.obter_usuario(user_id)
+        if user is None:
+            raise AuthenticationFailed('Usuário não encontrado.', code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('Usuário inativo.', code='user_inactive')
+
+        empresa_id = validated_token.get('empresa_id')
+        if empresa_id and empresa_id != str(user.empresa_id):
+            # Usuário trocado de empresa depois da emissão do token
+            raise AuthenticationFailed('Token de outra empresa.', code='empresa_alterada')
+
+        return user
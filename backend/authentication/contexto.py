@@ -0,0 +1,108 @@
+"""
+Contexto de tenant por processo: usuários (com a empresa) servidos de um
+cache em memória de TTL curto.
+
+A autenticação JWT (authentication.backends.TenantJWTAuthentication) usa
+este cache no lugar do SELECT do usuário e do acesso a user.empresa feitos
+a cada requisição.
+
+Invalidação (authentication/signals.py):
+- save/delete de CustomUser descarta o usuário
+- save/delete de Empresa descarta os usuários da empresa (exceto saves
+  com update_fields restritos a campos de controle, como numero_nfe_atual)
+- blacklist de token descarta o usuário dono do token
+
+O cache é local ao processo: em outros workers uma alteração só é vista
+após o TTL, por isso ele é curto.
+"""
+import copy
+import threading
+import time
+
+
+# Segundos que um usuário fica no cache do processo
+CONTEXTO_TTL = 60
+
+
+class CacheContexto:
+    """Dicionário com expiração por item, seguro entre threads."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._itens = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave, carregar):
+        """
+        Valor em cache para a chave; na falta (ou expirado) chama carregar().
+
+        Valores None não são guardados.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+        if item is not None and item[0] > agora:
+            return item[1]
+
+        valor = carregar()
+        if valor is not None:
+            with self._lock:
+                self._itens[chave] = (agora + self.ttl, valor)
+        return valor
+
+    def descartar(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def descartar_se(self, predicado):
+        """Descarta os itens cujo valor satisfaz o predicado."""
+        with self._lock:
+            for chave in [c for c, (_, valor) in self._itens.items() if predicado(valor)]:
+                del self._itens[chave]
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+_usuarios = CacheContexto(CONTEXTO_TTL)
+
+
+def _copiar_usuario(usuario):
+    # Cada requisição recebe sua cópia: alterações (ex.: PATCH /me) não vazam
+    # para o objeto em cache nem entre threads
+    copia = copy.copy(usuario)
+    if usuario.empresa_id:
+        copia.empresa = copy.copy(usuario.empresa)
+    return copia
+
+
+def obter_usuario(user_id):
+    """
+    Usuário pelo id, com a empresa já carregada (cópia do cache).
+
+    Returns:
+        CustomUser | None: None se não existir
+    """
+    from .models import CustomUser
+
+    def carregar():
+        return CustomUser.objects.select_related('empresa').filter(pk=user_id).first()
+
+    usuario = _usuarios.obter(str(user_id), carregar)
+    return _copiar_usuario(usuario) if usuario else None
+
+
+def invalidar_usuario(user_id):
+    """Descarta o usuário do cache do processo."""
+    _usuarios.descartar(str(user_id))
+
+
+def invalidar_empresa(empresa_id):
+    """Descarta do cache do processo os usuários da empresa."""
+    _usuarios.descartar_se(lambda usuario: usuario.empresa_id == empresa_id)
+
+
+def limpar():
+    """Esvazia o cache do processo (testes e comandos)."""
+    _usuarios.limpar()
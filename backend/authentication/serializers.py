@@ -16,6 +16,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     - cargo
     - permissions
     - is_superuser
+    - role_caixa, role_atendente, comissao_percentual
     
     Isso permite que o frontend saiba quem está logado sem fazer request extra.
     """
@@ -30,7 +31,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['email'] = user.email
         token['nome_completo'] = user.get_full_name()
         
-        # Informações da empresa (multi-tenancy)
+        # Informações da empresa (multi-tenancy); empresa_id é conferido
+        # a cada requisição por TenantJWTAuthentication
         if user.empresa:
             token['empresa_id'] = str(user.empresa.id)
             token['nome_empresa'] = user.empresa.nome_fantasia
@@ -54,6 +56,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['is_colaborador'] = user.is_colaborador
         token['role_atendente'] = user.role_atendente
         token['role_caixa'] = user.role_caixa
+        token['comissao_percentual'] = f"{user.comissao_percentual:.2f}"
         
         return token
     
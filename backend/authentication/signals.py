@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from tenant.models import Empresa
+from . import contexto
+from .models import CustomUser
+
+
+# Campos de controle da Empresa que não precisam ser vistos pelas requisições
+# (contadores e carimbo de data); saves restritos a eles mantêm o cache
+CAMPOS_EMPRESA_SEM_CONTEXTO = {'numero_nfe_atual', 'updated_at'}
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidar_contexto_usuario(sender, instance, **kwargs):
+    """Usuário alterado: descarta a cópia em cache do processo."""
+    contexto.invalidar_usuario(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Empresa)
+def invalidar_contexto_empresa(sender, instance, update_fields=None, **kwargs):
+    """Empresa alterada: descarta os usuários que a carregam."""
+    if update_fields is not None and set(update_fields) <= CAMPOS_EMPRESA_SEM_CONTEXTO:
+        return
+    contexto.invalidar_empresa(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def invalidar_contexto_token_revogado(sender, instance, **kwargs):
+    """Token revogado (logout/rotação): próxima requisição recarrega o usuário."""
+    user_id = instance.token.user_id
+    if user_id:
+        contexto.invalidar_usuario(user_id)
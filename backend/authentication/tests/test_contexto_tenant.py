@@ -0,0 +1,91 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication import contexto
+from authentication.models import CustomUser
+from authentication.serializers import CustomTokenObtainPairSerializer
+from tenant.models import Empresa
+
+
+def consultas_usuario(ctx):
+    return [q['sql'] for q in ctx.captured_queries if 'authentication_customuser' in q['sql']]
+
+
+class ContextoTenantJWTTest(TestCase):
+    url = '/api/v1/categorias/'
+
+    def setUp(self):
+        contexto.limpar()
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Token',
+            razao_social='Empresa Token LTDA',
+            cnpj='11222333000181',
+            email='token@empresa.test',
+        )
+        self.user = CustomUser.objects.create_user(
+            username='operador',
+            email='operador@empresa.test',
+            password='senha123',
+            empresa=self.empresa,
+            role_caixa=True,
+        )
+        self.refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def test_claims_de_tenant_no_access_token(self):
+        access = self.refresh.access_token
+        self.assertEqual(access['empresa_id'], str(self.empresa.id))
+        self.assertTrue(access['role_caixa'])
+        self.assertFalse(access['role_atendente'])
+        self.assertEqual(access['comissao_percentual'], '10.00')
+
+    def test_usuario_servido_do_cache_do_processo(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(len(consultas_usuario(ctx)), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(consultas_usuario(ctx), [])
+        self.assertFalse([q for q in ctx.captured_queries if 'tenant_empresa' in q['sql']])
+
+    def test_save_do_usuario_invalida_cache(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_save_da_empresa_invalida_apenas_campos_relevantes(self):
+        self.client.get(self.url)
+        self.empresa.save(update_fields=['numero_nfe_atual', 'updated_at'])
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        self.assertEqual(consultas_usuario(ctx), [])
+
+        self.empresa.nome_fantasia = 'Empresa Token Nova'
+        self.empresa.save(update_fields=['nome_fantasia', 'updated_at'])
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        self.assertEqual(len(consultas_usuario(ctx)), 1)
+
+    def test_token_de_outra_empresa_recusado(self):
+        self.client.get(self.url)
+        outra = Empresa.objects.create(
+            nome_fantasia='Outra', razao_social='Outra LTDA',
+            cnpj='11444777000161', email='outra@empresa.test',
+        )
+        self.user.empresa = outra
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_blacklist_invalida_cache(self):
+        self.client.get(self.url)
+        RefreshToken(str(self.refresh)).blacklist()
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        self.assertEqual(len(consultas_usuario(ctx)), 1)
@@ -0,0 +1,156 @@
+"""
+Busca de produtos do catálogo.
+
+Normaliza os textos (minúsculo, sem acento, só alfanuméricos) e compara por
+trigramas, com a mesma decomposição do pg_trgm. No PostgreSQL a busca usa o
+índice GIN trigram sobre Produto.termos_busca; nos demais bancos (SQLite em
+dev) usa um índice invertido em memória por empresa, reconstruído quando a
+versão do catálogo (sequência CARDAPIO da empresa) muda.
+"""
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+
+# Fração mínima dos trigramas da consulta presentes no produto
+LIMIAR_SIMILARIDADE = 0.5
+
+# Máximo de candidatos ranqueados devolvidos pela busca aproximada
+MAX_CANDIDATOS = 200
+
+_NAO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def normalizar(texto):
+    """
+    Normaliza texto para busca: minúsculo, sem acentos e sem pontuação.
+
+    Exemplo:
+        >>> normalizar('Pão de Queijo - 500g')
+        'pao de queijo 500g'
+    """
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _NAO_ALFANUMERICO.sub(' ', texto.lower()).strip()
+
+
+def termos_produto(nome, sku='', codigo_barras=''):
+    """Texto indexado de um produto (nome, SKU e código de barras)."""
+    return normalizar(' '.join(filter(None, [nome, sku, codigo_barras])))
+
+
+def tokens_ordenados(texto):
+    """Palavras normalizadas em ordem alfabética (base do token_sort_ratio)."""
+    return ' '.join(sorted(normalizar(texto).split()))
+
+
+def trigramas(texto):
+    """Trigramas por palavra, com o mesmo preenchimento do pg_trgm."""
+    resultado = set()
+    for palavra in normalizar(texto).split():
+        palavra = f'  {palavra} '
+        resultado.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return resultado
+
+
+class IndiceBusca:
+    """
+    Índice invertido trigrama → produtos de uma empresa.
+
+    O score é a fração dos trigramas da consulta encontrados no produto,
+    equivalente ao word_similarity do pg_trgm para consultas curtas.
+    Guarda também nome, código de barras e tokens ordenados do nome, usados
+    pelo matching de itens de NF-e sem nova consulta ao banco.
+    """
+
+    def __init__(self, linhas):
+        """
+        Args:
+            linhas: Iterável de (produto_id, termos_busca, nome, codigo_barras)
+        """
+        self.postings = defaultdict(list)
+        self.produtos = {}
+        for produto_id, termos, nome, codigo_barras in linhas:
+            self.produtos[produto_id] = (nome, codigo_barras, tokens_ordenados(nome))
+            for trigrama in trigramas(termos):
+                self.postings[trigrama].append(produto_id)
+
+    def _acertos(self, termo):
+        """Quantidade de trigramas da consulta presentes em cada produto."""
+        consulta = trigramas(termo)
+        acertos = Counter()
+        for trigrama in consulta:
+            acertos.update(self.postings.get(trigrama, ()))
+        return acertos, len(consulta)
+
+    def buscar(self, termo, limiar=LIMIAR_SIMILARIDADE, limite=MAX_CANDIDATOS):
+        """
+        Returns:
+            list: [(produto_id, score)] ordenada por score decrescente
+        """
+        acertos, total = self._acertos(termo)
+        if not total:
+            return []
+
+        resultado = [
+            (produto_id, qtd / total)
+            for produto_id, qtd in acertos.items()
+            if qtd / total >= limiar
+        ]
+        resultado.sort(key=lambda r: r[1], reverse=True)
+        return resultado[:limite]
+
+    def candidatos(self, termo, limite):
+        """
+        Shortlist dos produtos que mais compartilham trigramas com o termo.
+
+        Não aplica limiar: serve de pré-filtro para um score mais caro
+        (ex: token_sort_ratio no matching de NF-e).
+        """
+        acertos, _ = self._acertos(termo)
+        return [produto_id for produto_id, _ in acertos.most_common(limite)]
+
+
+def obter_indice(empresa_id, versao):
+    """
+    Índice em memória da empresa, reconstruído quando a versão muda.
+
+    Usado pela busca de produtos fora do PostgreSQL e pelo matching de
+    itens de NF-e (ProductMatcher) em qualquer banco.
+
+    Args:
+        empresa_id: UUID da empresa
+        versao: versão do catálogo (incrementada a cada save de Produto)
+    """
+    from catalog.models import Produto
+
+    chave = str(empresa_id)
+    atual = _indices.get(chave)
+    if atual and atual[0] == versao:
+        return atual[1]
+
+    indice = IndiceBusca(
+        Produto.objects.filter(empresa_id=empresa_id).values_list(
+            'id', 'termos_busca', 'nome', 'codigo_barras'
+        )
+    )
+    # Dentro de transação o índice pode refletir dados que ainda podem
+    # sofrer rollback com a mesma versão: usa sem guardar
+    if not transaction.get_connection().in_atomic_block:
+        with _indices_lock:
+            _indices[chave] = (versao, indice)
+    return indice
+
+
+def indice_empresa(empresa_id):
+    """Índice em memória da empresa na versão atual do catálogo."""
+    from tenant.services import SequenciaService
+
+    versao = SequenciaService.ultimo_numero(empresa_id, SequenciaService.CHAVE_CARDAPIO)
+    return obter_indice(empresa_id, versao)
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.14 on 2026-10-17 12:43
+
+import django.db.models.deletion
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def popular_bom_explodida(apps, schema_editor):
+    """Materializa a BOM explodida de todos os compostos já cadastrados."""
+    FichaTecnicaItem = apps.get_model('catalog', 'FichaTecnicaItem')
+    FichaTecnicaExplodida = apps.get_model('catalog', 'FichaTecnicaExplodida')
+
+    filhos = defaultdict(list)
+    empresas = {}
+    for item in FichaTecnicaItem.objects.filter(is_active=True).select_related('componente'):
+        filhos[item.produto_pai_id].append(
+            (item.componente_id, item.quantidade_liquida, item.componente.tipo != 'COMPOSTO')
+        )
+        empresas[item.produto_pai_id] = item.empresa_id
+
+    cache = {}
+
+    def explodir(produto_id, visitados):
+        if produto_id in cache:
+            return cache[produto_id]
+        if produto_id in visitados:
+            return {}  # Ciclo legado: ignora o ramo
+        explosao = defaultdict(lambda: [Decimal('0'), True])
+        for componente_id, quantidade, folha in filhos.get(produto_id, []):
+            explosao[componente_id][0] += quantidade
+            explosao[componente_id][1] = folha
+            if not folha:
+                for neto_id, (qtd_neto, folha_neto) in explodir(componente_id, visitados | {produto_id}).items():
+                    explosao[neto_id][0] += quantidade * qtd_neto
+                    explosao[neto_id][1] = folha_neto
+        cache[produto_id] = dict(explosao)
+        return cache[produto_id]
+
+    FichaTecnicaExplodida.objects.bulk_create([
+        FichaTecnicaExplodida(
+            empresa_id=empresas[produto_id],
+            produto_pai_id=produto_id,
+            componente_id=componente_id,
+            quantidade=quantidade,
+            folha=folha,
+        )
+        for produto_id in filhos
+        for componente_id, (quantidade, folha) in explodir(produto_id, frozenset()).items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_produto_cest_produto_cfop_padrao_produto_ncm_and_more'),
+        ('tenant', '0004_empresa_ambiente_nfe_empresa_certificado_digital_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FichaTecnicaExplodida',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Identificador único universal (UUID v4)', primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Atualizado em')),
+                ('is_active', models.BooleanField(db_index=True, default=True, help_text='Indica se o registro está ativo (soft delete)', verbose_name='Ativo')),
+                ('quantidade', models.DecimalField(decimal_places=8, help_text='Quantidade líquida do componente por unidade do produto pai', max_digits=20, verbose_name='Quantidade Acumulada')),
+                ('folha', models.BooleanField(default=True, help_text='True se o componente é FINAL/INSUMO (baixa estoque diretamente)', verbose_name='Folha')),
+                ('componente', models.ForeignKey(help_text='Descendente (direto ou indireto) do produto composto', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.produto', verbose_name='Componente')),
+                ('empresa', models.ForeignKey(help_text='Empresa à qual este registro pertence (tenant)', on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_set', to='tenant.empresa', verbose_name='Empresa')),
+                ('produto_pai', models.ForeignKey(help_text='Produto composto explodido', on_delete=django.db.models.deletion.CASCADE, related_name='bom_explodida', to='catalog.produto', verbose_name='Produto Composto')),
+            ],
+            options={
+                'verbose_name': 'Ficha Técnica Explodida',
+                'verbose_name_plural': 'Fichas Técnicas Explodidas',
+                'indexes': [models.Index(fields=['produto_pai', 'folha'], name='catalog_fic_produto_3f0683_idx'), models.Index(fields=['empresa', 'componente'], name='catalog_fic_empresa_5f1f80_idx')],
+                'unique_together': {('produto_pai', 'componente')},
+            },
+        ),
+        migrations.RunPython(popular_bom_explodida, migrations.RunPython.noop),
+    ]
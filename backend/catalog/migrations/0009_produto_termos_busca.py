@@ -0,0 +1,66 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:04
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def termos_produto(nome, sku, codigo_barras):
+    """
+    Cópia de catalog.busca.termos_produto/normalizar no momento desta
+    migration (migrations não importam código vivo dos apps).
+    """
+    texto = ' '.join(filter(None, [nome, sku, codigo_barras]))
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', ' ', texto.lower()).strip()
+
+
+def popular_termos_busca(apps, schema_editor):
+    """Preenche os termos de busca normalizados dos produtos existentes."""
+    Produto = apps.get_model('catalog', 'Produto')
+
+    produtos = list(Produto.objects.only('id', 'nome', 'sku', 'codigo_barras'))
+    for produto in produtos:
+        produto.termos_busca = termos_produto(produto.nome, produto.sku, produto.codigo_barras)
+    Produto.objects.bulk_update(produtos, ['termos_busca'], batch_size=1000)
+
+
+def criar_indice_trigram(apps, schema_editor):
+    """Índice GIN trigram (pg_trgm) sobre os termos de busca, só no PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS catalog_produto_busca_trgm_idx '
+        'ON catalog_produto USING gin (termos_busca gin_trgm_ops)'
+    )
+
+
+def remover_indice_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS catalog_produto_busca_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_ficha_tecnica_explodida'),
+        ('tenant', '0006_empresa_versao_cardapio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='termos_busca',
+            field=models.TextField(blank=True, editable=False, help_text='Nome, SKU e código de barras normalizados (sem acentos, minúsculo)', verbose_name='Termos de Busca'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['empresa', 'sku'], name='catalog_pro_empresa_e1938b_idx'),
+        ),
+        migrations.RunPython(popular_termos_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice_trigram, remover_indice_trigram),
+    ]
@@ -335,6 +335,14 @@ class Produto(TenantModel):
         help_text='Se True, item aparecerá na impressão da cozinha/bar'
     )
     
+    # Busca (mantido no save)
+    termos_busca = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Termos de Busca',
+        help_text='Nome, SKU e código de barras normalizados (sem acentos, minúsculo)'
+    )
+    
     class Meta:
         verbose_name = 'Produto'
         verbose_name_plural = 'Produtos'
@@ -348,6 +356,7 @@ class Produto(TenantModel):
             models.Index(fields=['empresa', 'tipo']),
             models.Index(fields=['sku']),
             models.Index(fields=['codigo_barras']),
+            models.Index(fields=['empresa', 'sku']),
             models.Index(fields=['destaque', 'is_active']),
         ]
     
@@ -362,6 +371,7 @@ class Produto(TenantModel):
         Validações e automações no save.
         - Gera slug automaticamente
         - Gera SKU se não fornecido
+        - Atualiza os termos de busca normalizados
         """
         # Gera slug
         if not self.slug:
@@ -384,6 +394,13 @@ class Produto(TenantModel):
             hash_obj = hashlib.md5(unique_str.encode())
             self.sku = f"SKU-{hash_obj.hexdigest()[:8].upper()}"
         
+        # Termos de busca (índice trigram no PostgreSQL)
+        from catalog.busca import termos_produto
+        self.termos_busca = termos_produto(self.nome, self.sku, self.codigo_barras)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'nome', 'sku', 'codigo_barras'} & set(update_fields):
+            kwargs['update_fields'] = list(update_fields) + ['termos_busca']
+        
         super().save(*args, **kwargs)
     
     @property
@@ -665,6 +682,31 @@ class FichaTecnicaItem(TenantModel):
                 'produto_pai': f'Apenas produtos do tipo COMPOSTO podem ter ficha técnica. '
                                f'Tipo atual: {self.produto_pai.get_tipo_display()}'
             })
+        
+        # Validação 3: Ciclos indiretos (A → B → A)
+        try:
+            self.validar_ciclo()
+        except ValidationError as e:
+            raise ValidationError({'componente': e.messages})
+    
+    def validar_ciclo(self):
+        """
+        Recusa o item se ele fechar um ciclo na ficha técnica.
+        
+        Raises:
+            ValidationError: Se detectar ciclo
+        """
+        from catalog.services import CatalogService
+        CatalogService.validar_ciclo_ficha_tecnica(self.produto_pai, self.componente)
+    
+    def save(self, *args, **kwargs):
+        """
+        Valida ciclos ANTES de gravar: o item não pode ficar salvo
+        (admin, shell, scripts fora de transação) com a BOM explodida
+        inconsistente.
+        """
+        self.validar_ciclo()
+        super().save(*args, **kwargs)
     
     @property
     def custo_calculado(self):
@@ -693,3 +735,65 @@ class FichaTecnicaItem(TenantModel):
         
         percentual = (self.custo_calculado / self.produto_pai.preco_custo) * 100
         return round(percentual, 2)
+
+
+class FichaTecnicaExplodida(TenantModel):
+    """
+    Ficha técnica explodida (BOM materializada) de um produto composto.
+    
+    Guarda uma linha por (produto_pai, componente) para TODOS os
+    descendentes do produto, com a quantidade líquida acumulada por
+    unidade do produto pai (somando todos os caminhos da árvore).
+    
+    Exemplo: X-Burger → Molho (0.05) → Maionese (0.5) gera a linha
+    X-Burger × Maionese = 0.025, além de X-Burger × Molho = 0.05.
+    
+    Responsabilidades:
+    - Permitir explosão completa da BOM com uma única query indexada
+    - Detectar ciclos sem percorrer a árvore
+    
+    IMPORTANTE: Não edite manualmente. As linhas são reconstruídas de
+    forma incremental pelos signals de FichaTecnicaItem
+    (CatalogService.reconstruir_bom_explodida).
+    """
+    
+    produto_pai = models.ForeignKey(
+        'Produto',
+        on_delete=models.CASCADE,
+        related_name='bom_explodida',
+        verbose_name='Produto Composto',
+        help_text='Produto composto explodido'
+    )
+    
+    componente = models.ForeignKey(
+        'Produto',
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Componente',
+        help_text='Descendente (direto ou indireto) do produto composto'
+    )
+    
+    quantidade = models.DecimalField(
+        max_digits=20,
+        decimal_places=8,
+        verbose_name='Quantidade Acumulada',
+        help_text='Quantidade líquida do componente por unidade do produto pai'
+    )
+    
+    folha = models.BooleanField(
+        default=True,
+        verbose_name='Folha',
+        help_text='True se o componente é FINAL/INSUMO (baixa estoque diretamente)'
+    )
+    
+    class Meta:
+        verbose_name = 'Ficha Técnica Explodida'
+        verbose_name_plural = 'Fichas Técnicas Explodidas'
+        unique_together = ('produto_pai', 'componente')
+        indexes = [
+            models.Index(fields=['produto_pai', 'folha']),
+            models.Index(fields=['empresa', 'componente']),
+        ]
+    
+    def __str__(self):
+        return f"{self.produto_pai.nome} ⇒ {self.componente.nome} ({self.quantidade})"
@@ -5,12 +5,22 @@ Responsabilidades:
 - Cálculo de custo de produtos compostos
 - Propagação de alterações de custo
 - Validações de ficha técnica
+- Manutenção da ficha técnica explodida (BOM materializada)
+- Versionamento do cardápio público
+- Busca de produtos (código exato e aproximada por trigramas)
 """
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
 from decimal import Decimal
 from django.db import transaction
 from django.core.exceptions import ValidationError
 
 
+# Propagação de custo adiada (por thread): {'insumo_ids': set, 'composto_ids': set}
+_propagacao_adiada = threading.local()
+
+
 class CatalogService:
     """
     Serviços de negócio para gestão de catálogo e fichas técnicas.
@@ -26,6 +36,8 @@ class CatalogService:
         
         O custo final é a soma dos custos de todos os componentes.
         Se um item tiver custo_fixo, usa esse valor ao invés do calculado.
+        Os compostos que utilizam este produto são recalculados na mesma
+        passada (ver propagar_custos).
         
         Args:
             produto: Instância de Produto (tipo COMPOSTO)
@@ -41,7 +53,7 @@ class CatalogService:
             >>> CatalogService.recalcular_custo_produto(produto)
             Decimal('12.50')
         """
-        from catalog.models import TipoProduto
+        from catalog.models import Produto, TipoProduto
         
         if produto.tipo != TipoProduto.COMPOSTO:
             raise ValidationError(
@@ -49,33 +61,30 @@ class CatalogService:
                 f"Tipo atual: {produto.get_tipo_display()}"
             )
         
-        custo_total = Decimal('0')
+        CatalogService.propagar_custos(composto_ids=[produto.id])
         
-        for item in produto.ficha_tecnica.select_related('componente').all():
-            custo_total += item.custo_calculado
-        
-        # Atualiza o custo do produto
-        produto.preco_custo = custo_total
-        produto.save(update_fields=['preco_custo', 'updated_at'])
+        produto.preco_custo = Produto.all_objects.filter(
+            id=produto.id
+        ).values_list('preco_custo', flat=True).get()
         
-        return custo_total
+        return produto.preco_custo
     
     @staticmethod
     @transaction.atomic
-    def propagar_custo_insumo(insumo):
+    def propagar_custo_insumo(insumo, assincrono=False):
         """
         Quando o custo de um insumo muda, recalcula todos os produtos que o utilizam.
         
-        Propagação em cascata:
-        1. Busca todos os produtos COMPOSTO que usam este insumo
-        2. Recalcula o custo de cada um
-        3. Se algum desses produtos também for usado em outro, propaga novamente
+        Todos os compostos que usam o insumo, direta ou indiretamente, são
+        recalculados uma única vez (ver propagar_custos).
         
         Args:
             insumo: Instância de Produto (geralmente tipo INSUMO ou FINAL)
+            assincrono: Enfileira a propagação (job) em vez de executá-la
         
         Returns:
             list: Lista de produtos que tiveram o custo recalculado
+                (ou o Job enfileirado, se assincrono)
         
         Exemplo:
             >>> bacon = Produto.objects.get(nome='Bacon')
@@ -84,25 +93,262 @@ class CatalogService:
             >>> afetados = CatalogService.propagar_custo_insumo(bacon)
             >>> # X-Burger, X-Bacon, etc serão recalculados
         """
-        from catalog.models import Produto, TipoProduto
+        if assincrono:
+            return CatalogService.enfileirar_propagacao_custos(insumo.empresa_id, insumo_ids=[insumo.id])
+        return CatalogService.propagar_custos(insumo_ids=[insumo.id])
+    
+    @staticmethod
+    @transaction.atomic
+    def propagar_custos(insumo_ids=(), composto_ids=()):
+        """
+        Recalcula, em uma única passada, o custo de todos os compostos afetados.
         
-        produtos_recalculados = []
+        Fluxo:
+        1. Afetados = compostos informados + todos os ancestrais dos produtos
+           informados (uma query na BOM explodida)
+        2. Custo dos componentes que não mudam somado via SQL (agregação)
+        3. Compostos ordenados topologicamente (filhos antes dos pais) e
+           cada custo calculado uma única vez em memória
+        4. Gravação com um único bulk_update (não dispara signals)
         
-        # Busca todos os produtos COMPOSTO que usam este insumo
-        produtos_afetados = Produto.objects.filter(
-            ficha_tecnica__componente=insumo,
-            tipo=TipoProduto.COMPOSTO,
-            is_active=True
-        ).distinct().select_for_update()
+        Args:
+            insumo_ids: IDs de produtos cujo preço de custo mudou
+            composto_ids: IDs de compostos cuja ficha técnica mudou
         
-        for produto in produtos_afetados:
-            CatalogService.recalcular_custo_produto(produto)
-            produtos_recalculados.append(produto)
+        Returns:
+            list: Produtos (COMPOSTO) que tiveram o custo recalculado
+        
+        Raises:
+            ValidationError: Se a ficha técnica contiver ciclo
+        """
+        from django.db.models import Case, When, Q, F, Sum, DecimalField
+        from django.utils import timezone
+        from catalog.models import Produto, FichaTecnicaItem, FichaTecnicaExplodida, TipoProduto
+        
+        origem = set(insumo_ids) | set(composto_ids)
+        if not origem:
+            return []
+        
+        # 1. Compostos afetados
+        afetados = set(composto_ids)
+        afetados |= set(
+            FichaTecnicaExplodida.objects.filter(
+                componente_id__in=origem
+            ).values_list('produto_pai_id', flat=True)
+        )
+        if not afetados:
+            return []
+        
+        produtos = {
+            produto.id: produto
+            for produto in Produto.all_objects.select_for_update().filter(
+                id__in=afetados, tipo=TipoProduto.COMPOSTO
+            )
+        }
+        afetados = set(produtos)
+        
+        # 2. Parcela fixa: custo_fixo ou componentes fora do conjunto afetado
+        calculado = Q(custo_fixo__isnull=True) | Q(custo_fixo=0)
+        custo_item = Case(
+            When(calculado, then=F('componente__preco_custo') * F('quantidade_liquida')),
+            default=F('custo_fixo'),
+            output_field=DecimalField(max_digits=20, decimal_places=8),
+        )
+        itens = FichaTecnicaItem.objects.filter(produto_pai_id__in=afetados)
+        custo_base = dict(
+            itens.exclude(calculado & Q(componente_id__in=afetados))
+            .values('produto_pai_id')
+            .annotate(custo=Sum(custo_item))
+            .values_list('produto_pai_id', 'custo')
+        )
+        
+        # 3. Arestas entre compostos afetados (custo ainda a calcular)
+        dependencias = defaultdict(list)
+        for pai_id, componente_id, quantidade in itens.filter(
+            calculado, componente_id__in=afetados
+        ).values_list('produto_pai_id', 'componente_id', 'quantidade_liquida'):
+            dependencias[pai_id].append((componente_id, quantidade))
+        
+        # 4. Ordem topológica e cálculo em memória
+        custos = {}
+        pendentes = set(afetados)
+        while pendentes:
+            prontos = [
+                produto_id for produto_id in pendentes
+                if not any(componente_id in pendentes for componente_id, _ in dependencias[produto_id])
+            ]
+            if not prontos:
+                raise ValidationError(
+                    "Ciclo detectado na ficha técnica. "
+                    "Um produto não pode compor a si mesmo, direta ou indiretamente."
+                )
+            
+            for produto_id in prontos:
+                custo = custo_base.get(produto_id) or Decimal('0')
+                for componente_id, quantidade in dependencias[produto_id]:
+                    custo += custos[componente_id] * quantidade
+                custos[produto_id] = custo.quantize(Decimal('0.01'))
             
-            # Recursão: Se este produto também é usado em outros, propaga novamente
-            CatalogService.propagar_custo_insumo(produto)
+            pendentes.difference_update(prontos)
+        
+        # 5. Gravação em lote
+        agora = timezone.now()
+        alterados = []
+        for produto_id, custo in custos.items():
+            produto = produtos[produto_id]
+            if produto.preco_custo != custo:
+                produto.preco_custo = custo
+                produto.updated_at = agora
+                alterados.append(produto)
+        
+        if alterados:
+            Produto.all_objects.bulk_update(alterados, ['preco_custo', 'updated_at'])
+        
+        return list(produtos.values())
+    
+    @staticmethod
+    def enfileirar_propagacao_custos(empresa_id, insumo_ids=(), composto_ids=()):
+        """
+        Enfileira propagar_custos como job (tarefa catalog.propagar_custos).
+        
+        Returns:
+            Job: Job enfileirado
+        """
+        from tenant.models import Empresa
+        from jobs.services import JobService
+        
+        return JobService.enfileirar(
+            Empresa.objects.get(pk=empresa_id),
+            'catalog.propagar_custos',
+            {'insumo_ids': sorted(map(str, insumo_ids)), 'composto_ids': sorted(map(str, composto_ids))}
+        )
+    
+    @staticmethod
+    def marcar_custo_alterado(insumo_ids=(), composto_ids=(), empresa_id=None):
+        """
+        Registra produtos com custo/ficha técnica alterados.
+        
+        Propaga imediatamente, ou acumula se estiver dentro de
+        adiar_propagacao_custo(). Com CATALOGO_PROPAGACAO_CUSTO_ASSINCRONA
+        (e a empresa informada) a propagação imediata vira um job.
+        """
+        from django.conf import settings
+        
+        pendentes = getattr(_propagacao_adiada, 'pendentes', None)
+        if pendentes is None:
+            if empresa_id and getattr(settings, 'CATALOGO_PROPAGACAO_CUSTO_ASSINCRONA', False):
+                CatalogService.enfileirar_propagacao_custos(empresa_id, insumo_ids, composto_ids)
+                return
+            CatalogService.propagar_custos(insumo_ids, composto_ids)
+            return
+        pendentes['insumo_ids'].update(insumo_ids)
+        pendentes['composto_ids'].update(composto_ids)
+    
+    @staticmethod
+    @contextmanager
+    def adiar_propagacao_custo():
+        """
+        Adia a propagação de custo até o fim do bloco.
+        
+        Útil em operações em lote (ex: importação de NF-e): as alterações
+        de custo feitas no bloco são propagadas uma única vez na saída.
+        Blocos aninhados são absorvidos pelo mais externo.
+        
+        Exemplo:
+            >>> with CatalogService.adiar_propagacao_custo():
+            ...     for insumo in insumos:
+            ...         insumo.save(update_fields=['preco_custo', 'updated_at'])
+        """
+        if getattr(_propagacao_adiada, 'pendentes', None) is not None:
+            yield
+            return
+        
+        _propagacao_adiada.pendentes = {'insumo_ids': set(), 'composto_ids': set()}
+        try:
+            yield
+            pendentes = _propagacao_adiada.pendentes
+        finally:
+            _propagacao_adiada.pendentes = None
+        
+        CatalogService.propagar_custos(**pendentes)
+    
+    @staticmethod
+    def invalidar_cardapio(empresa_id):
+        """
+        Incrementa a versão do cardápio público da empresa (UPDATE único).
+        
+        A versão compõe a chave do cardápio compilado em cache, então o
+        cache antigo deixa de ser usado sem precisar ser apagado. Fica em
+        uma linha própria (SequenciaNumeracao, chave CARDAPIO): salvar o
+        catálogo não trava a linha da Empresa, e um Empresa.save() com
+        instância antiga não regrava uma versão velha.
+        """
+        from tenant.services import SequenciaService
+        
+        SequenciaService.incrementar(empresa_id, SequenciaService.CHAVE_CARDAPIO)
+    
+    @staticmethod
+    def buscar_produtos(queryset, termo, empresa_id):
+        """
+        Busca ranqueada de produtos por nome, SKU ou código de barras.
+        
+        1. Código de barras ou SKU exatos: igualdade indexada, sem ranking
+        2. PostgreSQL: similaridade de palavra pg_trgm sobre termos_busca
+           (índice GIN trigram)
+        3. Demais bancos: índice invertido de trigramas em memória
+        
+        A comparação ignora acentos e caixa e tolera erros de digitação.
         
-        return produtos_recalculados
+        Args:
+            queryset: QuerySet de Produto já filtrado pelo tenant
+            termo: Texto digitado
+            empresa_id: UUID da empresa (chave do índice em memória)
+        
+        Returns:
+            QuerySet anotado com 'relevancia' e ordenado por ela
+        """
+        from django.db import connection
+        from django.db.models import Case, FloatField, Q, Value, When
+        from catalog import busca
+        
+        termo = (termo or '').strip()
+        if not termo:
+            return queryset
+        
+        # 1. Caminho exato (leitor de código de barras, SKU digitado)
+        exato = queryset.filter(
+            Q(codigo_barras=termo) | Q(sku=termo) | Q(sku=termo.upper())
+        )
+        if exato.exists():
+            return exato.annotate(relevancia=Value(1.0, output_field=FloatField()))
+        
+        normalizado = busca.normalizar(termo)
+        if not normalizado:
+            return queryset.none()
+        
+        # 2. PostgreSQL: operador %> usa o índice GIN trigram
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import TrigramWordSimilarity
+            return queryset.filter(
+                termos_busca__trigram_word_similar=normalizado
+            ).annotate(
+                relevancia=TrigramWordSimilarity(normalizado, 'termos_busca')
+            ).order_by('-relevancia', 'nome')
+        
+        # 3. Fallback em memória (SQLite em desenvolvimento)
+        candidatos = busca.indice_empresa(empresa_id).buscar(normalizado)
+        if not candidatos:
+            return queryset.none()
+        
+        return queryset.filter(
+            id__in=[produto_id for produto_id, _ in candidatos]
+        ).annotate(
+            relevancia=Case(
+                *[When(id=produto_id, then=Value(score)) for produto_id, score in candidatos],
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+        ).order_by('-relevancia', 'nome')
     
     @staticmethod
     def validar_ciclo_ficha_tecnica(produto_pai, componente, nivel=0, max_nivel=10):
@@ -116,42 +362,33 @@ class CatalogService:
         Args:
             produto_pai: Produto que receberá o componente
             componente: Produto que será adicionado como componente
-            nivel: Nível atual de recursão (para prevenir stack overflow)
-            max_nivel: Profundidade máxima permitida
+            nivel: Mantido por compatibilidade (a BOM explodida dispensa recursão)
+            max_nivel: Mantido por compatibilidade
         
         Returns:
-            bool: True se válido (sem ciclo), False se há ciclo
+            bool: True se válido (sem ciclo)
         
         Raises:
-            ValidationError: Se detectar ciclo ou profundidade excessiva
+            ValidationError: Se detectar ciclo
         """
-        from catalog.models import TipoProduto
+        from catalog.models import FichaTecnicaExplodida, TipoProduto
         
-        # Proteção contra recursão infinita
-        if nivel > max_nivel:
-            raise ValidationError(
-                f"Ficha técnica muito profunda (máximo {max_nivel} níveis). "
-                "Verifique se não há ciclos."
-            )
+        if produto_pai.id == componente.id:
+            raise ValidationError('Um produto não pode ser ingrediente dele mesmo.')
         
         # Caso base: se componente não é COMPOSTO, não há risco de ciclo
         if componente.tipo != TipoProduto.COMPOSTO:
             return True
         
-        # Verifica se o componente usa o produto_pai em sua ficha técnica
-        for item in componente.ficha_tecnica.select_related('componente').all():
-            if item.componente_id == produto_pai.id:
-                raise ValidationError(
-                    f"Ciclo detectado: '{produto_pai.nome}' não pode compor '{componente.nome}' "
-                    f"pois '{componente.nome}' já usa '{produto_pai.nome}' como componente."
-                )
-            
-            # Recursão: Verifica os componentes dos componentes
-            CatalogService.validar_ciclo_ficha_tecnica(
-                produto_pai, 
-                item.componente, 
-                nivel + 1,
-                max_nivel
+        # Verifica na BOM explodida se o componente já usa o produto_pai
+        # em qualquer nível da sua ficha técnica (uma única query)
+        if FichaTecnicaExplodida.objects.filter(
+            produto_pai=componente,
+            componente=produto_pai
+        ).exists():
+            raise ValidationError(
+                f"Ciclo detectado: '{produto_pai.nome}' não pode compor '{componente.nome}' "
+                f"pois '{componente.nome}' já usa '{produto_pai.nome}' como componente."
             )
         
         return True
@@ -214,7 +451,7 @@ class CatalogService:
         """
         Retorna lista completa de insumos necessários para produzir um produto.
         
-        Faz explosão completa da ficha técnica (recursiva).
+        Usa a ficha técnica explodida (FichaTecnicaExplodida), sem recursão.
         
         Args:
             produto: Produto composto
@@ -223,7 +460,7 @@ class CatalogService:
         Returns:
             dict: {produto_id: {'produto': Produto, 'quantidade': Decimal}}
         """
-        from catalog.models import TipoProduto
+        from catalog.models import FichaTecnicaExplodida, TipoProduto
         
         insumos = {}
         
@@ -235,31 +472,141 @@ class CatalogService:
             }
             return insumos
         
-        # Explosão recursiva
-        for item in produto.ficha_tecnica.select_related('componente').all():
-            qtd_componente = item.quantidade_liquida * Decimal(str(quantidade))
-            
-            if item.componente.tipo == TipoProduto.COMPOSTO:
-                # Recursão: Explode o componente também
-                sub_insumos = CatalogService.obter_lista_insumos_necessarios(
-                    item.componente, 
-                    qtd_componente
-                )
-                
-                # Acumula as quantidades
-                for insumo_id, dados in sub_insumos.items():
-                    if insumo_id in insumos:
-                        insumos[insumo_id]['quantidade'] += dados['quantidade']
-                    else:
-                        insumos[insumo_id] = dados
-            else:
-                # Insumo final
-                if item.componente.id in insumos:
-                    insumos[item.componente.id]['quantidade'] += qtd_componente
-                else:
-                    insumos[item.componente.id] = {
-                        'produto': item.componente,
-                        'quantidade': qtd_componente
-                    }
+        # Explosão completa em uma única query na BOM materializada
+        linhas = FichaTecnicaExplodida.objects.filter(
+            produto_pai=produto,
+            folha=True
+        ).select_related('componente')
+        
+        for linha in linhas:
+            insumos[linha.componente_id] = {
+                'produto': linha.componente,
+                'quantidade': linha.quantidade * Decimal(str(quantidade))
+            }
         
         return insumos
+    
+    @staticmethod
+    def obter_bom_explodida(produto_ids, apenas_folhas=True):
+        """
+        Retorna a ficha técnica explodida de vários produtos compostos.
+        
+        Args:
+            produto_ids: Iterable de UUIDs de produtos COMPOSTO
+            apenas_folhas: Se True, retorna apenas componentes FINAL/INSUMO
+        
+        Returns:
+            dict: {produto_pai_id: list[FichaTecnicaExplodida]}
+        """
+        from catalog.models import FichaTecnicaExplodida
+        
+        filtros = {'produto_pai_id__in': list(produto_ids)}
+        if apenas_folhas:
+            filtros['folha'] = True
+        
+        bom = defaultdict(list)
+        for linha in FichaTecnicaExplodida.objects.filter(**filtros).select_related('componente'):
+            bom[linha.produto_pai_id].append(linha)
+        return bom
+    
+    @staticmethod
+    @transaction.atomic
+    def reconstruir_bom_explodida(produto_ids):
+        """
+        Reconstrói a BOM explodida dos produtos informados e de todos os
+        compostos que os utilizam (direta ou indiretamente).
+        
+        Incremental: apenas os produtos afetados são recalculados, de baixo
+        para cima (ordem topológica). Compostos filhos que não foram afetados
+        têm suas linhas já materializadas reaproveitadas.
+        
+        Args:
+            produto_ids: Iterable de UUIDs de produtos cuja ficha técnica mudou
+        
+        Returns:
+            set: IDs dos produtos que tiveram a BOM reconstruída
+        
+        Raises:
+            ValidationError: Se a ficha técnica contiver ciclo
+        """
+        from catalog.models import FichaTecnicaItem, FichaTecnicaExplodida, TipoProduto
+        
+        # 1. Afetados = produtos alterados + todos os ancestrais
+        afetados = set(produto_ids)
+        fronteira = set(afetados)
+        while fronteira:
+            pais = set(
+                FichaTecnicaItem.objects.filter(
+                    componente_id__in=fronteira
+                ).values_list('produto_pai_id', flat=True)
+            )
+            fronteira = pais - afetados
+            afetados |= fronteira
+        
+        # 2. Fichas diretas de todos os afetados (uma query)
+        filhos = defaultdict(list)
+        empresas = {}
+        for item in FichaTecnicaItem.objects.filter(
+            produto_pai_id__in=afetados
+        ).select_related('componente'):
+            composto = item.componente.tipo == TipoProduto.COMPOSTO
+            filhos[item.produto_pai_id].append(
+                (item.componente_id, item.quantidade_liquida, composto)
+            )
+            empresas[item.produto_pai_id] = item.empresa_id
+        
+        # 3. Explosão já materializada de compostos filhos não afetados
+        explosoes = defaultdict(dict)
+        externos = {
+            componente_id
+            for itens in filhos.values()
+            for componente_id, _, composto in itens
+            if composto and componente_id not in afetados
+        }
+        for linha in FichaTecnicaExplodida.objects.filter(produto_pai_id__in=externos):
+            explosoes[linha.produto_pai_id][linha.componente_id] = (linha.quantidade, linha.folha)
+        
+        # 4. Ordem topológica (filhos antes dos pais) e explosão em memória
+        pendentes = set(afetados)
+        while pendentes:
+            prontos = [
+                produto_id for produto_id in pendentes
+                if not any(
+                    composto and componente_id in pendentes
+                    for componente_id, _, composto in filhos[produto_id]
+                )
+            ]
+            if not prontos:
+                raise ValidationError(
+                    "Ciclo detectado na ficha técnica. "
+                    "Um produto não pode compor a si mesmo, direta ou indiretamente."
+                )
+            
+            for produto_id in prontos:
+                explosao = defaultdict(lambda: [Decimal('0'), True])
+                for componente_id, quantidade, composto in filhos[produto_id]:
+                    explosao[componente_id][0] += quantidade
+                    explosao[componente_id][1] = not composto
+                    if composto:
+                        for neto_id, (qtd_neto, folha) in explosoes[componente_id].items():
+                            explosao[neto_id][0] += quantidade * qtd_neto
+                            explosao[neto_id][1] = folha
+                explosoes[produto_id] = {k: tuple(v) for k, v in explosao.items()}
+            
+            pendentes.difference_update(prontos)
+        
+        # 5. Substitui as linhas dos afetados
+        FichaTecnicaExplodida.all_objects.filter(produto_pai_id__in=afetados).delete()
+        FichaTecnicaExplodida.objects.bulk_create([
+            FichaTecnicaExplodida(
+                empresa_id=empresas[produto_id],
+                produto_pai_id=produto_id,
+                componente_id=componente_id,
+                quantidade=quantidade,
+                folha=folha
+            )
+            for produto_id in afetados if produto_id in empresas
+            for componente_id, (quantidade, folha) in explosoes[produto_id].items()
+        ])
+        
+        return afetados
@@ -1,54 +1,87 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from django.db.models import Sum
-from decimal import Decimal
-from catalog.models import FichaTecnicaItem, Produto, TipoProduto
+from catalog.models import FichaTecnicaItem, Produto, Categoria, GrupoComplemento, Complemento
+
+@receiver([post_save, post_delete], sender=FichaTecnicaItem)
+def atualizar_bom_explodida(sender, instance, **kwargs):
+    """
+    Reconstrói a ficha técnica explodida (BOM materializada) do produto pai
+    e de todos os compostos que o utilizam.
+    """
+    from catalog.services import CatalogService
+    CatalogService.reconstruir_bom_explodida([instance.produto_pai_id])
 
 @receiver([post_save, post_delete], sender=FichaTecnicaItem)
 def atualizar_custo_produto_composto(sender, instance, **kwargs):
     """
-    Atualiza o preço de custo do produto pai (COMPOSTO) 
+    Atualiza o preço de custo do produto pai (COMPOSTO) e de seus ancestrais
     sempre que um item da sua ficha técnica for alterado ou removido.
+    
+    Registrado após atualizar_bom_explodida: os ancestrais são lidos da BOM
+    explodida já atualizada.
     """
-    produto_pai = instance.produto_pai
+    from catalog.services import CatalogService
+    CatalogService.marcar_custo_alterado(
+        composto_ids=[instance.produto_pai_id], empresa_id=instance.empresa_id
+    )
+
+@receiver(post_save, sender=Produto)
+def replicar_custo_para_compostos(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Se o preço de custo de um produto mudar, 
+    precisamos atualizar todos os produtos COMPOSTOS que o utilizam.
     
-    # Calcula a soma dos custos de todos os componentes
-    # custo_calculado é uma property, então precisamos somar manualmente ou via extra/annotate
-    itens = FichaTecnicaItem.objects.filter(produto_pai=produto_pai)
+    A propagação grava via bulk_update, que não dispara este signal
+    novamente (sem recursão).
+    """
+    # Produto novo ainda não compõe nenhuma ficha técnica
+    if created:
+        return
+    if update_fields is not None and 'preco_custo' not in update_fields:
+        return
     
-    novo_custo = Decimal('0.00')
-    for item in itens:
-        novo_custo += item.custo_calculado
-        
-    # Atualiza o produto pai
-    if produto_pai.preco_custo != novo_custo:
-        produto_pai.preco_custo = novo_custo
-        produto_pai.save(update_fields=['preco_custo', 'updated_at'])
+    from catalog.services import CatalogService
+    CatalogService.marcar_custo_alterado(insumo_ids=[instance.id], empresa_id=instance.empresa_id)
 
 @receiver(post_save, sender=Produto)
-def replicar_custo_para_compostos(sender, instance, **kwargs):
+def atualizar_folha_bom_explodida(sender, instance, created, update_fields=None, **kwargs):
     """
-    Se o preço de custo de um INSUMO ou FINAL mudar, 
-    precisamos atualizar todos os produtos COMPOSTOS que o utilizam.
+    Se o tipo do produto mudar (ex: INSUMO → COMPOSTO), as linhas da BOM
+    explodida em que ele é componente ficam com a flag folha errada:
+    reconstrói a BOM dos compostos que o utilizam.
+    
+    Uma consulta indexada detecta a divergência; sem ela nada é refeito.
     """
-    # Evita recursão infinita e processamento desnecessário
-    if hasattr(instance, '_updating_custo'):
+    if created:
+        return
+    if update_fields is not None and 'tipo' not in update_fields:
         return
+    
+    from catalog.models import FichaTecnicaExplodida, TipoProduto
+    folha = instance.tipo != TipoProduto.COMPOSTO
+    if FichaTecnicaExplodida.objects.filter(
+        empresa_id=instance.empresa_id, componente=instance
+    ).exclude(folha=folha).exists():
+        from catalog.services import CatalogService
+        CatalogService.reconstruir_bom_explodida([instance.id])
 
-    # Busca todas as fichas técnicas onde este produto é componente
-    fichas = FichaTecnicaItem.objects.filter(componente=instance)
+@receiver([post_save, post_delete], sender=Produto)
+@receiver([post_save, post_delete], sender=Categoria)
+@receiver([post_save, post_delete], sender=GrupoComplemento)
+@receiver([post_save, post_delete], sender=Complemento)
+def invalidar_cardapio_publico(sender, instance, **kwargs):
+    """
+    Incrementa a versão do cardápio da empresa quando o catálogo muda.
     
-    produtos_afetados = set()
-    for ficha in fichas:
-        produtos_afetados.add(ficha.produto_pai)
-        
-    for pai in produtos_afetados:
-        # Força o recálculo do custo do pai
-        novo_custo = Decimal('0.00')
-        for item in pai.ficha_tecnica.all():
-            novo_custo += item.custo_calculado
-        
-        if pai.preco_custo != novo_custo:
-            pai._updating_custo = True
-            pai.preco_custo = novo_custo
-            pai.save(update_fields=['preco_custo', 'updated_at'])
+    O cardápio público compilado é guardado em cache por versão; a nova
+    versão faz a próxima requisição recompilar.
+    """
+    from catalog.services import CatalogService
+    CatalogService.invalidar_cardapio(instance.empresa_id)
+
+@receiver(m2m_changed, sender=GrupoComplemento.produtos_vinculados.through)
+def invalidar_cardapio_vinculos_complementos(sender, instance, action, **kwargs):
+    """Vínculo produto ↔ grupo de complementos também altera o cardápio."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        from catalog.services import CatalogService
+        CatalogService.invalidar_cardapio(instance.empresa_id)
@@ -0,0 +1,13 @@
+"""
+Tarefas em segundo plano do app Catalog (ver jobs.services.tarefa).
+"""
+from jobs.services import tarefa
+
+
+@tarefa('catalog.propagar_custos')
+def propagar_custos(empresa, insumo_ids=(), composto_ids=()):
+    """Recalcula o custo dos compostos afetados (CatalogService.propagar_custos)."""
+    from catalog.services import CatalogService
+    
+    produtos = CatalogService.propagar_custos(insumo_ids=insumo_ids, composto_ids=composto_ids)
+    return {'produtos_recalculados': len(produtos)}
@@ -0,0 +1,97 @@
+from django.test import TestCase
+from django.core.exceptions import ValidationError
+from decimal import Decimal
+from tenant.models import Empresa
+from catalog.models import Categoria, Produto, TipoProduto, FichaTecnicaItem, FichaTecnicaExplodida
+from catalog.services import CatalogService
+
+class BomExplodidaTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa BOM',
+            razao_social='Empresa BOM LTDA',
+            cnpj='11222333000181',
+            email='bom@empresa.test',
+        )
+        self.categoria = Categoria.objects.create(
+            empresa=self.empresa,
+            nome='Cat BOM',
+        )
+        self.farinha = self._produto('Farinha', TipoProduto.INSUMO, '2.00')
+        self.queijo = self._produto('Queijo', TipoProduto.INSUMO, '30.00')
+        self.massa = self._produto('Massa', TipoProduto.COMPOSTO)
+        self.pizza = self._produto('Pizza', TipoProduto.COMPOSTO)
+        self._ficha(self.massa, self.farinha, '0.5000')
+        self._ficha(self.pizza, self.massa, '2.0000')
+        self._ficha(self.pizza, self.queijo, '0.2000')
+
+    def _produto(self, nome, tipo, custo='0.00'):
+        return Produto.objects.create(
+            empresa=self.empresa,
+            nome=nome,
+            codigo_barras=f'789{nome}',
+            categoria=self.categoria,
+            tipo=tipo,
+            preco_venda=Decimal('10.00'),
+            preco_custo=Decimal(custo),
+        )
+
+    def _ficha(self, pai, componente, quantidade):
+        return FichaTecnicaItem.objects.create(
+            empresa=self.empresa,
+            produto_pai=pai,
+            componente=componente,
+            quantidade_liquida=Decimal(quantidade),
+        )
+
+    def _bom(self, produto):
+        return {
+            linha.componente_id: (linha.quantidade, linha.folha)
+            for linha in FichaTecnicaExplodida.objects.filter(produto_pai=produto)
+        }
+
+    def test_explosao_acumula_niveis(self):
+        bom = self._bom(self.pizza)
+        self.assertEqual(bom[self.farinha.id], (Decimal('1'), True))
+        self.assertEqual(bom[self.massa.id], (Decimal('2'), False))
+        self.assertEqual(bom[self.queijo.id], (Decimal('0.2'), True))
+
+    def test_alteracao_em_sub_receita_propaga_para_ancestrais(self):
+        item = FichaTecnicaItem.objects.get(produto_pai=self.massa, componente=self.farinha)
+        item.quantidade_liquida = Decimal('0.7500')
+        item.save()
+        self.assertEqual(self._bom(self.pizza)[self.farinha.id][0], Decimal('1.5'))
+
+        item.delete()
+        self.assertNotIn(self.farinha.id, self._bom(self.pizza))
+        self.assertEqual(self._bom(self.massa), {})
+
+    def test_insumos_necessarios_e_ciclo(self):
+        insumos = CatalogService.obter_lista_insumos_necessarios(self.pizza, 3)
+        self.assertEqual(insumos[self.farinha.id]['quantidade'], Decimal('3'))
+        self.assertNotIn(self.massa.id, insumos)
+        with self.assertRaises(ValidationError):
+            CatalogService.validar_ciclo_ficha_tecnica(self.massa, self.pizza)
+        with self.assertRaises(ValidationError):
+            self._ficha(self.massa, self.pizza, '1.0000')
+
+    def test_ciclo_recusado_antes_de_gravar(self):
+        item = FichaTecnicaItem(
+            empresa=self.empresa, produto_pai=self.massa,
+            componente=self.pizza, quantidade_liquida=Decimal('1.0000'),
+        )
+        with self.assertRaises(ValidationError) as ctx:
+            item.full_clean()
+        self.assertIn('componente', ctx.exception.message_dict)
+        with self.assertRaises(ValidationError):
+            item.save()
+        self.assertFalse(FichaTecnicaItem.objects.filter(produto_pai=self.massa, componente=self.pizza).exists())
+
+    def test_mudanca_de_tipo_reconstroi_folha(self):
+        self.queijo.tipo = TipoProduto.COMPOSTO
+        self.queijo.save()
+        self.assertEqual(self._bom(self.pizza)[self.queijo.id], (Decimal('0.2'), False))
+
+        self.queijo.tipo = TipoProduto.INSUMO
+        self.queijo.save(update_fields=['tipo'])
+        self.assertEqual(self._bom(self.pizza)[self.queijo.id], (Decimal('0.2'), True))
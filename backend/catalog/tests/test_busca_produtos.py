@@ -0,0 +1,50 @@
+from django.test import TestCase
+from decimal import Decimal
+from tenant.models import Empresa
+from catalog.models import Categoria, Produto
+from catalog.services import CatalogService
+
+class BuscaProdutosTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Busca',
+            razao_social='Empresa Busca LTDA',
+            cnpj='11222333000181',
+            email='busca@empresa.test',
+        )
+        self.categoria = Categoria.objects.create(empresa=self.empresa, nome='Cat Busca')
+        self.pao = self._produto('Pão de Queijo', '7890001')
+        self.queijo = self._produto('Queijo Minas Frescal', '7890002')
+        self.coca = self._produto('Coca-Cola Lata 350ml', '7890003')
+
+    def _produto(self, nome, codigo_barras):
+        return Produto.objects.create(
+            empresa=self.empresa,
+            nome=nome,
+            codigo_barras=codigo_barras,
+            categoria=self.categoria,
+            preco_venda=Decimal('10.00'),
+        )
+
+    def _buscar(self, termo):
+        return list(CatalogService.buscar_produtos(
+            Produto.objects.filter(empresa=self.empresa), termo, self.empresa.id
+        ))
+
+    def test_termos_normalizados_no_save(self):
+        self.assertTrue(self.pao.termos_busca.startswith('pao de queijo'))
+
+    def test_busca_sem_acento_e_com_erro_de_digitacao(self):
+        self.assertEqual(self._buscar('pao')[0], self.pao)
+        self.assertEqual(self._buscar('cocacola')[0], self.coca)
+        self.assertEqual(self._buscar('queijo minas frescla')[0], self.queijo)
+
+    def test_codigo_barras_e_sku_exatos(self):
+        self.assertEqual(self._buscar('7890003'), [self.coca])
+        self.assertEqual(self._buscar(self.queijo.sku.lower()), [self.queijo])
+
+    def test_indice_em_memoria_acompanha_alteracoes(self):
+        self.assertEqual(self._buscar('guarana'), [])
+        self.coca.nome = 'Guaraná Antarctica'
+        self.coca.save()
+        self.assertEqual(self._buscar('guarana'), [self.coca])
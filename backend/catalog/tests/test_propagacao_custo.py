@@ -0,0 +1,80 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+from tenant.models import Empresa
+from catalog.models import Categoria, Produto, TipoProduto, FichaTecnicaItem
+from catalog.services import CatalogService
+
+class PropagacaoCustoTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Custo',
+            razao_social='Empresa Custo LTDA',
+            cnpj='11222333000181',
+            email='custo@empresa.test',
+        )
+        self.categoria = Categoria.objects.create(
+            empresa=self.empresa,
+            nome='Cat Custo',
+        )
+        self.farinha = self._produto('Farinha', TipoProduto.INSUMO, '2.00')
+        self.queijo = self._produto('Queijo', TipoProduto.INSUMO, '30.00')
+        self.massa = self._produto('Massa', TipoProduto.COMPOSTO)
+        self.pizza = self._produto('Pizza', TipoProduto.COMPOSTO)
+        self.combo = self._produto('Combo', TipoProduto.COMPOSTO)
+        self._ficha(self.massa, self.farinha, '0.5000')
+        self._ficha(self.pizza, self.massa, '2.0000')
+        self._ficha(self.pizza, self.queijo, '0.2000')
+        self._ficha(self.combo, self.pizza, '1.0000')
+        self._ficha(self.combo, self.massa, '1.0000', custo_fixo='5.00')
+
+    def _produto(self, nome, tipo, custo='0.00'):
+        return Produto.objects.create(
+            empresa=self.empresa,
+            nome=nome,
+            codigo_barras=f'789{nome}',
+            categoria=self.categoria,
+            tipo=tipo,
+            preco_venda=Decimal('50.00'),
+            preco_custo=Decimal(custo),
+        )
+
+    def _ficha(self, pai, componente, quantidade, custo_fixo=None):
+        return FichaTecnicaItem.objects.create(
+            empresa=self.empresa,
+            produto_pai=pai,
+            componente=componente,
+            quantidade_liquida=Decimal(quantidade),
+            custo_fixo=Decimal(custo_fixo) if custo_fixo else None,
+        )
+
+    def _custo(self, produto):
+        return Produto.objects.get(id=produto.id).preco_custo
+
+    def test_custos_iniciais_da_ficha(self):
+        self.assertEqual(self._custo(self.massa), Decimal('1.00'))
+        # 2 × 1.00 + 0.2 × 30.00
+        self.assertEqual(self._custo(self.pizza), Decimal('8.00'))
+        # pizza + custo fixo da massa
+        self.assertEqual(self._custo(self.combo), Decimal('13.00'))
+
+    def test_alteracao_de_insumo_propaga_em_passada_unica(self):
+        self.farinha.preco_custo = Decimal('4.00')
+        with CaptureQueriesContext(connection) as ctx:
+            self.farinha.save(update_fields=['preco_custo', 'updated_at'])
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "catalog_produto"')]
+        # save do insumo + um único bulk_update dos compostos
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(self._custo(self.massa), Decimal('2.00'))
+        self.assertEqual(self._custo(self.pizza), Decimal('10.00'))
+        self.assertEqual(self._custo(self.combo), Decimal('15.00'))
+
+    def test_propagacao_adiada_em_lote(self):
+        with CatalogService.adiar_propagacao_custo():
+            for insumo, custo in [(self.farinha, '3.00'), (self.queijo, '40.00')]:
+                insumo.preco_custo = Decimal(custo)
+                insumo.save(update_fields=['preco_custo', 'updated_at'])
+            self.assertEqual(self._custo(self.pizza), Decimal('8.00'))
+        # 2 × 1.50 + 0.2 × 40.00
+        self.assertEqual(self._custo(self.pizza), Decimal('11.00'))
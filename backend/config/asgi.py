@@ -1,5 +1,9 @@
 """
 ASGI config for Projeto Nix.
+
+Servido por gunicorn com workers uvicorn (Dockerfile, docker-compose.prod.yml)
+e por uvicorn --reload em desenvolvimento (docker-compose.yml):
+o feed SSE do KDS (restaurant.views.kds_stream) é uma view assíncrona.
 """
 import os
 from django.core.asgi import get_asgi_application
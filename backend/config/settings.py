@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Lookups trigram (busca de produtos)
     
     # Third-party apps
     'rest_framework',
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
     'api',
     'scripts',  # Scripts e utilitários
     'nfe',  # Importação de NFe
+    'jobs',  # Tarefas em segundo plano (fila no banco)
 ]
 
 
@@ -137,7 +139,7 @@ REST_FRAMEWORK = {
     
     # Authentication
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.backends.TenantJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',  # Para Django Admin
     ],
     
@@ -271,6 +273,7 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_HEADERS = list(default_headers) + [
     'x-tenant-id',
+    'idempotency-key',
 ]
 
 # CSRF Trusted Origins - Liberado para os domínios principais e localhost
@@ -324,3 +327,8 @@ if not DEBUG:
 # Desativa controle de Lotes (FIFO/FEFO) para facilitar testes.
 # Se True, exige que existam Lotes criados para cada entrada de produto.
 ESTOQUE_USAR_LOTES = False
+
+# Propagação de custo de insumos para compostos em segundo plano
+# (job catalog.propagar_custos, executado por manage.py processar_jobs)
+# em vez de dentro da requisição que alterou o custo/ficha técnica.
+CATALOGO_PROPAGACAO_CUSTO_ASSINCRONA = False
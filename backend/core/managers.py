@@ -23,13 +23,14 @@ class TenantQuerySet(models.QuerySet):
         Raises:
             AttributeError: Se o user não possuir atributo 'empresa'
         """
-        if not hasattr(user, 'empresa'):
+        if not hasattr(user, 'empresa_id'):
             raise AttributeError(
                 f"O usuário {user} não possui atributo 'empresa'. "
                 "Verifique se o modelo User está configurado corretamente."
             )
         
-        return self.filter(empresa=user.empresa)
+        # empresa_id evita carregar a Empresa só para filtrar
+        return self.filter(empresa_id=user.empresa_id)
 
 
 class TenantManager(models.Manager):
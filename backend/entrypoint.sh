@@ -23,5 +23,7 @@ echo "Running production setup..."
 python manage.py setup_production
 
 # Start server
-echo "Starting Gunicorn..."
-exec gunicorn config.wsgi:application --bind 0.0.0.0:8000
+# ASGI (workers uvicorn): o feed SSE do KDS é uma view assíncrona e não
+# prende um worker por tela conectada. Número de workers: WEB_CONCURRENCY
+echo "Starting Gunicorn (ASGI)..."
+exec gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
@@ -23,7 +23,11 @@ class SessaoCaixaAdmin(admin.ModelAdmin):
     list_display = ['id', 'caixa', 'operador', 'status', 'data_abertura', 'data_fechamento', 'saldo_final_calculado', 'diferenca_caixa']
     list_filter = ['status', 'data_abertura', 'caixa']
     search_fields = ['operador__username', 'operador__first_name']
-    readonly_fields = ['data_abertura', 'saldo_final_calculado', 'diferenca_caixa']
+    readonly_fields = [
+        'data_abertura', 'saldo_final_calculado', 'diferenca_caixa',
+        'total_suprimentos', 'total_sangrias', 'total_recebimentos', 'total_vendas_dinheiro',
+        'total_vendas_pix', 'total_vendas_cartao_debito', 'total_vendas_cartao_credito', 'total_vendas_outros',
+    ]
     inlines = [MovimentoCaixaInline]
 
 
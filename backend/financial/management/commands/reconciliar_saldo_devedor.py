@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from financial.services import FinanceiroService
+
+
+class Command(BaseCommand):
+    help = 'Confere (e corrige com --corrigir) o saldo devedor dos clientes contra as contas a receber em aberto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', help='UUID da empresa (padrão: todas)')
+        parser.add_argument('--corrigir', action='store_true', help='Recalcula os saldos divergentes')
+
+    def handle(self, *args, **options):
+        divergencias = FinanceiroService.reconciliar_saldos_devedores(
+            empresa_id=options['empresa'],
+            corrigir=options['corrigir']
+        )
+
+        for divergencia in divergencias:
+            self.stdout.write(
+                f"Cliente {divergencia['cliente']} ({divergencia['cliente_id']}): "
+                f"{divergencia['atual']} -> {divergencia['esperado']}"
+            )
+
+        acao = 'corrigidas' if options['corrigir'] else 'encontradas'
+        self.stdout.write(self.style.SUCCESS(f"{len(divergencias)} divergências {acao}"))
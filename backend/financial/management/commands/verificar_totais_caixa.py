@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from financial.services import CaixaService
+
+
+class Command(BaseCommand):
+    help = 'Confere (e corrige com --corrigir) os totais correntes das sessões de caixa contra os movimentos e vendas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', help='UUID da empresa (padrão: todas)')
+        parser.add_argument('--sessao', help='UUID de uma sessão específica')
+        parser.add_argument('--corrigir', action='store_true', help='Grava os valores agregados')
+
+    def handle(self, *args, **options):
+        divergencias = CaixaService.verificar_totais(
+            empresa_id=options['empresa'],
+            sessao_id=options['sessao'],
+            corrigir=options['corrigir']
+        )
+
+        for divergencia in divergencias:
+            self.stdout.write(
+                f"Sessão {divergencia['sessao_id']} {divergencia['campo']}: "
+                f"{divergencia['atual']} -> {divergencia['esperado']}"
+            )
+
+        acao = 'corrigidas' if options['corrigir'] else 'encontradas'
+        self.stdout.write(self.style.SUCCESS(f"{len(divergencias)} divergências {acao}"))
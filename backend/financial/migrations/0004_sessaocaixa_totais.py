@@ -0,0 +1,54 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:29
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0003_alter_contapagar_tipo_pagamento_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessaocaixa',
+            name='total_recebimentos',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Movimentos de venda na gaveta (vendas em dinheiro)', max_digits=15, verbose_name='Total de Recebimentos'),
+        ),
+        migrations.AddField(
+            model_name='sessaocaixa',
+            name='total_sangrias',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Total de Sangrias'),
+        ),
+        migrations.AddField(
+            model_name='sessaocaixa',
+            name='total_suprimentos',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Total de Suprimentos'),
+        ),
+        migrations.AddField(
+            model_name='sessaocaixa',
+            name='total_vendas_cartao_credito',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Vendas em Cartão de Crédito'),
+        ),
+        migrations.AddField(
+            model_name='sessaocaixa',
+            name='total_vendas_cartao_debito',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Vendas em Cartão de Débito'),
+        ),
+        migrations.AddField(
+            model_name='sessaocaixa',
+            name='total_vendas_dinheiro',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Vendas em Dinheiro'),
+        ),
+        migrations.AddField(
+            model_name='sessaocaixa',
+            name='total_vendas_outros',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Vendas em Outras Formas'),
+        ),
+        migrations.AddField(
+            model_name='sessaocaixa',
+            name='total_vendas_pix',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Vendas em PIX'),
+        ),
+    ]
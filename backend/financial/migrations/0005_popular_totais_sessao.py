@@ -0,0 +1,61 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:30
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import migrations
+from django.db.models import Sum
+
+
+CAMPOS_TIPO = {
+    'SUPRIMENTO': 'total_suprimentos',
+    'SANGRIA': 'total_sangrias',
+    'VENDA': 'total_recebimentos',
+}
+
+CAMPOS_PAGAMENTO = {
+    'DINHEIRO': 'total_vendas_dinheiro',
+    'PIX': 'total_vendas_pix',
+    'CARTAO_DEBITO': 'total_vendas_cartao_debito',
+    'CARTAO_CREDITO': 'total_vendas_cartao_credito',
+}
+
+
+def popular_totais(apps, schema_editor):
+    """
+    Vincula as vendas já registradas no caixa à sessão e preenche os
+    totais correntes das sessões existentes.
+    """
+    SessaoCaixa = apps.get_model('financial', 'SessaoCaixa')
+    MovimentoCaixa = apps.get_model('financial', 'MovimentoCaixa')
+    Venda = apps.get_model('sales', 'Venda')
+
+    # Antes do vínculo, só as vendas em dinheiro (com movimento) eram ligadas ao turno
+    for sessao_id, venda_id in MovimentoCaixa.objects.filter(
+        is_active=True, tipo='VENDA', venda_origem__isnull=False
+    ).values_list('sessao_id', 'venda_origem_id'):
+        Venda.objects.filter(id=venda_id, sessao_caixa__isnull=True).update(sessao_caixa_id=sessao_id)
+
+    totais = defaultdict(lambda: defaultdict(Decimal))
+    for linha in MovimentoCaixa.objects.filter(is_active=True).values('sessao_id', 'tipo').annotate(total=Sum('valor')):
+        if linha['tipo'] in CAMPOS_TIPO:
+            totais[linha['sessao_id']][CAMPOS_TIPO[linha['tipo']]] += linha['total']
+    for linha in Venda.objects.filter(
+        is_active=True, sessao_caixa__isnull=False
+    ).values('sessao_caixa_id', 'tipo_pagamento').annotate(total=Sum('total_liquido')):
+        campo = CAMPOS_PAGAMENTO.get(linha['tipo_pagamento'], 'total_vendas_outros')
+        totais[linha['sessao_caixa_id']][campo] += linha['total']
+
+    for sessao_id, campos in totais.items():
+        SessaoCaixa.objects.filter(id=sessao_id).update(**campos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0004_sessaocaixa_totais'),
+        ('sales', '0007_venda_sessao_caixa'),
+    ]
+
+    operations = [
+        migrations.RunPython(popular_totais, migrations.RunPython.noop),
+    ]
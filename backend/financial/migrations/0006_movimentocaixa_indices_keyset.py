@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0005_popular_totais_sessao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimentocaixa',
+            index=models.Index(fields=['empresa', 'created_at', 'id'], name='financial_m_empresa_fe35c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentocaixa',
+            index=models.Index(fields=['sessao', 'created_at', 'id'], name='financial_m_sessao__6998f1_idx'),
+        ),
+    ]
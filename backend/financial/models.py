@@ -2,7 +2,7 @@
 Models financeiros para Projeto Nix.
 Gestão de contas a pagar e receber.
 """
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -225,6 +225,14 @@ class ContaReceber(TenantModel):
             raise ValidationError({
                 'data_pagamento': 'Data de pagamento é obrigatória para contas pagas'
             })
+    
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        """
+        Save atômico: o signal de pre_save trava a linha e lê a contribuição
+        anterior ao saldo devedor, aplicada como diferença no post_save.
+        """
+        super().save(*args, **kwargs)
 
 
 class ContaPagar(TenantModel):
@@ -497,6 +505,60 @@ class SessaoCaixa(TenantModel):
         help_text="Valor esperado pelo sistema (Inicial + Vendas - Sangrias + Suprimentos)"
     )
     
+    # Totais correntes da sessão, incrementados com F() a cada movimento
+    # (CaixaService.registrar_movimento) e a cada venda finalizada
+    # (CaixaService.registrar_venda): resumo e fechamento não somam os
+    # movimentos. Conferidos por `manage.py verificar_totais_caixa`.
+    total_suprimentos = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Total de Suprimentos"
+    )
+    total_sangrias = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Total de Sangrias"
+    )
+    total_recebimentos = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Total de Recebimentos",
+        help_text="Movimentos de venda na gaveta (vendas em dinheiro)"
+    )
+    total_vendas_dinheiro = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Vendas em Dinheiro"
+    )
+    total_vendas_pix = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Vendas em PIX"
+    )
+    total_vendas_cartao_debito = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Vendas em Cartão de Débito"
+    )
+    total_vendas_cartao_credito = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Vendas em Cartão de Crédito"
+    )
+    total_vendas_outros = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name="Vendas em Outras Formas"
+    )
+    
     status = models.CharField(
         max_length=20,
         choices=StatusSessao.choices,
@@ -587,6 +649,11 @@ class MovimentoCaixa(TenantModel):
         verbose_name = "Movimento de Caixa"
         verbose_name_plural = "Movimentos de Caixa"
         ordering = ['-data_hora']
+        indexes = [
+            # Paginação keyset do histórico (LedgerPagination)
+            models.Index(fields=['empresa', 'created_at', 'id']),
+            models.Index(fields=['sessao', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()}: R$ {self.valor}"
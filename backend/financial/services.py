@@ -1,7 +1,10 @@
-from decimal import Decimal
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_DOWN
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import F, Sum
 
 from .models import (
     Caixa, SessaoCaixa, MovimentoCaixa, TipoMovimentoCaixa, StatusSessao,
@@ -9,6 +12,27 @@ from .models import (
 )
 
 class CaixaService:
+    # Total corrente da sessão incrementado por tipo de movimento...
+    CAMPOS_TIPO = {
+        TipoMovimentoCaixa.SUPRIMENTO: 'total_suprimentos',
+        TipoMovimentoCaixa.SANGRIA: 'total_sangrias',
+        TipoMovimentoCaixa.VENDA: 'total_recebimentos',
+    }
+    
+    # ... e por forma de pagamento da venda finalizada (demais: total_vendas_outros)
+    CAMPOS_PAGAMENTO = {
+        'DINHEIRO': 'total_vendas_dinheiro',
+        'PIX': 'total_vendas_pix',
+        'CARTAO_DEBITO': 'total_vendas_cartao_debito',
+        'CARTAO_CREDITO': 'total_vendas_cartao_credito',
+    }
+    
+    CAMPOS_TOTAIS = (
+        'total_suprimentos', 'total_sangrias', 'total_recebimentos',
+        'total_vendas_dinheiro', 'total_vendas_pix', 'total_vendas_cartao_debito',
+        'total_vendas_cartao_credito', 'total_vendas_outros',
+    )
+
     @staticmethod
     def get_sessao_aberta(usuario):
         """Retorna sessão aberta para o usuário, se houver."""
@@ -46,84 +70,103 @@ class CaixaService:
     @staticmethod
     @transaction.atomic
     def fechar_caixa(sessao_id, saldo_informado):
-        """Fecha a sessão de caixa."""
+        """
+        Fecha a sessão de caixa.
+        
+        O saldo calculado vem dos totais correntes da sessão (leitura O(1)).
+        A sessão é travada para que nenhum movimento entre durante o fechamento.
+        """
         try:
-            sessao = SessaoCaixa.objects.get(id=sessao_id)
+            sessao = SessaoCaixa.objects.select_for_update().get(id=sessao_id)
         except SessaoCaixa.DoesNotExist:
             raise ValidationError("Sessão não encontrada.")
             
         if sessao.status != StatusSessao.ABERTA:
             raise ValidationError("Caixa já está fechado.")
-            
-        # Calcula totais
-        movimentos = sessao.movimentos.all()
-        total_suprimentos = sum(m.valor for m in movimentos if m.tipo == TipoMovimentoCaixa.SUPRIMENTO)
-        total_sangrias = sum(m.valor for m in movimentos if m.tipo == TipoMovimentoCaixa.SANGRIA)
-        total_vendas = sum(m.valor for m in movimentos if m.tipo == TipoMovimentoCaixa.VENDA)
         
-        saldo_calculado = sessao.saldo_inicial + total_suprimentos + total_vendas - total_sangrias
+        saldo_calculado = (
+            sessao.saldo_inicial + sessao.total_suprimentos
+            + sessao.total_recebimentos - sessao.total_sangrias
+        )
         
         sessao.saldo_final_informado = saldo_informado
         sessao.saldo_final_calculado = saldo_calculado
         sessao.data_fechamento = timezone.now()
         sessao.status = StatusSessao.FECHADA
-        sessao.save()
+        sessao.save(update_fields=[
+            'saldo_final_informado', 'saldo_final_calculado',
+            'data_fechamento', 'status', 'updated_at'
+        ])
         
         return sessao
 
     @staticmethod
-    def obter_resumo(sessao):
-        """Retorna resumo detalhado da sessão para fechamento."""
-        movimentos = sessao.movimentos.select_related('venda_origem').all()
-        
-        # Totais por tipo de movimento
-        total_suprimentos = sum(m.valor for m in movimentos if m.tipo == TipoMovimentoCaixa.SUPRIMENTO)
-        total_sangrias = sum(m.valor for m in movimentos if m.tipo == TipoMovimentoCaixa.SANGRIA)
+    def obter_resumo(sessao, recalcular=False):
+        """
+        Retorna resumo detalhado da sessão para fechamento.
         
-        # Totais por forma de pagamento (Vendas)
-        vendas = [m.venda_origem for m in movimentos if m.tipo == TipoMovimentoCaixa.VENDA and m.venda_origem]
+        Args:
+            sessao: SessaoCaixa
+            recalcular: Se True, ignora os totais correntes e agrega
+                movimentos e vendas da sessão (fallback/conferência)
+        """
+        if recalcular:
+            totais = CaixaService.calcular_totais([sessao.id])[sessao.id]
+        else:
+            totais = {campo: getattr(sessao, campo) for campo in CaixaService.CAMPOS_TOTAIS}
         
+        # Totais por forma de pagamento (vendas finalizadas na sessão)
         resumo_vendas = {
-            'DINHEIRO': Decimal('0.00'),
-            'PIX': Decimal('0.00'),
-            'CARTAO_DEBITO': Decimal('0.00'),
-            'CARTAO_CREDITO': Decimal('0.00'),
-            'OUTROS': Decimal('0.00')
+            forma: totais[campo] for forma, campo in CaixaService.CAMPOS_PAGAMENTO.items()
         }
-        
-        total_vendas_geral = Decimal('0.00')
-        
-        for v in vendas:
-            valor = v.total_liquido
-            total_vendas_geral += valor
-            tipo = v.tipo_pagamento or 'OUTROS'
-            if tipo in resumo_vendas:
-                resumo_vendas[tipo] += valor
-            else:
-                resumo_vendas['OUTROS'] += valor
+        resumo_vendas['OUTROS'] = totais['total_vendas_outros']
                 
         # Saldo em Dinheiro (Gaveta)
         # = Inicial + Suprimentos + Vendas(Dinheiro) - Sangrias
-        saldo_dinheiro = sessao.saldo_inicial + total_suprimentos + resumo_vendas['DINHEIRO'] - total_sangrias
+        saldo_dinheiro = (
+            sessao.saldo_inicial + totais['total_suprimentos']
+            + totais['total_recebimentos'] - totais['total_sangrias']
+        )
         
         return {
             'saldo_inicial': sessao.saldo_inicial,
-            'total_suprimentos': total_suprimentos,
-            'total_sangrias': total_sangrias,
-            'total_vendas': total_vendas_geral,
+            'total_suprimentos': totais['total_suprimentos'],
+            'total_sangrias': totais['total_sangrias'],
+            'total_vendas': sum(resumo_vendas.values(), Decimal('0.00')),
             'vendas_por_tipo': resumo_vendas,
             'saldo_final_dinheiro': saldo_dinheiro, # Esperado na gaveta
             'status': sessao.status
         }
 
     @staticmethod
+    def _incrementar_totais(sessao, campos, valor):
+        """
+        Soma `valor` aos totais da sessão com F() em um único UPDATE, que
+        também confirma que a sessão continua aberta.
+        
+        Raises:
+            ValidationError: Se a sessão não estiver aberta
+        """
+        atualizadas = SessaoCaixa.objects.filter(
+            id=sessao.id, status=StatusSessao.ABERTA
+        ).update(
+            updated_at=timezone.now(),
+            **{campo: F(campo) + valor for campo in campos}
+        )
+        if not atualizadas:
+            raise ValidationError("Caixa fechado.")
+
+    @staticmethod
+    @transaction.atomic
     def registrar_movimento(sessao, tipo, valor, descricao, venda=None):
         """Registra movimentação manual (suprimento/sangria) ou venda."""
-        if sessao.status != StatusSessao.ABERTA:
-            raise ValidationError("Caixa fechado.")
-            
-        MovimentoCaixa.objects.create(
-            empresa=sessao.empresa,
+        campo = CaixaService.CAMPOS_TIPO.get(tipo)
+        if campo is None:
+            raise ValidationError(f"Tipo de movimento inválido: {tipo}")
+        
+        CaixaService._incrementar_totais(sessao, [campo], valor)
+        return MovimentoCaixa.objects.create(
+            empresa_id=sessao.empresa_id,
             sessao=sessao,
             tipo=tipo,
             valor=valor,
@@ -131,13 +174,133 @@ class CaixaService:
             venda_origem=venda
         )
 
+    @staticmethod
+    def registrar_venda(sessao, venda):
+        """
+        Contabiliza uma venda finalizada no total da sua forma de pagamento.
+        
+        Chamado por VendaService na finalização, que grava venda.sessao_caixa
+        no mesmo UPDATE da venda. Vendas em dinheiro também geram um
+        movimento (registrar_movimento), que alimenta o saldo da gaveta.
+        """
+        campo = CaixaService.CAMPOS_PAGAMENTO.get(venda.tipo_pagamento, 'total_vendas_outros')
+        CaixaService._incrementar_totais(sessao, [campo], venda.total_liquido)
+
+    @staticmethod
+    def calcular_totais(sessao_ids):
+        """
+        Totais das sessões calculados a partir dos movimentos e vendas
+        (agregação agrupada: duas queries, qualquer que seja o volume).
+        
+        Returns:
+            dict: {sessao_id: {campo: Decimal}} com todos os CAMPOS_TOTAIS
+        """
+        from sales.models import Venda
+        
+        totais = {
+            sessao_id: dict.fromkeys(CaixaService.CAMPOS_TOTAIS, Decimal('0.00'))
+            for sessao_id in sessao_ids
+        }
+        movimentos = MovimentoCaixa.objects.filter(
+            sessao_id__in=totais.keys()
+        ).values('sessao_id', 'tipo').annotate(total=Sum('valor'))
+        for linha in movimentos:
+            campo = CaixaService.CAMPOS_TIPO.get(linha['tipo'])
+            if campo:
+                totais[linha['sessao_id']][campo] += linha['total']
+        
+        vendas = Venda.objects.filter(
+            sessao_caixa_id__in=totais.keys()
+        ).values('sessao_caixa_id', 'tipo_pagamento').annotate(total=Sum('total_liquido'))
+        for linha in vendas:
+            campo = CaixaService.CAMPOS_PAGAMENTO.get(linha['tipo_pagamento'], 'total_vendas_outros')
+            totais[linha['sessao_caixa_id']][campo] += linha['total']
+        
+        return totais
+
+    @staticmethod
+    def verificar_totais(empresa_id=None, sessao_id=None, corrigir=False, lote=500):
+        """
+        Compara os totais correntes das sessões com a agregação dos
+        movimentos e vendas (calcular_totais).
+        
+        Com corrigir=True, cada lote de sessões é travado antes da
+        agregação, de modo que movimentos concorrentes não se percam.
+        
+        Args:
+            empresa_id: Restringe a uma empresa (padrão: todas)
+            sessao_id: Restringe a uma sessão
+            corrigir: Se True, grava os valores agregados
+            lote: Sessões por transação
+        
+        Returns:
+            list[dict]: Divergências (sessao_id, campo, atual, esperado)
+        """
+        sessoes = SessaoCaixa.objects.order_by('id')
+        if empresa_id:
+            sessoes = sessoes.filter(empresa_id=empresa_id)
+        if sessao_id:
+            sessoes = sessoes.filter(id=sessao_id)
+        ids = list(sessoes.values_list('id', flat=True))
+        
+        divergencias = []
+        for inicio in range(0, len(ids), lote):
+            with transaction.atomic():
+                bloco = SessaoCaixa.objects.filter(id__in=ids[inicio:inicio + lote])
+                if corrigir:
+                    bloco = bloco.select_for_update()
+                atuais = {
+                    linha['id']: linha
+                    for linha in bloco.values('id', *CaixaService.CAMPOS_TOTAIS)
+                }
+                esperados = CaixaService.calcular_totais(atuais.keys())
+                
+                for sessao_id_atual, esperado in esperados.items():
+                    diferentes = {
+                        campo: valor for campo, valor in esperado.items()
+                        if atuais[sessao_id_atual][campo] != valor
+                    }
+                    for campo, valor in diferentes.items():
+                        divergencias.append({
+                            'sessao_id': sessao_id_atual,
+                            'campo': campo,
+                            'atual': atuais[sessao_id_atual][campo],
+                            'esperado': valor,
+                        })
+                    if corrigir and diferentes:
+                        SessaoCaixa.objects.filter(id=sessao_id_atual).update(
+                            updated_at=timezone.now(), **diferentes
+                        )
+        
+        return divergencias
+
 class FinanceiroService:
+    # Status de contas a receber que compõem o saldo devedor do cliente
+    STATUS_EM_ABERTO = (StatusConta.PENDENTE, StatusConta.VENCIDA)
+
+    # Intervalo entre os vencimentos das parcelas
+    DIAS_ENTRE_PARCELAS = 30
+
     @staticmethod
+    @transaction.atomic
     def gerar_conta_receber_venda(venda, parcelas=1, dias_vencimento=0):
-        """Gera conta a receber para uma venda finalizada."""
+        """
+        Gera conta(s) a receber para uma venda finalizada.
+        
+        As parcelas são gravadas com um único bulk_create e o saldo devedor
+        do cliente recebe um único incremento com o total em aberto.
+        
+        Args:
+            venda: Venda finalizada
+            parcelas: Quantidade de parcelas (vencimentos a cada 30 dias)
+            dias_vencimento: Dias até o primeiro vencimento (0 = hoje)
+        
+        Returns:
+            list[ContaReceber]: Parcelas criadas (vazia se já existiam)
+        """
         # Se já existe, não gera
         if ContaReceber.objects.filter(venda=venda).exists():
-            return
+            return []
             
         # Mapeia tipo de pagamento
         tipo_map = {
@@ -148,29 +311,178 @@ class FinanceiroService:
             'CONTA_CLIENTE': TipoPagamento.CONTA_CLIENTE,
         }
         
-        # Vou atualizar o Enum de TipoPagamento no financial/models.py também para ter CONTA_CLIENTE
         tipo = tipo_map.get(venda.tipo_pagamento, TipoPagamento.DINHEIRO)
         
         # Define status inicial (paga se for dinheiro/pix/debito)
         pagos_imediato = [TipoPagamento.DINHEIRO, TipoPagamento.PIX, TipoPagamento.CARTAO_DEBITO]
-        status_conta = StatusConta.PAGA if tipo in pagos_imediato and tipo != TipoPagamento.CONTA_CLIENTE else StatusConta.PENDENTE
+        status_conta = StatusConta.PAGA if tipo in pagos_imediato else StatusConta.PENDENTE
         
-        # Se dias_vencimento > 0, usa. Senão hoje.
-        if dias_vencimento > 0:
-            data_vencimento = timezone.now().date() + timezone.timedelta(days=dias_vencimento)
-        else:
-            data_vencimento = timezone.now().date()
-            
-        data_pagamento = timezone.now().date() if status_conta == StatusConta.PAGA else None
-        
-        ContaReceber.objects.create(
-            empresa=venda.empresa,
-            venda=venda,
-            cliente=venda.cliente, # Pode ser None
-            descricao=f"Venda #{venda.numero}",
-            valor_original=venda.total_liquido,
-            data_vencimento=data_vencimento,
-            data_pagamento=data_pagamento,
-            status=status_conta,
-            tipo_pagamento=tipo
+        # Pagamento imediato não é parcelado
+        parcelas = 1 if status_conta == StatusConta.PAGA else max(int(parcelas), 1)
+        
+        hoje = timezone.now().date()
+        data_pagamento = hoje if status_conta == StatusConta.PAGA else None
+        
+        # Parcelas iguais; a última absorve a diferença de arredondamento
+        valor_parcela = (venda.total_liquido / parcelas).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+        valores = [valor_parcela] * (parcelas - 1) + [venda.total_liquido - valor_parcela * (parcelas - 1)]
+        
+        contas = ContaReceber.objects.bulk_create([
+            ContaReceber(
+                empresa_id=venda.empresa_id,
+                venda=venda,
+                cliente_id=venda.cliente_id, # Pode ser None
+                descricao=(
+                    f"Venda #{venda.numero}" if parcelas == 1
+                    else f"Venda #{venda.numero} - Parcela {numero}/{parcelas}"
+                ),
+                valor_original=valor,
+                data_vencimento=hoje + timedelta(
+                    days=max(dias_vencimento, 0) + FinanceiroService.DIAS_ENTRE_PARCELAS * (numero - 1)
+                ),
+                data_pagamento=data_pagamento,
+                status=status_conta,
+                tipo_pagamento=tipo
+            )
+            for numero, valor in enumerate(valores, start=1)
+        ])
+        
+        # bulk_create não dispara os signals: um único delta para o cliente
+        deltas = defaultdict(Decimal)
+        for conta in contas:
+            cliente_id, valor = FinanceiroService.contribuicao_saldo(conta)
+            deltas[cliente_id] += valor
+        FinanceiroService.ajustar_saldos_devedores(deltas)
+        
+        return contas
+
+    @staticmethod
+    def contribuicao_saldo(conta):
+        """
+        Quanto a conta compõe do saldo devedor do cliente.
+        
+        Returns:
+            tuple: (cliente_id, valor) - valor zero se a conta estiver
+                paga, cancelada, inativa ou sem cliente
+        """
+        if conta.cliente_id and conta.is_active and conta.status in FinanceiroService.STATUS_EM_ABERTO:
+            return conta.cliente_id, conta.valor_original
+        return conta.cliente_id, Decimal('0.00')
+
+    @staticmethod
+    def travar_contribuicao_saldo(conta_id):
+        """
+        Trava a conta e lê como ela compõe o saldo devedor no banco, isto
+        é, antes do save/delete em andamento. Deve rodar em transação.
+        
+        Returns:
+            tuple | None: (cliente_id, valor), ou None se a conta não existir
+        """
+        conta = ContaReceber.all_objects.select_for_update().only(
+            'cliente', 'status', 'valor_original', 'is_active'
+        ).filter(id=conta_id).first()
+        return FinanceiroService.contribuicao_saldo(conta) if conta else None
+
+    @staticmethod
+    def ajustar_saldos_devedores(deltas):
+        """
+        Aplica diferenças em Cliente.saldo_devedor com F() (sem ler o saldo).
+        
+        Args:
+            deltas: {cliente_id: Decimal}; entradas nulas são ignoradas
+        """
+        from partners.models import Cliente
+        
+        agora = timezone.now()
+        # Ordem fixa entre clientes para evitar deadlocks
+        for cliente_id in sorted((c for c in deltas if c and deltas[c]), key=str):
+            Cliente.all_objects.filter(id=cliente_id).update(
+                saldo_devedor=F('saldo_devedor') + deltas[cliente_id],
+                updated_at=agora
+            )
+
+    @staticmethod
+    def calcular_saldos_devedores(empresa_id=None, cliente_ids=None):
+        """
+        Saldo devedor esperado a partir das contas em aberto (uma query agrupada).
+        
+        Returns:
+            dict: {cliente_id: Decimal} apenas para clientes com contas em aberto
+        """
+        contas = ContaReceber.objects.filter(
+            status__in=FinanceiroService.STATUS_EM_ABERTO,
+            cliente__isnull=False
         )
+        if empresa_id:
+            contas = contas.filter(empresa_id=empresa_id)
+        if cliente_ids is not None:
+            contas = contas.filter(cliente_id__in=cliente_ids)
+        return dict(
+            contas.values('cliente_id').annotate(total=Sum('valor_original')).values_list('cliente_id', 'total')
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def recalcular_saldos_devedores(cliente_ids):
+        """
+        Regrava o saldo devedor dos clientes a partir das contas em aberto.
+        
+        Os clientes são travados antes da agregação: deltas concorrentes
+        esperam e são aplicados sobre o valor recalculado.
+        
+        Returns:
+            dict: {cliente_id: Decimal} com os saldos gravados
+        """
+        from partners.models import Cliente
+        
+        cliente_ids = sorted(set(cliente_ids), key=str)
+        list(Cliente.all_objects.select_for_update().filter(id__in=cliente_ids).values_list('id', flat=True))
+        esperados = FinanceiroService.calcular_saldos_devedores(cliente_ids=cliente_ids)
+        
+        agora = timezone.now()
+        saldos = {}
+        for cliente_id in cliente_ids:
+            saldos[cliente_id] = esperados.get(cliente_id, Decimal('0.00'))
+            Cliente.all_objects.filter(id=cliente_id).update(saldo_devedor=saldos[cliente_id], updated_at=agora)
+        return saldos
+
+    @staticmethod
+    def reconciliar_saldos_devedores(empresa_id=None, corrigir=False):
+        """
+        Compara o saldo devedor de todos os clientes com as contas em
+        aberto (uma query agrupada por empresa) e reporta as divergências.
+        
+        Args:
+            empresa_id: Restringe a uma empresa (padrão: todas)
+            corrigir: Se True, recalcula os clientes divergentes
+        
+        Returns:
+            list[dict]: Divergências (empresa_id, cliente_id, cliente, atual, esperado)
+        """
+        from partners.models import Cliente
+        from tenant.models import Empresa
+        
+        empresas = [empresa_id] if empresa_id else list(Empresa.objects.values_list('id', flat=True))
+        divergencias = []
+        
+        for empresa_atual in empresas:
+            esperados = FinanceiroService.calcular_saldos_devedores(empresa_id=empresa_atual)
+            clientes = Cliente.objects.filter(empresa_id=empresa_atual).values_list('id', 'nome', 'saldo_devedor')
+            divergentes = []
+            for cliente_id, nome, atual in clientes:
+                esperado = esperados.get(cliente_id, Decimal('0.00'))
+                if atual != esperado:
+                    divergentes.append(cliente_id)
+                    divergencias.append({
+                        'empresa_id': empresa_atual,
+                        'cliente_id': cliente_id,
+                        'cliente': nome,
+                        'atual': atual,
+                        'esperado': esperado,
+                    })
+            
+            if corrigir and divergentes:
+                # Recalcula sob lock: o valor gravado considera deltas feitos após a leitura
+                FinanceiroService.recalcular_saldos_devedores(divergentes)
+        
+        return divergencias
@@ -1,34 +1,71 @@
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
-from django.db.models import Sum
+from collections import defaultdict
 from decimal import Decimal
-from .models import ContaReceber, StatusConta
 
-@receiver([post_save, post_delete], sender=ContaReceber)
-def atualizar_saldo_devedor_cliente(sender, instance, **kwargs):
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import ContaReceber
+from .services import FinanceiroService
+
+
+# Campos que definem a contribuição da conta no saldo devedor do cliente
+CAMPOS_SALDO = {'cliente', 'cliente_id', 'status', 'valor_original', 'is_active'}
+
+
+@receiver(pre_save, sender=ContaReceber)
+def travar_contribuicao_saldo(sender, instance, update_fields=None, **kwargs):
+    """
+    Trava a conta e guarda com quanto ela compõe o saldo devedor no banco:
+    é a base da diferença aplicada no post_save. Lido no próprio save (e
+    não ao carregar a instância), saves concorrentes da mesma conta não
+    aplicam a diferença sobre um estado já superado.
+    """
+    if instance._state.adding or (update_fields is not None and not CAMPOS_SALDO & set(update_fields)):
+        return
+    instance._contribuicao_saldo = FinanceiroService.travar_contribuicao_saldo(instance.pk)
+
+
+@receiver(post_save, sender=ContaReceber)
+def atualizar_saldo_devedor_cliente(sender, instance, created, update_fields=None, **kwargs):
     """
-    Atualiza o saldo devedor do cliente sempre que uma conta a receber 
-    for alterada, paga ou excluída.
+    Atualiza o saldo devedor do cliente sempre que uma conta a receber
+    for alterada, paga ou excluída (soft delete).
+
+    Aplica apenas a diferença entre a contribuição anterior e a atual da
+    conta (F(), sem reagregar as contas do cliente). Troca de cliente
+    debita um e credita o outro.
     """
-    cliente = instance.cliente
-    if not cliente:
+    if update_fields is not None and not CAMPOS_SALDO & set(update_fields):
+        return
+
+    atual = FinanceiroService.contribuicao_saldo(instance)
+    anterior = (None, Decimal('0.00')) if created else instance.__dict__.pop('_contribuicao_saldo', None)
+
+    if anterior is None:
+        if atual[0]:
+            FinanceiroService.recalcular_saldos_devedores([atual[0]])
+        return
+
+    deltas = defaultdict(Decimal)
+    deltas[anterior[0]] -= anterior[1]
+    deltas[atual[0]] += atual[1]
+    FinanceiroService.ajustar_saldos_devedores(deltas)
+
+
+@receiver(pre_delete, sender=ContaReceber)
+def travar_contribuicao_saldo_exclusao(sender, instance, **kwargs):
+    """Exclusão física: trava a conta e lê a contribuição a retirar."""
+    instance._contribuicao_saldo = FinanceiroService.travar_contribuicao_saldo(instance.pk)
+
+
+@receiver(post_delete, sender=ContaReceber)
+def remover_saldo_devedor_cliente(sender, instance, **kwargs):
+    """Exclusão física: retira a contribuição da conta do saldo do cliente."""
+    anterior = instance.__dict__.pop('_contribuicao_saldo', None)
+    if anterior is None:
+        if instance.cliente_id:
+            FinanceiroService.recalcular_saldos_devedores([instance.cliente_id])
         return
 
-    # Soma todas as contas PENDENTES ou VENCIDAS do cliente
-    saldo_aberto = ContaReceber.objects.filter(
-        cliente=cliente,
-        status__in=[StatusConta.PENDENTE, StatusConta.VENCIDAS] # Nota: No models.py é PENDENTE e VENCIDA
-    ).aggregate(total=Sum('valor_original'))['total'] or Decimal('0.00')
-    
-    # Nota: Em financial/models.py o StatusConta tem VENCIDA no singular
-    # Vou corrigir para usar o Enum correto se necessário ou filtrar manualmente
-    
-    # Busca real baseado no que está no models.py (StatusConta.PENDENTE e StatusConta.VENCIDA)
-    saldo_aberto = ContaReceber.objects.filter(
-        cliente=cliente,
-        status__in=['PENDENTE', 'VENCIDA']
-    ).aggregate(total=Sum('valor_original'))['total'] or Decimal('0.00')
-
-    if cliente.saldo_devedor != saldo_aberto:
-        cliente.saldo_devedor = saldo_aberto
-        cliente.save(update_fields=['saldo_devedor', 'updated_at'])
+    cliente_id, valor = anterior
+    FinanceiroService.ajustar_saldos_devedores({cliente_id: -valor})
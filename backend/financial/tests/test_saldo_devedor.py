@@ -0,0 +1,107 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from tenant.models import Empresa
+from authentication.models import CustomUser, TipoCargo
+from partners.models import Cliente, TipoPessoa
+from sales.models import Venda
+from financial.models import ContaReceber, StatusConta
+from financial.services import FinanceiroService
+
+
+class SaldoDevedorTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Saldo',
+            razao_social='Empresa Saldo LTDA',
+            cnpj='11222333000181',
+            email='saldo@empresa.test',
+        )
+        self.cliente = Cliente.objects.create(
+            empresa=self.empresa, nome='Cliente A', cpf_cnpj='71067578021', tipo_pessoa=TipoPessoa.FISICA
+        )
+        self.outro = Cliente.objects.create(
+            empresa=self.empresa, nome='Cliente B', cpf_cnpj='52998224725', tipo_pessoa=TipoPessoa.FISICA
+        )
+
+    def _saldo(self, cliente):
+        return Cliente.objects.get(id=cliente.id).saldo_devedor
+
+    def test_ciclo_de_vida_aplica_diferencas(self):
+        with CaptureQueriesContext(connection) as queries:
+            conta = ContaReceber.objects.create(
+                empresa=self.empresa, cliente=self.cliente, descricao='Fiado',
+                valor_original=Decimal('80.00'), data_vencimento=date.today(),
+            )
+        self.assertFalse(any('SUM(' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual(self._saldo(self.cliente), Decimal('80.00'))
+
+        conta = ContaReceber.objects.get(id=conta.id)
+        conta.valor_original = Decimal('100.00')
+        conta.save()
+        self.assertEqual(self._saldo(self.cliente), Decimal('100.00'))
+
+        conta.cliente = self.outro
+        conta.save()
+        self.assertEqual((self._saldo(self.cliente), self._saldo(self.outro)), (Decimal('0.00'), Decimal('100.00')))
+
+        conta.status = StatusConta.PAGA
+        conta.data_pagamento = date.today()
+        conta.save(update_fields=['status', 'data_pagamento', 'updated_at'])
+        self.assertEqual(self._saldo(self.outro), Decimal('0.00'))
+
+        conta.status = StatusConta.VENCIDA
+        conta.save()
+        conta.delete()
+        self.assertEqual(self._saldo(self.outro), Decimal('0.00'))
+
+    def test_instancia_desatualizada_aplica_diferenca_do_banco(self):
+        conta = ContaReceber.objects.create(
+            empresa=self.empresa, cliente=self.cliente, descricao='Fiado',
+            valor_original=Decimal('50.00'), data_vencimento=date.today(),
+        )
+        antiga = ContaReceber.objects.get(id=conta.id)
+
+        conta.status = StatusConta.PAGA
+        conta.data_pagamento = date.today()
+        conta.save()
+        self.assertEqual(self._saldo(self.cliente), Decimal('0.00'))
+
+        # Carregada antes do pagamento: a base é o estado gravado, não o da carga
+        antiga.valor_original = Decimal('70.00')
+        antiga.save()
+        self.assertEqual(self._saldo(self.cliente), Decimal('70.00'))
+
+        antiga.delete(hard=True)
+        self.assertEqual(self._saldo(self.cliente), Decimal('0.00'))
+
+    def test_parcelas_em_lote_e_reconciliacao(self):
+        vendedor = CustomUser.objects.create_user(
+            username='vendedor', email='vendedor@empresa.test', password='123456',
+            empresa=self.empresa, cargo=TipoCargo.GERENTE,
+        )
+        venda = Venda.objects.create(
+            empresa=self.empresa, vendedor=vendedor, cliente=self.cliente,
+            tipo_pagamento='CONTA_CLIENTE', total_liquido=Decimal('100.00'),
+        )
+
+        contas = FinanceiroService.gerar_conta_receber_venda(venda, parcelas=3, dias_vencimento=10)
+
+        self.assertEqual([c.valor_original for c in contas], [Decimal('33.33'), Decimal('33.33'), Decimal('33.34')])
+        self.assertEqual((contas[2].data_vencimento - date.today()).days, 70)
+        self.assertEqual(self._saldo(self.cliente), Decimal('100.00'))
+
+        Cliente.objects.filter(id=self.cliente.id).update(saldo_devedor=Decimal('5.00'))
+        Cliente.objects.filter(id=self.outro.id).update(saldo_devedor=Decimal('7.00'))
+        saida = StringIO()
+        call_command('reconciliar_saldo_devedor', '--corrigir', stdout=saida)
+
+        self.assertIn('2 divergências corrigidas', saida.getvalue())
+        self.assertEqual((self._saldo(self.cliente), self._saldo(self.outro)), (Decimal('100.00'), Decimal('0.00')))
+        self.assertEqual(FinanceiroService.reconciliar_saldos_devedores(), [])
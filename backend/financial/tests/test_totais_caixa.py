@@ -0,0 +1,104 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from tenant.models import Empresa
+from authentication.models import CustomUser, TipoCargo
+from catalog.models import Categoria, Produto, TipoProduto
+from stock.models import Deposito
+from stock.services import StockService
+from sales.models import Venda, ItemVenda
+from sales.services import VendaService
+from financial.models import Caixa, SessaoCaixa, TipoMovimentoCaixa, StatusSessao
+from financial.services import CaixaService
+
+
+class TotaisSessaoCaixaTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Caixa',
+            razao_social='Empresa Caixa LTDA',
+            cnpj='11222333000181',
+            email='caixa@empresa.test',
+        )
+        self.user = CustomUser.objects.create_user(
+            username='operador',
+            email='operador@empresa.test',
+            password='123456',
+            empresa=self.empresa,
+            cargo=TipoCargo.GERENTE,
+        )
+        self.deposito = Deposito.objects.create(empresa=self.empresa, nome='Loja', is_padrao=True)
+        self.produto = Produto.objects.create(
+            empresa=self.empresa,
+            nome='Produto Caixa',
+            categoria=Categoria.objects.create(empresa=self.empresa, nome='Geral'),
+            tipo=TipoProduto.FINAL,
+            preco_venda=Decimal('25.00'),
+        )
+        StockService.dar_entrada_com_lote(
+            produto=self.produto,
+            deposito=self.deposito,
+            quantidade=Decimal('100.000'),
+            codigo_lote='CX-1',
+            data_validade=date.today().replace(year=date.today().year + 1),
+        )
+        caixa = Caixa.objects.create(empresa=self.empresa, nome='Caixa 01')
+        self.sessao = CaixaService.abrir_caixa(caixa.id, self.user, saldo_inicial=Decimal('50.00'))
+
+    def _vender(self, quantidade, tipo_pagamento):
+        venda = Venda.objects.create(empresa=self.empresa, vendedor=self.user)
+        ItemVenda.objects.create(
+            empresa=self.empresa,
+            venda=venda,
+            produto=self.produto,
+            quantidade=Decimal(quantidade),
+            preco_unitario=self.produto.preco_venda,
+        )
+        return VendaService.finalizar_venda(
+            venda.id, self.deposito.id, usuario=self.user, tipo_pagamento=tipo_pagamento
+        )
+
+    def _movimentar(self):
+        CaixaService.registrar_movimento(self.sessao, TipoMovimentoCaixa.SUPRIMENTO, Decimal('100.00'), 'Troco')
+        CaixaService.registrar_movimento(self.sessao, TipoMovimentoCaixa.SANGRIA, Decimal('30.00'), 'Retirada')
+        self._vender('2', 'DINHEIRO')
+        self._vender('1', 'PIX')
+        self._vender('3', 'BOLETO')
+
+    def test_resumo_e_fechamento_pelos_totais_correntes(self):
+        self._movimentar()
+        sessao = SessaoCaixa.objects.get(id=self.sessao.id)
+
+        with self.assertNumQueries(0):
+            resumo = CaixaService.obter_resumo(sessao)
+
+        self.assertEqual(resumo['vendas_por_tipo']['DINHEIRO'], Decimal('50.00'))
+        self.assertEqual(resumo['vendas_por_tipo']['PIX'], Decimal('25.00'))
+        self.assertEqual(resumo['vendas_por_tipo']['OUTROS'], Decimal('75.00'))
+        self.assertEqual(resumo['total_vendas'], Decimal('150.00'))
+        self.assertEqual(resumo['saldo_final_dinheiro'], Decimal('170.00'))
+        self.assertEqual(CaixaService.obter_resumo(sessao, recalcular=True), resumo)
+
+        sessao = CaixaService.fechar_caixa(sessao.id, Decimal('170.00'))
+        self.assertEqual(sessao.saldo_final_calculado, Decimal('170.00'))
+        with self.assertRaisesMessage(Exception, 'Caixa fechado.'):
+            CaixaService.registrar_movimento(sessao, TipoMovimentoCaixa.SUPRIMENTO, Decimal('1.00'), 'Tarde')
+        self.assertEqual(SessaoCaixa.objects.get(id=sessao.id).status, StatusSessao.FECHADA)
+
+    def test_comando_verifica_e_corrige_totais(self):
+        self._movimentar()
+        SessaoCaixa.objects.filter(id=self.sessao.id).update(
+            total_sangrias=Decimal('0.00'), total_vendas_pix=Decimal('99.00')
+        )
+
+        saida = StringIO()
+        call_command('verificar_totais_caixa', '--corrigir', stdout=saida)
+        self.assertIn('2 divergências corrigidas', saida.getvalue())
+
+        self.assertEqual(CaixaService.verificar_totais(), [])
+        sessao = SessaoCaixa.objects.get(id=self.sessao.id)
+        self.assertEqual((sessao.total_sangrias, sessao.total_vendas_pix), (Decimal('30.00'), Decimal('25.00')))
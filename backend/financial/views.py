@@ -9,6 +9,7 @@ from api.serializers.financial import (
     CaixaSerializer, SessaoCaixaSerializer, MovimentoCaixaSerializer
 )
 from .services import CaixaService
+from api.pagination import LedgerPagination
 
 class ContaReceberViewSet(viewsets.ModelViewSet):
     queryset = ContaReceber.objects.all()
@@ -35,6 +36,24 @@ class CaixaViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Caixa.objects.filter(empresa=self.request.user.empresa)
 
+class MovimentoCaixaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Histórico de movimentos de caixa (somente leitura).
+    
+    Filtros: ?sessao=<uuid>. Paginação keyset com ?cursor= (LedgerPagination).
+    """
+    queryset = MovimentoCaixa.objects.all()
+    serializer_class = MovimentoCaixaSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = LedgerPagination
+
+    def get_queryset(self):
+        qs = MovimentoCaixa.objects.filter(empresa=self.request.user.empresa).order_by('-created_at', '-id')
+        sessao_id = self.request.query_params.get('sessao')
+        if sessao_id:
+            qs = qs.filter(sessao_id=sessao_id)
+        return qs
+
 class SessaoCaixaViewSet(viewsets.ModelViewSet):
     queryset = SessaoCaixa.objects.all()
     serializer_class = SessaoCaixaSerializer
@@ -45,10 +64,11 @@ class SessaoCaixaViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def resumo(self, request, pk=None):
-        """Retorna resumo financeiro da sessão."""
+        """Retorna resumo financeiro da sessão (?recalcular=1 agrega os movimentos)."""
         sessao = self.get_object()
+        recalcular = request.query_params.get('recalcular') in ('1', 'true')
         try:
-            dados = CaixaService.obter_resumo(sessao)
+            dados = CaixaService.obter_resumo(sessao, recalcular=recalcular)
             return Response(dados)
         except Exception as e:
              return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,13 @@
+"""
+Django Admin para app Jobs.
+"""
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['tipo', 'empresa', 'status', 'tentativas', 'max_tentativas', 'executar_em', 'concluido_em']
+    list_filter = ['status', 'tipo']
+    search_fields = ['tipo', 'chave_idempotencia']
+    readonly_fields = ['iniciado_em', 'concluido_em', 'reservado_por', 'reservado_ate', 'resultado', 'erro']
@@ -0,0 +1,15 @@
+"""
+Configuração do app Jobs (tarefas em segundo plano).
+"""
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = 'Tarefas em Segundo Plano'
+
+    def ready(self):
+        """Registra as tarefas declaradas nos módulos <app>/tarefas.py."""
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tarefas')
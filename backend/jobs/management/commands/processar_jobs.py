@@ -0,0 +1,64 @@
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from jobs.services import JobService
+
+
+class Command(BaseCommand):
+    help = 'Worker da fila de jobs: reserva e executa tarefas em segundo plano'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concorrencia', type=int, default=1, help='Jobs executados em paralelo (threads)')
+        parser.add_argument('--tipos', help='Tipos de tarefa separados por vírgula (padrão: todos)')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Espera em segundos quando a fila está vazia')
+        parser.add_argument('--uma-vez', action='store_true', help='Esvazia a fila e encerra')
+
+    def handle(self, *args, **options):
+        tipos = [tipo.strip() for tipo in (options['tipos'] or '').split(',') if tipo.strip()]
+        parar = threading.Event()
+        executados = [0] * options['concorrencia']
+
+        def encerrar(signum, frame):
+            self.stdout.write('Encerrando após os jobs em execução...')
+            parar.set()
+
+        signal.signal(signal.SIGINT, encerrar)
+        signal.signal(signal.SIGTERM, encerrar)
+
+        def trabalhar(indice):
+            worker = f"{socket.gethostname()}:{os.getpid()}:{indice}"
+            try:
+                while not parar.is_set():
+                    close_old_connections()
+                    try:
+                        jobs = JobService.reservar(worker, tipos=tipos or None)
+                    except DatabaseError as e:
+                        self.stderr.write(f"[{worker}] Erro ao reservar job: {e}")
+                        parar.wait(options['intervalo'])
+                        continue
+                    if not jobs:
+                        if options['uma_vez']:
+                            break
+                        parar.wait(options['intervalo'])
+                        continue
+                    JobService.executar(jobs[0])
+                    executados[indice] += 1
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=trabalhar, args=(indice,), daemon=True)
+            for indice in range(options['concorrencia'])
+        ]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+
+        self.stdout.write(self.style.SUCCESS(f"{sum(executados)} jobs executados"))
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:21
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('tenant', '0006_empresa_versao_cardapio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Identificador único universal (UUID v4)', primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Atualizado em')),
+                ('is_active', models.BooleanField(db_index=True, default=True, help_text='Indica se o registro está ativo (soft delete)', verbose_name='Ativo')),
+                ('tipo', models.CharField(help_text='Nome da tarefa registrada (ex: nfe.emitir_lote)', max_length=100, verbose_name='Tipo')),
+                ('payload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Parâmetros')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('EXECUTANDO', 'Executando'), ('CONCLUIDO', 'Concluído'), ('FALHOU', 'Falhou'), ('CANCELADO', 'Cancelado')], default='PENDENTE', max_length=20, verbose_name='Status')),
+                ('chave_idempotencia', models.CharField(blank=True, help_text='Enfileirar de novo com a mesma chave retorna o job existente', max_length=255, verbose_name='Chave de Idempotência')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('max_tentativas', models.PositiveSmallIntegerField(default=5, verbose_name='Máximo de Tentativas')),
+                ('executar_em', models.DateTimeField(default=django.utils.timezone.now, help_text='Próxima execução (adiada pelo backoff após falhas)', verbose_name='Executar em')),
+                ('reservado_por', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('reservado_ate', models.DateTimeField(blank=True, null=True, verbose_name='Reservado até')),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('resultado', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Resultado')),
+                ('erro', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('empresa', models.ForeignKey(help_text='Empresa à qual este registro pertence (tenant)', on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_set', to='tenant.empresa', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Job',
+                'verbose_name_plural': 'Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'executar_em'], name='jobs_job_fila_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('chave_idempotencia', ''), _negated=True), fields=('empresa', 'chave_idempotencia'), name='unique_job_chave_idempotencia'),
+        ),
+    ]
@@ -0,0 +1,127 @@
+"""
+Fila de tarefas em segundo plano (Projeto Nix).
+
+A fila é a própria tabela Job: sem broker externo. Um job enfileirado
+dentro de uma transação só fica visível para os workers após o commit.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import TenantModel
+
+
+class StatusJob(models.TextChoices):
+    PENDENTE = 'PENDENTE', 'Pendente'
+    EXECUTANDO = 'EXECUTANDO', 'Executando'
+    CONCLUIDO = 'CONCLUIDO', 'Concluído'
+    FALHOU = 'FALHOU', 'Falhou'
+    CANCELADO = 'CANCELADO', 'Cancelado'
+
+
+class Job(TenantModel):
+    """
+    Tarefa em segundo plano.
+    
+    O worker (manage.py processar_jobs) reserva jobs PENDENTE com
+    executar_em vencido, ou EXECUTANDO com reserva expirada (worker que
+    morreu no meio), e executa a função registrada para o tipo.
+    """
+    
+    tipo = models.CharField(
+        max_length=100,
+        verbose_name='Tipo',
+        help_text='Nome da tarefa registrada (ex: nfe.emitir_lote)'
+    )
+    
+    payload = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        blank=True,
+        verbose_name='Parâmetros'
+    )
+    
+    status = models.CharField(
+        max_length=20,
+        choices=StatusJob.choices,
+        default=StatusJob.PENDENTE,
+        verbose_name='Status'
+    )
+    
+    chave_idempotencia = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Chave de Idempotência',
+        help_text='Enfileirar de novo com a mesma chave retorna o job existente'
+    )
+    
+    tentativas = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Tentativas'
+    )
+    
+    max_tentativas = models.PositiveSmallIntegerField(
+        default=5,
+        verbose_name='Máximo de Tentativas'
+    )
+    
+    executar_em = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Executar em',
+        help_text='Próxima execução (adiada pelo backoff após falhas)'
+    )
+    
+    reservado_por = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Worker'
+    )
+    
+    reservado_ate = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Reservado até'
+    )
+    
+    iniciado_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Iniciado em'
+    )
+    
+    concluido_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Concluído em'
+    )
+    
+    resultado = models.JSONField(
+        null=True,
+        encoder=DjangoJSONEncoder,
+        blank=True,
+        verbose_name='Resultado'
+    )
+    
+    erro = models.TextField(
+        blank=True,
+        verbose_name='Último Erro'
+    )
+    
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['empresa', 'chave_idempotencia'],
+                condition=~Q(chave_idempotencia=''),
+                name='unique_job_chave_idempotencia'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['status', 'executar_em'], name='jobs_job_fila_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tipo} ({self.get_status_display()})"
@@ -0,0 +1,273 @@
+"""
+Serviços da fila de tarefas em segundo plano (Projeto Nix).
+
+Responsabilidades:
+- Registro das tarefas (decorator @tarefa, em <app>/tarefas.py)
+- Enfileiramento com chave de idempotência
+- Reserva concorrente de jobs pelos workers
+- Execução com novas tentativas e backoff exponencial
+"""
+import logging
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job, StatusJob
+
+
+logger = logging.getLogger(__name__)
+
+# Tarefas registradas: {tipo: função(empresa, **payload)}
+_tarefas = {}
+
+
+def tarefa(tipo):
+    """
+    Registra uma função como tarefa executável pelo worker.
+
+    A função recebe a empresa do job e o payload como kwargs, e deve
+    retornar um valor serializável em JSON (gravado em Job.resultado).
+
+    Exemplo:
+        >>> @tarefa('catalog.propagar_custos')
+        ... def propagar_custos(empresa, insumo_ids=(), composto_ids=()):
+        ...     ...
+    """
+    def registrar(funcao):
+        _tarefas[tipo] = funcao
+        return funcao
+    return registrar
+
+
+class ErroDefinitivo(Exception):
+    """Falha que não adianta repetir: o job vai direto para FALHOU."""
+    pass
+
+
+class JobService:
+    """
+    Fila de jobs sobre a tabela Job.
+
+    Reserva com select_for_update(skip_locked=True) onde o banco suporta
+    (PostgreSQL) e, em todos os bancos, com UPDATE condicional no status:
+    dois workers nunca executam a mesma tentativa.
+    """
+
+    # Espera antes da 2ª tentativa; dobra a cada falha, até BACKOFF_MAXIMO
+    BACKOFF_BASE = 30
+    BACKOFF_MAXIMO = 60 * 60
+
+    # Tempo de reserva: após ele, um job EXECUTANDO volta a ser elegível
+    # (worker que morreu no meio da execução)
+    DURACAO_RESERVA = 10 * 60
+
+    @staticmethod
+    def enfileirar(empresa, tipo, payload=None, chave_idempotencia='',
+                   executar_em=None, max_tentativas=5):
+        """
+        Enfileira um job.
+
+        Dentro de uma transação o job só é visto pelos workers após o
+        commit (e some junto em caso de rollback).
+
+        Args:
+            empresa: Empresa (tenant) do job
+            tipo: Nome da tarefa registrada
+            payload: Parâmetros da tarefa (serializáveis em JSON)
+            chave_idempotencia: Se informada e já existir job da empresa
+                com a mesma chave, retorna o job existente
+            executar_em: Agendamento (padrão: imediato)
+            max_tentativas: Total de execuções antes de FALHOU
+
+        Returns:
+            Job: Criado ou existente (mesma chave de idempotência)
+
+        Raises:
+            ValidationError: Se o tipo não estiver registrado
+        """
+        if tipo not in _tarefas:
+            raise ValidationError(f"Tarefa não registrada: {tipo}")
+
+        if chave_idempotencia:
+            existente = Job.all_objects.filter(
+                empresa=empresa, chave_idempotencia=chave_idempotencia
+            ).first()
+            if existente:
+                return existente
+
+        job = Job(
+            empresa=empresa,
+            tipo=tipo,
+            payload=payload or {},
+            chave_idempotencia=chave_idempotencia,
+            executar_em=executar_em or timezone.now(),
+            max_tentativas=max_tentativas,
+        )
+        try:
+            with transaction.atomic():
+                job.save()
+        except IntegrityError:
+            # Enfileirado em paralelo com a mesma chave
+            if not chave_idempotencia:
+                raise
+            return Job.all_objects.get(empresa=empresa, chave_idempotencia=chave_idempotencia)
+        return job
+
+    @staticmethod
+    def reservar(worker, tipos=None, limite=1):
+        """
+        Reserva até `limite` jobs elegíveis para o worker.
+
+        Elegíveis: PENDENTE com executar_em vencido, ou EXECUTANDO com a
+        reserva expirada. Cada reserva conta uma tentativa.
+
+        Args:
+            worker: Identificador do worker (gravado em reservado_por)
+            tipos: Restringe aos tipos informados
+            limite: Máximo de jobs reservados
+
+        Returns:
+            list[Job]: Jobs reservados (com empresa carregada)
+        """
+        agora = timezone.now()
+        elegiveis = Job.all_objects.filter(
+            Q(status=StatusJob.PENDENTE, executar_em__lte=agora) |
+            Q(status=StatusJob.EXECUTANDO, reservado_ate__lt=agora)
+        )
+        if tipos:
+            elegiveis = elegiveis.filter(tipo__in=tipos)
+
+        # Sem SELECT ... FOR UPDATE (SQLite) a leitura fica fora de transação:
+        # um lock de leitura não pode ser promovido a escrita com outros
+        # workers lendo, e o UPDATE condicional já garante a exclusividade
+        reservados = []
+        bloqueio = transaction.atomic() if connection.features.has_select_for_update else nullcontext()
+        with bloqueio:
+            candidatos = list(
+                elegiveis.select_for_update(skip_locked=True)
+                .order_by('executar_em')
+                .values_list('id', 'status', 'tentativas')[:limite]
+            )
+            for job_id, status_atual, tentativas in candidatos:
+                # UPDATE condicional: perde a corrida se outro worker já reservou
+                if Job.all_objects.filter(
+                    id=job_id, status=status_atual, tentativas=tentativas
+                ).update(
+                    status=StatusJob.EXECUTANDO,
+                    tentativas=F('tentativas') + 1,
+                    reservado_por=worker,
+                    reservado_ate=agora + timedelta(seconds=JobService.DURACAO_RESERVA),
+                    iniciado_em=agora,
+                    updated_at=agora,
+                ):
+                    reservados.append(job_id)
+
+        if not reservados:
+            return []
+        jobs = Job.all_objects.select_related('empresa').in_bulk(reservados)
+        return [jobs[job_id] for job_id in reservados]
+
+    @staticmethod
+    def executar(job):
+        """
+        Executa um job reservado e grava o resultado.
+
+        Falhas são repetidas com backoff exponencial até max_tentativas;
+        ErroDefinitivo encerra o job na hora. A gravação só acontece se a
+        reserva ainda for deste worker (não sobrescreve um job que expirou
+        e foi reservado por outro).
+
+        Returns:
+            str: Status final do job (StatusJob)
+        """
+        funcao = _tarefas.get(job.tipo)
+        try:
+            if funcao is None:
+                raise ErroDefinitivo(f"Tarefa não registrada: {job.tipo}")
+            if job.tentativas > job.max_tentativas:
+                raise ErroDefinitivo("Tentativas esgotadas (reserva expirada durante a execução).")
+            resultado = funcao(job.empresa, **job.payload)
+        except Exception as e:
+            agora = timezone.now()
+            definitivo = isinstance(e, ErroDefinitivo) or job.tentativas >= job.max_tentativas
+            logger.warning("Job %s (%s) falhou na tentativa %s: %s", job.id, job.tipo, job.tentativas, e)
+            campos = {
+                'erro': f"{type(e).__name__}: {e}",
+                'reservado_ate': None,
+                'updated_at': agora,
+            }
+            if definitivo:
+                campos.update(status=StatusJob.FALHOU, concluido_em=agora)
+            else:
+                campos.update(
+                    status=StatusJob.PENDENTE,
+                    executar_em=agora + timedelta(seconds=JobService.backoff(job.tentativas)),
+                )
+        else:
+            agora = timezone.now()
+            campos = {
+                'status': StatusJob.CONCLUIDO,
+                'resultado': resultado,
+                'erro': '',
+                'concluido_em': agora,
+                'reservado_ate': None,
+                'updated_at': agora,
+            }
+
+        Job.all_objects.filter(
+            id=job.id,
+            status=StatusJob.EXECUTANDO,
+            reservado_por=job.reservado_por,
+            tentativas=job.tentativas,
+        ).update(**campos)
+        for campo, valor in campos.items():
+            setattr(job, campo, valor)
+        return job.status
+
+    @staticmethod
+    def backoff(tentativas):
+        """Segundos até a próxima tentativa após `tentativas` falhas."""
+        return min(JobService.BACKOFF_MAXIMO, JobService.BACKOFF_BASE * 2 ** max(tentativas - 1, 0))
+
+    @staticmethod
+    def processar(worker, tipos=None, limite=None):
+        """
+        Executa jobs elegíveis, um a um, até a fila esvaziar.
+
+        Args:
+            worker: Identificador do worker
+            tipos: Restringe aos tipos informados
+            limite: Máximo de jobs a executar (padrão: sem limite)
+
+        Returns:
+            int: Quantidade de jobs executados
+        """
+        executados = 0
+        while limite is None or executados < limite:
+            jobs = JobService.reservar(worker, tipos=tipos)
+            if not jobs:
+                break
+            JobService.executar(jobs[0])
+            executados += 1
+        return executados
+
+    @staticmethod
+    def cancelar(job):
+        """
+        Cancela um job ainda pendente.
+
+        Raises:
+            ValidationError: Se o job já tiver começado ou terminado
+        """
+        agora = timezone.now()
+        if not Job.all_objects.filter(id=job.id, status=StatusJob.PENDENTE).update(
+            status=StatusJob.CANCELADO, concluido_em=agora, updated_at=agora
+        ):
+            raise ValidationError("Apenas jobs pendentes podem ser cancelados.")
+        job.status = StatusJob.CANCELADO
+        job.concluido_em = agora
+        return job
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from tenant.models import Empresa
+from authentication.models import CustomUser, TipoCargo
+from jobs.models import Job, StatusJob
+from jobs.services import JobService, ErroDefinitivo, tarefa
+
+
+execucoes = []
+
+
+@tarefa('teste.somar')
+def somar(empresa, a, b):
+    execucoes.append((a, b))
+    return {'soma': a + b}
+
+
+@tarefa('teste.instavel')
+def instavel(empresa, falhas):
+    execucoes.append(falhas)
+    if len(execucoes) <= falhas:
+        raise RuntimeError('SEFAZ indisponível')
+    return 'ok'
+
+
+@tarefa('teste.invalido')
+def invalido(empresa):
+    raise ErroDefinitivo('Nota inexistente')
+
+
+class JobServiceTests(TestCase):
+    def setUp(self):
+        execucoes.clear()
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Jobs',
+            razao_social='Empresa Jobs LTDA',
+            cnpj='11222333000181',
+            email='jobs@empresa.test',
+        )
+
+    def _vencer(self, job):
+        Job.all_objects.filter(id=job.id).update(executar_em=timezone.now())
+
+    def test_executa_job_e_grava_resultado(self):
+        job = JobService.enfileirar(self.empresa, 'teste.somar', {'a': 2, 'b': 3})
+
+        self.assertEqual(JobService.processar('w1'), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, StatusJob.CONCLUIDO)
+        self.assertEqual(job.resultado, {'soma': 5})
+        self.assertEqual(job.tentativas, 1)
+
+    def test_chave_idempotencia_retorna_job_existente(self):
+        primeiro = JobService.enfileirar(self.empresa, 'teste.somar', {'a': 1, 'b': 1}, chave_idempotencia='k1')
+        segundo = JobService.enfileirar(self.empresa, 'teste.somar', {'a': 9, 'b': 9}, chave_idempotencia='k1')
+
+        self.assertEqual(primeiro.id, segundo.id)
+        JobService.processar('w1')
+        self.assertEqual(execucoes, [(1, 1)])
+
+    def test_falha_repete_com_backoff_ate_concluir(self):
+        job = JobService.enfileirar(self.empresa, 'teste.instavel', {'falhas': 2})
+
+        JobService.processar('w1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.tentativas), (StatusJob.PENDENTE, 1))
+        self.assertIn('SEFAZ indisponível', job.erro)
+        self.assertGreater(job.executar_em, timezone.now() + timedelta(seconds=JobService.BACKOFF_BASE - 5))
+
+        # Ainda no backoff: nada a executar
+        self.assertEqual(JobService.processar('w1'), 0)
+
+        self._vencer(job)
+        JobService.processar('w1')
+        self._vencer(job)
+        JobService.processar('w1')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.tentativas, job.resultado), (StatusJob.CONCLUIDO, 3, 'ok'))
+
+    def test_esgota_tentativas_e_erro_definitivo(self):
+        instavel_job = JobService.enfileirar(self.empresa, 'teste.instavel', {'falhas': 5}, max_tentativas=1)
+        invalido_job = JobService.enfileirar(self.empresa, 'teste.invalido')
+
+        JobService.processar('w1')
+
+        instavel_job.refresh_from_db()
+        invalido_job.refresh_from_db()
+        self.assertEqual(instavel_job.status, StatusJob.FALHOU)
+        self.assertEqual(invalido_job.status, StatusJob.FALHOU)
+        self.assertEqual(invalido_job.tentativas, 1)
+
+    def test_reserva_expirada_volta_para_fila(self):
+        job = JobService.enfileirar(self.empresa, 'teste.somar', {'a': 1, 'b': 2})
+        self.assertEqual(len(JobService.reservar('w1')), 1)
+
+        # Worker w1 morreu: nada elegível até a reserva expirar
+        self.assertEqual(JobService.reservar('w2'), [])
+        Job.all_objects.filter(id=job.id).update(reservado_ate=timezone.now() - timedelta(seconds=1))
+
+        reservado = JobService.reservar('w2')[0]
+        self.assertEqual((reservado.reservado_por, reservado.tentativas), ('w2', 2))
+        JobService.executar(reservado)
+        job.refresh_from_db()
+        self.assertEqual(job.status, StatusJob.CONCLUIDO)
+
+    def test_endpoint_status(self):
+        usuario = CustomUser.objects.create_user(
+            username='jobs', email='jobs@empresa.test', password='123456',
+            empresa=self.empresa, cargo=TipoCargo.GERENTE,
+        )
+        client = APIClient()
+        client.force_authenticate(usuario)
+        job = JobService.enfileirar(self.empresa, 'teste.somar', {'a': 1, 'b': 1})
+
+        resposta = client.get(f'/api/v1/jobs/{job.id}/')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['status'], StatusJob.PENDENTE)
+
+        resposta = client.post(f'/api/v1/jobs/{job.id}/cancelar/')
+        self.assertEqual(resposta.data['status'], StatusJob.CANCELADO)
+        self.assertEqual(JobService.processar('w1'), 0)
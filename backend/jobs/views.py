@@ -0,0 +1,38 @@
+from rest_framework import viewsets, status, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+from .models import Job
+from .services import JobService
+from api.serializers.jobs import JobSerializer
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status dos jobs em segundo plano da empresa.
+    
+    Endpoints:
+    - GET /api/v1/jobs/ - Lista (filtros: ?status=, ?tipo=)
+    - GET /api/v1/jobs/{id}/ - Status e resultado de um job
+    - POST /api/v1/jobs/{id}/cancelar/ - Cancela um job pendente
+    """
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = Job.objects.filter(empresa=self.request.user.empresa)
+        for campo in ('status', 'tipo'):
+            valor = self.request.query_params.get(campo)
+            if valor:
+                queryset = queryset.filter(**{campo: valor})
+        return queryset
+    
+    @action(detail=True, methods=['post'])
+    def cancelar(self, request, pk=None):
+        job = self.get_object()
+        try:
+            JobService.cancelar(job)
+        except DjangoValidationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(job).data, status=status.HTTP_200_OK)
@@ -8,3 +8,6 @@ class NfeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'nfe'
     verbose_name = 'Importação de NFe'
+
+    def ready(self):
+        import nfe.signals
@@ -21,20 +21,27 @@ class NFeBuilder:
     
     def __init__(self, nota: NotaFiscal):
         self.nota = nota
+        # Dados do emitente memorizados (um acesso ao endereço por empresa)
+        self.perfil = nota.empresa.perfil_fiscal
         self.root = None
         self.inf_nfe = None
     
-    def build(self) -> str:
+    def build(self, salvar_chave=True) -> str:
         """
         Gera o XML completo da NFe.
         
+        Args:
+            salvar_chave: Grava a chave de acesso gerada na nota. A emissão em
+                lote passa False e grava todas as chaves com um bulk_update.
+        
         Returns:
             str: XML assinado (ou apenas gerado se não houver certificado)
         """
         # 1. Gerar Chave de Acesso se não existir
         if not self.nota.chave_acesso:
             self._gerar_chave_acesso()
-            self.nota.save(update_fields=['chave_acesso'])
+            if salvar_chave:
+                self.nota.save(update_fields=['chave_acesso'])
             
         # 2. Estrutura Básica
         self.root = etree.Element("NFe", nsmap=self.NSMAP)
@@ -56,10 +63,10 @@ class NFeBuilder:
     def _gerar_chave_acesso(self):
         """Gera chave de acesso da NFe."""
         # Componentes
-        uf = self.nota.empresa.endereco_uf_ibge_code or '35' # Default SP se não tiver
+        uf = self.perfil.codigo_uf_ibge or '35' # Default SP se não tiver
         data = self.nota.data_emissao
         aamm = f"{data.year % 100:02d}{data.month:02d}"
-        cnpj = self.nota.empresa.cnpj_limpo
+        cnpj = self.perfil.cnpj
         mod = self.nota.modelo
         serie = f"{self.nota.serie:03d}"
         ncnf = f"{self.nota.numero:09d}"
@@ -95,7 +102,7 @@ class NFeBuilder:
         """Grupo B. Identificação da NFe."""
         ide = etree.SubElement(self.inf_nfe, "ide")
         
-        self._tag(ide, "cUF", self.nota.empresa.endereco_uf_ibge_code or '35')
+        self._tag(ide, "cUF", self.perfil.codigo_uf_ibge or '35')
         self._tag(ide, "cNF", self.nota.chave_acesso[35:43]) # Código Numérico da chave
         self._tag(ide, "natOp", self.nota.natureza_operacao)
         self._tag(ide, "mod", self.nota.modelo)
@@ -104,7 +111,7 @@ class NFeBuilder:
         self._tag(ide, "dhEmi", self.nota.data_emissao.isoformat())
         self._tag(ide, "tpNF", "1") # 1=Saída
         self._tag(ide, "idDest", "1") # 1=Operação interna (por enquanto fixo)
-        self._tag(ide, "cMunFG", self.nota.empresa.endereco_municipio_ibge or '3550308') # Default SP
+        self._tag(ide, "cMunFG", self.perfil.codigo_municipio_ibge or '3550308') # Default SP
         self._tag(ide, "tpImp", "1") # 1=Retrato
         self._tag(ide, "tpEmis", self.nota.tipo_emissao)
         self._tag(ide, "cDV", self.nota.chave_acesso[-1])
@@ -119,24 +126,24 @@ class NFeBuilder:
         """Grupo C. Emitente."""
         emit = etree.SubElement(self.inf_nfe, "emit")
         
-        self._tag(emit, "CNPJ", self.nota.empresa.cnpj_limpo)
-        self._tag(emit, "xNome", self.nota.empresa.razao_social[:60])
-        self._tag(emit, "xFant", (self.nota.empresa.nome_fantasia or self.nota.empresa.razao_social)[:60])
+        self._tag(emit, "CNPJ", self.perfil.cnpj)
+        self._tag(emit, "xNome", self.perfil.razao_social[:60])
+        self._tag(emit, "xFant", (self.perfil.nome_fantasia or self.perfil.razao_social)[:60])
         
         ender = etree.SubElement(emit, "enderEmit")
         # TODO: Pegar endereço real da empresa. Usando dados da venda por enquanto se faltar na empresa
         # Assumindo que empresa tem campos de endereço (precisamos garantir isso no models)
-        self._tag(ender, "xLgr", self.nota.empresa.logradouro or "Rua Teste")
-        self._tag(ender, "nro", self.nota.empresa.numero or "123")
-        self._tag(ender, "xBairro", self.nota.empresa.bairro or "Centro")
-        self._tag(ender, "cMun", self.nota.empresa.endereco_municipio_ibge or "3550308")
-        self._tag(ender, "xMun", self.nota.empresa.cidade or "Sao Paulo")
-        self._tag(ender, "UF", self.nota.empresa.uf or "SP")
-        self._tag(ender, "CEP", (self.nota.empresa.cep or "01001000").replace('-', ''))
+        self._tag(ender, "xLgr", self.perfil.logradouro or "Rua Teste")
+        self._tag(ender, "nro", self.perfil.numero or "123")
+        self._tag(ender, "xBairro", self.perfil.bairro or "Centro")
+        self._tag(ender, "cMun", self.perfil.codigo_municipio_ibge or "3550308")
+        self._tag(ender, "xMun", self.perfil.cidade or "Sao Paulo")
+        self._tag(ender, "UF", self.perfil.uf or "SP")
+        self._tag(ender, "CEP", (self.perfil.cep or "01001000").replace('-', ''))
         self._tag(ender, "cPais", "1058") # Brasil
         self._tag(ender, "xPais", "BRASIL")
         
-        self._tag(emit, "IE", self.nota.empresa.inscricao_estadual.replace('.', '').replace('-', ''))
+        self._tag(emit, "IE", self.perfil.inscricao_estadual.replace('.', '').replace('-', ''))
         self._tag(emit, "CRT", "1") # 1=Simples Nacional
 
     def _build_dest(self):
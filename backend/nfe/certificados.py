@@ -0,0 +1,161 @@
+"""
+Registro de certificados digitais (A1) carregados por empresa.
+
+Decodificar o PFX e abrir a sessão HTTPS com a SEFAZ (handshake TLS com
+certificado cliente) são as partes caras da assinatura e da transmissão.
+O registro mantém, por processo e por empresa, o assinador (chave já
+decodificada) e uma sessão requests com keep-alive, reaproveitados por
+SefazClient e NFeService.
+
+Invalidação:
+- A entrada guarda a impressão do certificado (nome do arquivo + hash da
+  senha); se a Empresa lida do banco tiver outra impressão, a entrada é
+  recarregada (cobre alterações feitas por outros processos).
+- O signal post_save de Empresa invalida a entrada no processo corrente.
+- Entradas sem uso há mais de TTL_OCIOSO segundos são descartadas.
+"""
+import hashlib
+import threading
+import time
+
+import requests
+from requests_pkcs12 import Pkcs12Adapter
+from django.core.exceptions import ValidationError
+
+from .signing.signer import NFeSigner
+
+
+# Segundos sem uso até a entrada ser descartada (sessão fechada)
+TTL_OCIOSO = 15 * 60
+
+# Conexões mantidas por host na sessão (consultas de recibo em paralelo)
+CONEXOES_POR_HOST = 10
+
+
+class CertificadoCarregado:
+    """Material de um certificado já decodificado e a sessão HTTPS associada."""
+
+    def __init__(self, pfx_bytes, senha, impressao):
+        self.pfx_bytes = pfx_bytes
+        self.impressao = impressao
+        self.assinador = NFeSigner(pfx_bytes, senha)
+        self.session = requests.Session()
+        self.session.mount('https://', Pkcs12Adapter(
+            pkcs12_data=pfx_bytes,
+            pkcs12_password=senha,
+            pool_maxsize=CONEXOES_POR_HOST
+        ))
+        self.ultimo_uso = time.monotonic()
+
+    def fechar(self):
+        self.session.close()
+
+
+class RegistroCertificados:
+    """
+    Cache por processo de CertificadoCarregado, indexado pela empresa.
+
+    Thread-safe; os contadores (acertos, falhas, invalidacoes, expiradas)
+    permitem medir quantas decodificações de PFX/handshakes foram evitados.
+    """
+
+    def __init__(self, ttl=TTL_OCIOSO):
+        self.ttl = ttl
+        self._entradas = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.expiradas = 0
+
+    @staticmethod
+    def impressao(empresa):
+        """Identifica o certificado configurado (arquivo + senha)."""
+        senha = (empresa.senha_certificado or '').encode('utf-8')
+        return (empresa.certificado_digital.name, hashlib.sha256(senha).hexdigest())
+
+    def obter(self, empresa):
+        """
+        Retorna o certificado carregado da empresa, carregando-o se preciso.
+
+        Raises:
+            ValidationError: Se a empresa não tiver certificado ou ele for inválido
+        """
+        if not empresa.certificado_digital:
+            raise ValidationError("Empresa sem certificado digital configurado.")
+
+        chave = str(empresa.pk)
+        impressao = self.impressao(empresa)
+        agora = time.monotonic()
+
+        with self._lock:
+            self._expirar(agora)
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada.impressao == impressao:
+                entrada.ultimo_uso = agora
+                self.acertos += 1
+                return entrada
+            if entrada is not None:
+                self._descartar(chave)
+                self.invalidacoes += 1
+            self.falhas += 1
+
+        # Carregamento fora do lock: leitura do storage e decodificação do PFX
+        try:
+            with empresa.certificado_digital.open('rb') as f:
+                pfx_bytes = f.read()
+        except Exception as e:
+            raise ValidationError(f"Erro ao ler certificado: {e}")
+        entrada = CertificadoCarregado(pfx_bytes, empresa.senha_certificado, impressao)
+
+        with self._lock:
+            anterior = self._entradas.get(chave)
+            if anterior is not None and anterior.impressao == impressao:
+                # Carregada em paralelo por outra thread: mantém a existente
+                entrada.fechar()
+                return anterior
+            if anterior is not None:
+                anterior.fechar()
+            self._entradas[chave] = entrada
+        return entrada
+
+    def invalidar(self, empresa_id):
+        """Descarta o certificado carregado da empresa (se houver)."""
+        with self._lock:
+            if self._descartar(str(empresa_id)):
+                self.invalidacoes += 1
+
+    def limpar(self):
+        """Descarta todas as entradas e zera os contadores."""
+        with self._lock:
+            for chave in list(self._entradas):
+                self._descartar(chave)
+            self.acertos = self.falhas = self.invalidacoes = self.expiradas = 0
+
+    def estatisticas(self):
+        """Contadores de uso do registro neste processo."""
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'entradas': len(self._entradas),
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'invalidacoes': self.invalidacoes,
+                'expiradas': self.expiradas,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else None,
+            }
+
+    def _expirar(self, agora):
+        for chave, entrada in list(self._entradas.items()):
+            if agora - entrada.ultimo_uso > self.ttl:
+                self._descartar(chave)
+                self.expiradas += 1
+
+    def _descartar(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is not None:
+            entrada.fechar()
+        return entrada is not None
+
+
+registro_certificados = RegistroCertificados()
@@ -7,10 +7,17 @@ from nfe.parsers.nfe_parser import NFeParser, NFeParseError
 
 def main():
     parser = argparse.ArgumentParser(prog="nfe-cli", add_help=True)
-    parser.add_argument("xml_path", type=str)
+    parser.add_argument("xml_path", type=str, help="XML, ZIP ou diretório de XMLs")
+    parser.add_argument("--processos", type=int, default=None)
     args = parser.parse_args()
 
     p = Path(args.xml_path)
+    if p.is_dir() or (p.is_file() and p.suffix.lower() == ".zip"):
+        # Lote: um JSON por linha, na ordem dos arquivos
+        for resultado in NFeParser.parse_lote(p, processos=args.processos):
+            print(json.dumps(resultado, ensure_ascii=False, default=str))
+        return
+
     if not p.exists() or not p.is_file():
         print("Arquivo não encontrado", file=sys.stderr)
         sys.exit(1)
@@ -5,9 +5,15 @@ Estratégias de matching:
 1. EAN/Código de Barras (100% confiança)
 2. Vínculo ProdutoFornecedor existente (95%)
 3. Fuzzy matching por nome (75-90%)
+
+O fuzzy usa o índice de trigramas do catálogo (catalog.busca), montado uma
+vez por empresa e invalidado a cada alteração de Produto: o índice devolve
+uma shortlist e o token_sort_ratio só é calculado sobre ela. Uma NF-e
+inteira é casada em lote (find_matches_batch) com uma query por estratégia.
 """
 from typing import List, Dict, Optional
 from fuzzywuzzy import fuzz
+from catalog.busca import indice_empresa, tokens_ordenados
 from catalog.models import Produto
 from nfe.models import ProdutoFornecedor
 
@@ -21,6 +27,8 @@ class ProductMatcher:
     # Thresholds
     MIN_FUZZY_SCORE = 75  # Score mínimo para fuzzy matching
     MAX_SUGGESTIONS = 5    # Máximo de sugestões por item
+    MAX_FUZZY = 3          # Máximo de sugestões fuzzy por item
+    SHORTLIST = 40         # Candidatos do índice avaliados por item
     
     @staticmethod
     def find_matches(
@@ -54,141 +62,181 @@ class ProductMatcher:
                 }
             ]
         """
-        sugestoes = []
+        return ProductMatcher.find_matches_batch(
+            empresa,
+            [{'codigo_xml': codigo_xml, 'ean': ean, 'descricao_xml': descricao}],
+            cnpj_fornecedor
+        )[0]
+    
+    @staticmethod
+    def find_matches_batch(
+        empresa,
+        itens: List[Dict],
+        cnpj_fornecedor: Optional[str] = None
+    ) -> List[List[Dict]]:
+        """
+        Casa todos os itens de uma NFe de uma vez.
         
-        # Estratégia 1: Match por EAN (prioridade máxima)
-        if ean and ean != 'SEM GTIN':
-            match_ean = ProductMatcher._match_by_ean(empresa, ean)
-            if match_ean:
-                sugestoes.append(match_ean)
-                return sugestoes  # Match perfeito, não precisa tentar outras estratégias
+        Uma query para os EANs, uma para os vínculos do fornecedor e o
+        índice do catálogo em memória para o fuzzy, independente do
+        número de itens.
+        
+        Args:
+            empresa: Empresa do usuário
+            itens: Itens do parser (codigo_xml, ean, descricao_xml)
+            cnpj_fornecedor: CNPJ do fornecedor (opcional)
+        
+        Returns:
+            Lista de sugestões por item, na mesma ordem de itens
+        """
+        eans = {
+            item.get('ean') for item in itens
+            if item.get('ean') and item.get('ean') != 'SEM GTIN'
+        }
+        por_ean = ProductMatcher._match_by_ean(empresa, eans)
         
-        # Estratégia 2: Match por vínculo existente
+        por_vinculo = {}
         if cnpj_fornecedor:
-            match_vinculo = ProductMatcher._match_by_vinculo(
-                empresa, cnpj_fornecedor, codigo_xml
+            por_vinculo = ProductMatcher._match_by_vinculo(
+                empresa, cnpj_fornecedor, {item.get('codigo_xml') for item in itens}
             )
+        
+        indice = None
+        fuzzy_cache = {}
+        resultado = []
+        
+        for item in itens:
+            sugestoes = []
+            
+            # Estratégia 1: Match por EAN (prioridade máxima)
+            match_ean = por_ean.get(item.get('ean'))
+            if match_ean:
+                resultado.append([match_ean])
+                continue  # Match perfeito, não precisa tentar outras estratégias
+            
+            # Estratégia 2: Match por vínculo existente
+            match_vinculo = por_vinculo.get(item.get('codigo_xml'))
             if match_vinculo:
                 sugestoes.append(match_vinculo)
                 # Vínculo é quase perfeito, retorna mas permite tentar fuzzy também
                 if match_vinculo['score'] >= 95:
-                    return sugestoes
-        
-        # Estratégia 3: Match fuzzy por nome
-        fuzzy_matches = ProductMatcher._match_by_fuzzy(empresa, descricao)
-        sugestoes.extend(fuzzy_matches)
-        
-        # Remove duplicatas (caso produto apareça em múltiplas estratégias)
-        seen = set()
-        unique_sugestoes = []
-        for sug in sugestoes:
-            if sug['produto_id'] not in seen:
-                seen.add(sug['produto_id'])
-                unique_sugestoes.append(sug)
-        
-        # Ordena por score (maior primeiro)
-        unique_sugestoes.sort(key=lambda x: x['score'], reverse=True)
+                    resultado.append(sugestoes)
+                    continue
+            
+            # Estratégia 3: Match fuzzy por nome (descrições repetidas calculadas uma vez)
+            descricao = item.get('descricao_xml') or ''
+            if descricao not in fuzzy_cache:
+                if indice is None and len(descricao) >= 3:
+                    indice = indice_empresa(empresa.id)
+                fuzzy_cache[descricao] = ProductMatcher._match_by_fuzzy(indice, descricao)
+            sugestoes.extend(fuzzy_cache[descricao])
+            
+            # Remove duplicatas (caso produto apareça em múltiplas estratégias)
+            seen = set()
+            unique_sugestoes = []
+            for sug in sugestoes:
+                if sug['produto_id'] not in seen:
+                    seen.add(sug['produto_id'])
+                    unique_sugestoes.append(sug)
+            
+            # Ordena por score (maior primeiro)
+            unique_sugestoes.sort(key=lambda x: x['score'], reverse=True)
+            
+            # Retorna top N
+            resultado.append(unique_sugestoes[:ProductMatcher.MAX_SUGGESTIONS])
         
-        # Retorna top N
-        return unique_sugestoes[:ProductMatcher.MAX_SUGGESTIONS]
+        return resultado
     
     @staticmethod
-    def _match_by_ean(empresa, ean: str) -> Optional[Dict]:
-        """Match por código de barras."""
-        try:
-            produto = Produto.objects.filter(
-                empresa=empresa,
-                codigo_barras=ean,
-                is_active=True
-            ).first()
-            
-            if produto:
-                return {
-                    'produto_id': str(produto.id),
-                    'nome': produto.nome,
-                    'codigo_barras': produto.codigo_barras,
-                    'score': 100,
-                    'motivo': 'EAN/Código de barras exato',
-                    'estrategia': 'ean'
-                }
-        except Exception:
-            pass
+    def _match_by_ean(empresa, eans) -> Dict[str, Dict]:
+        """Match por código de barras (uma query para todos os EANs)."""
+        if not eans:
+            return {}
         
-        return None
+        produtos = Produto.objects.filter(
+            empresa=empresa,
+            codigo_barras__in=eans,
+            is_active=True
+        ).values('id', 'nome', 'codigo_barras')
+        
+        return {
+            produto['codigo_barras']: {
+                'produto_id': str(produto['id']),
+                'nome': produto['nome'],
+                'codigo_barras': produto['codigo_barras'],
+                'score': 100,
+                'motivo': 'EAN/Código de barras exato',
+                'estrategia': 'ean'
+            }
+            for produto in produtos
+        }
     
     @staticmethod
     def _match_by_vinculo(
         empresa,
         cnpj_fornecedor: str,
-        codigo_xml: str
-    ) -> Optional[Dict]:
-        """Match por vínculo ProdutoFornecedor existente."""
-        try:
-            vinculo = ProdutoFornecedor.objects.filter(
-                empresa=empresa,
-                cnpj_fornecedor=cnpj_fornecedor,
-                codigo_no_fornecedor=codigo_xml
-            ).select_related('produto').first()
-            
-            if vinculo and vinculo.produto.is_active:
-                return {
-                    'produto_id': str(vinculo.produto.id),
-                    'nome': vinculo.produto.nome,
-                    'codigo_barras': vinculo.produto.codigo_barras,
-                    'score': 95,
-                    'motivo': f'Vínculo existente com {vinculo.nome_fornecedor}',
-                    'estrategia': 'vinculo',
-                    'fator_conversao': float(vinculo.fator_conversao),
-                    'ultimo_preco': float(vinculo.ultimo_preco) if vinculo.ultimo_preco else None
-                }
-        except Exception:
-            pass
+        codigos_xml
+    ) -> Dict[str, Dict]:
+        """Match por vínculo ProdutoFornecedor existente (uma query)."""
+        vinculos = ProdutoFornecedor.objects.filter(
+            empresa=empresa,
+            cnpj_fornecedor=cnpj_fornecedor,
+            codigo_no_fornecedor__in=[codigo for codigo in codigos_xml if codigo]
+        ).select_related('produto')
         
-        return None
+        resultado = {}
+        for vinculo in vinculos:
+            if not vinculo.produto.is_active or vinculo.codigo_no_fornecedor in resultado:
+                continue
+            resultado[vinculo.codigo_no_fornecedor] = {
+                'produto_id': str(vinculo.produto.id),
+                'nome': vinculo.produto.nome,
+                'codigo_barras': vinculo.produto.codigo_barras,
+                'score': 95,
+                'motivo': f'Vínculo existente com {vinculo.nome_fornecedor}',
+                'estrategia': 'vinculo',
+                'fator_conversao': float(vinculo.fator_conversao),
+                'ultimo_preco': float(vinculo.ultimo_preco) if vinculo.ultimo_preco else None
+            }
+        
+        return resultado
     
     @staticmethod
-    def _match_by_fuzzy(empresa, descricao: str) -> List[Dict]:
-        """Match fuzzy por similaridade de nome."""
-        if not descricao or len(descricao) < 3:
+    def _match_by_fuzzy(indice, descricao: str) -> List[Dict]:
+        """
+        Match fuzzy por similaridade de nome.
+        
+        O índice de trigramas devolve a shortlist do catálogo inteiro;
+        token_sort_ratio é calculado só sobre ela, com os tokens do nome
+        já normalizados e ordenados no índice.
+        """
+        if not descricao or len(descricao) < 3 or indice is None:
             return []
         
+        descricao_tokens = tokens_ordenados(descricao)
         matches = []
         
-        try:
-            # Busca produtos ativos
-            produtos = Produto.objects.filter(
-                empresa=empresa,
-                is_active=True
-            ).values('id', 'nome', 'codigo_barras')[:200]  # Limita para performance
-            
-            descricao_clean = descricao.lower().strip()
+        for produto_id in indice.candidatos(descricao, ProductMatcher.SHORTLIST):
+            nome, codigo_barras, nome_tokens = indice.produtos[produto_id]
             
-            for prod in produtos:
-                nome_clean = prod['nome'].lower().strip()
-                
-                # Calcula similaridade
-                # token_sort_ratio ignora ordem das palavras
-                ratio = fuzz.token_sort_ratio(descricao_clean, nome_clean)
-                
-                if ratio >= ProductMatcher.MIN_FUZZY_SCORE:
-                    matches.append({
-                        'produto_id': str(prod['id']),
-                        'nome': prod['nome'],
-                        'codigo_barras': prod['codigo_barras'],
-                        'score': ratio,
-                        'motivo': f'Similaridade de nome ({ratio}%)',
-                        'estrategia': 'fuzzy'
-                    })
+            # token_sort_ratio: razão entre os tokens ordenados
+            ratio = fuzz.ratio(descricao_tokens, nome_tokens)
             
-            # Ordena por score
-            matches.sort(key=lambda x: x['score'], reverse=True)
-            
-            # Retorna top matches
-            return matches[:3]  # Top 3 fuzzy matches
-            
-        except Exception as e:
-            print(f"Erro no fuzzy matching: {e}")
-            return []
+            if ratio >= ProductMatcher.MIN_FUZZY_SCORE:
+                matches.append({
+                    'produto_id': str(produto_id),
+                    'nome': nome,
+                    'codigo_barras': codigo_barras,
+                    'score': ratio,
+                    'motivo': f'Similaridade de nome ({ratio}%)',
+                    'estrategia': 'fuzzy'
+                })
+        
+        # Ordena por score
+        matches.sort(key=lambda x: x['score'], reverse=True)
+        
+        # Retorna top matches
+        return matches[:ProductMatcher.MAX_FUZZY]
     
     @staticmethod
     def get_best_match(
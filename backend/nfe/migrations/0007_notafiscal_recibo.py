@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfe', '0006_notafiscal_finalidade'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notafiscal',
+            name='recibo',
+            field=models.CharField(blank=True, help_text='nRec retornado pela SEFAZ na autorização assíncrona', max_length=15, verbose_name='Recibo do Lote'),
+        ),
+    ]
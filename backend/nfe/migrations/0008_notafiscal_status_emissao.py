@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nfe', '0007_notafiscal_recibo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notafiscal',
+            name='status',
+            field=models.CharField(choices=[('DIGITACAO', 'Em Digitação'), ('VALIDADA', 'Validada'), ('ASSINADA', 'Assinada'), ('EMISSAO', 'Em Emissão'), ('TRANSMITIDA', 'Transmitida'), ('AUTORIZADA', 'Autorizada'), ('REJEITADA', 'Rejeitada'), ('CANCELADA', 'Cancelada'), ('DENEGADA', 'Denegada')], default='DIGITACAO', max_length=20, verbose_name='Status'),
+        ),
+    ]
@@ -115,6 +115,7 @@ class StatusNFe(models.TextChoices):
     DIGITACAO = 'DIGITACAO', 'Em Digitação'
     VALIDADA = 'VALIDADA', 'Validada'
     ASSINADA = 'ASSINADA', 'Assinada'
+    EMISSAO = 'EMISSAO', 'Em Emissão'
     TRANSMITIDA = 'TRANSMITIDA', 'Transmitida'
     AUTORIZADA = 'AUTORIZADA', 'Autorizada'
     REJEITADA = 'REJEITADA', 'Rejeitada'
@@ -235,6 +236,13 @@ class NotaFiscal(TenantModel):
         verbose_name='Protocolo'
     )
     
+    recibo = models.CharField(
+        max_length=15,
+        blank=True,
+        verbose_name='Recibo do Lote',
+        help_text='nRec retornado pela SEFAZ na autorização assíncrona'
+    )
+    
     # XMLs
     xml_envio = models.TextField(
         blank=True,
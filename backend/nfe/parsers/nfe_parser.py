@@ -2,11 +2,96 @@
 Parser de XML de NFe (Nota Fiscal Eletrônica) - Projeto Nix.
 
 Suporta NFe versões 3.10 e 4.00 do padrão brasileiro.
+
+O parse é incremental (lxml.etree.iterparse): o namespace é detectado uma
+única vez no primeiro elemento, os campos são lidos com XPaths
+pré-compilados e cada <det> é descartado da árvore assim que extraído,
+então a memória não cresce com o número de itens. parse_lote processa um
+ZIP ou diretório de XMLs em paralelo (pool de processos).
 """
+import io
+import logging
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from lxml import etree
 from decimal import Decimal
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+NS_NFE = 'http://www.portalfiscal.inf.br/nfe'
+
+
+def _compilar_xpaths(prefixo: str) -> Dict:
+    """XPaths pré-compilados com ou sem o prefixo do namespace NFe."""
+    def xpath(expressao):
+        return etree.XPath(expressao.replace('%', prefixo), namespaces={'nfe': NS_NFE})
+    
+    return {
+        # Emitente
+        'cnpj': xpath('string(%CNPJ)'),
+        'nome': xpath('string(%xNome)'),
+        # Identificação
+        'numero': xpath('string(%nNF)'),
+        'serie': xpath('string(%serie)'),
+        # Item
+        'codigo': xpath('string(%prod/%cProd)'),
+        'ean': xpath('string(%prod/%cEAN)'),
+        'descricao': xpath('string(%prod/%xProd)'),
+        'unidade': xpath('string(%prod/%uCom)'),
+        'quantidade': xpath('string(%prod/%qCom)'),
+        'preco': xpath('string(%prod/%vUnCom)'),
+        'rastro': xpath('%prod/%rastro | %rastro'),
+        # Rastreabilidade
+        'lote': xpath('string(%nLote)'),
+        'fabricacao': xpath('string(%dFab)'),
+        'validade': xpath('string(%dVal)'),
+    }
+
+
+# Compilados uma vez por thread (avaliadores lxml não são compartilhados entre threads)
+_xpaths_thread = threading.local()
+
+
+def _obter_xpaths(com_namespace: bool) -> Dict:
+    """XPaths pré-compilados da thread atual para o modo de namespace detectado."""
+    cache = getattr(_xpaths_thread, 'cache', None)
+    if cache is None:
+        cache = _xpaths_thread.cache = {}
+    if com_namespace not in cache:
+        cache[com_namespace] = _compilar_xpaths('nfe:' if com_namespace else '')
+    return cache[com_namespace]
+
+
+def _texto(valor: str) -> Optional[str]:
+    """Texto sem espaços nas pontas (None se vazio)."""
+    valor = valor.strip()
+    return valor or None
+
+
+def _parse_arquivo_lote(tarefa) -> Dict:
+    """
+    Worker do pool de parse_lote (precisa ser função de módulo).
+    
+    Args:
+        tarefa: (caminho_zip ou None, nome do membro ou caminho do arquivo)
+    """
+    caminho_zip, nome = tarefa
+    try:
+        if caminho_zip:
+            with zipfile.ZipFile(caminho_zip) as arquivo_zip, arquivo_zip.open(nome) as arquivo:
+                dados = NFeParser.parse_file(arquivo)
+        else:
+            with open(nome, 'rb') as arquivo:
+                dados = NFeParser.parse_file(arquivo)
+        return {'arquivo': nome, 'dados': dados, 'erro': None}
+    except Exception as e:
+        return {'arquivo': nome, 'dados': None, 'erro': str(e)}
 
 
 class NFeParseError(Exception):
@@ -27,16 +112,16 @@ class NFeParser:
     
     # Namespaces NFe
     NS = {
-        'nfe': 'http://www.portalfiscal.inf.br/nfe'
+        'nfe': NS_NFE
     }
     
     @staticmethod
-    def parse_file(xml_content: bytes) -> Dict:
+    def parse_file(xml_content) -> Dict:
         """
         Parse completo do XML da NFe.
         
         Args:
-            xml_content: Conteúdo do arquivo XML em bytes
+            xml_content: Conteúdo do arquivo XML em bytes (ou file-like)
             
         Returns:
             Dict com todos os dados extraídos
@@ -44,44 +129,176 @@ class NFeParser:
         Raises:
             NFeParseError: Se XML inválido ou dados faltantes
         """
+        dados = NFeParser.parse_stream(xml_content)
+        dados['itens'] = list(dados['itens'])
+        return dados
+    
+    @staticmethod
+    def parse_stream(source) -> Dict:
+        """
+        Parse incremental da NFe.
+        
+        Lê até o cabeçalho (emitente e identificação) e devolve os itens
+        como gerador, extraídos um a um enquanto o XML é lido.
+        
+        Args:
+            source: Bytes, objeto file-like ou caminho do arquivo
+        
+        Returns:
+            Dict com 'fornecedor', 'identificacao' e 'itens' (gerador)
+        
+        Raises:
+            NFeParseError: Se XML inválido ou dados faltantes (erros
+            após o cabeçalho surgem durante a iteração dos itens)
+        """
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        
+        eventos = NFeParser._eventos(source)
+        cabecalho = {}
+        pendentes = []
+        for tipo, dados in eventos:
+            if tipo == 'item':
+                pendentes.append(dados)  # Só ocorre se <det> vier antes do cabeçalho
+            else:
+                cabecalho[tipo] = dados
+                if len(cabecalho) == 2:
+                    break
+        
+        return {
+            'fornecedor': cabecalho['fornecedor'],
+            'identificacao': cabecalho['identificacao'],
+            'itens': NFeParser._itens_restantes(pendentes, eventos)
+        }
+    
+    @staticmethod
+    def _itens_restantes(pendentes: List[Dict], eventos) -> Iterator[Dict]:
+        """Itens já lidos seguidos dos próximos do stream."""
+        yield from pendentes
+        for tipo, dados in eventos:
+            if tipo == 'item':
+                yield dados
+    
+    @staticmethod
+    def _eventos(source):
+        """
+        Percorre o XML com iterparse gerando ('fornecedor' | 'identificacao' | 'item', dict).
+        
+        Valida a estrutura ao final do documento, com as mesmas mensagens
+        do parse em árvore.
+        """
+        xpaths = None
+        tags = {}
+        vistos = set()
+        qtd_det = 0
+        qtd_itens = 0
+        
         try:
-            tree = etree.fromstring(xml_content)
+            for _, elem in etree.iterparse(source, events=('end',), huge_tree=True):
+                if xpaths is None:
+                    # Detecção única de namespace pelo primeiro elemento
+                    com_ns = elem.tag.startswith('{%s}' % NS_NFE)
+                    xpaths = _obter_xpaths(com_ns)
+                    prefixo = '{%s}' % NS_NFE if com_ns else ''
+                    tags = {prefixo + nome: nome for nome in ('NFe', 'infNFe', 'ide', 'emit', 'det')}
+                
+                nome = tags.get(elem.tag)
+                if nome is None:
+                    continue
+                
+                if nome == 'det':
+                    qtd_det += 1
+                    try:
+                        item = NFeParser._parse_item(elem, xpaths)
+                    except Exception as e:
+                        # Ignora item com erro mas continua processando outros
+                        # (log, não stdout: o modo lote do cli_parse emite NDJSON no stdout)
+                        logger.warning("Erro ao processar item da NF-e: %s", e)
+                        item = None
+                    NFeParser._liberar(elem)
+                    if item is not None:
+                        qtd_itens += 1
+                        yield 'item', item
+                elif nome in vistos:
+                    continue
+                elif nome == 'emit':
+                    vistos.add(nome)
+                    yield 'fornecedor', NFeParser._parse_fornecedor(elem, xpaths)
+                elif nome == 'ide':
+                    vistos.add(nome)
+                    yield 'identificacao', NFeParser._parse_identificacao(elem, xpaths)
+                else:
+                    vistos.add(nome)
         except etree.XMLSyntaxError as e:
             raise NFeParseError(f"XML inválido: {str(e)}")
         
-        # Tenta encontrar a tag NFe
-        nfe = tree.find('.//nfe:NFe', NFeParser.NS)
-        if nfe is None:
-            # Tenta sem namespace (alguns XMLs não têm)
-            nfe = tree.find('.//NFe')
-            if nfe is None:
-                raise NFeParseError("Tag <NFe> não encontrada no XML")
+        if 'NFe' not in vistos:
+            raise NFeParseError("Tag <NFe> não encontrada no XML")
+        if 'infNFe' not in vistos:
+            raise NFeParseError("Tag <infNFe> não encontrada")
+        if 'emit' not in vistos:
+            raise NFeParseError("Dados do fornecedor não encontrados")
+        if 'ide' not in vistos:
+            raise NFeParseError("Dados de identificação não encontrados")
+        if not qtd_det:
+            raise NFeParseError("Nenhum item encontrado na NFe")
+        if not qtd_itens:
+            raise NFeParseError("Nenhum item válido encontrado")
+    
+    @staticmethod
+    def _liberar(elem):
+        """Descarta o elemento já processado e os irmãos anteriores."""
+        elem.clear(keep_tail=True)
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+    
+    @staticmethod
+    def parse_lote(origem, processos: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Parse de vários XMLs (ZIP ou diretório) em paralelo.
         
-        # Extrai infNFe
-        inf_nfe = nfe.find('.//nfe:infNFe', NFeParser.NS)
-        if inf_nfe is None:
-            inf_nfe = nfe.find('.//infNFe')
-            if inf_nfe is None:
-                raise NFeParseError("Tag <infNFe> não encontrada")
+        Cada processo abre e lê seu próprio arquivo; o processo principal
+        só recebe os dados extraídos.
         
-        # Parse dados
-        return {
-            'fornecedor': NFeParser._parse_fornecedor(inf_nfe),
-            'identificacao': NFeParser._parse_identificacao(inf_nfe),
-            'itens': NFeParser._parse_itens(inf_nfe)
-        }
+        Args:
+            origem: Caminho de um arquivo ZIP ou diretório com XMLs
+            processos: Tamanho do pool (padrão: núcleos da máquina; 1 = sem pool)
+        
+        Returns:
+            Gerador de {'arquivo', 'dados', 'erro'} na ordem dos arquivos
+        
+        Raises:
+            NFeParseError: Se a origem não for ZIP nem diretório
+        """
+        origem = Path(origem)
+        if origem.is_dir():
+            tarefas = [(None, str(caminho)) for caminho in sorted(origem.rglob('*.xml'))]
+        elif zipfile.is_zipfile(origem):
+            with zipfile.ZipFile(origem) as arquivo_zip:
+                tarefas = [
+                    (str(origem), nome) for nome in arquivo_zip.namelist()
+                    if nome.lower().endswith('.xml')
+                ]
+        else:
+            raise NFeParseError(f"Origem deve ser um arquivo ZIP ou diretório: {origem}")
+        
+        processos = processos or os.cpu_count() or 1
+        if processos == 1 or len(tarefas) <= 1:
+            for tarefa in tarefas:
+                yield _parse_arquivo_lote(tarefa)
+            return
+        
+        chunksize = max(1, len(tarefas) // (processos * 4))
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            yield from pool.map(_parse_arquivo_lote, tarefas, chunksize=chunksize)
     
     @staticmethod
-    def _parse_fornecedor(inf_nfe) -> Dict:
+    def _parse_fornecedor(emit, xpaths) -> Dict:
         """Extrai dados do fornecedor (emitente)."""
-        emit = inf_nfe.find('.//nfe:emit', NFeParser.NS)
-        if emit is None:
-            emit = inf_nfe.find('.//emit')
-            if emit is None:
-                raise NFeParseError("Dados do fornecedor não encontrados")
-        
-        cnpj = NFeParser._get_text(emit, './/nfe:CNPJ') or NFeParser._get_text(emit, './/CNPJ')
-        nome = NFeParser._get_text(emit, './/nfe:xNome') or NFeParser._get_text(emit, './/xNome')
+        cnpj = _texto(xpaths['cnpj'](emit))
+        nome = _texto(xpaths['nome'](emit))
         
         if not cnpj:
             raise NFeParseError("CNPJ do fornecedor não encontrado")
@@ -92,16 +309,10 @@ class NFeParser:
         }
     
     @staticmethod
-    def _parse_identificacao(inf_nfe) -> Dict:
+    def _parse_identificacao(ide, xpaths) -> Dict:
         """Extrai número e série da NFe."""
-        ide = inf_nfe.find('.//nfe:ide', NFeParser.NS)
-        if ide is None:
-            ide = inf_nfe.find('.//ide')
-            if ide is None:
-                raise NFeParseError("Dados de identificação não encontrados")
-        
-        numero = NFeParser._get_text(ide, './/nfe:nNF') or NFeParser._get_text(ide, './/nNF')
-        serie = NFeParser._get_text(ide, './/nfe:serie') or NFeParser._get_text(ide, './/serie')
+        numero = _texto(xpaths['numero'](ide))
+        serie = _texto(xpaths['serie'](ide))
         
         if not numero:
             raise NFeParseError("Número da NFe não encontrado")
@@ -112,69 +323,21 @@ class NFeParser:
         }
     
     @staticmethod
-    def _parse_itens(inf_nfe) -> List[Dict]:
-        """Extrai lista de itens da NFe."""
-        dets = inf_nfe.findall('.//nfe:det', NFeParser.NS)
-        if not dets:
-            dets = inf_nfe.findall('.//det')
-            if not dets:
-                raise NFeParseError("Nenhum item encontrado na NFe")
-        
-        itens = []
-        for det in dets:
-            try:
-                item = NFeParser._parse_item(det)
-                itens.append(item)
-            except Exception as e:
-                # Ignora item com erro mas continua processando outros
-                print(f"Aviso: Erro ao processar item: {e}")
-                continue
-        
-        if not itens:
-            raise NFeParseError("Nenhum item válido encontrado")
-        
-        return itens
-    
-    @staticmethod
-    def _parse_item(det) -> Dict:
+    def _parse_item(det, xpaths) -> Dict:
         """Parse de um item individual."""
-        prod = det.find('.//nfe:prod', NFeParser.NS)
-        if prod is None:
-            prod = det.find('.//prod')
-            if prod is None:
-                raise ValueError("Tag <prod> não encontrada no item")
-        
         # Dados básicos
-        codigo = (
-            NFeParser._get_text(prod, './/nfe:cProd') or 
-            NFeParser._get_text(prod, './/cProd')
-        )
-        ean = (
-            NFeParser._get_text(prod, './/nfe:cEAN') or 
-            NFeParser._get_text(prod, './/cEAN')
-        )
-        descricao = (
-            NFeParser._get_text(prod, './/nfe:xProd') or 
-            NFeParser._get_text(prod, './/xProd')
-        )
-        unidade = (
-            NFeParser._get_text(prod, './/nfe:uCom') or 
-            NFeParser._get_text(prod, './/uCom')
-        )
-        quantidade = (
-            NFeParser._get_text(prod, './/nfe:qCom') or 
-            NFeParser._get_text(prod, './/qCom')
-        )
-        preco = (
-            NFeParser._get_text(prod, './/nfe:vUnCom') or 
-            NFeParser._get_text(prod, './/vUnCom')
-        )
+        codigo = _texto(xpaths['codigo'](det))
+        ean = _texto(xpaths['ean'](det))
+        descricao = _texto(xpaths['descricao'](det))
+        unidade = _texto(xpaths['unidade'](det))
+        quantidade = _texto(xpaths['quantidade'](det))
+        preco = _texto(xpaths['preco'](det))
         
         if not codigo or not quantidade or not preco:
             raise ValueError("Dados obrigatórios do item faltando")
         
         # Dados de rastreabilidade (lote)
-        lote_data = NFeParser._parse_rastreabilidade(det)
+        lote_data = NFeParser._parse_rastreabilidade(det, xpaths)
         
         return {
             'codigo_xml': codigo,
@@ -187,26 +350,16 @@ class NFeParser:
         }
     
     @staticmethod
-    def _parse_rastreabilidade(det) -> Optional[Dict]:
+    def _parse_rastreabilidade(det, xpaths) -> Optional[Dict]:
         """Parse de dados de rastreabilidade (lote, validade)."""
-        rastro = det.find('.//nfe:rastro', NFeParser.NS)
-        if rastro is None:
-            rastro = det.find('.//rastro')
-            if rastro is None:
-                return None
-        
-        codigo_lote = (
-            NFeParser._get_text(rastro, './/nfe:nLote') or 
-            NFeParser._get_text(rastro, './/nLote')
-        )
-        data_fab = (
-            NFeParser._get_text(rastro, './/nfe:dFab') or 
-            NFeParser._get_text(rastro, './/dFab')
-        )
-        data_val = (
-            NFeParser._get_text(rastro, './/nfe:dVal') or 
-            NFeParser._get_text(rastro, './/dVal')
-        )
+        rastros = xpaths['rastro'](det)
+        if not rastros:
+            return None
+        rastro = rastros[0]
+        
+        codigo_lote = _texto(xpaths['lote'](rastro))
+        data_fab = _texto(xpaths['fabricacao'](rastro))
+        data_val = _texto(xpaths['validade'](rastro))
         
         if not codigo_lote:
             return None
@@ -217,18 +370,6 @@ class NFeParser:
             'validade': NFeParser._parse_date(data_val)
         }
     
-    @staticmethod
-    def _get_text(element, xpath: str) -> Optional[str]:
-        """Helper para pegar texto de um elemento."""
-        node = element.find(xpath, NFeParser.NS)
-        if node is None:
-            # Tenta sem namespace
-            node = element.find(xpath.replace('nfe:', ''))
-        
-        if node is not None and node.text:
-            return node.text.strip()
-        return None
-    
     @staticmethod
     def _parse_date(date_str: Optional[str]) -> Optional[str]:
         """
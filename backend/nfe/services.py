@@ -2,7 +2,8 @@
 Service Layer para importação de NFe - Projeto Nix.
 """
 import uuid
-from django.db import transaction
+from contextlib import nullcontext
+from django.db import connection, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from decimal import Decimal
@@ -15,12 +16,15 @@ from financial.models import ContaPagar, StatusConta
 from sales.models import Venda
 from tenant.models import Empresa
 from datetime import date, timedelta
-from django.db.models import Max
+from django.db.models import Max, Q
 from .models import ProdutoFornecedor, NotaFiscal, ItemNotaFiscal, StatusNFe, TipoEmissao, FinalidadeNFe
 from sales.models import Venda, StatusVenda
 from .builders.nfe_builder import NFeBuilder
 from .signing.signer import NFeSigner
-from .transport.sefaz_client import SefazClient
+from .certificados import registro_certificados
+from .transport.sefaz_client import (
+    SefazClient, MAX_NFE_POR_LOTE, CSTAT_LOTE_RECEBIDO, CSTAT_LOTE_PROCESSADO
+)
 
 
 class NFeService:
@@ -33,8 +37,16 @@ class NFeService:
     - Integração com StockService (lotes + FIFO)
     - Idempotência (evita duplicação)
     - Geração de NFe a partir de Venda
+    - Emissão em lote (enviNFe com várias notas)
     """
     
+    # Sequência dos identificadores de lote enviNFe (idLote)
+    CHAVE_LOTE_NFE = 'NFE-LOTE'
+    
+    # Status que podem entrar em uma emissão e validade da reserva
+    STATUS_EMITIVEIS = [StatusNFe.DIGITACAO, StatusNFe.VALIDADA, StatusNFe.ASSINADA, StatusNFe.REJEITADA]
+    RESERVA_EMISSAO = timedelta(minutes=10)
+    
     @staticmethod
     @transaction.atomic
     def gerar_nfe_de_venda(empresa, venda_id, usuario, modelo='55', serie='1'):
@@ -129,10 +141,6 @@ class NFeService:
             
         ItemNotaFiscal.objects.bulk_create(itens_nota)
         
-        # Atualizar número da última NFe na empresa
-        empresa.numero_nfe_atual = numero_nota
-        empresa.save(update_fields=['numero_nfe_atual'])
-        
         return nota
 
     @staticmethod
@@ -158,11 +166,7 @@ class NFeService:
         # Assinar XML se empresa tiver certificado
         if empresa.certificado_digital:
             try:
-                # Carregar certificado
-                with empresa.certificado_digital.open('rb') as f:
-                    cert_bytes = f.read()
-                
-                signer = NFeSigner(cert_bytes, empresa.senha_certificado)
+                signer = registro_certificados.obter(empresa).assinador
                 xml_content = signer.sign_nfe(xml_content)
                 
                 nota.status = StatusNFe.ASSINADA
@@ -183,7 +187,7 @@ class NFeService:
     @staticmethod
     def consultar_recibo(recibo, empresa):
         """
-        Consulta o recibo na SEFAZ e atualiza a nota se encontrar protocolo.
+        Consulta o recibo na SEFAZ e atualiza as notas do lote pelo protocolo.
         
         Args:
             recibo: Número do recibo
@@ -194,46 +198,332 @@ class NFeService:
         """
         client = SefazClient(empresa)
         retorno = client.consultar_recibo(recibo)
+        NFeService._aplicar_protocolos(empresa, retorno.get('protocolos', []))
+        return retorno
+
+    @staticmethod
+    def _aplicar_protocolos(empresa, protocolos):
+        """
+        Atualiza as notas a partir dos protNFe retornados pela SEFAZ.
+        
+        As notas são localizadas pela chave de acesso (chNFe) em uma única
+        consulta e gravadas com um bulk_update.
+        
+        Returns:
+            Dict {status: quantidade de notas atualizadas}
+        """
+        protocolos = {prot['chNFe']: prot for prot in protocolos if prot.get('chNFe')}
+        if not protocolos:
+            return {}
+        
+        agora = timezone.now()
+        contagem = {}
+        notas = list(NotaFiscal.objects.filter(empresa=empresa, chave_acesso__in=protocolos))
+        for nota in notas:
+            prot = protocolos[nota.chave_acesso]
+            if prot['cStat'] == '100':
+                nota.status = StatusNFe.AUTORIZADA
+                nota.protocolo_autorizacao = prot['nProt'] or ''
+                nota.xml_processado = prot['xml_prot']
+            elif prot['cStat'] in ['110', '301', '302']: # Denegada
+                nota.status = StatusNFe.DENEGADA
+                nota.observacoes = f"Denegada: {prot['xMotivo']}"
+            else:
+                # Rejeitada
+                nota.status = StatusNFe.REJEITADA
+                nota.observacoes = f"Rejeitada ({prot['cStat']}): {prot['xMotivo']}"
+            nota.updated_at = agora
+            contagem[nota.status] = contagem.get(nota.status, 0) + 1
+        
+        NotaFiscal.objects.bulk_update(
+            notas,
+            ['status', 'protocolo_autorizacao', 'xml_processado', 'observacoes', 'updated_at']
+        )
+        return contagem
+
+    @staticmethod
+    def transmitir_nfe(nota_id, empresa):
+        """
+        Gera, assina e transmite uma única NFe em modo síncrono (indSinc=1).
+        
+        Usado dentro da requisição: não espera recibo. Se a SEFAZ responder
+        de forma assíncrona, a nota fica TRANSMITIDA para consultar_recibo.
+        
+        Returns:
+            Dict com o resumo de emitir_lote
+        
+        Raises:
+            ValidationError: Nota inexistente, já em emissão ou em status
+                que não permite transmissão
+        """
+        if not NotaFiscal.objects.filter(id=nota_id, empresa=empresa).exists():
+            raise ValidationError("Nota Fiscal não encontrada.")
+        resultado = NFeService.emitir_lote(
+            empresa, [nota_id], processos=1, aguardar_recibos=False, sincrono=True
+        )
+        if not resultado['status']:
+            raise ValidationError("Nota Fiscal já está em emissão ou não pode ser transmitida no status atual.")
+        return resultado
+
+    @staticmethod
+    def _reservar_notas(empresa, nota_ids):
+        """
+        Reserva as notas para emissão (status EMISSAO).
+        
+        Mesmo esquema da fila de jobs: select_for_update(skip_locked=True)
+        onde o banco suporta, e UPDATE condicional ao status lido, que
+        garante a exclusividade também sem SELECT ... FOR UPDATE (SQLite).
+        Reservas mais antigas que RESERVA_EMISSAO (processo que morreu no
+        meio) podem ser retomadas.
+        
+        Returns:
+            Dict {nota_id: status anterior} das notas reservadas
+        """
+        agora = timezone.now()
+        elegiveis = NotaFiscal.objects.filter(empresa=empresa, id__in=nota_ids).filter(
+            Q(status__in=NFeService.STATUS_EMITIVEIS) |
+            Q(status=StatusNFe.EMISSAO, updated_at__lt=agora - NFeService.RESERVA_EMISSAO)
+        )
+        
+        reservadas = {}
+        bloqueio = transaction.atomic() if connection.features.has_select_for_update else nullcontext()
+        with bloqueio:
+            candidatas = list(
+                elegiveis.select_for_update(skip_locked=True).values_list('id', 'status', 'updated_at')
+            )
+            for nota_id, status_atual, atualizada_em in candidatas:
+                if NotaFiscal.objects.filter(
+                    id=nota_id, status=status_atual, updated_at=atualizada_em
+                ).update(status=StatusNFe.EMISSAO, updated_at=agora):
+                    reservadas[nota_id] = status_atual
+        return reservadas
+
+    @staticmethod
+    def _liberar_notas(reservadas):
+        """
+        Devolve ao status anterior as notas reservadas que continuam em
+        EMISSAO (não chegaram a ter resultado de transmissão gravado).
+        
+        Args:
+            reservadas: Dict {nota_id: status anterior} de _reservar_notas
+        """
+        agora = timezone.now()
+        for status_anterior in set(reservadas.values()):
+            NotaFiscal.objects.filter(
+                id__in=[nota_id for nota_id, status_nota in reservadas.items() if status_nota == status_anterior],
+                status=StatusNFe.EMISSAO
+            ).update(status=status_anterior, updated_at=agora)
+
+    @staticmethod
+    def enfileirar_emissao(empresa, nota_ids, chave_idempotencia=''):
+        """
+        Enfileira emitir_lote como job (tarefa nfe.emitir_lote).
+        
+        Returns:
+            Job: Job enfileirado (ou o existente com a mesma chave)
+        """
+        from jobs.services import JobService
+        
+        return JobService.enfileirar(
+            empresa,
+            'nfe.emitir_lote',
+            {'nota_ids': [str(nota_id) for nota_id in nota_ids]},
+            chave_idempotencia=chave_idempotencia
+        )
+
+    @staticmethod
+    def enfileirar_importacao(empresa, payload, usuario, chave_idempotencia=''):
+        """
+        Enfileira efetivar_importacao_nfe como job (tarefa nfe.efetivar_importacao).
+        
+        Args:
+            payload: Dados já validados no formato de entrada (JSON) do serializer
+        
+        Returns:
+            Job: Job enfileirado (ou o existente com a mesma chave)
+        """
+        from jobs.services import JobService
+        
+        return JobService.enfileirar(
+            empresa,
+            'nfe.efetivar_importacao',
+            {'payload': payload, 'usuario': usuario},
+            chave_idempotencia=chave_idempotencia
+        )
+
+    @staticmethod
+    def emitir_lote(empresa, nota_ids, processos=None, aguardar_recibos=True,
+                    intervalo_consulta=2.0, tentativas_consulta=10, sincrono=False):
+        """
+        Emite várias NFe/NFC-e de uma vez (ex: regularização de contingência).
+        
+        Etapas:
+        0. Reserva as notas (_reservar_notas): a view síncrona e um job
+           nfe.emitir_lote concorrentes nunca assinam/transmitem a mesma nota
+        1. Gera todos os XMLs com as notas, itens e endereços pré-carregados
+        2. Assina em um pool de processos (chave carregada uma vez por processo)
+        3. Agrupa em lotes enviNFe de até MAX_NFE_POR_LOTE notas, numerados
+           pela sequência da empresa, e envia pela mesma sessão HTTPS
+        4. Consulta os recibos em paralelo e aplica os protocolos
         
-        if 'protocolo' in retorno:
-            prot = retorno['protocolo']
-            # Tenta achar a nota pela chave ou recibo (se tivéssemos salvo o recibo na nota)
-            # Como não salvamos recibo na nota ainda (falha minha no model), vamos tentar achar pelo xml se possível
-            # Ou o chamador deve passar a nota.
-            # Idealmente: NotaFiscal tem campo 'recibo'.
-            
-            # Vamos assumir que quem chama sabe qual nota é, ou atualizamos a nota se o protocolo bater.
-            # O protocolo tem chNFe.
-            chave = prot.get('chNFe')
-            if chave:
+        Não roda em uma única transação: cada etapa grava seu resultado,
+        e notas que ficarem TRANSMITIDA (recibo ainda em processamento)
+        podem ser finalizadas depois com consultar_recibo.
+        
+        Args:
+            empresa: Empresa emitente (com certificado digital)
+            nota_ids: IDs das notas a emitir
+            processos: Processos de assinatura (1 = sem pool)
+            aguardar_recibos: Consulta os recibos antes de retornar
+            intervalo_consulta: Espera entre consultas do mesmo recibo (segundos)
+            tentativas_consulta: Máximo de consultas por recibo
+            sincrono: Lotes de uma nota com indSinc=1 (protocolo na resposta)
+            
+        Returns:
+            Dict com lotes enviados, contagem por status e erros por nota
+            
+        Raises:
+            ValidationError: Se a empresa não tiver certificado válido
+        """
+        from tenant.services import SequenciaService
+        
+        if not empresa.certificado_digital:
+            raise ValidationError("Empresa sem certificado digital configurado.")
+        
+        resultado = {'lotes': [], 'status': {}, 'erros': []}
+        
+        def registrar_erro(nota, mensagem):
+            resultado['erros'].append({'nota_id': str(nota.id), 'numero': nota.numero, 'erro': mensagem})
+        
+        # 0. Reservar as notas (status EMISSAO) antes de gerar qualquer XML
+        reservadas = NFeService._reservar_notas(empresa, nota_ids)
+        if not reservadas:
+            return resultado
+        try:
+            notas = list(
+                NotaFiscal.objects.filter(id__in=reservadas)
+                .select_related('cliente')
+                .prefetch_related('itens', 'cliente__enderecos')
+                .order_by('modelo', 'serie', 'numero')
+            )
+            
+            # 1. Gerar XMLs (chaves gravadas junto com os XMLs assinados)
+            geradas = []
+            xmls = []
+            for nota in notas:
+                nota.empresa = empresa
                 try:
-                    nota = NotaFiscal.objects.get(chave_acesso=chave, empresa=empresa)
-                    if prot['cStat'] == '100':
-                        nota.status = StatusNFe.AUTORIZADA
-                        nota.protocolo_autorizacao = prot['nProt']
-                        nota.xml_processado = prot['xml_prot']
-                        nota.save(update_fields=['status', 'protocolo_autorizacao', 'xml_processado'])
-                    elif prot['cStat'] in ['110', '301', '302']: # Denegada
-                        nota.status = StatusNFe.DENEGADA
-                        nota.observacoes = f"Denegada: {prot['xMotivo']}"
-                        nota.save(update_fields=['status', 'observacoes'])
-                    else:
-                        # Rejeitada
+                    xmls.append(NFeBuilder(nota).build(salvar_chave=False))
+                    geradas.append(nota)
+                except Exception as e:
+                    registrar_erro(nota, f"Erro ao gerar XML: {e}")
+                    nota.status = reservadas[nota.id]
+            
+            # 2. Assinar
+            certificado = registro_certificados.obter(empresa)
+            assinaturas = NFeSigner.assinar_lote(
+                xmls, certificado.pfx_bytes, empresa.senha_certificado, processos,
+                assinador=certificado.assinador
+            )
+            
+            assinadas = []
+            for nota, assinatura in zip(geradas, assinaturas):
+                if assinatura['erro']:
+                    registrar_erro(nota, f"Erro ao assinar: {assinatura['erro']}")
+                    nota.status = reservadas[nota.id]
+                else:
+                    # Continua reservada (EMISSAO) até o retorno da transmissão
+                    nota.xml_envio = assinatura['xml']
+                    assinadas.append(nota)
+            
+            # Notas que não serão transmitidas são liberadas aqui
+            agora = timezone.now()
+            for nota in notas:
+                nota.updated_at = agora
+            NotaFiscal.objects.bulk_update(notas, ['chave_acesso', 'xml_envio', 'status', 'updated_at'])
+            
+            # 3. Transmitir em lotes pela mesma sessão
+            client = SefazClient(empresa)
+            recibos = {}
+            protocolos = []
+            for inicio in range(0, len(assinadas), MAX_NFE_POR_LOTE):
+                lote = assinadas[inicio:inicio + MAX_NFE_POR_LOTE]
+                id_lote = SequenciaService.proximo_numero(empresa, NFeService.CHAVE_LOTE_NFE)
+                try:
+                    retorno = client.autorizar_lote(
+                        [nota.xml_envio for nota in lote], id_lote=id_lote,
+                        sincrono=sincrono and len(lote) == 1
+                    )
+                except ValidationError as e:
+                    retorno = {'cStat': None, 'xMotivo': '; '.join(e.messages), 'xml_raw': ''}
+            
+                recibo = retorno.get('recibo') if retorno['cStat'] == CSTAT_LOTE_RECEBIDO else None
+                protocolo = retorno.get('protocolo') if retorno['cStat'] == CSTAT_LOTE_PROCESSADO else None
+                agora = timezone.now()
+                for nota in lote:
+                    nota.xml_retorno = retorno['xml_raw']
+                    nota.updated_at = agora
+                    if protocolo or recibo:
+                        # Síncrono: o protocolo é aplicado logo abaixo
+                        nota.status = StatusNFe.TRANSMITIDA
+                        nota.recibo = recibo or ''
+                    elif retorno['cStat']:
                         nota.status = StatusNFe.REJEITADA
-                        nota.observacoes = f"Rejeitada ({prot['cStat']}): {prot['xMotivo']}"
-                        nota.save(update_fields=['status', 'observacoes'])
-                except NotaFiscal.DoesNotExist:
-                    pass
-                    
-        return retorno
+                        nota.observacoes = f"Lote rejeitado ({retorno['cStat']}): {retorno['xMotivo']}"
+                    else:
+                        nota.status = StatusNFe.ASSINADA
+                        registrar_erro(nota, f"Erro ao transmitir: {retorno['xMotivo']}")
+                NotaFiscal.objects.bulk_update(
+                    lote, ['status', 'recibo', 'xml_retorno', 'observacoes', 'updated_at']
+                )
+                if recibo:
+                    recibos[recibo] = lote
+                if protocolo:
+                    protocolos.append(protocolo)
+            
+                resultado['lotes'].append({
+                    'id_lote': id_lote,
+                    'notas': len(lote),
+                    'cStat': retorno['cStat'],
+                    'xMotivo': retorno['xMotivo'],
+                    'recibo': recibo,
+                })
+            NFeService._aplicar_protocolos(empresa, protocolos)
+            
+            # 4. Consultar recibos em paralelo
+            if aguardar_recibos and recibos:
+                retornos = client.consultar_recibos(
+                    recibos, intervalo=intervalo_consulta, tentativas=tentativas_consulta
+                )
+                protocolos = []
+                for recibo, retorno in retornos.items():
+                    if 'erro' in retorno:
+                        for nota in recibos[recibo]:
+                            registrar_erro(nota, f"Erro ao consultar recibo {recibo}: {retorno['erro']}")
+                    else:
+                        protocolos.extend(retorno.get('protocolos', []))
+                NFeService._aplicar_protocolos(empresa, protocolos)
+            
+        except Exception:
+            # Certificado ilegível, falha no pool de assinatura, erro de
+            # conexão etc.: as notas sem resultado não ficam presas em EMISSAO
+            NFeService._liberar_notas(reservadas)
+            raise
+        
+        for status_nota in NotaFiscal.objects.filter(
+            empresa=empresa, id__in=list(reservadas)
+        ).values_list('status', flat=True):
+            resultado['status'][status_nota] = resultado['status'].get(status_nota, 0) + 1
+        return resultado
 
     @staticmethod
     def _validar_dados_emissao(empresa, cliente):
         """Valida dados obrigatórios para emissão de NFe."""
-        # Validar Empresa (Emitente)
-        if not empresa.inscricao_estadual:
+        # Validar Empresa (Emitente), pelo perfil fiscal memorizado
+        perfil = empresa.perfil_fiscal
+        if not perfil.inscricao_estadual:
             raise ValidationError("Empresa sem Inscrição Estadual configurada.")
-        if not empresa.certificado_digital:
+        if not perfil.possui_certificado:
             # Apenas warning por enquanto, ou erro se for obrigatório ter o cert para criar o registro
             pass 
             
@@ -254,22 +544,66 @@ class NFeService:
 
     @staticmethod
     def _gerar_numero_nfe(empresa, serie, modelo):
-        """Gera próximo número de NFe para a série."""
-        # Tenta pegar do contador da empresa primeiro
-        proximo_numero = empresa.numero_nfe_atual + 1
+        """
+        Reserva o próximo número de NFe para a série.
+        
+        Regras de lacuna (a numeração da NF-e não pode pular números sem
+        inutilização na SEFAZ):
+        - O número é reservado na mesma transação que cria a nota; se ela
+          for desfeita, o contador também volta (sem lacuna).
+        - Número entregue nunca é reutilizado: notas rejeitadas ou
+          excluídas deixam lacunas a inutilizar (ver listar_lacunas_nfe).
+        - Cada modelo/série tem seu contador: uma nota numa série não
+          avança as demais.
+        - empresa.numero_nfe_atual (ex: migração de outro emissor) só é
+          considerado ao semear o contador da série padrão da empresa
+          (modelo 55, empresa.serie_nfe); depois a sequência é a fonte.
+        """
+        from tenant.services import SequenciaService
         
-        # Verifica se já existe na tabela de notas (segurança extra)
-        # Se houver gap ou se o contador estiver desatualizado
-        ultimo_banco = NotaFiscal.objects.filter(
-            empresa=empresa,
-            serie=serie,
-            modelo=modelo
-        ).aggregate(Max('numero'))['numero__max']
+        def ultima_nota():
+            ultimo = NotaFiscal.all_objects.filter(
+                empresa=empresa,
+                serie=serie,
+                modelo=modelo
+            ).aggregate(Max('numero'))['numero__max'] or 0
+            if str(modelo) == '55' and int(serie) == int(empresa.serie_nfe or 0):
+                ultimo = max(ultimo, empresa.numero_nfe_atual or 0)
+            return ultimo
+        
+        return SequenciaService.proximo_numero(
+            empresa,
+            SequenciaService.chave_nfe(modelo, serie),
+            semente=ultima_nota
+        )
+    
+    @staticmethod
+    def listar_lacunas_nfe(empresa, serie, modelo):
+        """
+        Lista números da série já entregues pela sequência sem nota gravada.
         
-        if ultimo_banco and ultimo_banco >= proximo_numero:
-            proximo_numero = ultimo_banco + 1
-            
-        return proximo_numero
+        São os números que devem ser inutilizados na SEFAZ.
+        
+        Returns:
+            list[int]: Números faltantes, em ordem crescente
+        """
+        from tenant.services import SequenciaService
+        
+        ultimo = SequenciaService.ultimo_numero(
+            empresa, SequenciaService.chave_nfe(modelo, serie)
+        )
+        usados = set(
+            NotaFiscal.all_objects.filter(
+                empresa=empresa,
+                serie=serie,
+                modelo=modelo,
+                numero__lte=ultimo
+            ).values_list('numero', flat=True)
+        )
+        if not usados:
+            return []
+        
+        return [numero for numero in range(min(usados), ultimo + 1) if numero not in usados]
 
     @staticmethod
     @transaction.atomic
@@ -402,33 +736,15 @@ class NFeService:
             'erros': []
         }
         
-        for idx, item in enumerate(itens, 1):
-            try:
-                item_resultado = NFeService._processar_item_nfe(
-                    empresa=empresa,
-                    deposito=deposito,
-                    fornecedor=fornecedor,
-                    cnpj_fornecedor=cnpj_fornecedor,
-                    nome_fornecedor=nome_fornecedor,
-                    item_data=item,
-                    documento=documento,
-                    usuario=usuario
-                )
-                resultado['itens_processados'].append(item_resultado)
-                
-                if item_resultado.get('vinculo_criado'):
-                    resultado['vinculos_criados'] += 1
-                if item_resultado.get('lote_criado'):
-                    resultado['lotes_criados'] += 1
-                    
-            except Exception as e:
-                erro = {
-                    'item_numero': idx,
-                    'codigo_xml': item.get('codigo_xml'),
-                    'erro': str(e)
-                }
-                resultado['erros'].append(erro)
-                # Continua processando outros itens
+        NFeService._importar_itens_nfe(
+            empresa=empresa,
+            deposito=deposito,
+            cnpj_fornecedor=cnpj_fornecedor,
+            nome_fornecedor=nome_fornecedor,
+            itens=itens,
+            documento=documento,
+            resultado=resultado
+        )
         
         # 7. Gerar Conta a Pagar
         financeiro = payload.get('financeiro') or {}
@@ -463,97 +779,192 @@ class NFeService:
         return resultado
     
     @staticmethod
-    def _processar_item_nfe(empresa, deposito, fornecedor, cnpj_fornecedor, 
-                           nome_fornecedor, item_data, documento, usuario):
-        """Processa um item individual da NFe."""
-        
-        # Extrair dados
-        produto_id = item_data.get('produto_id')
-        codigo_xml = item_data.get('codigo_xml')
-        fator_conversao = Decimal(str(item_data.get('fator_conversao', 1)))
-        qtd_xml = Decimal(str(item_data.get('qtd_xml', 0)))
-        preco_custo = Decimal(str(item_data.get('preco_custo', 0)))
-        lote_data = item_data.get('lote', {})
-        
-        # Validações
-        if not produto_id:
-            raise ValidationError(
-                f"Item {codigo_xml}: produto_id não informado"
-            )
-        
-        if fator_conversao <= 0:
-            raise ValidationError(
-                f"Item {codigo_xml}: fator_conversao deve ser > 0"
-            )
+    def _importar_itens_nfe(empresa, deposito, cnpj_fornecedor, nome_fornecedor,
+                            itens, documento, resultado):
+        """
+        Importa os itens da NFe com escrita agrupada.
         
-        if qtd_xml <= 0:
-            raise ValidationError(
-                f"Item {codigo_xml}: qtd_xml deve ser > 0"
-            )
+        1. Valida todos os itens e pré-carrega os produtos (uma query)
+        2. Lotes, movimentações e saldos via StockService.dar_entrada_itens
+        3. Vínculos ProdutoFornecedor (uma query + bulk insert/update)
+        4. Custos dos insumos atualizados em bulk e propagados uma única vez
         
-        # Buscar produto
-        try:
-            produto = Produto.objects.get(
-                id=produto_id,
-                empresa=empresa
-            )
-        except Produto.DoesNotExist:
-            raise ValidationError(
-                f"Produto {produto_id} não encontrado ou não pertence à empresa"
-            )
-        
-        if not produto.is_active:
-            raise ValidationError(
-                f"Produto {produto.nome} está inativo"
-            )
+        Itens inválidos entram em resultado['erros'] sem interromper os demais.
+        """
+        from catalog.services import CatalogService
+        
+        def registrar_erro(idx, item, mensagem):
+            resultado['erros'].append({
+                'item_numero': idx,
+                'codigo_xml': item.get('codigo_xml'),
+                'erro': mensagem
+            })
+        
+        # 1. Pré-carga dos produtos e validação antecipada
+        produto_ids = set()
+        for item in itens:
+            try:
+                produto_ids.add(uuid.UUID(str(item.get('produto_id'))))
+            except ValueError:
+                pass
+        produtos = {
+            produto.id: produto
+            for produto in Produto.all_objects.filter(empresa=empresa, id__in=produto_ids)
+        }
         
-        # Atualizar custo se for INSUMO e propagar para fichas técnicas
-        if produto.tipo == TipoProduto.INSUMO and preco_custo > 0 and preco_custo != produto.preco_custo:
-            produto.preco_custo = preco_custo
-            produto.save(update_fields=['preco_custo', 'updated_at'])
+        validos = []
+        for idx, item in enumerate(itens, 1):
+            produto_id = item.get('produto_id')
+            codigo_xml = item.get('codigo_xml')
+            try:
+                fator_conversao = Decimal(str(item.get('fator_conversao', 1)))
+                qtd_xml = Decimal(str(item.get('qtd_xml', 0)))
+                preco_custo = Decimal(str(item.get('preco_custo', 0)))
+            except Exception as e:
+                registrar_erro(idx, item, f"Item {codigo_xml}: valor numérico inválido ({e})")
+                continue
             
-            # Gatilho: Recalcular custo de todos os produtos que utilizam este insumo
-            from catalog.services import CatalogService
-            CatalogService.propagar_custo_insumo(produto)
-        
-        # Salvar vínculo ProdutoFornecedor
-        vinculo, criado = ProdutoFornecedor.objects.update_or_create(
-            empresa=empresa,
-            produto=produto,
-            cnpj_fornecedor=cnpj_fornecedor,
-            codigo_no_fornecedor=codigo_xml,
-            defaults={
-                'nome_fornecedor': nome_fornecedor,
+            if not produto_id:
+                registrar_erro(idx, item, f"Item {codigo_xml}: produto_id não informado")
+                continue
+            if not codigo_xml:
+                registrar_erro(idx, item, f"Item {idx}: codigo_xml não informado")
+                continue
+            if fator_conversao <= 0:
+                registrar_erro(idx, item, f"Item {codigo_xml}: fator_conversao deve ser > 0")
+                continue
+            if qtd_xml <= 0:
+                registrar_erro(idx, item, f"Item {codigo_xml}: qtd_xml deve ser > 0")
+                continue
+            
+            try:
+                produto = produtos.get(uuid.UUID(str(produto_id)))
+            except ValueError:
+                produto = None
+            if produto is None:
+                registrar_erro(idx, item, f"Produto {produto_id} não encontrado ou não pertence à empresa")
+                continue
+            if not produto.is_active:
+                registrar_erro(idx, item, f"Produto {produto.nome} está inativo")
+                continue
+            
+            validos.append({
+                'idx': idx,
+                'item': item,
+                'produto': produto,
                 'fator_conversao': fator_conversao,
-                'ultimo_preco': preco_custo
-            }
-        )
-        
-        # Calcular quantidade real
-        quantidade_real = (qtd_xml * fator_conversao).quantize(Decimal("0.001"))
-        
-        # Processar entrada com lote
-        lote, movimentacao = StockService.dar_entrada_com_lote(
-            produto=produto,
-            deposito=deposito,
-            quantidade=quantidade_real,
-            codigo_lote=lote_data.get('codigo', f'LOTE-{uuid.uuid4().hex[:8].upper()}'),
-            data_validade=lote_data.get('validade'),
-            data_fabricacao=lote_data.get('fabricacao'),
-            valor_unitario=preco_custo,
-            documento=documento,
-            observacao=f"NFe - {codigo_xml} - Fator: {fator_conversao}x"
+                'qtd_xml': qtd_xml,
+                'preco_custo': preco_custo,
+                # Calcular quantidade real
+                'quantidade_real': (qtd_xml * fator_conversao).quantize(Decimal("0.001")),
+            })
+        
+        # 2. Entrada de estoque agrupada (lotes validados antes de gravar)
+        entradas = []
+        for valido in validos:
+            lote_data = valido['item'].get('lote') or {}
+            entradas.append({
+                'produto': valido['produto'],
+                'quantidade': valido['quantidade_real'],
+                'codigo_lote': lote_data.get('codigo') or f'LOTE-{uuid.uuid4().hex[:8].upper()}',
+                'data_validade': lote_data.get('validade'),
+                'data_fabricacao': lote_data.get('fabricacao'),
+                'valor_unitario': valido['preco_custo'],
+                'observacao': (
+                    f"NFe - {valido['item'].get('codigo_xml')} - "
+                    f"Fator: {valido['fator_conversao']}x"
+                )
+            })
+        
+        estoque = {'itens': {}, 'erros': {}}
+        if entradas:
+            estoque = StockService.dar_entrada_itens(deposito, entradas, documento)
+        
+        for indice, mensagem in estoque['erros'].items():
+            registrar_erro(validos[indice]['idx'], validos[indice]['item'], mensagem)
+        resultado['erros'].sort(key=lambda erro: erro['item_numero'])
+        
+        aceitos = [
+            (valido, estoque['itens'][indice])
+            for indice, valido in enumerate(validos)
+            if indice in estoque['itens']
+        ]
+        if not aceitos:
+            return
+        
+        agora = timezone.now()
+        
+        # 3. Vínculos ProdutoFornecedor
+        vinculos = {
+            vinculo.codigo_no_fornecedor: vinculo
+            for vinculo in ProdutoFornecedor.all_objects.filter(
+                empresa=empresa,
+                cnpj_fornecedor=cnpj_fornecedor,
+                codigo_no_fornecedor__in={valido['item']['codigo_xml'] for valido, _ in aceitos}
+            )
+        }
+        vinculos_novos = {}
+        vinculos_alterados = {}
+        for valido, _ in aceitos:
+            codigo_xml = valido['item']['codigo_xml']
+            vinculo = vinculos.get(codigo_xml)
+            valido['vinculo_criado'] = vinculo is None
+            if vinculo is None:
+                vinculo = ProdutoFornecedor(
+                    empresa=empresa,
+                    cnpj_fornecedor=cnpj_fornecedor,
+                    codigo_no_fornecedor=codigo_xml
+                )
+                vinculos[codigo_xml] = vinculos_novos[codigo_xml] = vinculo
+            elif codigo_xml not in vinculos_novos:
+                vinculos_alterados[codigo_xml] = vinculo
+            
+            vinculo.produto = valido['produto']
+            vinculo.nome_fornecedor = nome_fornecedor
+            vinculo.fator_conversao = valido['fator_conversao']
+            vinculo.ultimo_preco = valido['preco_custo']
+            vinculo.data_ultima_compra = agora
+            vinculo.updated_at = agora
+            vinculo.is_active = True
+        
+        ProdutoFornecedor.all_objects.bulk_create(list(vinculos_novos.values()))
+        ProdutoFornecedor.all_objects.bulk_update(
+            list(vinculos_alterados.values()),
+            ['produto', 'nome_fornecedor', 'fator_conversao', 'ultimo_preco',
+             'data_ultima_compra', 'updated_at', 'is_active']
         )
         
-        return {
-            'produto_id': str(produto.id),
-            'produto_nome': produto.nome,
-            'quantidade_xml': float(qtd_xml),
-            'fator_conversao': float(fator_conversao),
-            'quantidade_real': float(quantidade_real),
-            'lote_id': str(lote.id),
-            'lote_codigo': lote.codigo_lote,
-            'lote_criado': movimentacao.id is not None,
-            'vinculo_criado': criado,
-            'movimentacao_id': str(movimentacao.id)
-        }
+        # 4. Custo dos insumos (última linha vence) e propagação única
+        insumos = {}
+        for valido, _ in aceitos:
+            produto = valido['produto']
+            preco_custo = valido['preco_custo']
+            if produto.tipo == TipoProduto.INSUMO and preco_custo > 0 and preco_custo != produto.preco_custo:
+                produto.preco_custo = preco_custo
+                produto.updated_at = agora
+                insumos[produto.id] = produto
+        
+        if insumos:
+            Produto.all_objects.bulk_update(list(insumos.values()), ['preco_custo', 'updated_at'])
+            CatalogService.propagar_custos(insumo_ids=list(insumos))
+        
+        # 5. Relatório por item
+        for valido, entrada in aceitos:
+            produto = valido['produto']
+            lote = entrada['lote']
+            resultado['itens_processados'].append({
+                'produto_id': str(produto.id),
+                'produto_nome': produto.nome,
+                'quantidade_xml': float(valido['qtd_xml']),
+                'fator_conversao': float(valido['fator_conversao']),
+                'quantidade_real': float(valido['quantidade_real']),
+                'lote_id': str(lote.id),
+                'lote_codigo': lote.codigo_lote,
+                'lote_criado': entrada['lote_criado'],
+                'vinculo_criado': valido['vinculo_criado'],
+                'movimentacao_id': str(entrada['movimentacao'].id)
+            })
+            if valido['vinculo_criado']:
+                resultado['vinculos_criados'] += 1
+            if entrada['lote_criado']:
+                resultado['lotes_criados'] += 1
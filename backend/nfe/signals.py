@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from tenant.models import Empresa
+
+
+@receiver(post_save, sender=Empresa)
+def invalidar_certificado_carregado(sender, instance, update_fields=None, **kwargs):
+    """
+    Descarta o certificado carregado (chave e sessão SEFAZ) da empresa
+    quando o arquivo ou a senha do certificado podem ter mudado.
+    """
+    if update_fields is not None and not {'certificado_digital', 'senha_certificado'} & set(update_fields):
+        return
+    from nfe.certificados import registro_certificados
+    registro_certificados.invalidar(instance.pk)
+
+
+@receiver(post_delete, sender=Empresa)
+def descartar_certificado_carregado(sender, instance, **kwargs):
+    from nfe.certificados import registro_certificados
+    registro_certificados.invalidar(instance.pk)
@@ -2,12 +2,53 @@
 Signer para assinatura de NFe utilizando certificado A1 (PKCS#12).
 """
 import base64
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from lxml import etree
 from signxml import XMLSigner, methods
 from cryptography.hazmat.primitives.serialization import pkcs12
 from cryptography.hazmat.primitives import hashes
 from django.core.exceptions import ValidationError
 
+class _XMLSignerSHA1(XMLSigner):
+    """
+    XMLSigner que aceita RSA-SHA1.
+    
+    O leiaute 4.00 da NF-e exige SHA1, que o signxml recusa por padrão.
+    """
+    
+    def check_deprecated_methods(self):
+        pass
+
+
+# Assinador do processo worker de assinar_lote (carregado uma vez por processo)
+_assinador = None
+
+
+def _inicializar_assinador(certificado_pfx_bytes, senha):
+    """Initializer do pool: decodifica o PFX uma única vez por processo."""
+    global _assinador
+    _assinador = NFeSigner(certificado_pfx_bytes, senha)
+
+
+def _assinar_xml(xml_content, assinador=None):
+    """
+    Worker do pool de assinar_lote (precisa ser função de módulo).
+    
+    Args:
+        xml_content: XML da NFe
+        assinador: NFeSigner a usar (padrão: o carregado pelo initializer)
+    
+    Returns:
+        Dict {'xml': XML assinado ou None, 'erro': mensagem ou None}
+    """
+    try:
+        return {'xml': (assinador or _assinador).sign_nfe(xml_content), 'erro': None}
+    except Exception as e:
+        return {'xml': None, 'erro': str(e)}
+
+
 class NFeSigner:
     """
     Assinador de XMLs de NFe padrão ICP-Brasil.
@@ -84,7 +125,7 @@ class NFeSigner:
         # - Digest Method: SHA1
         # - Signature Method: RSA-SHA1
         
-        signer = XMLSigner(
+        signer = _XMLSignerSHA1(
             method=methods.enveloped,
             signature_algorithm="rsa-sha1",
             digest_algorithm="sha1",
@@ -95,7 +136,7 @@ class NFeSigner:
         signed_root = signer.sign(
             root,
             key=self.private_key,
-            cert=self.certificate,
+            cert=[self.certificate],
             reference_uri=f"#{uri_id}"
         )
         
@@ -103,3 +144,41 @@ class NFeSigner:
         # O signxml já gera válido, mas às vezes precisamos limpar namespaces extras
         
         return etree.tostring(signed_root, encoding='UTF-8', xml_declaration=True).decode('utf-8')
+
+    @staticmethod
+    def assinar_lote(xmls, certificado_pfx_bytes, senha, processos=None, assinador=None):
+        """
+        Assina vários XMLs de NFe em paralelo.
+        
+        A assinatura RSA é CPU-bound: cada processo do pool carrega a chave
+        uma vez (initializer) e assina a sua parte dos XMLs.
+        
+        Args:
+            xmls: Lista de XMLs de NFe
+            certificado_pfx_bytes: Conteúdo do arquivo .pfx em bytes
+            senha: Senha do certificado
+            processos: Tamanho do pool (padrão: núcleos da máquina; 1 = sem pool)
+            assinador: NFeSigner já carregado com o mesmo certificado (evita
+                decodificar o PFX de novo no processo principal)
+            
+        Returns:
+            list: [{'xml', 'erro'}] na mesma ordem de `xmls`
+            
+        Raises:
+            ValidationError: Se o certificado não puder ser carregado
+        """
+        # Valida o certificado no processo principal (erro claro em vez de
+        # pool quebrado) e o reaproveita quando não há paralelismo
+        assinador = assinador or NFeSigner(certificado_pfx_bytes, senha)
+        
+        processos = processos or os.cpu_count() or 1
+        if processos == 1 or len(xmls) <= 1:
+            return [_assinar_xml(xml, assinador) for xml in xmls]
+        
+        chunksize = max(1, len(xmls) // (processos * 4))
+        with ProcessPoolExecutor(
+            max_workers=processos,
+            initializer=_inicializar_assinador,
+            initargs=(certificado_pfx_bytes, senha)
+        ) as pool:
+            return list(pool.map(_assinar_xml, xmls, chunksize=chunksize))
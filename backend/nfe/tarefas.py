@@ -0,0 +1,32 @@
+"""
+Tarefas em segundo plano do app NFe (ver jobs.services.tarefa).
+"""
+from django.core.exceptions import ValidationError
+
+from jobs.services import tarefa, ErroDefinitivo
+
+
+@tarefa('nfe.emitir_lote')
+def emitir_lote(empresa, nota_ids, processos=None):
+    """Gera, assina, transmite e consulta os recibos (NFeService.emitir_lote)."""
+    from nfe.services import NFeService
+    
+    try:
+        return NFeService.emitir_lote(empresa, nota_ids, processos=processos)
+    except ValidationError as e:
+        raise ErroDefinitivo('; '.join(e.messages))
+
+
+@tarefa('nfe.efetivar_importacao')
+def efetivar_importacao(empresa, payload, usuario):
+    """Efetiva a importação de uma NFe de entrada (NFeService.efetivar_importacao_nfe)."""
+    from nfe.serializers import ConfirmarImportacaoNFeSerializer
+    from nfe.services import NFeService
+    
+    serializer = ConfirmarImportacaoNFeSerializer(data=payload)
+    if not serializer.is_valid():
+        raise ErroDefinitivo(f"Dados inválidos: {serializer.errors}")
+    try:
+        return NFeService.efetivar_importacao_nfe(empresa, serializer.validated_data, usuario)
+    except ValidationError as e:
+        raise ErroDefinitivo('; '.join(e.messages))
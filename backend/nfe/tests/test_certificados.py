@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from tenant.models import Empresa
+from nfe.certificados import RegistroCertificados, registro_certificados
+from nfe.tests.test_emissao_lote import gerar_pfx
+
+
+class RegistroCertificadosTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.pfx = gerar_pfx('1234')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.settings_media = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_media.enable()
+        self.addCleanup(self.settings_media.disable)
+        registro_certificados.limpar()
+        self.addCleanup(registro_certificados.limpar)
+
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Cert',
+            razao_social='Empresa Cert LTDA',
+            cnpj='11222333000181',
+            email='cert@empresa.test',
+            senha_certificado='1234',
+        )
+        self.empresa.certificado_digital.save('cert.pfx', ContentFile(self.pfx))
+
+    def test_reaproveita_certificado_e_sessao(self):
+        primeira = registro_certificados.obter(self.empresa)
+        segunda = registro_certificados.obter(Empresa.objects.get(pk=self.empresa.pk))
+
+        self.assertIs(primeira, segunda)
+        self.assertIsNotNone(primeira.assinador.private_key)
+        estatisticas = registro_certificados.estatisticas()
+        self.assertEqual((estatisticas['acertos'], estatisticas['falhas']), (1, 1))
+
+    def test_troca_de_senha_invalida_entrada(self):
+        primeira = registro_certificados.obter(self.empresa)
+
+        self.empresa.certificado_digital.save('cert.pfx', ContentFile(gerar_pfx('nova')), save=False)
+        self.empresa.senha_certificado = 'nova'
+        self.empresa.save()
+
+        segunda = registro_certificados.obter(self.empresa)
+        self.assertIsNot(primeira, segunda)
+        self.assertEqual(registro_certificados.estatisticas()['invalidacoes'], 1)
+
+    def test_alteracao_em_outro_processo_detectada_pela_impressao(self):
+        registro = RegistroCertificados()
+        primeira = registro.obter(self.empresa)
+
+        # Sem signal: outra instância da empresa com outra senha
+        outra = Empresa.objects.get(pk=self.empresa.pk)
+        outra.senha_certificado = 'errada'
+        with self.assertRaises(Exception):
+            registro.obter(outra)
+        self.assertEqual(registro.invalidacoes, 1)
+        self.assertIsNot(registro.obter(self.empresa), primeira)
+
+    def test_expira_entrada_ociosa(self):
+        registro = RegistroCertificados(ttl=60)
+        with mock.patch('nfe.certificados.time.monotonic', return_value=1000):
+            primeira = registro.obter(self.empresa)
+        with mock.patch('nfe.certificados.time.monotonic', return_value=1061):
+            segunda = registro.obter(self.empresa)
+
+        self.assertIsNot(primeira, segunda)
+        self.assertEqual((registro.expiradas, registro.falhas, registro.acertos), (1, 2, 0))
+
+    def test_estatisticas_restritas_a_equipe(self):
+        from rest_framework.test import APIClient
+        from authentication.models import CustomUser
+
+        usuario = CustomUser.objects.create_user(
+            username='operador', email='operador@empresa.test', password='123456',
+            empresa=self.empresa,
+        )
+        client = APIClient()
+        client.force_authenticate(usuario)
+        url = '/api/v1/nfe/emissao/certificados-estatisticas/'
+        self.assertEqual(client.get(url).status_code, 403)
+
+        usuario.is_staff = True
+        usuario.save()
+        resposta = client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('acertos', resposta.json())
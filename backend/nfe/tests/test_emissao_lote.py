@@ -0,0 +1,279 @@
+import datetime
+import re
+import shutil
+import tempfile
+import threading
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import NameOID
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from tenant.models import Empresa
+from catalog.models import Categoria, Produto
+from partners.models import Cliente, TipoPessoa
+from locations.models import Endereco, TipoEndereco, UF
+from nfe.models import NotaFiscal, ItemNotaFiscal, StatusNFe
+from nfe.services import NFeService
+from nfe.transport.sefaz_client import SefazClient
+
+
+def gerar_pfx(senha):
+    """Certificado A1 autoassinado para os testes."""
+    chave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    nome = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'EMPRESA TESTE:11222333000181')])
+    agora = datetime.datetime.now(datetime.timezone.utc)
+    certificado = (
+        x509.CertificateBuilder()
+        .subject_name(nome)
+        .issuer_name(nome)
+        .public_key(chave.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(agora)
+        .not_valid_after(agora + datetime.timedelta(days=1))
+        .sign(chave, hashes.SHA256())
+    )
+    return pkcs12.serialize_key_and_certificates(
+        b'teste', chave, certificado, None,
+        serialization.BestAvailableEncryption(senha.encode())
+    )
+
+
+class FakeSefaz(BaseHTTPRequestHandler):
+    """
+    SEFAZ local: aceita lotes (cStat 103) e autoriza todas as notas na
+    segunda consulta do recibo (a primeira responde 105, em processamento).
+    Lotes síncronos (indSinc=1) são autorizados na própria resposta (104).
+    """
+
+    lotes = {}
+    consultas = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8')
+        if 'enviNFe' in corpo and '<indSinc>1</indSinc>' in corpo:
+            chave = re.search(r'Id="NFe(\d{44})"', corpo).group(1)
+            retorno = (
+                '<retEnviNFe xmlns="http://www.portalfiscal.inf.br/nfe" versao="4.00">'
+                '<cStat>104</cStat><xMotivo>Lote processado</xMotivo>'
+                f'<protNFe versao="4.00"><infProt><chNFe>{chave}</chNFe>'
+                '<nProt>135000000099999</nProt><cStat>100</cStat>'
+                '<xMotivo>Autorizado o uso da NF-e</xMotivo></infProt></protNFe></retEnviNFe>'
+            )
+        elif 'enviNFe' in corpo:
+            recibo = f'{len(self.lotes) + 1:015d}'
+            self.lotes[recibo] = re.findall(r'Id="NFe(\d{44})"', corpo)
+            retorno = (
+                '<retEnviNFe xmlns="http://www.portalfiscal.inf.br/nfe" versao="4.00">'
+                '<cStat>103</cStat><xMotivo>Lote recebido com sucesso</xMotivo>'
+                f'<infRec><nRec>{recibo}</nRec><tMed>1</tMed></infRec></retEnviNFe>'
+            )
+        else:
+            recibo = re.search(r'<nRec>(\d+)</nRec>', corpo).group(1)
+            self.consultas[recibo] = self.consultas.get(recibo, 0) + 1
+            if self.consultas[recibo] == 1:
+                retorno = (
+                    '<retConsReciNFe xmlns="http://www.portalfiscal.inf.br/nfe" versao="4.00">'
+                    '<cStat>105</cStat><xMotivo>Lote em processamento</xMotivo></retConsReciNFe>'
+                )
+            else:
+                protocolos = ''.join(
+                    '<protNFe versao="4.00"><infProt>'
+                    f'<chNFe>{chave}</chNFe><dhRecbto>2026-01-01T10:00:00-03:00</dhRecbto>'
+                    f'<nProt>1350000000{i:05d}</nProt><cStat>100</cStat>'
+                    '<xMotivo>Autorizado o uso da NF-e</xMotivo></infProt></protNFe>'
+                    for i, chave in enumerate(self.lotes[recibo], start=1)
+                )
+                retorno = (
+                    '<retConsReciNFe xmlns="http://www.portalfiscal.inf.br/nfe" versao="4.00">'
+                    f'<cStat>104</cStat><xMotivo>Lote processado</xMotivo>{protocolos}</retConsReciNFe>'
+                )
+        resposta = (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope">'
+            f'<soap:Body><nfeResultMsg>{retorno}</nfeResultMsg></soap:Body></soap:Envelope>'
+        ).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/soap+xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(resposta)))
+        self.end_headers()
+        self.wfile.write(resposta)
+
+
+class EmissaoLoteNFeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.pfx = gerar_pfx('1234')
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), FakeSefaz)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.servidor.server_address[1]}/ws'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        FakeSefaz.lotes.clear()
+        FakeSefaz.consultas.clear()
+        self.settings_media = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_media.enable()
+        self.addCleanup(self.settings_media.disable)
+
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Lote',
+            razao_social='Empresa Lote LTDA',
+            cnpj='11222333000181',
+            email='lote@empresa.test',
+            inscricao_estadual='123456789',
+            senha_certificado='1234',
+        )
+        self.empresa.certificado_digital.save('cert.pfx', ContentFile(self.pfx))
+        self.cliente = Cliente.objects.create(
+            empresa=self.empresa,
+            nome='Cliente Lote',
+            cpf_cnpj='71067578021',
+            tipo_pessoa=TipoPessoa.FISICA,
+        )
+        Endereco.objects.create(
+            empresa=self.empresa,
+            content_object=self.cliente,
+            tipo=TipoEndereco.FISICO,
+            cep='01001-000',
+            logradouro='Praça da Sé',
+            numero='100',
+            bairro='Sé',
+            cidade='São Paulo',
+            uf=UF.SP,
+            codigo_municipio_ibge='3550308',
+        )
+        categoria = Categoria.objects.create(empresa=self.empresa, nome='Cat Lote')
+        self.produto = Produto.objects.create(
+            empresa=self.empresa,
+            nome='Produto Lote',
+            categoria=categoria,
+            preco_venda=Decimal('10.00'),
+            ncm='21069090',
+        )
+        self.notas = [self._criar_nota(numero) for numero in range(1, 6)]
+
+    def _criar_nota(self, numero):
+        nota = NotaFiscal.objects.create(
+            empresa=self.empresa,
+            cliente=self.cliente,
+            numero=numero,
+            serie=1,
+            modelo='65',
+            valor_total_produtos=Decimal('10.00'),
+            valor_total_nota=Decimal('10.00'),
+        )
+        ItemNotaFiscal.objects.create(
+            empresa=self.empresa,
+            nota=nota,
+            produto=self.produto,
+            numero_item=1,
+            codigo_produto='P1',
+            descricao_produto='Produto Lote',
+            ncm='21069090',
+            cfop='5102',
+            unidade_comercial='UN',
+            quantidade=Decimal('1'),
+            valor_unitario=Decimal('10.00'),
+            valor_total=Decimal('10.00'),
+            csosn='102',
+        )
+        return nota
+
+    def test_emitir_lote_agrupa_assina_e_autoriza(self):
+        with mock.patch.object(SefazClient, '_get_url', return_value=self.url), \
+                mock.patch('nfe.services.MAX_NFE_POR_LOTE', 2):
+            resultado = NFeService.emitir_lote(
+                self.empresa, [nota.id for nota in self.notas],
+                processos=1, intervalo_consulta=0
+            )
+
+        self.assertEqual(resultado['erros'], [])
+        self.assertEqual([lote['notas'] for lote in resultado['lotes']], [2, 2, 1])
+        self.assertEqual([lote['id_lote'] for lote in resultado['lotes']], [1, 2, 3])
+        self.assertEqual(resultado['status'], {StatusNFe.AUTORIZADA: 5})
+        self.assertEqual(set(FakeSefaz.consultas.values()), {2})
+
+        for nota in NotaFiscal.objects.filter(empresa=self.empresa):
+            self.assertEqual(len(nota.chave_acesso), 44)
+            self.assertIn('Signature', nota.xml_envio)
+            self.assertTrue(nota.recibo)
+            self.assertTrue(nota.protocolo_autorizacao.startswith('1350000000'))
+
+    def test_emitir_lote_sem_aguardar_deixa_notas_transmitidas(self):
+        with mock.patch.object(SefazClient, '_get_url', return_value=self.url):
+            resultado = NFeService.emitir_lote(
+                self.empresa, [nota.id for nota in self.notas],
+                processos=1, aguardar_recibos=False
+            )
+            self.assertEqual(len(resultado['lotes']), 1)
+            self.assertEqual(resultado['status'], {StatusNFe.TRANSMITIDA: 5})
+
+            # Consulta posterior do recibo finaliza o lote inteiro
+            recibo = resultado['lotes'][0]['recibo']
+            NFeService.consultar_recibo(recibo, self.empresa)
+            retorno = NFeService.consultar_recibo(recibo, self.empresa)
+
+        self.assertEqual(len(retorno['protocolos']), 5)
+        self.assertEqual(
+            NotaFiscal.objects.filter(empresa=self.empresa, status=StatusNFe.AUTORIZADA).count(), 5
+        )
+
+    def test_transmitir_nfe_sincrono_sem_consultar_recibo(self):
+        nota = self.notas[0]
+        with mock.patch.object(SefazClient, '_get_url', return_value=self.url):
+            resultado = NFeService.transmitir_nfe(nota.id, self.empresa)
+
+        self.assertEqual(resultado['status'], {StatusNFe.AUTORIZADA: 1})
+        self.assertEqual(FakeSefaz.lotes, {})
+        self.assertEqual(FakeSefaz.consultas, {})
+        nota.refresh_from_db()
+        self.assertEqual(nota.protocolo_autorizacao, '135000000099999')
+
+    def test_nota_reservada_nao_entra_em_outra_emissao(self):
+        reservadas = NFeService._reservar_notas(self.empresa, [self.notas[0].id])
+        self.assertEqual(list(reservadas.values()), [StatusNFe.DIGITACAO])
+
+        with mock.patch.object(SefazClient, '_get_url', return_value=self.url):
+            resultado = NFeService.emitir_lote(
+                self.empresa, [nota.id for nota in self.notas],
+                processos=1, aguardar_recibos=False
+            )
+            with self.assertRaises(ValidationError):
+                NFeService.transmitir_nfe(self.notas[0].id, self.empresa)
+
+        self.assertEqual(resultado['lotes'][0]['notas'], 4)
+        self.assertEqual(
+            NotaFiscal.objects.get(id=self.notas[0].id).status, StatusNFe.EMISSAO
+        )
+
+    def test_falha_apos_reserva_devolve_status_anterior(self):
+        ids = [nota.id for nota in self.notas]
+        with mock.patch('nfe.services.registro_certificados.obter', side_effect=ValueError('PFX ilegível')):
+            with self.assertRaises(ValueError):
+                NFeService.emitir_lote(self.empresa, ids, processos=1, aguardar_recibos=False)
+
+        self.assertEqual(
+            set(NotaFiscal.objects.filter(id__in=ids).values_list('status', flat=True)),
+            {StatusNFe.DIGITACAO}
+        )
+        # Nova tentativa reserva as mesmas notas
+        self.assertEqual(len(NFeService._reservar_notas(self.empresa, ids)), len(ids))
@@ -1,8 +1,25 @@
 from pathlib import Path
 from decimal import Decimal
+import tempfile
 import unittest
+import zipfile
 
-from nfe.parsers.nfe_parser import NFeParser
+from nfe.parsers.nfe_parser import NFeParser, NFeParseError
+
+
+def _xml_com_itens(n, namespace=True):
+    dets = ''.join(
+        f'<det nItem="{i}"><prod><cProd>P{i}</cProd><cEAN>SEM GTIN</cEAN>'
+        f'<xProd>Item {i}</xProd><uCom>UN</uCom><qCom>{i}</qCom><vUnCom>1,50</vUnCom>'
+        f'<rastro><nLote>L{i}</nLote><dVal>2030-01-01</dVal></rastro></prod></det>'
+        for i in range(1, n + 1)
+    )
+    xmlns = ' xmlns="http://www.portalfiscal.inf.br/nfe"' if namespace else ''
+    return (
+        f'<nfeProc{xmlns}><NFe><infNFe><ide><nNF>99</nNF><serie>2</serie></ide>'
+        f'<emit><CNPJ>12.345.678/0001-99</CNPJ><xNome>Distribuidora</xNome></emit>'
+        f'{dets}</infNFe></NFe></nfeProc>'
+    ).encode()
 
 
 class TestNFeParser(unittest.TestCase):
@@ -45,6 +62,39 @@ class TestNFeParser(unittest.TestCase):
         self.assertEqual(item["lote"]["validade"], "2026-12-31")
 
 
+class TestNFeParserStream(unittest.TestCase):
+    def test_parse_stream_gera_itens_sob_demanda(self):
+        dados = NFeParser.parse_stream(_xml_com_itens(990))
+        self.assertEqual(dados["fornecedor"]["cnpj"], "12345678000199")
+        self.assertEqual(dados["identificacao"]["serie_nfe"], "2")
+        primeiro = next(dados["itens"])
+        self.assertEqual(primeiro["codigo_xml"], "P1")
+        self.assertEqual(primeiro["preco_xml"], Decimal("1.50"))
+        self.assertEqual(primeiro["lote"]["codigo"], "L1")
+        self.assertEqual(sum(1 for _ in dados["itens"]), 989)
+
+    def test_xml_sem_namespace(self):
+        dados = NFeParser.parse_file(_xml_com_itens(3, namespace=False))
+        self.assertEqual([i["codigo_xml"] for i in dados["itens"]], ["P1", "P2", "P3"])
+
+    def test_parse_lote_zip_em_paralelo(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            caminho = Path(tmp) / "notas.zip"
+            with zipfile.ZipFile(caminho, "w") as zf:
+                zf.writestr("a.xml", _xml_com_itens(5))
+                zf.writestr("b.xml", b"<nfeProc><quebrado>")
+                zf.writestr("leiame.txt", "ignorado")
+            resultados = list(NFeParser.parse_lote(caminho, processos=2))
+        self.assertEqual([r["arquivo"] for r in resultados], ["a.xml", "b.xml"])
+        self.assertEqual(len(resultados[0]["dados"]["itens"]), 5)
+        self.assertIsNone(resultados[1]["dados"])
+        self.assertIn("XML inválido", resultados[1]["erro"])
+
+    def test_origem_invalida(self):
+        with self.assertRaises(NFeParseError):
+            list(NFeParser.parse_lote(__file__))
+
+
 if __name__ == "__main__":
     unittest.main()
 
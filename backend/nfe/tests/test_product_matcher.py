@@ -0,0 +1,54 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+from tenant.models import Empresa
+from catalog.models import Categoria, Produto
+from nfe.matching.product_matcher import ProductMatcher
+
+class ProductMatcherTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Match',
+            razao_social='Empresa Match LTDA',
+            cnpj='11222333000181',
+            email='match@empresa.test',
+        )
+        categoria = Categoria.objects.create(empresa=self.empresa, nome='Cat Match')
+        for i in range(250):
+            Produto.objects.create(
+                empresa=self.empresa, nome=f'Produto Genérico {i:03d}',
+                codigo_barras=f'100{i:04d}', categoria=categoria,
+                preco_venda=Decimal('1.00'),
+            )
+        # Cadastrado depois dos 200 primeiros: antes nunca era avaliado
+        self.coca = Produto.objects.create(
+            empresa=self.empresa, nome='Coca-Cola Lata 350ml',
+            codigo_barras='7894900011517', categoria=categoria,
+            preco_venda=Decimal('5.00'),
+        )
+
+    def _itens(self, n):
+        itens = [{'codigo_xml': '1', 'ean': '7894900011517', 'descricao_xml': 'REFRIG COCA'}]
+        itens += [
+            {'codigo_xml': str(i), 'ean': 'SEM GTIN', 'descricao_xml': 'LATA COCA COLA 350ML'}
+            for i in range(n)
+        ]
+        return itens
+
+    def test_fuzzy_cobre_catalogo_inteiro(self):
+        sugestoes = ProductMatcher.find_matches(
+            self.empresa, '99', None, 'COCA COLA LATA 350 ML'
+        )
+        self.assertEqual(sugestoes[0]['produto_id'], str(self.coca.id))
+        self.assertEqual(sugestoes[0]['estrategia'], 'fuzzy')
+
+    def test_lote_com_queries_constantes(self):
+        ProductMatcher.find_matches_batch(self.empresa, self._itens(1))
+        with CaptureQueriesContext(connection) as poucos:
+            ProductMatcher.find_matches_batch(self.empresa, self._itens(1))
+        with CaptureQueriesContext(connection) as muitos:
+            resultado = ProductMatcher.find_matches_batch(self.empresa, self._itens(30))
+        self.assertEqual(len(poucos), len(muitos))
+        self.assertEqual(resultado[0][0]['estrategia'], 'ean')
+        self.assertEqual(resultado[-1][0]['produto_id'], str(self.coca.id))
@@ -90,3 +90,57 @@ class NFeServiceImportacaoTests(TestCase):
             codigo_lote='LOTE-NFE-1',
         )
         self.assertEqual(str(lote.data_validade), payload['itens'][0]['lote']['validade'])
+
+    def _payload(self, numero, n, **extra):
+        validade = str(date.today().replace(year=date.today().year + 1))
+        itens = [
+            {
+                'codigo_xml': f'COD-{i % 3}',
+                'produto_id': str(self.produto.id),
+                'fator_conversao': 1,
+                'qtd_xml': 2,
+                'preco_custo': 5 + i,
+                'lote': {'codigo': f'LOTE-{numero}-{i % 2}', 'validade': validade},
+            }
+            for i in range(n)
+        ]
+        return {
+            'deposito_id': str(self.deposito.id),
+            'numero_nfe': numero,
+            'fornecedor': {'cnpj': '73621701000129', 'nome': 'Fornecedor XYZ'},
+            'itens': itens,
+            'financeiro': {'gerar_conta': False},
+            **extra,
+        }
+
+    def test_importacao_em_lote_com_queries_constantes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from stock.models import Saldo
+
+        with CaptureQueriesContext(connection) as poucos:
+            NFeService.efetivar_importacao_nfe(self.empresa, self._payload('1', 3), 'nfe')
+        with CaptureQueriesContext(connection) as muitos:
+            resultado = NFeService.efetivar_importacao_nfe(self.empresa, self._payload('2', 30), 'nfe')
+
+        self.assertEqual(len(poucos), len(muitos))
+        self.assertEqual(len(resultado['itens_processados']), 30)
+        self.assertEqual(resultado['lotes_criados'], 2)
+        self.assertEqual(
+            Saldo.objects.get(produto=self.produto, deposito=self.deposito).quantidade,
+            Decimal('66.000')
+        )
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.preco_custo, Decimal('34.00'))
+
+    def test_itens_invalidos_reportados_sem_interromper(self):
+        payload = self._payload('3', 2)
+        payload['itens'].append({'codigo_xml': 'X', 'produto_id': 'nao-uuid', 'qtd_xml': 1})
+        payload['itens'].append({
+            'codigo_xml': 'Y', 'produto_id': str(self.produto.id), 'qtd_xml': 1,
+            'lote': {'codigo': 'LOTE-3-0', 'validade': '2099-01-01'},
+        })
+        resultado = NFeService.efetivar_importacao_nfe(self.empresa, payload, 'nfe')
+        self.assertEqual(len(resultado['itens_processados']), 2)
+        self.assertEqual([e['item_numero'] for e in resultado['erros']], [3, 4])
+        self.assertIn('validade diferente', resultado['erros'][1]['erro'])
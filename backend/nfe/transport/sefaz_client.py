@@ -1,16 +1,32 @@
 """
 Cliente SOAP para comunicação com a SEFAZ.
 """
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from requests_pkcs12 import Pkcs12Adapter
 from lxml import etree
 from django.core.exceptions import ValidationError
 from tenant.models import AmbienteNFe
 
+NS_NFE = '{http://www.portalfiscal.inf.br/nfe}'
+
+# Máximo de NF-e por lote enviNFe (limite do leiaute 4.00)
+MAX_NFE_POR_LOTE = 50
+
+# cStat do retorno de autorização/consulta de recibo
+CSTAT_LOTE_RECEBIDO = '103'
+CSTAT_LOTE_PROCESSADO = '104'
+CSTAT_LOTE_EM_PROCESSAMENTO = '105'
+
+
 class SefazClient:
     """
     Cliente para consumo dos Web Services da SEFAZ.
     Suporta NFe 4.00.
+    
+    A sessão HTTPS (com o certificado) é compartilhada por todos os
+    clientes da mesma empresa no processo (ver nfe.certificados).
     """
     
     # URLs dos Web Services (Exemplo SP)
@@ -36,8 +52,9 @@ class SefazClient:
             empresa: Instância do model Empresa com certificado configurado.
         """
         self.empresa = empresa
-        self.uf = empresa.uf or 'SP'
-        self.ambiente = empresa.ambiente_nfe
+        perfil = empresa.perfil_fiscal
+        self.uf = perfil.uf or 'SP'
+        self.ambiente = perfil.ambiente_nfe
         
         if not self.empresa.certificado_digital:
             raise ValidationError("Empresa sem certificado digital configurado.")
@@ -45,31 +62,18 @@ class SefazClient:
         self.session = self._create_session()
         
     def _create_session(self):
-        """Cria sessão requests configurada com certificado PFX."""
-        session = requests.Session()
-        
-        # Carregar bytes do certificado
-        try:
-            with self.empresa.certificado_digital.open('rb') as f:
-                pfx_bytes = f.read()
-        except Exception as e:
-            raise ValidationError(f"Erro ao ler certificado: {e}")
-            
-        # Configurar adaptador PKCS12
-        # requests-pkcs12 permite passar o conteúdo do PFX e a senha
-        adapter = Pkcs12Adapter(
-            pkcs12_data=pfx_bytes,
-            pkcs12_password=self.empresa.senha_certificado
-        )
-        
-        # Montar adaptador para https
-        session.mount('https://', adapter)
+        """
+        Sessão requests com o certificado PFX da empresa.
         
-        return session
+        Vem do registro de certificados do processo: o PFX é decodificado e
+        a conexão TLS aberta uma vez, e reaproveitados entre clientes.
+        """
+        from nfe.certificados import registro_certificados
+        return registro_certificados.obter(self.empresa).session
         
     def autorizar_nfe(self, xml_assinado, id_lote='1'):
         """
-        Envia lote de NFe para autorização (Síncrono ou Assíncrono).
+        Envia uma única NFe para autorização síncrona.
         Para NFe 4.00, o método padrão é NfeAutorizacao.
         
         Args:
@@ -79,17 +83,39 @@ class SefazClient:
         Returns:
             Dict com resposta (status, motivo, recibo, etc)
         """
+        return self.autorizar_lote([xml_assinado], id_lote=id_lote, sincrono=True)
+    
+    def autorizar_lote(self, xmls_assinados, id_lote, sincrono=False):
+        """
+        Envia um lote enviNFe com até MAX_NFE_POR_LOTE notas.
+        
+        No modo assíncrono (padrão) a SEFAZ responde com o recibo (cStat 103)
+        e o resultado de cada nota deve ser obtido com consultar_recibo.
+        
+        Args:
+            xmls_assinados: Lista de XMLs de NFe assinados
+            id_lote: Identificador do lote (sequencial por empresa)
+            sincrono: indSinc=1 (só aceito pela SEFAZ com uma nota por lote)
+            
+        Returns:
+            Dict com cStat, xMotivo, recibo (assíncrono) ou protocolo (síncrono)
+        """
+        if not xmls_assinados:
+            raise ValidationError("Lote de NFe vazio.")
+        if len(xmls_assinados) > MAX_NFE_POR_LOTE:
+            raise ValidationError(f"Lote de NFe excede o limite de {MAX_NFE_POR_LOTE} notas.")
+        
         url = self._get_url('NfeAutorizacao')
         
         # Montar Envelope SOAP
-        xml_content = xml_assinado.replace("<?xml version='1.0' encoding='UTF-8'?>", "")
+        xml_content = ''.join(self._remover_declaracao(xml) for xml in xmls_assinados)
         envelope = self._build_soap_envelope(
             method='nfeAutorizacaoLote',
             content=f"""
             <nfeDadosMsg xmlns="http://www.portalfiscal.inf.br/nfe/wsdl/NFeAutorizacao4">
                 <enviNFe xmlns="http://www.portalfiscal.inf.br/nfe" versao="4.00">
                     <idLote>{id_lote}</idLote>
-                    <indSinc>1</indSinc>
+                    <indSinc>{1 if sincrono else 0}</indSinc>
                     {xml_content}
                 </enviNFe>
             </nfeDadosMsg>
@@ -134,6 +160,42 @@ class SefazClient:
         # Parse resposta (similar ao retorno de autorização, mas structure retConsReciNFe)
         return self._parse_retorno_recibo(response)
 
+    def consultar_recibos(self, recibos, intervalo=2.0, tentativas=10, max_workers=4):
+        """
+        Consulta vários recibos em paralelo até saírem de processamento.
+        
+        Cada recibo é consultado em uma thread, pela mesma sessão; enquanto
+        a SEFAZ responder cStat 105 (lote em processamento) a consulta é
+        repetida após `intervalo` segundos, até `tentativas` vezes.
+        
+        Args:
+            recibos: Números de recibo retornados por autorizar_lote
+            intervalo: Espera entre consultas do mesmo recibo (segundos)
+            tentativas: Máximo de consultas por recibo
+            max_workers: Consultas simultâneas
+            
+        Returns:
+            Dict {recibo: retorno de consultar_recibo ou {'erro': mensagem}}
+        """
+        recibos = list(recibos)
+        if not recibos:
+            return {}
+        
+        def aguardar(recibo):
+            try:
+                for tentativa in range(tentativas):
+                    if tentativa:
+                        time.sleep(intervalo)
+                    retorno = self.consultar_recibo(recibo)
+                    if retorno['cStat'] != CSTAT_LOTE_EM_PROCESSAMENTO:
+                        break
+                return retorno
+            except ValidationError as e:
+                return {'erro': '; '.join(e.messages)}
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(recibos))) as pool:
+            return dict(zip(recibos, pool.map(aguardar, recibos)))
+
     def _parse_retorno_recibo(self, xml_response):
         """Parse do retorno da consulta de recibo."""
         root = etree.fromstring(xml_response)
@@ -157,22 +219,38 @@ class SefazClient:
             'xml_raw': etree.tostring(ret_cons, encoding='unicode')
         }
         
-        # Extrair protocolos
-        prot_nfe = ret_cons.find('.//{http://www.portalfiscal.inf.br/nfe}protNFe')
-        if prot_nfe is not None:
-            inf_prot = prot_nfe.find('.//{http://www.portalfiscal.inf.br/nfe}infProt')
-            if inf_prot is not None:
-                resultado['protocolo'] = {
-                    'nProt': inf_prot.findtext('.//{http://www.portalfiscal.inf.br/nfe}nProt'),
-                    'cStat': inf_prot.findtext('.//{http://www.portalfiscal.inf.br/nfe}cStat'),
-                    'xMotivo': inf_prot.findtext('.//{http://www.portalfiscal.inf.br/nfe}xMotivo'),
-                    'dhRecbto': inf_prot.findtext('.//{http://www.portalfiscal.inf.br/nfe}dhRecbto'),
-                    'chNFe': inf_prot.findtext('.//{http://www.portalfiscal.inf.br/nfe}chNFe'),
-                    'xml_prot': etree.tostring(prot_nfe, encoding='unicode')
-                }
+        # Extrair protocolos (um protNFe por nota do lote)
+        resultado['protocolos'] = [
+            self._parse_prot_nfe(prot_nfe)
+            for prot_nfe in ret_cons.iter(f'{NS_NFE}protNFe')
+        ]
+        if resultado['protocolos']:
+            resultado['protocolo'] = resultado['protocolos'][0]
                 
         return resultado
 
+    def _parse_prot_nfe(self, prot_nfe):
+        """Extrai os dados de um protNFe (infProt)."""
+        inf_prot = prot_nfe.find(f'.//{NS_NFE}infProt')
+        if inf_prot is None:
+            inf_prot = prot_nfe
+        return {
+            'nProt': inf_prot.findtext(f'.//{NS_NFE}nProt'),
+            'cStat': inf_prot.findtext(f'.//{NS_NFE}cStat'),
+            'xMotivo': inf_prot.findtext(f'.//{NS_NFE}xMotivo'),
+            'dhRecbto': inf_prot.findtext(f'.//{NS_NFE}dhRecbto'),
+            'chNFe': inf_prot.findtext(f'.//{NS_NFE}chNFe'),
+            'xml_prot': etree.tostring(prot_nfe, encoding='unicode')
+        }
+
+    @staticmethod
+    def _remover_declaracao(xml):
+        """Remove a declaração <?xml ...?> para embutir a NFe no enviNFe."""
+        xml = xml.strip()
+        if xml.startswith('<?xml'):
+            xml = xml[xml.index('?>') + 2:]
+        return xml
+
     def _get_url(self, servico):
         """Retorna URL do serviço para UF e Ambiente configurados."""
         urls_uf = self.URLS.get(self.uf, self.URLS['SP']) # Fallback SP
@@ -234,17 +312,14 @@ class SefazClient:
             'xml_raw': etree.tostring(ret_envi, encoding='unicode')
         }
         
+        # Assíncrono: recibo para consulta posterior
+        inf_rec = ret_envi.find(f'{NS_NFE}infRec')
+        if inf_rec is not None:
+            resultado['recibo'] = inf_rec.findtext(f'{NS_NFE}nRec')
+        
         # Se síncrono, pode vir protNFe direto
-        prot_nfe = ret_envi.find('.//{http://www.portalfiscal.inf.br/nfe}protNFe')
+        prot_nfe = ret_envi.find(f'.//{NS_NFE}protNFe')
         if prot_nfe is not None:
-            inf_prot = prot_nfe.find('.//{http://www.portalfiscal.inf.br/nfe}infProt')
-            if inf_prot is not None:
-                resultado['protocolo'] = {
-                    'nProt': inf_prot.findtext('.//{http://www.portalfiscal.inf.br/nfe}nProt'),
-                    'cStat': inf_prot.findtext('.//{http://www.portalfiscal.inf.br/nfe}cStat'),
-                    'xMotivo': inf_prot.findtext('.//{http://www.portalfiscal.inf.br/nfe}xMotivo'),
-                    'dhRecbto': inf_prot.findtext('.//{http://www.portalfiscal.inf.br/nfe}dhRecbto'),
-                    'xml_prot': etree.tostring(prot_nfe, encoding='unicode')
-                }
+            resultado['protocolo'] = self._parse_prot_nfe(prot_nfe)
         
         return resultado
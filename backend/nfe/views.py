@@ -4,7 +4,7 @@ Views/ViewSets para NFe - Projeto Nix.
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.core.exceptions import ValidationError as DjangoValidationError
 
 from .models import ProdutoFornecedor, NotaFiscal
@@ -18,6 +18,13 @@ from .serializers import (
 from .services import NFeService
 from .parsers.nfe_parser import NFeParser, NFeParseError
 from .matching.product_matcher import ProductMatcher
+from api.serializers.jobs import JobSerializer
+
+
+def _assincrono(request):
+    """Requisição pediu execução em segundo plano (body ou ?assincrono=1)."""
+    valor = request.data.get('assincrono', request.query_params.get('assincrono', False))
+    return str(valor).lower() in ('1', 'true', 'sim')
 
 
 class EmissaoNFeViewSet(viewsets.ModelViewSet):
@@ -26,7 +33,8 @@ class EmissaoNFeViewSet(viewsets.ModelViewSet):
     
     Endpoints:
     - POST /api/nfe/emissao/gerar_de_venda/ - Gera NFe a partir de uma venda
-    - POST /api/nfe/emissao/{id}/transmitir/ - Transmite a NFe (TODO)
+    - POST /api/nfe/emissao/{id}/transmitir/ - Transmite a NFe
+    - GET /api/nfe/emissao/certificados-estatisticas/ - Uso do cache de certificados
     """
     serializer_class = NotaFiscalSerializer
     permission_classes = [IsAuthenticated]
@@ -103,7 +111,20 @@ class EmissaoNFeViewSet(viewsets.ModelViewSet):
     def transmitir_view(self, request, pk=None):
         """
         Transmite a NFe para a SEFAZ.
+        
+        Com {"assincrono": true} enfileira a transmissão e responde 202 com
+        o job (acompanhar em /api/v1/jobs/{id}/). Header Idempotency-Key
+        opcional.
         """
+        if _assincrono(request):
+            if not NotaFiscal.objects.filter(id=pk, empresa=request.user.empresa).exists():
+                return Response({'error': 'Nota Fiscal não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+            job = NFeService.enfileirar_emissao(
+                request.user.empresa, [pk],
+                chave_idempotencia=request.headers.get('Idempotency-Key', '')
+            )
+            return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        
         try:
             resultado = NFeService.transmitir_nfe(
                 nota_id=pk,
@@ -149,6 +170,19 @@ class EmissaoNFeViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': f'Erro interno: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(
+        detail=False, methods=['get'], url_path='certificados-estatisticas',
+        permission_classes=[IsAdminUser],
+    )
+    def certificados_estatisticas(self, request):
+        """
+        Contadores do registro de certificados deste processo
+        (acertos = PFX/sessão SEFAZ reaproveitados). Os contadores cobrem
+        todas as empresas, por isso o acesso é restrito à equipe (is_staff).
+        """
+        from .certificados import registro_certificados
+        return Response(registro_certificados.estatisticas(), status=status.HTTP_200_OK)
+
 
 class ProdutoFornecedorViewSet(viewsets.ModelViewSet):
     """
@@ -235,19 +269,15 @@ class ImportacaoNFeViewSet(viewsets.GenericViewSet):
             # 2. Parse do XML
             dados = NFeParser.parse_file(xml_content)
             
-            # 3. Match produtos para cada item
+            # 3. Match produtos de todos os itens em lote
             cnpj_fornecedor = dados['fornecedor']['cnpj']
+            sugestoes_por_item = ProductMatcher.find_matches_batch(
+                empresa=request.user.empresa,
+                itens=dados['itens'],
+                cnpj_fornecedor=cnpj_fornecedor
+            )
             
-            for item in dados['itens']:
-                # Encontra sugestões
-                sugestoes = ProductMatcher.find_matches(
-                    empresa=request.user.empresa,
-                    codigo_xml=item['codigo_xml'],
-                    ean=item.get('ean'),
-                    descricao=item['descricao_xml'],
-                    cnpj_fornecedor=cnpj_fornecedor
-                )
-                
+            for item, sugestoes in zip(dados['itens'], sugestoes_por_item):
                 item['sugestoes_produtos'] = sugestoes
                 
                 # Define sugestão principal
@@ -320,6 +350,9 @@ class ImportacaoNFeViewSet(viewsets.GenericViewSet):
             ]
         }
         
+        Com "assincrono": true a importação é enfileirada e a resposta é
+        202 com o job (header Idempotency-Key opcional).
+        
         Response: {
             "status": "sucesso" | "parcial" | "erro",
             "message": "...",
@@ -341,6 +374,19 @@ class ImportacaoNFeViewSet(viewsets.GenericViewSet):
                 'errors': serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if _assincrono(request):
+            job = NFeService.enfileirar_importacao(
+                request.user.empresa,
+                {campo: valor for campo, valor in request.data.items() if campo != 'assincrono'},
+                request.user.username,
+                chave_idempotencia=request.headers.get('Idempotency-Key', '')
+            )
+            return Response({
+                'status': 'enfileirado',
+                'message': 'Importação enfileirada',
+                'job': JobSerializer(job).data
+            }, status=status.HTTP_202_ACCEPTED)
+        
         try:
             resultado = NFeService.efetivar_importacao_nfe(
                 empresa=request.user.empresa,
@@ -8,3 +8,7 @@ class RestaurantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restaurant'
     verbose_name = 'Restaurante'
+    
+    def ready(self):
+        """Importa signals quando o app estiver pronto."""
+        import restaurant.signals  # noqa
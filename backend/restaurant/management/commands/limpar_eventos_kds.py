@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from restaurant.services import KdsService
+
+
+class Command(BaseCommand):
+    help = 'Expurga eventos antigos do feed do KDS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=24,
+            help='Mantém os eventos das últimas N horas (padrão: 24)'
+        )
+
+    def handle(self, *args, **options):
+        removidos = KdsService.limpar_eventos(horas=options['horas'])
+        self.stdout.write(self.style.SUCCESS(f'{removidos} eventos KDS removidos'))
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-17 12:55
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0001_initial'),
+        ('tenant', '0006_empresa_versao_cardapio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoKDS',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False, verbose_name='Sequência')),
+                ('setor_id', models.UUIDField(blank=True, help_text='Setor de impressão do produto no momento do evento', null=True, verbose_name='Setor')),
+                ('item_id', models.UUIDField(verbose_name='Item')),
+                ('tipo', models.CharField(choices=[('NOVO', 'Novo Item'), ('STATUS', 'Mudança de Status'), ('REMOVIDO', 'Item Removido')], max_length=10, verbose_name='Tipo')),
+                ('dados', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Estado do item (mesmo formato do snapshot do KDS)', verbose_name='Dados')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Criado em')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_kds', to='tenant.empresa', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Evento KDS',
+                'verbose_name_plural': 'Eventos KDS',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['empresa', 'id'], name='restaurant__empresa_d5c1b6_idx')],
+            },
+        ),
+    ]
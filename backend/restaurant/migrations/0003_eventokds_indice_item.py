@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0002_evento_kds'),
+        ('tenant', '0007_versao_cardapio_sequencia'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventokds',
+            index=models.Index(fields=['item_id', 'id'], name='restaurant__item_id_f46b20_idx'),
+        ),
+    ]
@@ -5,6 +5,7 @@ Gerencia mesas, comandas e setores de produção.
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils.text import slugify
 
 from core.models import TenantModel
@@ -311,3 +312,76 @@ class Comanda(TenantModel):
         if motivo:
             self.observacoes = f"Bloqueada: {motivo}"
         self.save()
+
+
+class TipoEventoKDS(models.TextChoices):
+    """Tipos de evento do feed do KDS."""
+    NOVO = 'NOVO', 'Novo Item'
+    STATUS = 'STATUS', 'Mudança de Status'
+    REMOVIDO = 'REMOVIDO', 'Item Removido'
+
+
+class EventoKDS(models.Model):
+    """
+    Log de eventos do KDS (deltas de itens de produção).
+    
+    O id auto-incremental é o cursor de sequência do feed: telas que
+    reconectam retomam a partir do último id recebido (Last-Event-ID).
+    
+    Responsabilidades:
+    - Registrar criação, mudança de status e remoção de itens de produção
+    - Guardar o estado do item no momento do evento (payload idempotente)
+    """
+    
+    id = models.BigAutoField(
+        primary_key=True,
+        verbose_name='Sequência'
+    )
+    
+    empresa = models.ForeignKey(
+        'tenant.Empresa',
+        on_delete=models.CASCADE,
+        related_name='eventos_kds',
+        verbose_name='Empresa'
+    )
+    
+    setor_id = models.UUIDField(
+        null=True,
+        blank=True,
+        verbose_name='Setor',
+        help_text='Setor de impressão do produto no momento do evento'
+    )
+    
+    item_id = models.UUIDField(
+        verbose_name='Item'
+    )
+    
+    tipo = models.CharField(
+        max_length=10,
+        choices=TipoEventoKDS.choices,
+        verbose_name='Tipo'
+    )
+    
+    dados = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        verbose_name='Dados',
+        help_text='Estado do item (mesmo formato do snapshot do KDS)'
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Criado em'
+    )
+    
+    class Meta:
+        verbose_name = 'Evento KDS'
+        verbose_name_plural = 'Eventos KDS'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['empresa', 'id']),
+            models.Index(fields=['item_id', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.id} {self.tipo} {self.item_id}"
@@ -4,11 +4,13 @@ Orquestra lógica de negócio de mesas, comandas e pedidos.
 """
 from django.db import transaction
 from django.core.exceptions import ValidationError
+from django.db.models import Exists, Max, OuterRef
 from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
 
 from restaurant.models import Mesa, Comanda, StatusMesa, StatusComanda
-from sales.models import Venda, ItemVenda, ItemVendaComplemento, StatusVenda
+from sales.models import Venda, ItemVenda, ItemVendaComplemento, StatusVenda, StatusProducao
 from catalog.models import Produto, Complemento, GrupoComplemento
 
 
@@ -77,6 +79,37 @@ class RestaurantService:
     @staticmethod
     def _adicionar_item_venda(venda, empresa, produto_id, quantidade, complementos_list=None, observacao=''):
         """Helper para adicionar item a uma venda (usado por Mesa e Comanda)."""
+        return RestaurantService._adicionar_itens_venda(venda, empresa, [{
+            'produto_id': produto_id,
+            'quantidade': quantidade,
+            'complementos': complementos_list,
+            'observacao': observacao,
+        }])[0]
+    
+    @staticmethod
+    def _adicionar_itens_venda(venda, empresa, itens):
+        """
+        Adiciona vários itens (com complementos) a uma venda de uma só vez.
+        
+        Produtos e complementos são buscados em lote, itens e complementos
+        gravados com bulk_create e os totais da venda recalculados uma
+        única vez ao final.
+        
+        Args:
+            venda: Instância de Venda
+            empresa: Empresa (tenant)
+            itens: Lista de dicts com produto_id, quantidade,
+                complementos (opcional) e observacao (opcional)
+        
+        Returns:
+            list[ItemVenda]: Itens criados, na ordem recebida
+        
+        Raises:
+            ValidationError: Se venda fechada, produto/complemento inválido
+                ou grupo obrigatório não preenchido
+        """
+        from sales.services import VendaService
+        
         # Validação: venda não pode estar finalizada
         if venda.status not in [StatusVenda.ORCAMENTO, StatusVenda.PENDENTE]:
             raise ValidationError(
@@ -84,58 +117,92 @@ class RestaurantService:
                 "Não é possível adicionar itens."
             )
         
-        # Busca produto
-        try:
-            produto = Produto.objects.get(
-                id=produto_id,
+        # Busca produtos e complementos em lote
+        produtos = {
+            str(produto.id): produto
+            for produto in Produto.objects.filter(
+                id__in={item_data['produto_id'] for item_data in itens},
                 empresa=empresa,
                 is_active=True
             )
-        except Produto.DoesNotExist:
-            raise ValidationError(f"Produto com ID {produto_id} não encontrado ou inativo")
-        
-        # Valida grupos de complementos obrigatórios
-        if complementos_list:
-            RestaurantService._validar_complementos_obrigatorios(
-                produto, complementos_list
+        }
+        complementos_ids = {
+            comp_data.get('complemento_id')
+            for item_data in itens
+            for comp_data in (item_data.get('complementos') or [])
+        }
+        complementos = {
+            str(complemento.id): complemento
+            for complemento in Complemento.objects.filter(
+                id__in=complementos_ids,
+                empresa=empresa,
+                is_active=True
             )
+        } if complementos_ids else {}
         
-        # Cria item
-        item = ItemVenda.objects.create(
-            empresa=empresa,
-            venda=venda,
-            produto=produto,
-            quantidade=Decimal(str(quantidade)),
-            preco_unitario=produto.preco_venda,
-            observacoes=observacao
-        )
-        
-        # Adiciona complementos
-        if complementos_list:
+        novos_itens = []
+        novos_complementos = []
+        for item_data in itens:
+            produto = produtos.get(str(item_data['produto_id']))
+            if produto is None:
+                raise ValidationError(
+                    f"Produto com ID {item_data['produto_id']} não encontrado ou inativo"
+                )
+            
+            complementos_list = item_data.get('complementos') or []
+            
+            # Valida grupos de complementos obrigatórios
+            if complementos_list:
+                RestaurantService._validar_complementos_obrigatorios(
+                    produto, complementos_list
+                )
+            
+            # Cria item (snapshot de preço e custo, como em ItemVenda.save)
+            quantidade = Decimal(str(item_data['quantidade']))
+            item = ItemVenda(
+                empresa=empresa,
+                venda=venda,
+                produto=produto,
+                quantidade=quantidade,
+                preco_unitario=produto.preco_venda,
+                custo_unitario=produto.preco_custo,
+                observacoes=item_data.get('observacao') or ''
+            )
+            item.subtotal = quantidade * item.preco_unitario
+            
+            # Adiciona complementos
             for comp_data in complementos_list:
                 complemento_id = comp_data.get('complemento_id')
-                comp_quantidade = Decimal(str(comp_data.get('quantidade', 1)))
-                
-                try:
-                    complemento = Complemento.objects.get(
-                        id=complemento_id,
-                        empresa=empresa,
-                        is_active=True
-                    )
-                except Complemento.DoesNotExist:
+                complemento = complementos.get(str(complemento_id))
+                if complemento is None:
                     raise ValidationError(
                         f"Complemento com ID {complemento_id} não encontrado"
                     )
                 
-                ItemVendaComplemento.objects.create(
+                comp_quantidade = Decimal(str(comp_data.get('quantidade', 1)))
+                novos_complementos.append(ItemVendaComplemento(
                     empresa=empresa,
                     item_pai=item,
                     complemento=complemento,
                     quantidade=comp_quantidade,
-                    preco_unitario=complemento.preco_adicional
-                )
+                    preco_unitario=complemento.preco_adicional,
+                    subtotal=comp_quantidade * complemento.preco_adicional
+                ))
+                item.subtotal += comp_quantidade * complemento.preco_adicional
+            
+            novos_itens.append(item)
+        
+        # bulk_create não dispara signals: totais recalculados uma única vez
+        ItemVenda.objects.bulk_create(novos_itens)
+        ItemVendaComplemento.objects.bulk_create(novos_complementos)
+        VendaService.recalcular_totais([venda.id])
         
-        return item
+        # Publica os novos itens no feed do KDS após o commit
+        item_ids = [item.id for item in novos_itens]
+        transaction.on_commit(lambda: KdsService.registrar_eventos(item_ids))
+        venda.refresh_from_db(fields=['total_bruto', 'total_desconto', 'total_liquido'])
+        
+        return novos_itens
 
     @staticmethod
     @transaction.atomic
@@ -164,6 +231,33 @@ class RestaurantService:
             observacao=observacao
         )
     
+    @staticmethod
+    @transaction.atomic
+    def adicionar_itens_mesa(mesa_id, itens):
+        """
+        Adiciona vários itens ao pedido da mesa de uma só vez.
+        
+        Args:
+            mesa_id: UUID da mesa
+            itens: Lista de dicts com produto_id, quantidade,
+                complementos (opcional) e observacao (opcional)
+        """
+        try:
+            mesa = Mesa.objects.select_for_update().get(id=mesa_id)
+        except Mesa.DoesNotExist:
+            raise ValidationError(f"Mesa com ID {mesa_id} não encontrada")
+        
+        if not mesa.venda_atual:
+            raise ValidationError(
+                f"Mesa {mesa.numero} não tem venda aberta. Use 'abrir_mesa' primeiro."
+            )
+        
+        return RestaurantService._adicionar_itens_venda(
+            venda=mesa.venda_atual,
+            empresa=mesa.empresa,
+            itens=itens
+        )
+    
     @staticmethod
     def _validar_complementos_obrigatorios(produto, complementos_list):
         """
@@ -198,96 +292,141 @@ class RestaurantService:
         """
         Finaliza venda da mesa e baixa estoque.
         
+        Mesa sem consumo tem a venda cancelada e volta a LIVRE; com consumo,
+        a venda é finalizada e a mesa fica SUJA (aguardando limpeza).
+        
         Args:
             mesa_id: UUID da mesa
             deposito_id: UUID do depósito para baixa de estoque
             tipo_pagamento: Tipo de pagamento (opcional, atualiza venda)
             usuario: Usuário que está fechando (para caixa)
-            valor_pago: Valor pago (opcional)
+            valor_pago: Valor pago (opcional, não utilizado na finalização)
             colaborador_id: ID do colaborador (garçom/atendente)
             cpf_cliente: CPF do cliente para nota
         
         Returns:
             Venda: Venda finalizada
         """
+        return RestaurantService._fechar_conta(
+            modelo=Mesa,
+            conta_id=mesa_id,
+            deposito_id=deposito_id,
+            tipo_pagamento=tipo_pagamento,
+            usuario=usuario,
+            colaborador_id=colaborador_id,
+            cpf_cliente=cpf_cliente
+        )
+    
+    @staticmethod
+    def _fechar_conta(modelo, conta_id, deposito_id, tipo_pagamento=None, usuario=None,
+                      colaborador_id=None, cpf_cliente=None):
+        """
+        Pipeline único de fechamento de mesas e comandas.
+        
+        Carrega mesa/comanda, venda (com cliente e atendentes), itens com
+        produtos, depósito e sessão de caixa com um número fixo de queries,
+        independente da quantidade de itens. As alterações da venda
+        (cliente, atendente, tipo de pagamento, status, comissão) são
+        gravadas em um único UPDATE pelo núcleo de VendaService.
+        
+        Args:
+            modelo: Mesa ou Comanda
+            conta_id: UUID da mesa/comanda
+            (demais argumentos: ver fechar_mesa)
+        
+        Returns:
+            Venda: Venda finalizada (ou cancelada, mesa sem consumo)
+        """
+        from django.conf import settings
+        from sales.services import VendaService
+        
+        eh_mesa = modelo is Mesa
+        
+        # 1. Mesa/comanda travada (apenas a própria linha)
         try:
-            mesa = Mesa.objects.select_for_update().get(id=mesa_id)
-        except Mesa.DoesNotExist:
-            raise ValidationError(f"Mesa com ID {mesa_id} não encontrada")
+            conta = modelo.objects.select_for_update(of=('self',)).get(id=conta_id)
+        except modelo.DoesNotExist:
+            raise ValidationError(f"{modelo._meta.verbose_name} com ID {conta_id} não encontrada")
         
-        # ... (código existente de verificação de venda)
+        identificacao = f"Mesa {conta.numero}" if eh_mesa else f"Comanda {conta.codigo}"
+        if not conta.venda_atual_id:
+            raise ValidationError(f"{identificacao} não tem venda aberta")
         
-        if not mesa.venda_atual:
-            raise ValidationError(f"Mesa {mesa.numero} não tem venda aberta")
+        # 2. Venda travada, com os relacionamentos usados na finalização
+        venda = Venda.objects.select_for_update(of=('self',)).select_related(
+            'cliente', 'atendente', 'colaborador', 'vendedor'
+        ).get(id=conta.venda_atual_id)
+        campos_alterados = []
         
-        venda = mesa.venda_atual
-
-        # Atualiza cliente se CPF informado
+        # 3. Cliente pelo CPF informado (em memória; gravado no UPDATE final)
         if cpf_cliente:
             from partners.models import Cliente
             # Remove pontuação
             cpf_limpo = ''.join(filter(str.isdigit, cpf_cliente))
             
             if cpf_limpo:
-                cliente = Cliente.objects.filter(cpf_cnpj=cpf_limpo, empresa=mesa.empresa).first()
+                # Cliente.clean grava o documento formatado: busca pelas duas formas
+                if len(cpf_limpo) == 11:
+                    formatado = f"{cpf_limpo[:3]}.{cpf_limpo[3:6]}.{cpf_limpo[6:9]}-{cpf_limpo[9:]}"
+                else:
+                    formatado = f"{cpf_limpo[:2]}.{cpf_limpo[2:5]}.{cpf_limpo[5:8]}/{cpf_limpo[8:12]}-{cpf_limpo[12:]}"
+                cliente = Cliente.objects.filter(
+                    cpf_cnpj__in=[cpf_limpo, formatado], empresa_id=conta.empresa_id
+                ).first()
                 if not cliente:
                     cliente = Cliente.objects.create(
-                        empresa=mesa.empresa,
+                        empresa_id=conta.empresa_id,
                         nome=f"Consumidor {cpf_limpo}",
                         cpf_cnpj=cpf_limpo,
                         tipo_pessoa='FISICA'
                     )
                 venda.cliente = cliente
-                venda.save(update_fields=['cliente'])
+                campos_alterados.append('cliente')
         
-        # Define colaborador se informado (sobreescreve ou define atendente)
+        # 4. Colaborador informado (sobreescreve ou define atendente)
         if colaborador_id:
-            try:
-                from authentication.models import CustomUser
-                colaborador = CustomUser.objects.get(id=colaborador_id, empresa=mesa.empresa)
+            from authentication.models import CustomUser
+            colaborador = CustomUser.objects.filter(id=colaborador_id, empresa_id=conta.empresa_id).first()
+            if colaborador:  # Ignora se não achar
                 venda.atendente = colaborador
-                venda.save(update_fields=['atendente'])
-            except CustomUser.DoesNotExist:
-                pass # Ignora se não achar
-        
-        # Atualiza tipo de pagamento se fornecido
-        if tipo_pagamento:
-            venda.tipo_pagamento = tipo_pagamento
-            venda.save(update_fields=['tipo_pagamento'])
-        
-        # Validação: venda deve ter itens
-        if not venda.itens.exists():
-            # Se não tem itens, cancela a ocupação e libera a mesa
+                campos_alterados.append('atendente')
+        
+        # 5. Itens (uma query)
+        itens = list(venda.itens.select_related('produto'))
+        
+        if not itens:
+            if not eh_mesa:
+                raise ValidationError("Venda não tem itens")
+            
+            # Mesa sem consumo: cancela a ocupação e libera a mesa
             venda.status = StatusVenda.CANCELADA
             venda.observacoes = (venda.observacoes or "") + " | Cancelada: Sem consumo"
-            venda.save()
-            
-            mesa.status = StatusMesa.LIVRE
-            mesa.venda_atual = None
-            mesa.save()
+            if tipo_pagamento:
+                venda.tipo_pagamento = tipo_pagamento
+                campos_alterados.append('tipo_pagamento')
+            venda.save(update_fields=['status', 'observacoes', 'updated_at', *campos_alterados])
             
+            conta.status = StatusMesa.LIVRE
+            conta.venda_atual = None
+            conta.save(update_fields=['status', 'venda_atual', 'updated_at'])
             return venda
         
-        # Usa VendaService para finalizar (baixa estoque, atualiza status)
-        from sales.services import VendaService
-        from django.conf import settings
-        
-        # Lê configuração de lotes (padrão True se não definido)
-        usar_lotes = getattr(settings, 'ESTOQUE_USAR_LOTES', True)
-        
-        venda_finalizada = VendaService.finalizar_venda(
-            venda_id=venda.id,
+        # 6. Finalização (depósito, caixa, estoque, financeiro) em um único UPDATE da venda
+        venda_finalizada = VendaService._finalizar(
+            venda=venda,
+            itens=itens,
             deposito_id=deposito_id,
-            usuario=usuario or 'sistema', # Passa usuário
-            usar_lotes=usar_lotes,
+            usuario=usuario or 'sistema',
+            # Lê configuração de lotes (padrão True se não definido)
+            usar_lotes=getattr(settings, 'ESTOQUE_USAR_LOTES', True),
             tipo_pagamento=tipo_pagamento,
-            valor_pago=valor_pago
+            campos_alterados=campos_alterados
         )
         
-        # Libera mesa (suja para limpeza)
-        mesa.status = StatusMesa.SUJA
-        mesa.venda_atual = None
-        mesa.save()
+        # 7. Libera mesa (suja para limpeza) ou comanda
+        conta.status = StatusMesa.SUJA if eh_mesa else StatusComanda.LIVRE
+        conta.venda_atual = None
+        conta.save(update_fields=['status', 'venda_atual', 'updated_at'])
         
         return venda_finalizada
     
@@ -522,59 +661,37 @@ class ComandaService:
     
     @staticmethod
     @transaction.atomic
-    def fechar_comanda(comanda_id, deposito_id, tipo_pagamento=None, usuario=None, valor_pago=None, colaborador_id=None, cpf_cliente=None):
-        """Fecha comanda e finaliza venda."""
+    def adicionar_itens_comanda(comanda_id, itens):
+        """Adiciona vários itens à comanda de uma só vez (ver adicionar_itens_mesa)."""
         try:
             comanda = Comanda.objects.select_for_update().get(id=comanda_id)
         except Comanda.DoesNotExist:
             raise ValidationError(f"Comanda com ID {comanda_id} não encontrada")
         
         if not comanda.venda_atual:
-            raise ValidationError(f"Comanda {comanda.codigo} não tem venda aberta")
-        
-        venda = comanda.venda_atual
-        
-        # Atualiza cliente se CPF informado
-        if cpf_cliente:
-            from partners.models import Cliente
-            cpf_limpo = ''.join(filter(str.isdigit, cpf_cliente))
-            if cpf_limpo:
-                cliente = Cliente.objects.filter(cpf_cnpj=cpf_limpo, empresa=comanda.empresa).first()
-                if not cliente:
-                    cliente = Cliente.objects.create(
-                        empresa=comanda.empresa,
-                        nome=f"Consumidor {cpf_limpo}",
-                        cpf_cnpj=cpf_limpo,
-                        tipo_pessoa='FISICA'
-                    )
-                venda.cliente = cliente
-                venda.save(update_fields=['cliente'])
-        
-        # Define colaborador
-        if colaborador_id:
-            try:
-                from authentication.models import CustomUser
-                colaborador = CustomUser.objects.get(id=colaborador_id, empresa=comanda.empresa)
-                venda.atendente = colaborador
-                venda.save(update_fields=['atendente'])
-            except CustomUser.DoesNotExist:
-                pass
-
-        if not venda.itens.exists():
-            raise ValidationError("Venda não tem itens")
+            raise ValidationError(
+                f"Comanda {comanda.codigo} não tem venda aberta"
+            )
         
-        from sales.services import VendaService
-        venda_finalizada = VendaService.finalizar_venda(
-            venda_id=venda.id,
+        return RestaurantService._adicionar_itens_venda(
+            venda=comanda.venda_atual,
+            empresa=comanda.empresa,
+            itens=itens
+        )
+    
+    @staticmethod
+    @transaction.atomic
+    def fechar_comanda(comanda_id, deposito_id, tipo_pagamento=None, usuario=None, valor_pago=None, colaborador_id=None, cpf_cliente=None):
+        """Fecha comanda e finaliza venda (mesmo pipeline de fechar_mesa)."""
+        return RestaurantService._fechar_conta(
+            modelo=Comanda,
+            conta_id=comanda_id,
             deposito_id=deposito_id,
-            usuario=usuario or 'sistema',
             tipo_pagamento=tipo_pagamento,
-            valor_pago=valor_pago
+            usuario=usuario,
+            colaborador_id=colaborador_id,
+            cpf_cliente=cpf_cliente
         )
-        
-        comanda.liberar()
-        
-        return venda_finalizada
 
     @staticmethod
     @transaction.atomic
@@ -597,3 +714,255 @@ class ComandaService:
             raise ValidationError("Venda fechada")
 
         item.delete()
+
+
+class KdsService:
+    """
+    Feed do Kitchen Display System (KDS).
+    
+    Responsabilidades:
+    - Montar o snapshot dos itens em produção (agrupados por venda)
+    - Registrar deltas de itens (novo, status, removido) no EventoKDS
+    - Entregar eventos a partir de um cursor de sequência
+    """
+    
+    STATUS_EM_PRODUCAO = [StatusProducao.PENDENTE, StatusProducao.EM_PREPARO]
+    STATUS_VENDA_ABERTA = [StatusVenda.ORCAMENTO, StatusVenda.PENDENTE]
+    
+    # O id do evento é atribuído no INSERT, não no commit: eventos desta
+    # janela atrás do cursor são relidos para pegar transações lentas
+    JANELA_ATRASO = timedelta(seconds=30)
+    
+    @staticmethod
+    def _itens_producao():
+        """QuerySet base dos itens de produção com os relacionamentos do KDS."""
+        return ItemVenda.all_objects.filter(
+            produto__imprimir_producao=True
+        ).select_related(
+            'venda', 'venda__mesa', 'venda__comanda', 'venda__cliente',
+            'produto'
+        ).prefetch_related('complementos__complemento')
+    
+    @staticmethod
+    def _identificacao(venda):
+        """Identifica a origem do pedido (Mesa, Comanda, Cliente ou Venda)."""
+        try:
+            if hasattr(venda, 'mesa') and venda.mesa:
+                return f"Mesa {venda.mesa.numero}"
+            if hasattr(venda, 'comanda') and venda.comanda:
+                return f"Comanda {venda.comanda.codigo}"
+            if venda.cliente:
+                return f"{venda.cliente.nome}"
+        except Exception:
+            pass
+        return f"Venda #{venda.numero}"
+    
+    @staticmethod
+    def _serializar_item(item):
+        """Estado do item no formato do snapshot do KDS."""
+        return {
+            'id': str(item.id),
+            'venda_id': str(item.venda_id),
+            'setor_id': str(item.produto.setor_impressao_id) if item.produto.setor_impressao_id else None,
+            'produto': item.produto.nome,
+            'quantidade': float(item.quantidade),
+            'status': item.status_producao,
+            'observacoes': item.observacoes,
+            'complementos': [
+                f"{float(c.quantidade)}x {c.complemento.nome}"
+                for c in item.complementos.all()
+            ]
+        }
+    
+    @staticmethod
+    def _status_kds(item):
+        """Status do item no KDS; None se saiu da tela (excluído ou venda fechada)."""
+        if not item.is_active or item.venda.status not in KdsService.STATUS_VENDA_ABERTA:
+            return None
+        return item.status_producao
+    
+    @staticmethod
+    def snapshot(empresa, setor_id=None):
+        """
+        Itens pendentes de produção, agrupados por venda.
+        
+        Args:
+            empresa: Empresa (tenant)
+            setor_id: UUID do setor de impressão (opcional)
+        
+        Returns:
+            list: [{venda_id, identificacao, inicio, itens: [...]}]
+        """
+        qs = KdsService._itens_producao().filter(
+            empresa=empresa,
+            is_active=True,
+            venda__status__in=KdsService.STATUS_VENDA_ABERTA,
+            status_producao__in=KdsService.STATUS_EM_PRODUCAO
+        ).order_by('created_at')
+        
+        if setor_id:
+            qs = qs.filter(produto__setor_impressao_id=setor_id)
+        
+        grouped = {}
+        for item in qs:
+            venda_id = str(item.venda_id)
+            if venda_id not in grouped:
+                grouped[venda_id] = {
+                    'venda_id': venda_id,
+                    'identificacao': KdsService._identificacao(item.venda),
+                    'inicio': item.venda.created_at,
+                    'itens': []
+                }
+            grouped[venda_id]['itens'].append(KdsService._serializar_item(item))
+        
+        return list(grouped.values())
+    
+    @staticmethod
+    def _ultimos_eventos(item_ids):
+        """Último evento publicado de cada item: {item_id: EventoKDS}."""
+        from restaurant.models import EventoKDS
+        
+        ultimos = EventoKDS.objects.filter(
+            item_id__in=item_ids
+        ).values('item_id').annotate(ultimo=Max('id')).values_list('ultimo', flat=True)
+        return {
+            evento.item_id: evento
+            for evento in EventoKDS.objects.filter(id__in=list(ultimos))
+        }
+    
+    @staticmethod
+    def registrar_eventos(item_ids):
+        """
+        Grava um evento por item de produção cujo estado na tela mudou.
+        
+        O tipo sai da comparação com o último evento publicado do item:
+        - sem evento anterior (ou depois de REMOVIDO): NOVO
+        - saiu da tela (excluído, venda finalizada/cancelada): REMOVIDO
+        - status_producao diferente: STATUS
+        
+        Estado igual ao já publicado não gera evento: pode ser chamado a
+        cada save, com ou sem update_fields, sem duplicar o feed.
+        
+        Args:
+            item_ids: Iterable de UUIDs de ItemVenda
+        """
+        from restaurant.models import EventoKDS, TipoEventoKDS
+        
+        itens = list(KdsService._itens_producao().filter(id__in=list(item_ids)))
+        if not itens:
+            return
+        ultimos = KdsService._ultimos_eventos([item.id for item in itens])
+        
+        eventos = []
+        for item in itens:
+            status_kds = KdsService._status_kds(item)
+            anterior = ultimos.get(item.id)
+            
+            if anterior is None or anterior.tipo == TipoEventoKDS.REMOVIDO:
+                if status_kds is None:
+                    continue
+                tipo = TipoEventoKDS.NOVO
+            elif anterior.dados.get('status') == status_kds:
+                continue
+            elif status_kds is None:
+                tipo = TipoEventoKDS.REMOVIDO
+            else:
+                tipo = TipoEventoKDS.STATUS
+            
+            dados = KdsService._serializar_item(item)
+            dados.update({
+                'tipo': tipo,
+                'identificacao': KdsService._identificacao(item.venda),
+                'inicio': item.venda.created_at,
+                'status': status_kds,
+            })
+            eventos.append(EventoKDS(
+                empresa_id=item.empresa_id,
+                setor_id=item.produto.setor_impressao_id,
+                item_id=item.id,
+                tipo=tipo,
+                dados=dados
+            ))
+        
+        EventoKDS.objects.bulk_create(eventos)
+    
+    @staticmethod
+    def registrar_eventos_venda(venda_id):
+        """Publica o estado de todos os itens de produção da venda."""
+        KdsService.registrar_eventos(
+            ItemVenda.all_objects.filter(
+                venda_id=venda_id,
+                produto__imprimir_producao=True
+            ).values_list('id', flat=True)
+        )
+    
+    @staticmethod
+    def cursor_atual(empresa):
+        """Último id de evento da empresa (cursor inicial para quem recebe o snapshot)."""
+        from restaurant.models import EventoKDS
+        
+        return EventoKDS.objects.filter(
+            empresa=empresa
+        ).order_by('-id').values_list('id', flat=True).first() or 0
+    
+    @staticmethod
+    def cursor_valido(cursor, empresa):
+        """
+        Indica se é possível retomar a partir do cursor.
+        
+        O evento do cursor precisa existir e ser da empresa: se foi
+        expurgado (limpar_eventos), pode haver eventos perdidos e o cliente
+        deve receber um novo snapshot.
+        """
+        from restaurant.models import EventoKDS
+        
+        return bool(cursor) and EventoKDS.objects.filter(id=cursor, empresa=empresa).exists()
+    
+    @staticmethod
+    def eventos_desde(empresa, cursor, setor_id=None, limite=500, entregues=()):
+        """
+        Eventos da empresa posteriores ao cursor, em ordem de sequência.
+        
+        Também relê os eventos da JANELA_ATRASO com id até o cursor: uma
+        transação lenta pode comitar um id menor depois de outros já
+        entregues. Desses, só voltam os ainda não entregues nesta conexão
+        (entregues) e que sejam o último evento do item, para um estado
+        antigo não sobrescrever um mais novo na tela.
+        
+        Args:
+            empresa: Empresa (tenant)
+            cursor: Último id entregue
+            setor_id: UUID do setor (opcional)
+            limite: Máximo de eventos novos por consulta
+            entregues: ids já enviados nesta conexão
+        """
+        from restaurant.models import EventoKDS
+        
+        qs = EventoKDS.objects.filter(empresa=empresa)
+        if setor_id:
+            qs = qs.filter(setor_id=setor_id)
+        
+        atrasados = qs.filter(
+            id__lte=cursor,
+            created_at__gte=timezone.now() - KdsService.JANELA_ATRASO
+        ).exclude(
+            id__in=list(entregues)
+        ).exclude(
+            Exists(EventoKDS.objects.filter(item_id=OuterRef('item_id'), id__gt=OuterRef('id')))
+        ).order_by('id')
+        
+        return list(atrasados) + list(qs.filter(id__gt=cursor).order_by('id')[:limite])
+    
+    @staticmethod
+    def limpar_eventos(horas=24):
+        """
+        Expurga eventos antigos.
+        
+        Returns:
+            int: Quantidade de eventos removidos
+        """
+        from restaurant.models import EventoKDS
+        
+        limite = timezone.now() - timedelta(hours=horas)
+        removidos, _ = EventoKDS.objects.filter(created_at__lt=limite).delete()
+        return removidos
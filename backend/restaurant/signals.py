@@ -0,0 +1,51 @@
+"""
+Signals para o módulo Restaurant.
+Alimenta o feed incremental do KDS.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from sales.models import ItemVenda, Venda
+
+
+# Campos do item que mudam o que aparece na tela do KDS
+CAMPOS_KDS = {'status_producao', 'is_active'}
+
+
+@receiver(post_save, sender=ItemVenda)
+def publicar_evento_kds(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Registra o delta do item no feed do KDS.
+    
+    Disparado na criação, em saves completos (admin, serializers) e em
+    saves parciais que toquem status_producao/is_active. O tipo (NOVO,
+    STATUS, REMOVIDO) é deduzido pelo KdsService comparando com o último
+    evento do item; sem mudança visível nada é gravado.
+    
+    O evento é gravado após o commit: complementos criados na mesma
+    transação já entram no payload e transações desfeitas não publicam.
+    """
+    if update_fields is not None and not CAMPOS_KDS & set(update_fields):
+        return
+    
+    from restaurant.services import KdsService
+    item_id = instance.id
+    transaction.on_commit(lambda: KdsService.registrar_eventos([item_id]))
+
+
+@receiver(post_save, sender=Venda)
+def retirar_itens_kds_venda(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Venda finalizada ou cancelada (ex: mesa fechada com itens ainda
+    pendentes) tira seus itens da tela: publica REMOVIDO para cada um.
+    """
+    from restaurant.services import KdsService
+    
+    if created or instance.status in KdsService.STATUS_VENDA_ABERTA:
+        return
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    
+    venda_id = instance.id
+    transaction.on_commit(lambda: KdsService.registrar_eventos_venda(venda_id))
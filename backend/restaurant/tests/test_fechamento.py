@@ -0,0 +1,109 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from tenant.models import Empresa
+from authentication.models import CustomUser, TipoCargo
+from catalog.models import Categoria, Produto, TipoProduto
+from stock.models import Deposito
+from stock.services import StockService
+from sales.models import StatusVenda
+from financial.models import Caixa, MovimentoCaixa
+from financial.services import CaixaService
+from restaurant.models import Mesa, Comanda, StatusMesa, StatusComanda
+from restaurant.services import RestaurantService, ComandaService
+
+
+class FechamentoContaTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Restaurante Fechamento',
+            razao_social='Restaurante Fechamento LTDA',
+            cnpj='11222333000181',
+            email='fechamento@empresa.test',
+        )
+        self.user = CustomUser.objects.create_user(
+            username='caixa',
+            email='caixa@empresa.test',
+            password='123456',
+            empresa=self.empresa,
+            cargo=TipoCargo.GERENTE,
+        )
+        self.deposito = Deposito.objects.create(empresa=self.empresa, nome='Cozinha', is_padrao=True)
+        categoria = Categoria.objects.create(empresa=self.empresa, nome='Pratos')
+        self.produtos = []
+        for i in range(6):
+            produto = Produto.objects.create(
+                empresa=self.empresa,
+                nome=f'Prato {i}',
+                categoria=categoria,
+                tipo=TipoProduto.FINAL,
+                preco_venda=Decimal('20.00'),
+                codigo_barras=f'78900000000{i}',
+            )
+            StockService.dar_entrada_com_lote(
+                produto=produto,
+                deposito=self.deposito,
+                quantidade=Decimal('50.000'),
+                codigo_lote=f'L{i}',
+                data_validade=date.today().replace(year=date.today().year + 1),
+            )
+            self.produtos.append(produto)
+        caixa = Caixa.objects.create(empresa=self.empresa, nome='Caixa 1')
+        CaixaService.abrir_caixa(caixa.id, self.user)
+
+    def _mesa_com_itens(self, numero, quantidade_itens):
+        mesa = Mesa.objects.create(empresa=self.empresa, numero=numero)
+        RestaurantService.abrir_mesa(mesa.id, self.user)
+        RestaurantService.adicionar_itens_mesa(mesa.id, [
+            {'produto_id': produto.id, 'quantidade': 1}
+            for produto in self.produtos[:quantidade_itens]
+        ])
+        return mesa
+
+    def _fechar_mesa(self, mesa):
+        with CaptureQueriesContext(connection) as queries:
+            venda = RestaurantService.fechar_mesa(
+                mesa.id, self.deposito.id,
+                tipo_pagamento='DINHEIRO',
+                usuario=self.user,
+                colaborador_id=self.user.id,
+                cpf_cliente='710.675.780-21',
+            )
+        return venda, len(queries)
+
+    def test_fechar_mesa_com_queries_constantes(self):
+        # Primeiro fechamento cadastra o cliente pelo CPF; os demais o reutilizam
+        self._fechar_mesa(self._mesa_com_itens(1, 1))
+        venda_pequena, queries_pequena = self._fechar_mesa(self._mesa_com_itens(2, 1))
+        venda_grande, queries_grande = self._fechar_mesa(self._mesa_com_itens(3, 6))
+
+        self.assertEqual(queries_pequena, queries_grande)
+        venda_grande.refresh_from_db()
+        self.assertEqual(venda_grande.status, StatusVenda.FINALIZADA)
+        self.assertEqual(venda_grande.cliente.cpf_cnpj, '710.675.780-21')
+        self.assertEqual(venda_grande.cliente_id, venda_pequena.cliente_id)
+        self.assertEqual(venda_grande.atendente_id, self.user.id)
+        self.assertEqual(venda_grande.tipo_pagamento, 'DINHEIRO')
+        self.assertEqual(Mesa.objects.get(numero=3).status, StatusMesa.SUJA)
+        self.assertEqual(MovimentoCaixa.objects.filter(venda_origem=venda_grande).count(), 1)
+
+    def test_fechar_comanda_pelo_mesmo_pipeline(self):
+        comanda = Comanda.objects.create(empresa=self.empresa, codigo='C-01')
+        ComandaService.abrir_comanda(comanda.id, self.user)
+        ComandaService.adicionar_itens_comanda(comanda.id, [
+            {'produto_id': self.produtos[0].id, 'quantidade': 2}
+        ])
+
+        venda = ComandaService.fechar_comanda(
+            comanda.id, self.deposito.id, tipo_pagamento='PIX', usuario=self.user
+        )
+
+        venda.refresh_from_db()
+        comanda.refresh_from_db()
+        self.assertEqual((venda.status, venda.tipo_pagamento), (StatusVenda.FINALIZADA, 'PIX'))
+        self.assertEqual((comanda.status, comanda.venda_atual_id), (StatusComanda.LIVRE, None))
+        self.assertEqual(venda.contas_receber.get().tipo_pagamento, 'PIX')
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from django.utils import timezone
+from decimal import Decimal
+from tenant.models import Empresa
+from authentication import contexto
+from authentication.models import CustomUser, TipoCargo
+from authentication.serializers import CustomTokenObtainPairSerializer
+from catalog.models import Categoria, Produto, TipoProduto
+from sales.models import Venda, StatusVenda, StatusProducao
+from restaurant.models import EventoKDS, TipoEventoKDS
+from restaurant.services import RestaurantService, KdsService
+
+
+class KdsStreamTest(TestCase):
+    def setUp(self):
+        contexto.limpar()
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Cozinha KDS',
+            razao_social='Cozinha KDS LTDA',
+            cnpj='11222333000181',
+        )
+        self.user = CustomUser.objects.create_user(
+            username='cozinha',
+            email='cozinha@kds.test',
+            password='123456',
+            empresa=self.empresa,
+            cargo=TipoCargo.GERENTE,
+        )
+        categoria = Categoria.objects.create(empresa=self.empresa, nome='Pratos')
+        self.prato = Produto.objects.create(
+            empresa=self.empresa,
+            nome='Prato Feito',
+            categoria=categoria,
+            tipo=TipoProduto.FINAL,
+            preco_venda=Decimal('25.00'),
+        )
+        self.venda = Venda.objects.create(
+            empresa=self.empresa,
+            vendedor=self.user,
+            status=StatusVenda.ORCAMENTO,
+        )
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def _adicionar_item(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return RestaurantService._adicionar_item_venda(
+                self.venda, self.empresa, self.prato.id, 1
+            )
+
+    def _stream(self, **headers):
+        response = self.client.get('/api/v1/kds/stream/?duracao=0', **self.auth, **headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        async def ler():
+            return b''.join([parte async for parte in response.streaming_content])
+        return async_to_sync(ler)().decode()
+
+    def _tipos(self, item):
+        return list(EventoKDS.objects.filter(item_id=item.id).values_list('tipo', flat=True))
+
+    def test_snapshot_e_retomada_pelo_cursor(self):
+        item = self._adicionar_item()
+        corpo = self._stream()
+        self.assertIn('event: snapshot', corpo)
+        self.assertIn(str(item.id), corpo)
+        cursor = EventoKDS.objects.get(item_id=item.id).id
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            item.status_producao = StatusProducao.EM_PREPARO
+            item.save(update_fields=['status_producao', 'updated_at'])
+        
+        corpo = self._stream(HTTP_LAST_EVENT_ID=str(cursor))
+        self.assertNotIn('event: snapshot', corpo)
+        self.assertIn('event: item', corpo)
+        self.assertIn('"status": "EM_PREPARO"', corpo)
+
+    def test_sem_autenticacao(self):
+        self.auth = {}
+        response = self.client.get('/api/v1/kds/stream/?duracao=0')
+        self.assertEqual(response.status_code, 401)
+
+    def test_remocao_gera_evento(self):
+        item = self._adicionar_item()
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertEqual(self._tipos(item), [TipoEventoKDS.NOVO, TipoEventoKDS.REMOVIDO])
+
+    def test_save_completo_e_venda_fechada_geram_eventos(self):
+        item = self._adicionar_item()
+        with self.captureOnCommitCallbacks(execute=True):
+            item.status_producao = StatusProducao.EM_PREPARO
+            item.save()
+            item.save()  # sem mudança visível: não duplica
+        with self.captureOnCommitCallbacks(execute=True):
+            self.venda.status = StatusVenda.CANCELADA
+            self.venda.save()
+        self.assertEqual(
+            self._tipos(item),
+            [TipoEventoKDS.NOVO, TipoEventoKDS.STATUS, TipoEventoKDS.REMOVIDO]
+        )
+
+    def test_cursor_de_outra_empresa_pede_snapshot(self):
+        outra = Empresa.objects.create(
+            nome_fantasia='Outra', razao_social='Outra LTDA', cnpj='11444777000161',
+        )
+        evento = EventoKDS.objects.create(
+            empresa=outra, item_id=self.venda.id, tipo=TipoEventoKDS.NOVO, dados={},
+        )
+        self.assertFalse(KdsService.cursor_valido(evento.id, self.empresa))
+        self.assertIn('event: snapshot', self._stream(HTTP_LAST_EVENT_ID=str(evento.id)))
+
+    def test_evento_comitado_atrasado_e_relido(self):
+        item = self._adicionar_item()
+        atrasado = EventoKDS.objects.get(item_id=item.id)
+        outro = self._adicionar_item()
+        cursor = EventoKDS.objects.get(item_id=outro.id).id
+
+        eventos = KdsService.eventos_desde(self.empresa, cursor)
+        self.assertEqual([e.id for e in eventos], [atrasado.id, cursor])
+        self.assertEqual(KdsService.eventos_desde(self.empresa, cursor, entregues={atrasado.id, cursor}), [])
+
+        EventoKDS.objects.filter(id=atrasado.id).update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual([e.id for e in KdsService.eventos_desde(self.empresa, cursor)], [cursor])
@@ -1,13 +1,23 @@
 """
 ViewSets para API REST do módulo Restaurant.
 """
-from rest_framework import viewsets, status, filters
+import asyncio
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.http import HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import viewsets, status, filters, exceptions
 from rest_framework.decorators import action
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 
 from restaurant.models import SetorImpressao, Mesa, Comanda
-from restaurant.services import RestaurantService, ComandaService
+from restaurant.services import RestaurantService, ComandaService, KdsService
 from api.serializers.restaurant import SetorImpressaoSerializer, MesaSerializer, ComandaSerializer
 from sales.models import ItemVenda, StatusProducao, StatusVenda
 from rest_framework.permissions import IsAuthenticated
@@ -452,6 +462,7 @@ class ComandaViewSet(TenantFilteredViewSet):
                 comanda_id=comanda.id,
                 deposito_id=deposito_id,
                 tipo_pagamento=tipo_pagamento,
+                usuario=request.user,
                 valor_pago=valor_pago,
                 colaborador_id=colaborador_id,
                 cpf_cliente=cpf_cliente
@@ -506,68 +517,165 @@ class ComandaViewSet(TenantFilteredViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _evento_sse(evento, dados, id=None):
+    """Formata uma mensagem SSE."""
+    linhas = []
+    if id is not None:
+        linhas.append(f"id: {id}")
+    linhas.append(f"event: {evento}")
+    linhas.append(f"data: {json.dumps(dados, cls=DjangoJSONEncoder)}")
+    return "\n".join(linhas) + "\n\n"
+
+
+# Feed SSE do KDS: duração máxima da conexão (o cliente reconecta com
+# Last-Event-ID), intervalo de consulta ao log de eventos e keep-alive
+KDS_STREAM_DURACAO_MAXIMA = 300
+KDS_STREAM_INTERVALO = 1.0
+KDS_STREAM_KEEPALIVE = 15
+
+
+def _autenticar_stream(request):
+    """Usuário autenticado pelas classes do DRF (JWT/sessão), com a empresa carregada."""
+    drf_request = Request(
+        request,
+        authenticators=[classe() for classe in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    try:
+        usuario = drf_request.user
+    except exceptions.APIException:
+        return None
+    if not usuario.is_authenticated:
+        return None
+    usuario.empresa  # carrega aqui: no gerador assíncrono não há ORM síncrono
+    return usuario
+
+
+async def _no_banco(funcao, *args, **kwargs):
+    """
+    Executa a consulta (ORM síncrono) na thread da requisição: as consultas
+    de uma mesma tela reaproveitam a conexão (CONN_MAX_AGE) entre os ciclos.
+    """
+    return await sync_to_async(funcao)(*args, **kwargs)
+
+
+def _fechar_conexao():
+    """Fim do feed: devolve a conexão usada pela tela."""
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+def _erro_sse(mensagem, status_code):
+    return HttpResponse(
+        _evento_sse('erro', {'error': mensagem}),
+        status=status_code,
+        content_type='text/event-stream'
+    )
+
+
+async def kds_stream(request):
+    """
+    Feed em tempo real do KDS (Server-Sent Events).
+    
+    View assíncrona, servida pelo app ASGI (config/asgi.py): cada tela
+    conectada é uma corrotina esperando asyncio.sleep, e não um worker
+    preso. As consultas reaproveitam a conexão da tela, fechada ao fim
+    do feed. Sob WSGI (manage.py runserver) a resposta só seria entregue
+    ao fim de KDS_STREAM_DURACAO_MAXIMA: use o servidor ASGI (Dockerfile).
+    
+    Envia um evento 'snapshot' com os itens do setor e, depois, apenas
+    eventos 'item' (deltas de NOVO, STATUS e REMOVIDO). Cada mensagem
+    traz o id de sequência; ao reconectar, o cliente envia o último id
+    (header Last-Event-ID ou ?cursor=) e recebe só o que perdeu.
+    
+    Query params:
+        setor_id: UUID do setor (opcional)
+        cursor: Último id recebido (opcional)
+        duracao: Segundos até encerrar a conexão (máx. 300)
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    
+    usuario = await _no_banco(_autenticar_stream, request)
+    if usuario is None:
+        return _erro_sse('As credenciais de autenticação não foram fornecidas.', status.HTTP_401_UNAUTHORIZED)
+    
+    empresa = usuario.empresa
+    setor_id = request.GET.get('setor_id')
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('cursor')
+    try:
+        cursor = int(cursor or 0)
+        duracao = min(
+            float(request.GET.get('duracao', KDS_STREAM_DURACAO_MAXIMA)),
+            KDS_STREAM_DURACAO_MAXIMA
+        )
+    except ValueError:
+        return _erro_sse('cursor/duracao inválidos', status.HTTP_400_BAD_REQUEST)
+    
+    async def eventos():
+        try:
+            async for mensagem in mensagens():
+                yield mensagem
+        finally:
+            await _no_banco(_fechar_conexao)
+    
+    async def mensagens():
+        nonlocal cursor
+        yield f"retry: {int(KDS_STREAM_INTERVALO * 1000)}\n\n"
+        
+        if not await _no_banco(KdsService.cursor_valido, cursor, empresa):
+            # Cursor capturado antes do snapshot: nenhum delta se perde
+            cursor = await _no_banco(KdsService.cursor_atual, empresa)
+            snapshot = await _no_banco(KdsService.snapshot, empresa, setor_id)
+            yield _evento_sse('snapshot', snapshot, id=cursor)
+        
+        # ids entregues nesta conexão dentro da janela de atraso
+        entregues = {}
+        fim = time.monotonic() + duracao
+        ultimo_envio = time.monotonic()
+        while True:
+            novos = await _no_banco(
+                KdsService.eventos_desde, empresa, cursor, setor_id, entregues=entregues.keys()
+            )
+            for evento in novos:
+                # Evento atrasado (id menor) não faz o cursor do cliente voltar
+                cursor = max(cursor, evento.id)
+                entregues[evento.id] = evento.created_at
+                yield _evento_sse('item', evento.dados, id=cursor)
+            
+            limite = timezone.now() - KdsService.JANELA_ATRASO
+            entregues = {id_: momento for id_, momento in entregues.items() if momento >= limite}
+            
+            agora = time.monotonic()
+            if novos:
+                ultimo_envio = agora
+            elif agora - ultimo_envio >= KDS_STREAM_KEEPALIVE:
+                ultimo_envio = agora
+                yield ": keep-alive\n\n"
+            
+            if agora >= fim:
+                break
+            if not novos:
+                await asyncio.sleep(KDS_STREAM_INTERVALO)
+    
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 class KdsViewSet(viewsets.ViewSet):
     """
     API para o Kitchen Display System (KDS).
     Gerencia itens de produção (Cozinha/Bar).
+    
+    O feed em tempo real fica em kds_stream (view assíncrona).
     """
     permission_classes = [IsAuthenticated]
 
     def list(self, request):
         """Lista itens pendentes de produção."""
         setor_id = request.query_params.get('setor_id')
-        
-        # Filtra itens não finalizados e que devem ser produzidos
-        qs = ItemVenda.objects.filter(
-            venda__status__in=[StatusVenda.ORCAMENTO, StatusVenda.PENDENTE],
-            status_producao__in=[StatusProducao.PENDENTE, StatusProducao.EM_PREPARO],
-            produto__imprimir_producao=True
-        ).select_related(
-            'venda', 'venda__mesa', 'venda__comanda', 'venda__cliente',
-            'produto', 'produto__setor_impressao'
-        ).prefetch_related('complementos', 'complementos__complemento').order_by('created_at')
-        
-        if setor_id:
-            qs = qs.filter(produto__setor_impressao_id=setor_id)
-            
-        # Agrupamento manual
-        grouped = {}
-        for item in qs:
-            venda_id = str(item.venda.id)
-            
-            if venda_id not in grouped:
-                identificacao = f"Venda #{item.venda.numero}"
-                # Tenta identificar origem
-                try:
-                    if hasattr(item.venda, 'mesa') and item.venda.mesa:
-                        identificacao = f"Mesa {item.venda.mesa.numero}"
-                    elif hasattr(item.venda, 'comanda') and item.venda.comanda:
-                        identificacao = f"Comanda {item.venda.comanda.codigo}"
-                    elif item.venda.cliente:
-                        identificacao = f"{item.venda.cliente.nome}"
-                except Exception:
-                    pass
-                
-                grouped[venda_id] = {
-                    'venda_id': venda_id,
-                    'identificacao': identificacao,
-                    'inicio': item.venda.created_at,
-                    'itens': []
-                }
-            
-            grouped[venda_id]['itens'].append({
-                'id': str(item.id),
-                'produto': item.produto.nome,
-                'quantidade': float(item.quantidade),
-                'status': item.status_producao,
-                'observacoes': item.observacoes,
-                'complementos': [
-                    f"{float(c.quantidade)}x {c.complemento.nome}" 
-                    for c in item.complementos.all()
-                ]
-            })
-            
-        return Response(list(grouped.values()))
+        return Response(KdsService.snapshot(request.user.empresa, setor_id))
 
     @action(detail=True, methods=['post'])
     def avancar(self, request, pk=None):
@@ -583,7 +691,7 @@ class KdsViewSet(viewsets.ViewSet):
             next_status = status_map.get(item.status_producao)
             if next_status:
                 item.status_producao = next_status
-                item.save()
+                item.save(update_fields=['status_producao', 'updated_at'])
                 return Response({'status': next_status})
             
             return Response({'status': item.status_producao}) # Já está entregue
@@ -0,0 +1,30 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from sales.services import ResumoVendasService
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o rollup horário de vendas (backfill dos dashboards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', help='UUID da empresa (padrão: todas)')
+        parser.add_argument('--desde', help='Data inicial YYYY-MM-DD (padrão: desde a primeira venda)')
+        parser.add_argument('--ate', help='Data final YYYY-MM-DD (padrão: hoje)')
+
+    def handle(self, *args, **options):
+        try:
+            desde = date.fromisoformat(options['desde']) if options['desde'] else None
+            ate = date.fromisoformat(options['ate']) if options['ate'] else None
+        except ValueError as e:
+            raise CommandError(f'Data inválida: {e}')
+
+        resultado = ResumoVendasService.reconstruir(
+            empresa_id=options['empresa'],
+            data_inicio=desde,
+            data_fim=ate
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollup reconstruído: {resultado['vendas_hora']} horas, "
+            f"{resultado['produtos_hora']} produto/hora, "
+            f"{resultado['pagamentos_hora']} pagamento/hora"
+        ))
@@ -0,0 +1,79 @@
+# Generated by Django 5.0.14 on 2026-10-17 12:57
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_ficha_tecnica_explodida'),
+        ('sales', '0005_alter_venda_tipo_pagamento'),
+        ('tenant', '0006_empresa_versao_cardapio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoPagamentoHora',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Identificador único universal (UUID v4)', primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Atualizado em')),
+                ('is_active', models.BooleanField(db_index=True, default=True, help_text='Indica se o registro está ativo (soft delete)', verbose_name='Ativo')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('hora', models.PositiveSmallIntegerField(verbose_name='Hora')),
+                ('tipo_pagamento', models.CharField(choices=[('DINHEIRO', 'Dinheiro'), ('PIX', 'PIX'), ('CARTAO_DEBITO', 'Cartão de Débito'), ('CARTAO_CREDITO', 'Cartão de Crédito'), ('BOLETO', 'Boleto'), ('TRANSFERENCIA', 'Transferência Bancária'), ('CONTA_CLIENTE', 'Conta Cliente (A Prazo)')], max_length=20, verbose_name='Tipo de Pagamento')),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Total')),
+                ('qtd_pedidos', models.IntegerField(default=0, verbose_name='Quantidade de Pedidos')),
+                ('empresa', models.ForeignKey(help_text='Empresa à qual este registro pertence (tenant)', on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_set', to='tenant.empresa', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Pagamento por Hora',
+                'verbose_name_plural': 'Resumos de Pagamento por Hora',
+                'unique_together': {('empresa', 'data', 'hora', 'tipo_pagamento')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoProdutoHora',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Identificador único universal (UUID v4)', primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Atualizado em')),
+                ('is_active', models.BooleanField(db_index=True, default=True, help_text='Indica se o registro está ativo (soft delete)', verbose_name='Ativo')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('hora', models.PositiveSmallIntegerField(verbose_name='Hora')),
+                ('quantidade', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=15, verbose_name='Quantidade Vendida')),
+                ('valor_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Soma de quantidade × preço unitário', max_digits=15, verbose_name='Valor Total')),
+                ('empresa', models.ForeignKey(help_text='Empresa à qual este registro pertence (tenant)', on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_set', to='tenant.empresa', verbose_name='Empresa')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.produto', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Produto por Hora',
+                'verbose_name_plural': 'Resumos de Produto por Hora',
+                'indexes': [models.Index(fields=['empresa', 'data'], name='sales_resum_empresa_555ffe_idx')],
+                'unique_together': {('empresa', 'data', 'hora', 'produto')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoVendaHora',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Identificador único universal (UUID v4)', primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Atualizado em')),
+                ('is_active', models.BooleanField(db_index=True, default=True, help_text='Indica se o registro está ativo (soft delete)', verbose_name='Ativo')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('hora', models.PositiveSmallIntegerField(help_text='Hora local (0-23) da finalização', verbose_name='Hora')),
+                ('total_vendas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15, verbose_name='Total Vendido')),
+                ('qtd_pedidos', models.IntegerField(default=0, verbose_name='Quantidade de Pedidos')),
+                ('empresa', models.ForeignKey(help_text='Empresa à qual este registro pertence (tenant)', on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_set', to='tenant.empresa', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Vendas por Hora',
+                'verbose_name_plural': 'Resumos de Vendas por Hora',
+                'ordering': ['data', 'hora'],
+                'unique_together': {('empresa', 'data', 'hora')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0004_sessaocaixa_totais'),
+        ('sales', '0006_resumo_vendas_hora'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venda',
+            name='sessao_caixa',
+            field=models.ForeignKey(blank=True, help_text='Turno de caixa em que a venda foi finalizada', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vendas', to='financial.sessaocaixa', verbose_name='Sessão de Caixa'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0007_venda_sessao_caixa'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['empresa', 'created_at', 'id'], name='sales_venda_empresa_d97e0c_idx'),
+        ),
+    ]
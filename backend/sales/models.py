@@ -164,6 +164,16 @@ class Venda(TenantModel):
         help_text='Forma de pagamento utilizada'
     )
     
+    sessao_caixa = models.ForeignKey(
+        'financial.SessaoCaixa',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='vendas',
+        verbose_name='Sessão de Caixa',
+        help_text='Turno de caixa em que a venda foi finalizada'
+    )
+    
     # Datas
     data_emissao = models.DateTimeField(
         auto_now_add=True,
@@ -203,6 +213,8 @@ class Venda(TenantModel):
             models.Index(fields=['vendedor', 'data_emissao']),
             models.Index(fields=['cliente', 'data_emissao']),
             models.Index(fields=['slug']),
+            # Paginação keyset do histórico (LedgerPagination)
+            models.Index(fields=['empresa', 'created_at', 'id']),
         ]
     
     def __str__(self):
@@ -215,18 +227,24 @@ class Venda(TenantModel):
         """
         Save com geração de número sequencial.
         
-        IMPORTANTE: Usa select_for_update() para prevenir race conditions
-        na geração do número sequencial.
+        IMPORTANTE: O número vem do contador da empresa (SequenciaNumeracao),
+        que trava uma única linha em vez de todas as vendas do tenant.
         """
         # Gera número sequencial se é uma nova venda
         if not self.numero:
-            # Lock para prevenir race condition
-            ultimo_numero = Venda.objects.select_for_update().filter(
-                empresa=self.empresa
-            ).aggregate(Max('numero'))['numero__max']
+            from tenant.services import SequenciaService
+            
+            def ultima_venda():
+                # Começa em 1001 se for a primeira venda
+                return Venda.all_objects.filter(
+                    empresa=self.empresa
+                ).aggregate(Max('numero'))['numero__max'] or 1000
             
-            # Começa em 1001 se for a primeira venda
-            self.numero = (ultimo_numero or 1000) + 1
+            self.numero = SequenciaService.proximo_numero(
+                self.empresa,
+                SequenciaService.CHAVE_VENDA,
+                semente=ultima_venda
+            )
         
         # Gera slug baseado no número
         if not self.slug:
@@ -597,3 +615,126 @@ class ItemVendaComplemento(TenantModel):
     def possui_produto_vinculado(self):
         """Verifica se complemento baixa estoque."""
         return self.complemento.possui_produto_vinculado
+
+
+class ResumoVendaHora(TenantModel):
+    """
+    Resumo horário de vendas finalizadas (rollup para dashboards).
+    
+    Atualizado de forma incremental ao finalizar/cancelar vendas
+    (ResumoVendasService) e reconstruível com o comando
+    reconstruir_resumo_vendas. Data e hora no fuso local.
+    """
+    
+    data = models.DateField(
+        verbose_name='Data'
+    )
+    
+    hora = models.PositiveSmallIntegerField(
+        verbose_name='Hora',
+        help_text='Hora local (0-23) da finalização'
+    )
+    
+    total_vendas = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Total Vendido'
+    )
+    
+    qtd_pedidos = models.IntegerField(
+        default=0,
+        verbose_name='Quantidade de Pedidos'
+    )
+    
+    class Meta:
+        verbose_name = 'Resumo de Vendas por Hora'
+        verbose_name_plural = 'Resumos de Vendas por Hora'
+        unique_together = ('empresa', 'data', 'hora')
+        ordering = ['data', 'hora']
+    
+    def __str__(self):
+        return f"{self.data} {self.hora:02d}h: {self.total_vendas}"
+
+
+class ResumoProdutoHora(TenantModel):
+    """Resumo horário de quantidade e valor vendidos por produto."""
+    
+    data = models.DateField(
+        verbose_name='Data'
+    )
+    
+    hora = models.PositiveSmallIntegerField(
+        verbose_name='Hora'
+    )
+    
+    produto = models.ForeignKey(
+        Produto,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Produto'
+    )
+    
+    quantidade = models.DecimalField(
+        max_digits=15,
+        decimal_places=3,
+        default=Decimal('0.000'),
+        verbose_name='Quantidade Vendida'
+    )
+    
+    valor_total = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Valor Total',
+        help_text='Soma de quantidade × preço unitário'
+    )
+    
+    class Meta:
+        verbose_name = 'Resumo de Produto por Hora'
+        verbose_name_plural = 'Resumos de Produto por Hora'
+        unique_together = ('empresa', 'data', 'hora', 'produto')
+        indexes = [
+            models.Index(fields=['empresa', 'data']),
+        ]
+    
+    def __str__(self):
+        return f"{self.data} {self.hora:02d}h {self.produto_id}: {self.quantidade}"
+
+
+class ResumoPagamentoHora(TenantModel):
+    """Resumo horário de vendas por forma de pagamento."""
+    
+    data = models.DateField(
+        verbose_name='Data'
+    )
+    
+    hora = models.PositiveSmallIntegerField(
+        verbose_name='Hora'
+    )
+    
+    tipo_pagamento = models.CharField(
+        max_length=20,
+        choices=TipoPagamento.choices,
+        verbose_name='Tipo de Pagamento'
+    )
+    
+    total = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Total'
+    )
+    
+    qtd_pedidos = models.IntegerField(
+        default=0,
+        verbose_name='Quantidade de Pedidos'
+    )
+    
+    class Meta:
+        verbose_name = 'Resumo de Pagamento por Hora'
+        verbose_name_plural = 'Resumos de Pagamento por Hora'
+        unique_together = ('empresa', 'data', 'hora', 'tipo_pagamento')
+    
+    def __str__(self):
+        return f"{self.data} {self.hora:02d}h {self.tipo_pagamento}: {self.total}"
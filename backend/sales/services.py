@@ -2,12 +2,24 @@
 Service Layer para o módulo de vendas.
 Orquestra regras de negócio complexas e integração entre módulos.
 """
-from django.db import transaction
+import threading
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from django.db import transaction, IntegrityError
+from django.db.models import F, Sum, Count, OuterRef, Subquery, Value, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce, TruncHour
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from decimal import Decimal
 
-from .models import Venda, ItemVenda, StatusVenda
+from .models import (
+    Venda, ItemVenda, ItemVendaComplemento, StatusVenda,
+    ResumoVendaHora, ResumoProdutoHora, ResumoPagamentoHora
+)
+
+
+# Vendas com totais pendentes de recálculo (por thread)
+_totais_adiados = threading.local()
 
 
 class VendaService:
@@ -22,6 +34,7 @@ class VendaService:
     - Cancelar vendas (com devolução de estoque)
     - Validar regras de negócio antes de operações
     - Garantir consistência transacional
+    - Manter totais da venda (recálculo em lote)
     """
     
     @staticmethod
@@ -46,7 +59,7 @@ class VendaService:
         Args:
             venda_id: UUID da venda a finalizar
             deposito_id: UUID do depósito de onde sair o estoque
-            usuario: Username do usuário finalizando (para auditoria)
+            usuario: CustomUser ou username do operador (caixa e auditoria)
             usar_lotes: Se True, usa controle FIFO. Se False, baixa sem lote (default: True)
             gerar_conta_receber: Se True, gera financeiro (default: True)
             tipo_pagamento: Forma de pagamento (opcional)
@@ -57,6 +70,59 @@ class VendaService:
         Raises:
             ValidationError: Se venda não pode ser finalizada ou estoque insuficiente
         """
+        # 1. Busca venda com lock para prevenir race condition
+        # (relacionamentos usados na comissão/crédito vêm no mesmo SELECT)
+        try:
+            venda = Venda.objects.select_for_update(of=('self',)).select_related(
+                'cliente', 'atendente', 'colaborador', 'vendedor'
+            ).get(id=venda_id)
+        except Venda.DoesNotExist:
+            raise ValidationError(f"Venda com ID {venda_id} não encontrada")
+        
+        # 2. Busca itens da venda (uma query, materializada uma única vez)
+        itens = list(venda.itens.select_related('produto'))
+        
+        return VendaService._finalizar(
+            venda=venda,
+            itens=itens,
+            deposito_id=deposito_id,
+            usuario=usuario,
+            usar_lotes=usar_lotes,
+            gerar_conta_receber=gerar_conta_receber,
+            tipo_pagamento=tipo_pagamento
+        )
+    
+    @staticmethod
+    def _finalizar(venda, itens, deposito_id, usuario=None, usar_lotes=True,
+                   gerar_conta_receber=True, tipo_pagamento=None, campos_alterados=()):
+        """
+        Núcleo da finalização, compartilhado por finalizar_venda e pelo
+        fechamento de mesas/comandas (RestaurantService.fechar_conta).
+        
+        Recebe a venda já travada e os itens já carregados; o chamador pode
+        ter alterado campos da venda em memória (cliente, atendente...) e
+        informá-los em campos_alterados: tudo é gravado em um único UPDATE.
+        
+        O caixa do operador é validado antes da baixa de estoque e a ficha
+        técnica é explodida uma única vez para validação e baixa.
+        
+        Args:
+            venda: Venda travada (select_for_update)
+            itens: Lista de ItemVenda com produto carregado
+            deposito_id: UUID do depósito de onde sair o estoque
+            usuario: CustomUser ou username do operador
+            usar_lotes: Se True, usa controle FIFO
+            gerar_conta_receber: Se True, gera financeiro
+            tipo_pagamento: Forma de pagamento (opcional, grava na venda)
+            campos_alterados: Campos da venda alterados pelo chamador
+        
+        Returns:
+            Venda: Instância da venda finalizada
+        
+        Raises:
+            ValidationError: Se venda não pode ser finalizada, estoque
+                insuficiente ou operador sem caixa aberto
+        """
         # Import tardio para evitar circular import
         from stock.models import Deposito
         from stock.services import StockService
@@ -64,35 +130,44 @@ class VendaService:
         from financial.models import TipoMovimentoCaixa
         from authentication.models import CustomUser
         
-        # 1. Busca venda com lock para prevenir race condition
-        try:
-            venda = Venda.objects.select_for_update().get(id=venda_id)
-        except Venda.DoesNotExist:
-            raise ValidationError(f"Venda com ID {venda_id} não encontrada")
-        
-        # 2. Valida se venda pode ser finalizada
+        # 1. Valida se venda pode ser finalizada
         if not venda.pode_ser_finalizada:
             raise ValidationError(
                 f"Venda #{venda.numero} não pode ser finalizada. "
                 f"Status atual: {venda.get_status_display()}"
             )
         
-        # 3. Busca depósito
+        if not itens:
+            raise ValidationError(
+                f"Venda #{venda.numero} não possui itens. "
+                "Adicione produtos antes de finalizar."
+            )
+        
+        # 2. Busca depósito
         try:
-            deposito = Deposito.objects.get(id=deposito_id, empresa=venda.empresa)
+            deposito = Deposito.objects.select_related('empresa').get(
+                id=deposito_id, empresa_id=venda.empresa_id
+            )
         except Deposito.DoesNotExist:
             raise ValidationError(f"Depósito com ID {deposito_id} não encontrado")
         
-        # 4. Busca itens da venda
-        itens = venda.itens.select_related('produto').all()
+        # 3. CAIXA PDV: Validação antes de qualquer escrita
+        # REGRA: Toda venda finalizada deve ter um caixa aberto pelo operador (turno).
+        user_obj = None
+        if usuario:
+            if isinstance(usuario, CustomUser):
+                user_obj = usuario
+            elif isinstance(usuario, str):
+                user_obj = CustomUser.objects.filter(username=usuario).first()
         
-        if not itens.exists():
-            raise ValidationError(
-                f"Venda #{venda.numero} não possui itens. "
-                "Adicione produtos antes de finalizar."
-            )
+        if not user_obj:
+            raise ValidationError("Usuário não identificado para validação de caixa.")
+
+        sessao = CaixaService.get_sessao_aberta(user_obj)
+        if not sessao:
+            raise ValidationError("Operador não possui caixa aberto. Abra o caixa para finalizar a venda.")
         
-        # 5. VALIDAÇÃO DE CRÉDITO (Se for Conta Cliente)
+        # 4. VALIDAÇÃO DE CRÉDITO (Se for Conta Cliente)
         if tipo_pagamento == 'CONTA_CLIENTE':
             if not venda.cliente:
                 raise ValidationError("Vendas a prazo exigem um cliente cadastrado.")
@@ -108,39 +183,40 @@ class VendaService:
                         f"Total Venda: R$ {venda.total_liquido}."
                     )
         
-        # 6. VALIDAÇÃO PRÉVIA: Usa StockService para validar estoque
-        # (Funciona com explosão de BOM e lotes)
-        erros_estoque = []
-        for item in itens:
-            resultado = StockService.validar_estoque_disponivel(
-                produto=item.produto,
-                deposito=deposito,
-                quantidade_necessaria=item.quantidade,
-                usar_lotes=usar_lotes
-            )
-            
-            if not resultado['disponivel']:
-                erros_estoque.append(
-                    f"• {item.produto.nome}: Necessário {item.quantidade}, "
-                    f"Disponível {resultado['quantidade_disponivel']}"
-                )
+        # 5. VALIDAÇÃO PRÉVIA: Usa StockService para validar estoque
+        # (Demanda consolidada da venda inteira, com explosão de BOM e lotes;
+        # a mesma explosão é reaproveitada na baixa)
+        explosao = StockService.explodir_necessidades(
+            [(item.produto, item.quantidade) for item in itens]
+        )
+        validacao = StockService.validar_estoque_itens(
+            itens=itens,
+            deposito=deposito,
+            usar_lotes=usar_lotes,
+            explosao=explosao
+        )
         
         # Se houver erros de estoque, aborta com mensagem detalhada
-        if erros_estoque:
+        if not validacao['disponivel']:
             raise ValidationError(
                 "Estoque insuficiente para finalizar venda:\n" + 
-                "\n".join(erros_estoque)
+                "\n".join(
+                    f"• {d['produto']}: Necessário {d['quantidade_necessaria']}, "
+                    f"Disponível {d['quantidade_disponivel']}"
+                    for d in validacao['deficits']
+                )
             )
         
         # 6. Processa baixa de estoque usando StockService
-        # (Automaticamente explode BOM e usa FIFO se aplicável)
+        # (Explode BOM da venda inteira e usa FIFO se aplicável, em lote)
         try:
-            for item in itens:
-                StockService.processar_baixa_venda(
-                    item_venda=item,
-                    deposito=deposito,
-                    usar_lotes=usar_lotes
-                )
+            StockService.processar_baixa_itens(
+                itens=itens,
+                deposito=deposito,
+                origem=f"VENDA-{venda.numero}",
+                usar_lotes=usar_lotes,
+                explosao=explosao
+            )
         except Exception as e:
             # Rollback automático pela transação
             raise ValidationError(
@@ -166,32 +242,27 @@ class VendaService:
             if percentual > 0:
                 venda.comissao_valor = (venda.total_liquido * percentual) / 100
         
+        campos = ['status', 'data_finalizacao', 'updated_at', 'colaborador', 'atendente',
+                  'comissao_valor', 'sessao_caixa']
+        venda.sessao_caixa = sessao
+        if tipo_pagamento:
+            venda.tipo_pagamento = tipo_pagamento
+            campos.append('tipo_pagamento')
+        campos.extend(campo for campo in campos_alterados if campo not in campos)
+        
         venda.status = StatusVenda.FINALIZADA
         venda.data_finalizacao = timezone.now()
-        venda.save(update_fields=['status', 'data_finalizacao', 'updated_at', 'colaborador', 'atendente', 'comissao_valor'])
+        venda.save(update_fields=campos)
+        ResumoVendasService.agendar_registro(venda)
         
         # 8. FATURAMENTO: Gera contas a receber automaticamente (à vista por padrão)
         if gerar_conta_receber:
             from financial.services import FinanceiroService
             FinanceiroService.gerar_conta_receber_venda(venda)
         
-        # 9. CAIXA PDV: Validação e Registro
-        # REGRA: Toda venda finalizada deve ter um caixa aberto pelo operador (turno).
-        user_obj = None
-        if usuario:
-            if isinstance(usuario, CustomUser):
-                user_obj = usuario
-            elif isinstance(usuario, str):
-                user_obj = CustomUser.objects.filter(username=usuario).first()
-        
-        if not user_obj:
-            raise ValidationError("Usuário não identificado para validação de caixa.")
-
-        sessao = CaixaService.get_sessao_aberta(user_obj)
-        if not sessao:
-            raise ValidationError("Operador não possui caixa aberto. Abra o caixa para finalizar a venda.")
-            
-        # Registra movimento apenas se for Dinheiro (outros entram na conciliação do fechamento)
+        # 9. Totais do turno por forma de pagamento; movimento na gaveta apenas
+        # se for Dinheiro (outros entram na conciliação do fechamento)
+        CaixaService.registrar_venda(sessao, venda)
         if tipo_pagamento == 'DINHEIRO':
             CaixaService.registrar_movimento(
                 sessao=sessao,
@@ -295,6 +366,7 @@ class VendaService:
             venda.observacoes = (venda.observacoes or '') + observacao_cancelamento
         
         venda.save(update_fields=['status', 'data_cancelamento', 'observacoes', 'updated_at'])
+        ResumoVendasService.agendar_registro(venda, sinal=-1)
         
         return venda
     
@@ -316,7 +388,8 @@ class VendaService:
                 'detalhes': list[dict]
             }
         """
-        from stock.models import Saldo
+        from stock.models import Deposito
+        from stock.services import StockService
         
         try:
             venda = Venda.objects.get(id=venda_id)
@@ -327,43 +400,344 @@ class VendaService:
                 'detalhes': []
             }
         
-        itens = venda.itens.select_related('produto').all()
-        erros = []
-        detalhes = []
+        try:
+            deposito = Deposito.objects.get(id=deposito_id, empresa=venda.empresa)
+        except Deposito.DoesNotExist:
+            return {
+                'disponivel': False,
+                'erros': [f"Depósito com ID {deposito_id} não encontrado"],
+                'detalhes': []
+            }
         
-        for item in itens:
-            try:
-                saldo = Saldo.objects.get(
-                    empresa=venda.empresa,
-                    produto=item.produto,
-                    deposito_id=deposito_id
-                )
-                
-                disponivel = saldo.quantidade >= item.quantidade
-                
-                detalhes.append({
-                    'produto': item.produto.nome,
-                    'necessario': float(item.quantidade),
-                    'disponivel': float(saldo.quantidade),
-                    'suficiente': disponivel
-                })
-                
-                if not disponivel:
-                    erros.append(
-                        f"{item.produto.nome}: Necessário {item.quantidade}, "
-                        f"Disponível {saldo.quantidade}"
-                    )
-            except Saldo.DoesNotExist:
-                detalhes.append({
-                    'produto': item.produto.nome,
-                    'necessario': float(item.quantidade),
-                    'disponivel': 0.0,
-                    'suficiente': False
-                })
-                erros.append(f"{item.produto.nome}: Sem estoque no depósito")
+        # Demanda consolidada por insumo (explode fichas técnicas) contra o Saldo
+        validacao = StockService.validar_estoque_itens(
+            itens=venda.itens.select_related('produto'),
+            deposito=deposito,
+            usar_lotes=False
+        )
+        
+        detalhes = [
+            {
+                'produto': d['produto'],
+                'necessario': float(d['quantidade_necessaria']),
+                'disponivel': float(d['quantidade_disponivel']),
+                'suficiente': d['deficit'] == 0
+            }
+            for d in validacao['detalhes']
+        ]
+        erros = [
+            f"{d['produto']}: Necessário {d['quantidade_necessaria']}, "
+            f"Disponível {d['quantidade_disponivel']}"
+            if d['quantidade_disponivel'] > 0
+            else f"{d['produto']}: Sem estoque no depósito"
+            for d in validacao['deficits']
+        ]
         
         return {
             'disponivel': len(erros) == 0,
             'erros': erros,
             'detalhes': detalhes
         }
+    
+    @staticmethod
+    def recalcular_totais(venda_ids):
+        """
+        Recalcula subtotais dos itens e totais das vendas via SQL.
+        
+        Dois UPDATEs, independentemente do número de itens/complementos:
+        1. Subtotal de cada item = quantidade × preço + complementos - desconto
+        2. Totais da venda agregados a partir dos subtotais dos itens
+        
+        Args:
+            venda_ids: Iterable de UUIDs de vendas
+        """
+        venda_ids = list(set(venda_ids))
+        if not venda_ids:
+            return
+        
+        decimal = DecimalField(max_digits=15, decimal_places=2)
+        zero = Value(Decimal('0.00'), output_field=decimal)
+        
+        def soma(queryset, campo, expressao):
+            return Coalesce(
+                Subquery(
+                    queryset.values(campo).annotate(total=Sum(expressao)).values('total'),
+                    output_field=decimal
+                ),
+                zero
+            )
+        
+        complementos = ItemVendaComplemento.objects.filter(item_pai=OuterRef('pk'))
+        ItemVenda.objects.filter(venda_id__in=venda_ids).update(
+            subtotal=(
+                F('quantidade') * F('preco_unitario')
+                - F('desconto')
+                + soma(complementos, 'item_pai', 'subtotal')
+            )
+        )
+        
+        itens = ItemVenda.objects.filter(venda=OuterRef('pk'))
+        Venda.all_objects.filter(id__in=venda_ids).update(
+            total_bruto=soma(itens, 'venda', F('subtotal') + F('desconto')),
+            total_desconto=soma(itens, 'venda', 'desconto'),
+            total_liquido=soma(itens, 'venda', 'subtotal'),
+            updated_at=timezone.now()
+        )
+    
+    @staticmethod
+    def marcar_totais_alterados(venda_id):
+        """
+        Registra que os itens de uma venda mudaram.
+        
+        Recalcula imediatamente, ou acumula se estiver dentro de
+        adiar_recalculo_totais().
+        
+        Returns:
+            bool: True se os totais foram recalculados agora
+        """
+        pendentes = getattr(_totais_adiados, 'vendas', None)
+        if pendentes is None:
+            VendaService.recalcular_totais([venda_id])
+            return True
+        pendentes.add(venda_id)
+        return False
+    
+    @staticmethod
+    @contextmanager
+    def adiar_recalculo_totais():
+        """
+        Adia o recálculo de totais até o fim do bloco.
+        
+        Gravações de itens e complementos dentro do bloco apenas marcam a
+        venda como alterada; na saída, cada venda é recalculada uma única
+        vez. O recálculo ocorre dentro da transação corrente (e não no
+        commit) para que o próprio fluxo enxergue os totais atualizados.
+        Blocos aninhados são absorvidos pelo mais externo.
+        
+        Instâncias em memória não são atualizadas: use refresh_from_db()
+        se precisar dos totais após o bloco.
+        
+        Exemplo:
+            >>> with VendaService.adiar_recalculo_totais():
+            ...     item = ItemVenda.objects.create(...)
+            ...     ItemVendaComplemento.objects.create(item_pai=item, ...)
+        """
+        if getattr(_totais_adiados, 'vendas', None) is not None:
+            yield
+            return
+        
+        _totais_adiados.vendas = set()
+        try:
+            yield
+            vendas = _totais_adiados.vendas
+        finally:
+            _totais_adiados.vendas = None
+        
+        VendaService.recalcular_totais(vendas)
+
+
+class ResumoVendasService:
+    """
+    Rollup horário de vendas finalizadas (ResumoVendaHora, ResumoProdutoHora,
+    ResumoPagamentoHora).
+    
+    Responsabilidades:
+    - Acumular a venda no seu bucket (data/hora local da finalização) após
+      o commit de finalizar_venda, e estornar após cancelar_venda
+    - Reconstruir os buckets de um período (backfill)
+    - Servir o resumo do dia lendo apenas os buckets
+    """
+    
+    @staticmethod
+    def _bucket(momento):
+        """(data, hora) no fuso local."""
+        local = timezone.localtime(momento)
+        return local.date(), local.hour
+    
+    @staticmethod
+    def _valor_itens():
+        return ExpressionWrapper(
+            F('quantidade') * F('preco_unitario'),
+            output_field=DecimalField(max_digits=15, decimal_places=2)
+        )
+    
+    @staticmethod
+    def _acumular(modelo, chave, incrementos, criar=True):
+        """Soma os incrementos na linha da chave (UPDATE com F; cria se não existir)."""
+        valores = {campo: F(campo) + valor for campo, valor in incrementos.items()}
+        valores['updated_at'] = timezone.now()
+        if modelo.objects.filter(**chave).update(**valores) or not criar:
+            return
+        try:
+            with transaction.atomic():
+                modelo.objects.create(**chave, **incrementos)
+        except IntegrityError:
+            # Criada por transação concorrente
+            modelo.objects.filter(**chave).update(**valores)
+    
+    @staticmethod
+    @transaction.atomic
+    def registrar_venda(venda, sinal=1):
+        """
+        Aplica (sinal=1) ou estorna (sinal=-1) a venda nos buckets.
+        
+        Estornos não criam buckets: vendas anteriores ao rollup só são
+        contabilizadas após reconstruir().
+        """
+        data, hora = ResumoVendasService._bucket(venda.data_finalizacao)
+        chave = {'empresa_id': venda.empresa_id, 'data': data, 'hora': hora}
+        criar = sinal > 0
+        
+        ResumoVendasService._acumular(ResumoVendaHora, chave, {
+            'total_vendas': sinal * venda.total_liquido,
+            'qtd_pedidos': sinal,
+        }, criar)
+        ResumoVendasService._acumular(
+            ResumoPagamentoHora,
+            {**chave, 'tipo_pagamento': venda.tipo_pagamento},
+            {'total': sinal * venda.total_liquido, 'qtd_pedidos': sinal},
+            criar
+        )
+        
+        itens = ItemVenda.objects.filter(venda_id=venda.id).values('produto_id').annotate(
+            qtd=Sum('quantidade'),
+            valor=Sum(ResumoVendasService._valor_itens())
+        )
+        for linha in itens:
+            ResumoVendasService._acumular(
+                ResumoProdutoHora,
+                {**chave, 'produto_id': linha['produto_id']},
+                {'quantidade': sinal * linha['qtd'], 'valor_total': sinal * linha['valor']},
+                criar
+            )
+    
+    @staticmethod
+    def agendar_registro(venda, sinal=1):
+        """Registra a venda nos buckets após o commit da transação corrente."""
+        transaction.on_commit(lambda: ResumoVendasService.registrar_venda(venda, sinal))
+    
+    @staticmethod
+    @transaction.atomic
+    def reconstruir(empresa_id=None, data_inicio=None, data_fim=None):
+        """
+        Recalcula os buckets do período a partir das vendas (backfill).
+        
+        Args:
+            empresa_id: UUID da empresa (None = todas)
+            data_inicio: Data inicial (inclusive, None = desde a primeira venda)
+            data_fim: Data final (inclusive, None = até hoje)
+        
+        Returns:
+            dict: Quantidade de linhas geradas por tabela
+        """
+        tz = timezone.get_current_timezone()
+        vendas = Venda.objects.filter(status=StatusVenda.FINALIZADA)
+        resumos = [ResumoVendaHora, ResumoProdutoHora, ResumoPagamentoHora]
+        filtros_resumo = {}
+        
+        if empresa_id:
+            vendas = vendas.filter(empresa_id=empresa_id)
+            filtros_resumo['empresa_id'] = empresa_id
+        if data_inicio:
+            vendas = vendas.filter(
+                data_finalizacao__gte=timezone.make_aware(datetime.combine(data_inicio, time.min), tz)
+            )
+            filtros_resumo['data__gte'] = data_inicio
+        if data_fim:
+            vendas = vendas.filter(
+                data_finalizacao__lt=timezone.make_aware(datetime.combine(data_fim + timedelta(days=1), time.min), tz)
+            )
+            filtros_resumo['data__lte'] = data_fim
+        
+        for modelo in resumos:
+            modelo.all_objects.filter(**filtros_resumo).delete()
+        
+        hora = TruncHour('data_finalizacao', tzinfo=tz)
+        linhas_venda = []
+        for linha in vendas.values('empresa_id', momento=hora).annotate(
+            total=Sum('total_liquido'), qtd=Count('id')
+        ):
+            data, h = ResumoVendasService._bucket(linha['momento'])
+            linhas_venda.append(ResumoVendaHora(
+                empresa_id=linha['empresa_id'], data=data, hora=h,
+                total_vendas=linha['total'], qtd_pedidos=linha['qtd']
+            ))
+        
+        linhas_pagamento = []
+        for linha in vendas.values('empresa_id', 'tipo_pagamento', momento=hora).annotate(
+            total=Sum('total_liquido'), qtd=Count('id')
+        ):
+            data, h = ResumoVendasService._bucket(linha['momento'])
+            linhas_pagamento.append(ResumoPagamentoHora(
+                empresa_id=linha['empresa_id'], data=data, hora=h,
+                tipo_pagamento=linha['tipo_pagamento'],
+                total=linha['total'], qtd_pedidos=linha['qtd']
+            ))
+        
+        linhas_produto = []
+        itens = ItemVenda.objects.filter(venda__in=vendas)
+        for linha in itens.values(
+            'empresa_id', 'produto_id',
+            momento=TruncHour('venda__data_finalizacao', tzinfo=tz)
+        ).annotate(qtd=Sum('quantidade'), valor=Sum(ResumoVendasService._valor_itens())):
+            data, h = ResumoVendasService._bucket(linha['momento'])
+            linhas_produto.append(ResumoProdutoHora(
+                empresa_id=linha['empresa_id'], data=data, hora=h,
+                produto_id=linha['produto_id'],
+                quantidade=linha['qtd'], valor_total=linha['valor']
+            ))
+        
+        ResumoVendaHora.objects.bulk_create(linhas_venda, batch_size=1000)
+        ResumoPagamentoHora.objects.bulk_create(linhas_pagamento, batch_size=1000)
+        ResumoProdutoHora.objects.bulk_create(linhas_produto, batch_size=1000)
+        
+        return {
+            'vendas_hora': len(linhas_venda),
+            'pagamentos_hora': len(linhas_pagamento),
+            'produtos_hora': len(linhas_produto),
+        }
+    
+    @staticmethod
+    def resumo_periodo(empresa, data_inicio, data_fim=None, ranking=5):
+        """
+        Métricas de vendas de um período lidas dos buckets.
+        
+        Args:
+            empresa: Empresa (tenant)
+            data_inicio: Data inicial (inclusive)
+            data_fim: Data final (inclusive, padrão = data_inicio)
+            ranking: Tamanho do ranking de produtos
+        
+        Returns:
+            dict: total_vendas, qtd_pedidos, ticket_medio, ranking_produtos,
+                vendas_por_hora e vendas_por_pagamento
+        """
+        filtros = {
+            'empresa': empresa,
+            'data__gte': data_inicio,
+            'data__lte': data_fim or data_inicio,
+        }
+        
+        horas = list(ResumoVendaHora.objects.filter(**filtros).values('hora').annotate(
+            total=Sum('total_vendas'), qtd=Sum('qtd_pedidos')
+        ).order_by('hora'))
+        total_vendas = sum((h['total'] for h in horas), Decimal('0.00'))
+        qtd_pedidos = sum(h['qtd'] for h in horas)
+        
+        produtos = ResumoProdutoHora.objects.filter(**filtros).values('produto__nome').annotate(
+            quantidade_vendida=Sum('quantidade'),
+            valor_total=Sum('valor_total')
+        ).filter(quantidade_vendida__gt=0).order_by('-quantidade_vendida')[:ranking]
+        
+        pagamentos = ResumoPagamentoHora.objects.filter(**filtros).values('tipo_pagamento').annotate(
+            total=Sum('total'), qtd=Sum('qtd_pedidos')
+        ).filter(qtd__gt=0).order_by('-total')
+        
+        return {
+            'total_vendas': total_vendas,
+            'qtd_pedidos': qtd_pedidos,
+            'ticket_medio': (total_vendas / qtd_pedidos) if qtd_pedidos else Decimal('0'),
+            'ranking_produtos': list(produtos),
+            'vendas_por_hora': [h for h in horas if h['total'] > 0],
+            'vendas_por_pagamento': list(pagamentos),
+        }
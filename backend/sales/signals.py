@@ -4,82 +4,75 @@ Automatiza cálculos e manutenção de dados derivados.
 """
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.db.models import Sum, F
-from decimal import Decimal
 
-from .models import ItemVenda, Venda
+from .models import ItemVenda, ItemVendaComplemento, Venda
+
+
+def _atualizar_em_memoria(venda=None, item=None):
+    """
+    Sincroniza instâncias já carregadas com os valores recalculados no banco.
+    
+    Preserva o comportamento esperado por quem segura a instância
+    (ex: item.subtotal na resposta da API logo após adicionar complementos).
+    """
+    if item is not None:
+        subtotal = ItemVenda.all_objects.filter(
+            pk=item.pk
+        ).values_list('subtotal', flat=True).first()
+        if subtotal is not None:
+            item.subtotal = subtotal
+        if ItemVenda.venda.is_cached(item):
+            venda = item.venda
+    
+    if venda is not None:
+        totais = Venda.all_objects.filter(pk=venda.pk).values(
+            'total_bruto', 'total_desconto', 'total_liquido'
+        ).first()
+        if totais:
+            for campo, valor in totais.items():
+                setattr(venda, campo, valor)
 
 
 @receiver(post_save, sender=ItemVenda)
 @receiver(post_delete, sender=ItemVenda)
 def recalcular_totais_venda(sender, instance, **kwargs):
     """
-    Recalcula os totais da venda quando um item é salvo ou deletado.
+    Marca a venda do item como alterada (recalcula os totais).
     
     Atualiza:
     - total_bruto: Soma de (quantidade × preço unitário + complementos) de todos os itens
     - total_desconto: Soma de descontos de todos os itens
     - total_liquido: total_bruto - total_desconto
     
-    IMPORTANTE: Este signal garante que os totais estejam sempre
-    sincronizados com os itens, incluindo complementos.
+    Dentro de VendaService.adiar_recalculo_totais() o recálculo é feito uma
+    única vez ao final do bloco; fora dele, é imediato (SQL único por tabela).
     """
-    venda = instance.venda
+    from sales.services import VendaService
     
-    # Calcula totais agregando os itens
-    # Nota: subtotal do item já inclui complementos (calculado no signal abaixo)
-    agregacao = venda.itens.aggregate(
-        total_bruto=Sum(F('quantidade') * F('preco_unitario')),
-        total_desconto=Sum('desconto'),
-        total_subtotais=Sum('subtotal')  # Já inclui complementos
-    )
-    
-    # Extrai valores (ou 0 se não houver itens)
-    total_bruto_itens = agregacao['total_bruto'] or Decimal('0.00')
-    total_desconto = agregacao['total_desconto'] or Decimal('0.00')
-    
-    # Soma complementos ao total bruto
-    from sales.models import ItemVendaComplemento
-    total_complementos = ItemVendaComplemento.objects.filter(
-        item_pai__venda=venda
-    ).aggregate(total=Sum('subtotal'))['total'] or Decimal('0.00')
-    
-    total_bruto = total_bruto_itens + total_complementos
-    total_liquido = total_bruto - total_desconto
-    
-    # Atualiza venda (apenas se valores mudaram)
-    if (venda.total_bruto != total_bruto or 
-        venda.total_desconto != total_desconto or 
-        venda.total_liquido != total_liquido):
-        
-        venda.total_bruto = total_bruto
-        venda.total_desconto = total_desconto
-        venda.total_liquido = total_liquido
-        
-        # Usa update_fields para evitar triggers desnecessários
-        venda.save(update_fields=['total_bruto', 'total_desconto', 'total_liquido', 'updated_at'])
+    if VendaService.marcar_totais_alterados(instance.venda_id):
+        if ItemVenda.venda.is_cached(instance):
+            _atualizar_em_memoria(venda=instance.venda)
 
 
-# Signal para recalcular subtotal do item quando complementos mudam
-@receiver(post_save, sender='sales.ItemVendaComplemento')
-@receiver(post_delete, sender='sales.ItemVendaComplemento')
+@receiver(post_save, sender=ItemVendaComplemento)
+@receiver(post_delete, sender=ItemVendaComplemento)
 def recalcular_subtotal_item(sender, instance, **kwargs):
     """
-    Recalcula subtotal do item quando seus complementos mudam.
+    Marca a venda do item como alterada quando seus complementos mudam.
     
     Subtotal do item = (quantidade × preço) + total_complementos - desconto
+    (recalculado junto com os totais da venda, sem re-salvar o item)
     """
-    item = instance.item_pai
-    
-    # Calcula total dos complementos
-    total_complementos = item.total_complementos
+    from sales.services import VendaService
     
-    # Calcula novo subtotal
-    base = item.quantidade * item.preco_unitario
-    novo_subtotal = base + total_complementos - item.desconto
+    if ItemVendaComplemento.item_pai.is_cached(instance):
+        item = instance.item_pai
+        venda_id = item.venda_id
+    else:
+        item = None
+        venda_id = ItemVenda.all_objects.filter(
+            pk=instance.item_pai_id
+        ).values_list('venda_id', flat=True).first()
     
-    # Atualiza apenas se mudou
-    if item.subtotal != novo_subtotal:
-        item.subtotal = novo_subtotal
-        item.save(update_fields=['subtotal', 'updated_at'])
-
+    if venda_id and VendaService.marcar_totais_alterados(venda_id) and item is not None:
+        _atualizar_em_memoria(item=item)
@@ -0,0 +1,63 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from tenant.models import Empresa, SequenciaNumeracao
+from tenant.services import SequenciaService
+from authentication.models import CustomUser, TipoCargo
+from sales.models import Venda
+
+class NumeracaoVendaTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Numeração',
+            razao_social='Empresa Numeração LTDA',
+            cnpj='11222333000181',
+            email='numeracao@empresa.test',
+        )
+        self.user = CustomUser.objects.create_user(
+            username='numeracao',
+            email='numeracao@empresa.test',
+            password='123456',
+            empresa=self.empresa,
+            cargo=TipoCargo.GERENTE,
+        )
+
+    def _venda(self):
+        return Venda.objects.create(
+            empresa=self.empresa,
+            vendedor=self.user,
+            tipo_pagamento='DINHEIRO',
+        )
+
+    def test_numeracao_sequencial_pelo_contador(self):
+        self.assertEqual(self._venda().numero, 1001)
+        self.assertEqual(self._venda().numero, 1002)
+        sequencia = SequenciaNumeracao.objects.get(empresa=self.empresa, chave=SequenciaService.CHAVE_VENDA)
+        self.assertEqual(sequencia.ultimo_numero, 1002)
+
+    def test_contador_semeado_pelas_vendas_existentes(self):
+        self._venda()
+        SequenciaNumeracao.objects.all().delete()
+        Venda.objects.filter(empresa=self.empresa).update(numero=5000)
+        self.assertEqual(self._venda().numero, 5001)
+
+    def test_nao_consulta_max_das_vendas(self):
+        self._venda()
+        with CaptureQueriesContext(connection) as ctx:
+            self._venda()
+        self.assertFalse([q for q in ctx.captured_queries if 'MAX(' in q['sql'].upper()])
+
+    def test_minimo_avanca_sem_retroceder(self):
+        chave = SequenciaService.chave_nfe('55', '1')
+        self.assertEqual(SequenciaService.proximo_numero(self.empresa, chave, minimo=40), 41)
+        self.assertEqual(SequenciaService.proximo_numero(self.empresa, chave, minimo=10), 42)
+
+    def test_series_de_nfe_independentes(self):
+        from nfe.services import NFeService
+        self.empresa.numero_nfe_atual = 100
+        self.empresa.save()
+
+        self.assertEqual(NFeService._gerar_numero_nfe(self.empresa, '1', '55'), 101)
+        self.assertEqual(NFeService._gerar_numero_nfe(self.empresa, '1', '65'), 1)
+        self.assertEqual(NFeService._gerar_numero_nfe(self.empresa, '2', '55'), 1)
+        self.assertEqual(NFeService._gerar_numero_nfe(self.empresa, '1', '55'), 102)
@@ -0,0 +1,71 @@
+from django.test import TestCase
+from django.utils import timezone
+from decimal import Decimal
+from tenant.models import Empresa
+from authentication.models import CustomUser, TipoCargo
+from catalog.models import Categoria, Produto, TipoProduto
+from sales.models import Venda, ItemVenda, StatusVenda, ResumoVendaHora
+from sales.services import ResumoVendasService
+
+class ResumoVendasTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Resumo',
+            razao_social='Empresa Resumo LTDA',
+            cnpj='11222333000181',
+            email='resumo@empresa.test',
+        )
+        self.user = CustomUser.objects.create_user(
+            username='resumo',
+            email='resumo@empresa.test',
+            password='123456',
+            empresa=self.empresa,
+            cargo=TipoCargo.GERENTE,
+        )
+        categoria = Categoria.objects.create(empresa=self.empresa, nome='Bebidas')
+        self.suco = Produto.objects.create(
+            empresa=self.empresa, nome='Suco', codigo_barras='7891',
+            categoria=categoria, tipo=TipoProduto.FINAL, preco_venda=Decimal('8.00'),
+        )
+        self.cafe = Produto.objects.create(
+            empresa=self.empresa, nome='Café', codigo_barras='7892',
+            categoria=categoria, tipo=TipoProduto.FINAL, preco_venda=Decimal('5.00'),
+        )
+        self.hoje = timezone.localdate()
+
+    def _venda_finalizada(self, itens, tipo_pagamento='DINHEIRO'):
+        venda = Venda.objects.create(
+            empresa=self.empresa, vendedor=self.user, tipo_pagamento=tipo_pagamento,
+        )
+        for produto, qtd in itens:
+            ItemVenda.objects.create(
+                empresa=self.empresa, venda=venda, produto=produto,
+                quantidade=Decimal(qtd), preco_unitario=produto.preco_venda,
+            )
+        venda.refresh_from_db()
+        venda.status = StatusVenda.FINALIZADA
+        venda.data_finalizacao = timezone.now()
+        venda.save(update_fields=['status', 'data_finalizacao', 'updated_at'])
+        ResumoVendasService.registrar_venda(venda)
+        return venda
+
+    def test_incremental_e_estorno(self):
+        self._venda_finalizada([(self.suco, '2'), (self.cafe, '1')])
+        cancelada = self._venda_finalizada([(self.cafe, '3')], tipo_pagamento='PIX')
+        ResumoVendasService.registrar_venda(cancelada, sinal=-1)
+        
+        resumo = ResumoVendasService.resumo_periodo(self.empresa, self.hoje)
+        self.assertEqual(resumo['total_vendas'], Decimal('21.00'))
+        self.assertEqual(resumo['qtd_pedidos'], 1)
+        ranking = {p['produto__nome']: p['quantidade_vendida'] for p in resumo['ranking_produtos']}
+        self.assertEqual(ranking, {'Suco': Decimal('2.000'), 'Café': Decimal('1.000')})
+        self.assertEqual([p['tipo_pagamento'] for p in resumo['vendas_por_pagamento']], ['DINHEIRO'])
+
+    def test_reconstrucao_igual_ao_incremental(self):
+        self._venda_finalizada([(self.suco, '1')])
+        self._venda_finalizada([(self.suco, '1'), (self.cafe, '2')], tipo_pagamento='PIX')
+        incremental = ResumoVendasService.resumo_periodo(self.empresa, self.hoje)
+        
+        ResumoVendaHora.objects.all().delete()
+        ResumoVendasService.reconstruir(empresa_id=self.empresa.id, data_inicio=self.hoje)
+        self.assertEqual(ResumoVendasService.resumo_periodo(self.empresa, self.hoje), incremental)
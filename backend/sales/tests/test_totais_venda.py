@@ -0,0 +1,90 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+from tenant.models import Empresa
+from authentication.models import CustomUser, TipoCargo
+from catalog.models import Categoria, Produto, TipoProduto, GrupoComplemento, Complemento
+from sales.models import Venda, ItemVenda, ItemVendaComplemento, StatusVenda
+from sales.services import VendaService
+from restaurant.services import RestaurantService
+
+class TotaisVendaTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Totais',
+            razao_social='Empresa Totais LTDA',
+            cnpj='11222333000181',
+            email='totais@empresa.test',
+        )
+        self.user = CustomUser.objects.create_user(
+            username='totais',
+            email='totais@empresa.test',
+            password='123456',
+            empresa=self.empresa,
+            cargo=TipoCargo.GERENTE,
+        )
+        categoria = Categoria.objects.create(empresa=self.empresa, nome='Lanches')
+        self.burger = Produto.objects.create(
+            empresa=self.empresa,
+            nome='Burger',
+            categoria=categoria,
+            tipo=TipoProduto.FINAL,
+            preco_venda=Decimal('30.00'),
+            preco_custo=Decimal('12.00'),
+        )
+        grupo = GrupoComplemento.objects.create(empresa=self.empresa, nome='Adicionais')
+        self.bacon = Complemento.objects.create(
+            empresa=self.empresa, grupo=grupo, nome='Bacon', preco_adicional=Decimal('4.00'),
+        )
+        self.queijo = Complemento.objects.create(
+            empresa=self.empresa, grupo=grupo, nome='Queijo', preco_adicional=Decimal('3.00'),
+        )
+        self.venda = Venda.objects.create(
+            empresa=self.empresa,
+            vendedor=self.user,
+            status=StatusVenda.ORCAMENTO,
+        )
+
+    def _totais(self):
+        return Venda.objects.values_list(
+            'total_bruto', 'total_desconto', 'total_liquido'
+        ).get(id=self.venda.id)
+
+    def test_complementos_entram_no_subtotal_e_nos_totais(self):
+        item = ItemVenda.objects.create(
+            empresa=self.empresa, venda=self.venda, produto=self.burger,
+            quantidade=Decimal('2.000'), preco_unitario=Decimal('30.00'), desconto=Decimal('5.00'),
+        )
+        ItemVendaComplemento.objects.create(
+            empresa=self.empresa, item_pai=item, complemento=self.bacon, quantidade=Decimal('2.000'),
+        )
+        self.assertEqual(item.subtotal, Decimal('63.00'))
+        self.assertEqual(self._totais(), (Decimal('68.00'), Decimal('5.00'), Decimal('63.00')))
+
+    def test_recalculo_adiado_executa_uma_vez(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with VendaService.adiar_recalculo_totais():
+                item = ItemVenda.objects.create(
+                    empresa=self.empresa, venda=self.venda, produto=self.burger,
+                    quantidade=Decimal('1.000'), preco_unitario=Decimal('30.00'),
+                )
+                for complemento in [self.bacon, self.queijo]:
+                    ItemVendaComplemento.objects.create(
+                        empresa=self.empresa, item_pai=item, complemento=complemento,
+                    )
+                self.assertEqual(self._totais()[2], Decimal('0.00'))
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "sales_venda"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self._totais()[2], Decimal('37.00'))
+
+    def test_adicionar_varios_itens_de_uma_vez(self):
+        itens = RestaurantService._adicionar_itens_venda(self.venda, self.empresa, [
+            {'produto_id': self.burger.id, 'quantidade': 1,
+             'complementos': [{'complemento_id': self.bacon.id, 'quantidade': 1}]},
+            {'produto_id': self.burger.id, 'quantidade': 2},
+        ])
+        self.assertEqual([i.subtotal for i in itens], [Decimal('34.00'), Decimal('60.00')])
+        self.assertEqual(self.venda.total_liquido, Decimal('94.00'))
+        self.assertEqual(self._totais()[2], Decimal('94.00'))
+        self.assertEqual(ItemVenda.objects.get(id=itens[0].id).custo_unitario, Decimal('12.00'))
@@ -5,7 +5,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
 from datetime import timedelta
-from .models import Deposito, Saldo, Movimentacao, Lote
+from .models import Deposito, Saldo, Movimentacao, Lote, FechamentoEstoque, SaldoFechamento
 
 
 class LoteInline(admin.TabularInline):
@@ -191,3 +191,30 @@ class MovimentacaoAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         # Movimentações são imutáveis
         return False
+
+
+class SaldoFechamentoInline(admin.TabularInline):
+    """Inline com a posição de fechamento por produto/depósito/lote."""
+    model = SaldoFechamento
+    extra = 0
+    readonly_fields = ['produto', 'deposito', 'lote', 'quantidade']
+    fields = ['produto', 'deposito', 'lote', 'quantidade']
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(FechamentoEstoque)
+class FechamentoEstoqueAdmin(admin.ModelAdmin):
+    list_display = ['empresa', 'competencia', 'arquivado_em', 'arquivo']
+    list_filter = ['empresa']
+    readonly_fields = ['id', 'empresa', 'competencia', 'arquivado_em', 'arquivo', 'created_at', 'updated_at']
+    inlines = [SaldoFechamentoInline]
+    
+    def has_add_permission(self, request):
+        # Gerado pelo comando fechar_estoque
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
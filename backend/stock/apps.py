@@ -5,3 +5,7 @@ class StockConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stock'
     verbose_name = 'Estoque'
+    
+    def ready(self):
+        """Importa signals quando o app estiver pronto."""
+        import stock.signals  # noqa
@@ -0,0 +1,75 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.exportacao import CHUNK_SIZE, EXPORTACOES, em_blocos, linhas_ndjson
+from stock.models import FechamentoEstoque, Movimentacao
+from stock.services import StockService
+
+
+class Command(BaseCommand):
+    help = (
+        'Arquiva em NDJSON gzip as movimentações de meses já fechados (fechar_estoque) '
+        'mais antigos que a retenção e as remove do razão'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destino', required=True, help='Diretório dos arquivos')
+        parser.add_argument('--empresa', help='UUID da empresa (padrão: todas)')
+        parser.add_argument('--meses', type=int, default=12, help='Meses mantidos no banco (padrão: 12)')
+        parser.add_argument('--simular', action='store_true', help='Apenas lista os meses que seriam arquivados')
+
+    def handle(self, *args, **options):
+        limite = timezone.localdate().replace(day=1)
+        for _ in range(options['meses']):
+            limite = (limite - timedelta(days=1)).replace(day=1)
+
+        fechamentos = FechamentoEstoque.objects.filter(
+            arquivado_em__isnull=True, competencia__lt=limite
+        ).order_by('empresa_id', 'competencia')
+        if options['empresa']:
+            fechamentos = fechamentos.filter(empresa_id=options['empresa'])
+
+        exportacao = EXPORTACOES['movimentacoes']
+        total = 0
+        for fechamento in fechamentos:
+            pasta = os.path.join(options['destino'], str(fechamento.empresa_id))
+            caminho = os.path.join(pasta, f"movimentacoes-{fechamento.competencia:%Y-%m}.ndjson.gz")
+            if options['simular']:
+                self.stdout.write(f"{fechamento.empresa_id} {fechamento}: {caminho}")
+                continue
+
+            movimentacoes = Movimentacao.objects.filter(
+                empresa_id=fechamento.empresa_id,
+                created_at__gte=fechamento.inicio,
+                created_at__lt=fechamento.fim
+            )
+            gravadas = self._gravar(exportacao, movimentacoes, pasta, caminho)
+            if gravadas != movimentacoes.count():
+                raise CommandError(f"{caminho}: {gravadas} linhas gravadas, razão alterado durante o arquivamento.")
+
+            removidas = StockService.remover_movimentacoes_arquivadas(fechamento, caminho)
+            self.stdout.write(f"{fechamento.empresa_id} {fechamento}: {removidas} movimentações -> {caminho}")
+            total += removidas
+
+        self.stdout.write(self.style.SUCCESS(f"{total} movimentações arquivadas"))
+
+    def _gravar(self, exportacao, movimentacoes, pasta, caminho):
+        """Grava o arquivo (via .parcial + rename) e retorna o número de linhas."""
+        os.makedirs(pasta, exist_ok=True)
+        contador = [0]
+
+        def contar(linhas):
+            for linha in linhas:
+                contador[0] += 1
+                yield linha
+
+        linhas = exportacao.valores(movimentacoes).iterator(chunk_size=CHUNK_SIZE)
+        parcial = caminho + '.parcial'
+        with open(parcial, 'wb') as arquivo:
+            for bloco in em_blocos(contar(linhas_ndjson(exportacao.cabecalhos, linhas)), comprimir=True):
+                arquivo.write(bloco)
+        os.replace(parcial, caminho)
+        return contador[0]
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from stock.services import StockService
+from tenant.models import Empresa
+
+
+class Command(BaseCommand):
+    help = 'Fecha o razão de estoque até a competência (padrão: mês anterior), gravando os saldos de fechamento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', help='UUID da empresa (padrão: todas)')
+        parser.add_argument('--competencia', help='Mês a fechar, AAAA-MM (padrão: mês anterior)')
+
+    def handle(self, *args, **options):
+        if options['competencia']:
+            try:
+                competencia = datetime.strptime(options['competencia'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('Competência inválida, use AAAA-MM.')
+        else:
+            competencia = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+        empresas = Empresa.objects.all()
+        if options['empresa']:
+            empresas = empresas.filter(id=options['empresa'])
+
+        total = 0
+        for empresa in empresas:
+            try:
+                fechamentos = StockService.fechar_estoque(empresa.id, competencia)
+            except ValidationError as e:
+                self.stdout.write(f"{empresa}: {'; '.join(e.messages)}")
+                continue
+            for fechamento in fechamentos:
+                self.stdout.write(f"{empresa}: {fechamento} ({fechamento.saldos.count()} posições)")
+            total += len(fechamentos)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} meses fechados"))
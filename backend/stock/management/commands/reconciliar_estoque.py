@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from stock.services import StockService
+
+
+class Command(BaseCommand):
+    help = 'Detecta (e corrige com --corrigir) divergências entre Saldo, Lote, Movimentacao e o índice de disponibilidade'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', help='UUID da empresa (padrão: todas)')
+        parser.add_argument('--corrigir', action='store_true', help='Grava os valores esperados')
+
+    def handle(self, *args, **options):
+        resultado = StockService.reconciliar_estoque(
+            empresa_id=options['empresa'],
+            corrigir=options['corrigir']
+        )
+
+        for divergencia in resultado['saldos']:
+            self.stdout.write(
+                f"Saldo produto={divergencia['produto_id']} deposito={divergencia['deposito_id']}: "
+                f"{divergencia['atual']} -> {divergencia['esperado']}"
+            )
+        for divergencia in resultado['lotes']:
+            self.stdout.write(
+                f"Lote {divergencia['codigo_lote']}: {divergencia['atual']} -> {divergencia['esperado']}"
+            )
+        for divergencia in resultado['disponibilidades']:
+            self.stdout.write(
+                f"Disponibilidade produto={divergencia['produto_id']} deposito={divergencia['deposito_id']}: "
+                f"{divergencia['atual']} -> {divergencia['esperado']}"
+            )
+        for alerta in resultado['alertas']:
+            self.stdout.write(self.style.WARNING(f"Alerta: {alerta['motivo']} ({alerta})"))
+
+        total = sum(len(resultado[chave]) for chave in ('saldos', 'lotes', 'disponibilidades'))
+        acao = 'corrigidas' if options['corrigir'] else 'encontradas'
+        self.stdout.write(self.style.SUCCESS(f"{total} divergências {acao}"))
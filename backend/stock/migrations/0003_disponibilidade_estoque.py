@@ -0,0 +1,88 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:01
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def popular_disponibilidade(apps, schema_editor):
+    """Constrói o índice de disponibilidade a partir dos lotes existentes."""
+    Lote = apps.get_model('stock', 'Lote')
+    DisponibilidadeEstoque = apps.get_model('stock', 'DisponibilidadeEstoque')
+
+    indice = {}
+    lotes = Lote.objects.filter(is_active=True, quantidade_atual__gt=0).order_by(
+        'empresa_id', 'produto_id', 'deposito_id', 'data_validade', 'data_fabricacao', 'id'
+    ).values_list('id', 'empresa_id', 'produto_id', 'deposito_id', 'quantidade_atual')
+    for lote_id, empresa_id, produto_id, deposito_id, quantidade in lotes:
+        chave = (empresa_id, produto_id, deposito_id)
+        if chave not in indice:
+            indice[chave] = [Decimal('0.000'), lote_id]
+        indice[chave][0] += quantidade
+
+    DisponibilidadeEstoque.objects.bulk_create([
+        DisponibilidadeEstoque(
+            empresa_id=empresa_id,
+            produto_id=produto_id,
+            deposito_id=deposito_id,
+            quantidade_lotes=quantidade,
+            proximo_lote_id=lote_id,
+        )
+        for (empresa_id, produto_id, deposito_id), (quantidade, lote_id) in indice.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_ficha_tecnica_explodida'),
+        ('stock', '0002_add_lote_batch_control'),
+        ('tenant', '0006_empresa_versao_cardapio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisponibilidadeEstoque',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Identificador único universal (UUID v4)', primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Atualizado em')),
+                ('is_active', models.BooleanField(db_index=True, default=True, help_text='Indica se o registro está ativo (soft delete)', verbose_name='Ativo')),
+                ('quantidade_lotes', models.DecimalField(decimal_places=3, default=Decimal('0.000'), help_text='Soma dos lotes com saldo positivo (atualizado automaticamente)', max_digits=15, verbose_name='Disponível em Lotes')),
+            ],
+            options={
+                'verbose_name': 'Disponibilidade de Estoque',
+                'verbose_name_plural': 'Disponibilidades de Estoque',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(condition=models.Q(('quantidade_atual__gt', 0)), fields=['empresa', 'produto', 'deposito', 'data_validade', 'data_fabricacao'], name='stock_lote_fefo_ativo_idx'),
+        ),
+        migrations.AddField(
+            model_name='disponibilidadeestoque',
+            name='deposito',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disponibilidades', to='stock.deposito', verbose_name='Depósito'),
+        ),
+        migrations.AddField(
+            model_name='disponibilidadeestoque',
+            name='empresa',
+            field=models.ForeignKey(help_text='Empresa à qual este registro pertence (tenant)', on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_set', to='tenant.empresa', verbose_name='Empresa'),
+        ),
+        migrations.AddField(
+            model_name='disponibilidadeestoque',
+            name='produto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disponibilidades', to='catalog.produto', verbose_name='Produto'),
+        ),
+        migrations.AddField(
+            model_name='disponibilidadeestoque',
+            name='proximo_lote',
+            field=models.ForeignKey(blank=True, help_text='Lote com saldo e validade mais próxima', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='stock.lote', verbose_name='Próximo Lote FEFO'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='disponibilidadeestoque',
+            unique_together={('empresa', 'produto', 'deposito')},
+        ),
+        migrations.RunPython(popular_disponibilidade, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0003_disponibilidade_estoque'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimentacao',
+            index=models.Index(fields=['empresa', 'created_at', 'id'], name='stock_movim_empresa_a67cec_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:46
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_produto_termos_busca'),
+        ('stock', '0004_movimentacao_indice_keyset'),
+        ('tenant', '0006_empresa_versao_cardapio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FechamentoEstoque',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Identificador único universal (UUID v4)', primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Atualizado em')),
+                ('is_active', models.BooleanField(db_index=True, default=True, help_text='Indica se o registro está ativo (soft delete)', verbose_name='Ativo')),
+                ('competencia', models.DateField(help_text='Primeiro dia do mês fechado', verbose_name='Competência')),
+                ('arquivado_em', models.DateTimeField(blank=True, help_text='Quando as movimentações do mês foram arquivadas e removidas', null=True, verbose_name='Arquivado em')),
+                ('arquivo', models.CharField(blank=True, help_text='Arquivo com as movimentações arquivadas do mês', max_length=255, verbose_name='Arquivo')),
+                ('empresa', models.ForeignKey(help_text='Empresa à qual este registro pertence (tenant)', on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_set', to='tenant.empresa', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Fechamento de Estoque',
+                'verbose_name_plural': 'Fechamentos de Estoque',
+                'ordering': ['-competencia'],
+                'unique_together': {('empresa', 'competencia')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoFechamento',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Identificador único universal (UUID v4)', primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Data e hora de criação do registro', verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Data e hora da última atualização', verbose_name='Atualizado em')),
+                ('is_active', models.BooleanField(db_index=True, default=True, help_text='Indica se o registro está ativo (soft delete)', verbose_name='Ativo')),
+                ('quantidade', models.DecimalField(decimal_places=3, max_digits=15, verbose_name='Quantidade')),
+                ('deposito', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='stock.deposito', verbose_name='Depósito')),
+                ('empresa', models.ForeignKey(help_text='Empresa à qual este registro pertence (tenant)', on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_set', to='tenant.empresa', verbose_name='Empresa')),
+                ('fechamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='stock.fechamentoestoque', verbose_name='Fechamento')),
+                ('lote', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='stock.lote', verbose_name='Lote')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='catalog.produto', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Fechamento',
+                'verbose_name_plural': 'Saldos de Fechamento',
+                'indexes': [models.Index(fields=['fechamento', 'produto', 'deposito'], name='stock_saldo_fechame_00f0b3_idx')],
+            },
+        ),
+    ]
@@ -9,7 +9,9 @@ SEPARAÇÃO DE RESPONSABILIDADES (DDD):
 from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.utils.text import slugify
+from datetime import datetime, time, timedelta
 from decimal import Decimal
 
 from core.models import TenantModel
@@ -333,6 +335,8 @@ class Movimentacao(TenantModel):
             models.Index(fields=['empresa', 'tipo']),
             models.Index(fields=['created_at']),
             models.Index(fields=['documento']),
+            # Paginação keyset do histórico (LedgerPagination)
+            models.Index(fields=['empresa', 'created_at', 'id']),
         ]
     
     def __str__(self):
@@ -559,6 +563,12 @@ class Lote(TenantModel):
             models.Index(fields=['empresa', 'produto', 'deposito', 'data_validade']),
             models.Index(fields=['empresa', 'data_validade']),  # Para alertas globais
             models.Index(fields=['codigo_lote']),
+            # Índice parcial: só lotes com saldo participam do FEFO
+            models.Index(
+                fields=['empresa', 'produto', 'deposito', 'data_validade', 'data_fabricacao'],
+                condition=models.Q(quantidade_atual__gt=0),
+                name='stock_lote_fefo_ativo_idx'
+            ),
         ]
     
     def __str__(self):
@@ -649,3 +659,176 @@ class Lote(TenantModel):
                 'deposito': 'Depósito deve pertencer à mesma empresa'
             })
 
+
+
+class DisponibilidadeEstoque(TenantModel):
+    """
+    Índice de disponibilidade por Empresa × Produto × Depósito.
+    
+    Mantém pré-calculados o saldo em lotes e o próximo lote FEFO, para que
+    a checagem de disponibilidade e a primeira escolha FEFO sejam leituras
+    de uma única linha em vez de agregações sobre Lote.
+    
+    IMPORTANTE: Não edite manualmente. É atualizado na mesma transação que
+    altera os lotes (StockService.atualizar_disponibilidade) e pode ser
+    reconstruído com o comando reconciliar_estoque.
+    """
+    
+    produto = models.ForeignKey(
+        Produto,
+        on_delete=models.CASCADE,
+        related_name='disponibilidades',
+        verbose_name='Produto'
+    )
+    
+    deposito = models.ForeignKey(
+        Deposito,
+        on_delete=models.CASCADE,
+        related_name='disponibilidades',
+        verbose_name='Depósito'
+    )
+    
+    quantidade_lotes = models.DecimalField(
+        max_digits=15,
+        decimal_places=3,
+        default=Decimal('0.000'),
+        verbose_name='Disponível em Lotes',
+        help_text='Soma dos lotes com saldo positivo (atualizado automaticamente)'
+    )
+    
+    proximo_lote = models.ForeignKey(
+        Lote,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Próximo Lote FEFO',
+        help_text='Lote com saldo e validade mais próxima'
+    )
+    
+    class Meta:
+        verbose_name = 'Disponibilidade de Estoque'
+        verbose_name_plural = 'Disponibilidades de Estoque'
+        unique_together = [['empresa', 'produto', 'deposito']]
+    
+    def __str__(self):
+        """Representação amigável do índice."""
+        return f"{self.produto_id} @ {self.deposito_id}: {self.quantidade_lotes} em lotes"
+
+
+class FechamentoEstoque(TenantModel):
+    """
+    Fechamento mensal do razão de estoque (uma linha por empresa × mês).
+    
+    Os saldos de fechamento (SaldoFechamento) guardam a posição acumulada
+    ao fim da competência. Saldo em uma data = último fechamento anterior +
+    movimentações posteriores (StockService.saldo_em), então consultas e
+    reconciliações leem só a janela recente do razão.
+    
+    Meses fechados podem ter as movimentações arquivadas em arquivo
+    comprimido e removidas da tabela (comando arquivar_movimentacoes).
+    """
+    
+    competencia = models.DateField(
+        verbose_name='Competência',
+        help_text='Primeiro dia do mês fechado'
+    )
+    
+    arquivado_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Arquivado em',
+        help_text='Quando as movimentações do mês foram arquivadas e removidas'
+    )
+    
+    arquivo = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Arquivo',
+        help_text='Arquivo com as movimentações arquivadas do mês'
+    )
+    
+    class Meta:
+        verbose_name = 'Fechamento de Estoque'
+        verbose_name_plural = 'Fechamentos de Estoque'
+        ordering = ['-competencia']
+        unique_together = [['empresa', 'competencia']]
+    
+    def __str__(self):
+        """Representação amigável do fechamento."""
+        return f"Fechamento {self.competencia:%m/%Y}"
+    
+    @staticmethod
+    def inicio_competencia(competencia):
+        """Início (aware, fuso local) do mês da competência."""
+        return timezone.make_aware(datetime.combine(competencia.replace(day=1), time.min))
+    
+    @staticmethod
+    def proxima_competencia(competencia):
+        """Primeiro dia do mês seguinte."""
+        return (competencia.replace(day=1) + timedelta(days=32)).replace(day=1)
+    
+    @property
+    def inicio(self):
+        return self.inicio_competencia(self.competencia)
+    
+    @property
+    def fim(self):
+        """Limite exclusivo: movimentações com created_at < fim estão no fechamento."""
+        return self.inicio_competencia(self.proxima_competencia(self.competencia))
+
+
+class SaldoFechamento(TenantModel):
+    """
+    Posição de estoque ao fim de uma competência por Produto × Depósito × Lote.
+    
+    lote vazio agrega as movimentações sem lote. Posições zeradas não são
+    gravadas.
+    """
+    
+    fechamento = models.ForeignKey(
+        FechamentoEstoque,
+        on_delete=models.CASCADE,
+        related_name='saldos',
+        verbose_name='Fechamento'
+    )
+    
+    produto = models.ForeignKey(
+        Produto,
+        on_delete=models.PROTECT,
+        related_name='+',
+        verbose_name='Produto'
+    )
+    
+    deposito = models.ForeignKey(
+        Deposito,
+        on_delete=models.PROTECT,
+        related_name='+',
+        verbose_name='Depósito'
+    )
+    
+    lote = models.ForeignKey(
+        Lote,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Lote'
+    )
+    
+    quantidade = models.DecimalField(
+        max_digits=15,
+        decimal_places=3,
+        verbose_name='Quantidade'
+    )
+    
+    class Meta:
+        verbose_name = 'Saldo de Fechamento'
+        verbose_name_plural = 'Saldos de Fechamento'
+        indexes = [
+            models.Index(fields=['fechamento', 'produto', 'deposito']),
+        ]
+    
+    def __str__(self):
+        """Representação amigável do saldo de fechamento."""
+        return f"{self.produto_id} @ {self.deposito_id}: {self.quantidade}"
@@ -7,9 +7,16 @@ Responsabilidades:
 - Baixa de estoque em vendas
 - Validações de estoque
 """
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from django.db import transaction, models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+
+# Precisão das quantidades de estoque (Movimentacao/Saldo/Lote usam 3 casas)
+QUANTIDADE_ESTOQUE = Decimal('0.001')
 
 
 class StockService:
@@ -31,6 +38,9 @@ class StockService:
         - Produtos COMPOSTO: Explosão de ficha técnica (baixa os componentes)
         - Lotes: Consumo FIFO/FEFO automático
         
+        Para vendas com vários itens prefira processar_baixa_itens, que
+        consolida a venda inteira em uma única passada.
+        
         Args:
             item_venda: Instância de ItemVenda
             deposito: Depósito de onde baixar o estoque
@@ -44,177 +54,246 @@ class StockService:
             >>> deposito = Deposito.objects.get(is_padrao=True)
             >>> StockService.processar_baixa_venda(item, deposito)
         """
-        from catalog.models import TipoProduto
-        
-        produto = item_venda.produto
-        
-        if produto.tipo == TipoProduto.COMPOSTO:
-            # Explosão de Materiais (Bill of Materials - BOM)
-            StockService._baixar_produto_composto(
-                produto=produto,
-                quantidade=item_venda.quantidade,
-                deposito=deposito,
-                origem=f"VENDA-{item_venda.venda.numero if hasattr(item_venda.venda, 'numero') else item_venda.venda.id}",
-                usar_lotes=usar_lotes
-            )
-        else:
-            # Produto final ou insumo vendido diretamente
-            StockService._baixar_produto_simples(
-                produto=produto,
-                quantidade=item_venda.quantidade,
-                deposito=deposito,
-                origem=f"VENDA-{item_venda.venda.numero if hasattr(item_venda.venda, 'numero') else item_venda.venda.id}",
-                usar_lotes=usar_lotes
-            )
+        return StockService.processar_baixa_itens(
+            itens=[item_venda],
+            deposito=deposito,
+            origem=StockService._documento_venda(item_venda.venda),
+            usar_lotes=usar_lotes
+        )
     
     @staticmethod
-    def _baixar_produto_composto(produto, quantidade, deposito, origem, usar_lotes):
+    @transaction.atomic
+    def processar_baixa_itens(itens, deposito, origem, usar_lotes=True, explosao=None):
         """
-        Explosão recursiva da ficha técnica.
+        Baixa de estoque de uma venda inteira em uma única passada.
+        
+        Algoritmo:
+        1. Explode todas as fichas técnicas em necessidade líquida por produto
+           (uma query na BOM materializada)
+        2. Trava (select_for_update) Lotes e Saldos envolvidos uma única vez,
+           sempre na mesma ordem (produto_id) para evitar deadlocks
+        3. Calcula a alocação FEFO em memória
+        4. Grava movimentações, lotes e saldos com bulk_create/bulk_update
+        
+        O número de queries é constante em relação à quantidade de itens.
         
         Args:
-            produto: Produto COMPOSTO
-            quantidade: Quantidade do produto composto a ser produzido
-            deposito: Depósito de onde baixar componentes
-            origem: Descrição da origem (para auditoria)
-            usar_lotes: Se usa controle de lotes
+            itens: Iterable de ItemVenda (ou objetos com produto e quantidade)
+            deposito: Depósito de onde baixar o estoque
+            origem: Documento gravado nas movimentações (ex: VENDA-1001)
+            usar_lotes: Se True, consome lotes FIFO/FEFO
+            explosao: Retorno de explodir_necessidades já calculado para os
+                mesmos itens (evita explodir a BOM de novo)
+        
+        Returns:
+            list: Movimentações de SAIDA criadas
+        
+        Raises:
+            ValidationError: Se estoque insuficiente
         """
-        from catalog.models import TipoProduto
+        if explosao is None:
+            explosao = StockService.explodir_necessidades(
+                [(item.produto, item.quantidade) for item in itens]
+            )
+        necessidades, produtos = explosao
         
-        for item_ficha in produto.ficha_tecnica.select_related('componente').all():
-            qtd_a_baixar = quantidade * item_ficha.quantidade_liquida
-            componente = item_ficha.componente
-            
-            # Recursividade: Se o componente também for composto, explode novamente
-            if componente.tipo == TipoProduto.COMPOSTO:
-                StockService._baixar_produto_composto(
-                    produto=componente,
-                    quantidade=qtd_a_baixar,
-                    deposito=deposito,
-                    origem=origem,
-                    usar_lotes=usar_lotes
-                )
-            else:
-                # Componente é FINAL ou INSUMO, baixa direto
-                StockService._baixar_produto_simples(
-                    produto=componente,
-                    quantidade=qtd_a_baixar,
-                    deposito=deposito,
-                    origem=origem,
-                    usar_lotes=usar_lotes
-                )
+        if not necessidades:
+            return []
+        
+        return StockService._baixar_necessidades(
+            necessidades=necessidades,
+            produtos=produtos,
+            deposito=deposito,
+            origem=origem,
+            usar_lotes=usar_lotes
+        )
     
     @staticmethod
-    @transaction.atomic
-    def _baixar_produto_simples(produto, quantidade, deposito, origem, usar_lotes):
+    def explodir_necessidades(itens):
         """
-        Baixa de produto simples (FINAL ou INSUMO).
+        Explosão de Materiais (BOM) de vários produtos de uma só vez.
+        
+        Usa a ficha técnica explodida (FichaTecnicaExplodida): todos os
+        compostos são resolvidos com uma única query, qualquer que seja a
+        profundidade das receitas.
         
         Args:
-            produto: Produto a baixar
-            quantidade: Quantidade a baixar
-            deposito: Depósito
-            origem: Origem da movimentação
-            usar_lotes: Se True, usa FIFO. Se False, baixa sem lote
+            itens: Lista de tuplas (produto, quantidade)
+        
+        Returns:
+            tuple: (
+                {produto_id: Decimal} com a necessidade líquida de cada
+                produto FINAL/INSUMO,
+                {produto_id: Produto} com as instâncias envolvidas
+            )
         """
-        if usar_lotes:
-            StockService._baixar_com_fifo(produto, quantidade, deposito, origem)
-        else:
-            StockService._baixar_sem_lote(produto, quantidade, deposito, origem)
+        from catalog.models import FichaTecnicaExplodida, TipoProduto
+        
+        necessidades = defaultdict(Decimal)
+        produtos = {}
+        compostos = defaultdict(Decimal)
+        
+        for produto, quantidade in itens:
+            produtos[produto.id] = produto
+            if produto.tipo == TipoProduto.COMPOSTO:
+                compostos[produto.id] += Decimal(str(quantidade))
+            else:
+                necessidades[produto.id] += Decimal(str(quantidade))
+        
+        if compostos:
+            linhas = FichaTecnicaExplodida.objects.filter(
+                produto_pai_id__in=compostos.keys(),
+                folha=True
+            ).select_related('componente')
+            
+            for linha in linhas:
+                produtos[linha.componente_id] = linha.componente
+                necessidades[linha.componente_id] += compostos[linha.produto_pai_id] * linha.quantidade
+        
+        # Arredonda antes de filtrar: necessidades ínfimas viram zero e saem
+        necessidades = {
+            produto_id: qtd
+            for produto_id, qtd in (
+                (produto_id, qtd.quantize(QUANTIDADE_ESTOQUE))
+                for produto_id, qtd in necessidades.items()
+            )
+            if qtd > 0
+        }
+        return necessidades, produtos
     
     @staticmethod
-    def _baixar_com_fifo(produto, quantidade_total, deposito, origem):
+    def _documento_venda(venda):
+        """Documento padrão das movimentações de uma venda."""
+        return f"VENDA-{venda.numero if hasattr(venda, 'numero') else venda.id}"
+    
+    @staticmethod
+    def _baixar_necessidades(necessidades, produtos, deposito, origem, usar_lotes):
         """
-        Algoritmo FIFO/FEFO: Consome lotes por ordem de validade.
-        
-        Itera sobre lotes ordenados por data de validade (ascendente),
-        consumindo do mais próximo ao vencimento até completar a quantidade.
+        Aplica as necessidades líquidas no estoque com escrita em lote.
         
         Args:
-            produto: Produto a baixar
-            quantidade_total: Quantidade total a baixar
+            necessidades: {produto_id: Decimal} já explodido
+            produtos: {produto_id: Produto}
             deposito: Depósito
-            origem: Descrição da origem
+            origem: Documento da movimentação
+            usar_lotes: Se True, consome lotes FEFO
+        
+        Returns:
+            list: Movimentações criadas
         
         Raises:
-            ValidationError: Se estoque insuficiente nos lotes
+            ValidationError: Se estoque insuficiente (lotes ou saldo)
         """
-        from stock.models import Lote, Movimentacao, TipoMovimentacao
+        from stock.models import Lote, Saldo, Movimentacao, TipoMovimentacao
         
-        # Busca lotes disponíveis ordenados por validade (FEFO - First Expired, First Out)
-        lotes_disponiveis = Lote.objects.filter(
-            empresa=deposito.empresa,
-            produto=produto,
-            deposito=deposito,
-            quantidade_atual__gt=0
-        ).order_by('data_validade', 'data_fabricacao').select_for_update()
+        empresa = deposito.empresa
+        produto_ids = sorted(
+            (produto_id for produto_id, qtd in necessidades.items() if qtd > 0),
+            key=str
+        )
+        if not produto_ids:
+            return []
+        agora = timezone.now()
         
-        qtd_restante = quantidade_total
-        movimentacoes_criadas = []
+        # 1. Alocação FEFO em memória (lotes travados uma única vez, ordem fixa)
+        alocacoes = defaultdict(list)
+        lotes_alterados = []
         
-        for lote in lotes_disponiveis:
-            if qtd_restante <= 0:
-                break
+        if usar_lotes:
+            lotes = Lote.objects.select_for_update().filter(
+                empresa=empresa,
+                deposito=deposito,
+                produto_id__in=produto_ids,
+                quantidade_atual__gt=0
+            ).order_by('produto_id', 'data_validade', 'data_fabricacao', 'id')
             
-            # Quanto posso tirar deste lote?
-            qtd_a_retirar = min(qtd_restante, lote.quantidade_atual)
+            lotes_por_produto = defaultdict(list)
+            for lote in lotes:
+                lotes_por_produto[lote.produto_id].append(lote)
             
-            # 1. Cria movimentação linkada ao lote
-            mov = Movimentacao.objects.create(
-                empresa=deposito.empresa,
-                produto=produto,
+            for produto_id in produto_ids:
+                qtd_restante = necessidades[produto_id]
+                
+                for lote in lotes_por_produto[produto_id]:
+                    if qtd_restante <= 0:
+                        break
+                    
+                    qtd_a_retirar = min(qtd_restante, lote.quantidade_atual)
+                    lote.quantidade_atual -= qtd_a_retirar
+                    lote.updated_at = agora
+                    lotes_alterados.append(lote)
+                    alocacoes[produto_id].append((lote, qtd_a_retirar))
+                    qtd_restante -= qtd_a_retirar
+                
+                if qtd_restante > 0:
+                    produto = produtos[produto_id]
+                    raise ValidationError(
+                        f"Estoque insuficiente de '{produto.nome}' no depósito '{deposito.nome}'. "
+                        f"Necessário: {necessidades[produto_id]}, "
+                        f"Disponível em lotes: {necessidades[produto_id] - qtd_restante}"
+                    )
+        else:
+            for produto_id in produto_ids:
+                alocacoes[produto_id].append((None, necessidades[produto_id]))
+        
+        # 2. Saldos travados uma única vez, na mesma ordem dos lotes
+        saldos = {
+            saldo.produto_id: saldo
+            for saldo in Saldo.objects.select_for_update().filter(
+                empresa=empresa,
                 deposito=deposito,
-                lote=lote,
-                tipo=TipoMovimentacao.SAIDA,
-                quantidade=qtd_a_retirar,
-                valor_unitario=produto.preco_custo or Decimal('0'),
-                documento=origem,
-                observacao=f"FIFO - Lote {lote.codigo_lote}"
-            )
-            movimentacoes_criadas.append(mov)
+                produto_id__in=produto_ids
+            ).order_by('produto_id')
+        }
+        
+        movimentacoes = []
+        for produto_id in produto_ids:
+            produto = produtos[produto_id]
+            saldo = saldos.get(produto_id)
+            saldo_atual = saldo.quantidade if saldo else Decimal('0.000')
             
-            # 2. Atualiza saldo do lote
-            lote.quantidade_atual -= qtd_a_retirar
-            lote.save(update_fields=['quantidade_atual', 'updated_at'])
+            if saldo_atual - necessidades[produto_id] < 0:
+                raise ValidationError(
+                    f"Operação resultaria em saldo negativo: {saldo_atual - necessidades[produto_id]}. "
+                    f"Saldo atual: {saldo_atual}, "
+                    f"Tentativa de saída: {necessidades[produto_id]}"
+                )
             
-            qtd_restante -= qtd_a_retirar
-        
-        # Fallback: Estoque insuficiente?
-        if qtd_restante > 0:
-            # Rollback: Remove movimentações criadas
-            for mov in movimentacoes_criadas:
-                mov.delete()
+            for lote, quantidade in alocacoes[produto_id]:
+                movimentacoes.append(Movimentacao(
+                    empresa=empresa,
+                    produto=produto,
+                    deposito=deposito,
+                    lote=lote,
+                    tipo=TipoMovimentacao.SAIDA,
+                    quantidade=quantidade,
+                    valor_unitario=produto.preco_custo or Decimal('0'),
+                    documento=origem,
+                    observacao=(
+                        f"FIFO - Lote {lote.codigo_lote}" if lote
+                        else "Baixa sem controle de lote"
+                    )
+                ))
             
-            raise ValidationError(
-                f"Estoque insuficiente de '{produto.nome}' no depósito '{deposito.nome}'. "
-                f"Necessário: {quantidade_total}, Disponível em lotes: {quantidade_total - qtd_restante}"
-            )
-    
-    @staticmethod
-    def _baixar_sem_lote(produto, quantidade, deposito, origem):
-        """
-        Baixa de estoque SEM controle de lote (modo legado).
+            saldo.quantidade = saldo_atual - necessidades[produto_id]
+            saldo.updated_at = agora
         
-        Args:
-            produto: Produto a baixar
-            quantidade: Quantidade a baixar
-            deposito: Depósito
-            origem: Descrição da origem
-        """
-        from stock.models import Movimentacao, TipoMovimentacao
+        # 3. Escrita em lote
+        Movimentacao.objects.bulk_create(movimentacoes)
         
-        # Cria movimentação simples sem lote
-        Movimentacao.objects.create(
-            empresa=deposito.empresa,
-            produto=produto,
-            deposito=deposito,
-            lote=None,
-            tipo=TipoMovimentacao.SAIDA,
-            quantidade=quantidade,
-            valor_unitario=produto.preco_custo or Decimal('0'),
-            documento=origem,
-            observacao="Baixa sem controle de lote"
+        ultima_por_produto = {mov.produto_id: mov for mov in movimentacoes}
+        for produto_id, saldo in saldos.items():
+            saldo.ultima_movimentacao = ultima_por_produto[produto_id]
+        
+        if lotes_alterados:
+            Lote.objects.bulk_update(lotes_alterados, ['quantidade_atual', 'updated_at'])
+            StockService.atualizar_disponibilidade(deposito, produto_ids)
+        Saldo.objects.bulk_update(
+            list(saldos.values()),
+            ['quantidade', 'ultima_movimentacao', 'updated_at']
         )
+        
+        return movimentacoes
     
     @staticmethod
     @transaction.atomic
@@ -244,19 +323,8 @@ class StockService:
         from stock.models import Lote, Movimentacao, TipoMovimentacao
         
         # Normaliza datas se vierem como string
-        from datetime import date
-        def _to_date(d):
-            if d is None:
-                return None
-            if isinstance(d, date):
-                return d
-            try:
-                return date.fromisoformat(str(d))
-            except Exception:
-                return None
-        
-        data_validade = _to_date(data_validade)
-        data_fabricacao = _to_date(data_fabricacao)
+        data_validade = StockService._para_data(data_validade)
+        data_fabricacao = StockService._para_data(data_fabricacao)
         
         # Busca ou cria o lote
         lote, created = Lote.objects.get_or_create(
@@ -298,6 +366,178 @@ class StockService:
         
         return lote, mov
     
+    @staticmethod
+    def _para_data(valor):
+        """Converte string ISO em date (None se vazio ou inválido)."""
+        if valor is None:
+            return None
+        if isinstance(valor, date):
+            return valor
+        try:
+            return date.fromisoformat(str(valor))
+        except Exception:
+            return None
+    
+    @staticmethod
+    @transaction.atomic
+    def dar_entrada_itens(deposito, entradas, documento=''):
+        """
+        Entrada de vários itens com lote em escrita agrupada (ex: NF-e).
+        
+        Todas as entradas são validadas antes de qualquer escrita; as
+        inválidas voltam em 'erros' e as demais são gravadas com bulk insert
+        de lotes e movimentações e um único delta de Saldo por produto.
+        
+        Args:
+            deposito: Depósito
+            entradas: Lista de dicts com produto, quantidade, codigo_lote,
+                data_validade e, opcionalmente, data_fabricacao,
+                valor_unitario e observacao
+            documento: Número do documento (NF, etc)
+        
+        Returns:
+            dict: {
+                'itens': {indice: {'lote', 'movimentacao', 'lote_criado'}},
+                'erros': {indice: str}
+            }
+        """
+        from stock.models import Lote, Saldo, Movimentacao, TipoMovimentacao
+        
+        empresa = deposito.empresa
+        agora = timezone.now()
+        erros = {}
+        
+        # 1. Lotes existentes travados uma única vez
+        lotes = {
+            (lote.produto_id, lote.codigo_lote): lote
+            for lote in Lote.all_objects.select_for_update().filter(
+                empresa=empresa,
+                deposito=deposito,
+                produto_id__in={entrada['produto'].id for entrada in entradas},
+                codigo_lote__in={entrada['codigo_lote'] for entrada in entradas}
+            ).order_by('produto_id', 'codigo_lote')
+        }
+        
+        # 2. Validação de todas as entradas antes de gravar
+        novos = {}
+        validas = []
+        for indice, entrada in enumerate(entradas):
+            codigo_lote = entrada['codigo_lote']
+            data_validade = StockService._para_data(entrada.get('data_validade'))
+            data_fabricacao = StockService._para_data(entrada.get('data_fabricacao'))
+            chave = (entrada['produto'].id, codigo_lote)
+            lote = lotes.get(chave) or novos.get(chave)
+            
+            if entrada['quantidade'] <= 0:
+                erros[indice] = 'Quantidade deve ser maior que zero'
+            elif data_validade is None:
+                erros[indice] = f"Lote {codigo_lote}: data de validade obrigatória"
+            elif data_fabricacao and data_fabricacao > data_validade:
+                erros[indice] = f"Lote {codigo_lote}: data de fabricação posterior à validade"
+            elif lote is not None and not lote.is_active:
+                erros[indice] = f"Lote {codigo_lote} está inativo"
+            elif lote is not None and lote.data_validade != data_validade:
+                erros[indice] = (
+                    f"Lote {codigo_lote} já existe com validade diferente. "
+                    f"Existente: {lote.data_validade}, Informado: {data_validade}"
+                )
+            else:
+                if lote is None:
+                    lote = Lote(
+                        empresa=empresa,
+                        produto=entrada['produto'],
+                        deposito=deposito,
+                        codigo_lote=codigo_lote,
+                        data_validade=data_validade,
+                        data_fabricacao=data_fabricacao,
+                        quantidade_atual=Decimal('0')
+                    )
+                    novos[chave] = lote
+                validas.append((indice, entrada, chave, lote))
+        
+        if not validas:
+            return {'itens': {}, 'erros': erros}
+        
+        # 3. Quantidades acumuladas em memória
+        itens = {}
+        movimentacoes = []
+        alterados = set()
+        deltas = defaultdict(Decimal)
+        for indice, entrada, chave, lote in validas:
+            produto = entrada['produto']
+            quantidade = entrada['quantidade']
+            
+            lote.quantidade_atual += quantidade
+            lote.updated_at = agora
+            deltas[produto.id] += quantidade
+            
+            mov = Movimentacao(
+                empresa=empresa,
+                produto=produto,
+                deposito=deposito,
+                lote=lote,
+                tipo=TipoMovimentacao.ENTRADA,
+                quantidade=quantidade,
+                valor_unitario=entrada.get('valor_unitario') or produto.preco_custo or Decimal('0'),
+                documento=documento,
+                observacao=entrada.get('observacao') or f"Entrada de lote {lote.codigo_lote}"
+            )
+            movimentacoes.append(mov)
+            itens[indice] = {
+                'lote': lote,
+                'movimentacao': mov,
+                'lote_criado': chave in novos and chave not in alterados
+            }
+            alterados.add(chave)
+        
+        # 4. Saldos travados uma única vez, na mesma ordem dos lotes
+        saldos = {
+            saldo.produto_id: saldo
+            for saldo in Saldo.objects.select_for_update().filter(
+                empresa=empresa,
+                deposito=deposito,
+                produto_id__in=deltas.keys()
+            ).order_by('produto_id')
+        }
+        saldos_novos = []
+        for produto_id, delta in deltas.items():
+            saldo = saldos.get(produto_id)
+            if saldo is None:
+                saldo = Saldo(
+                    empresa=empresa,
+                    produto_id=produto_id,
+                    deposito=deposito,
+                    quantidade=Decimal('0.000')
+                )
+                saldos_novos.append(saldo)
+            saldo.quantidade += delta
+            saldo.updated_at = agora
+            saldos[produto_id] = saldo
+        
+        # 5. Escrita em lote
+        Lote.objects.bulk_create(list(novos.values()))
+        Lote.objects.bulk_update(
+            [lote for chave, lote in lotes.items() if chave in alterados],
+            ['quantidade_atual', 'updated_at']
+        )
+        Movimentacao.objects.bulk_create(movimentacoes)
+        
+        ultima_por_produto = {mov.produto_id: mov for mov in movimentacoes}
+        for produto_id, saldo in saldos.items():
+            saldo.ultima_movimentacao = ultima_por_produto[produto_id]
+        
+        Saldo.objects.bulk_create(saldos_novos)
+        produtos_novos = {saldo.produto_id for saldo in saldos_novos}
+        Saldo.objects.bulk_update(
+            [saldo for saldo in saldos.values() if saldo.produto_id not in produtos_novos],
+            ['quantidade', 'ultima_movimentacao', 'updated_at']
+        )
+        
+        # bulk_update não dispara o signal de Lote
+        StockService.atualizar_disponibilidade(deposito, deltas.keys())
+        
+        return {'itens': itens, 'erros': erros}
+    
     @staticmethod
     def validar_estoque_disponivel(produto, deposito, quantidade_necessaria, usar_lotes=True):
         """
@@ -317,35 +557,33 @@ class StockService:
                 'deficit': Decimal (se insuficiente)
             }
         """
-        from stock.models import Saldo, Lote
+        from stock.models import Saldo, DisponibilidadeEstoque
         from catalog.models import TipoProduto
         
-        # Se for produto composto, valida os componentes
+        # Se for produto composto, valida os componentes (BOM explodida)
         if produto.tipo == TipoProduto.COMPOSTO:
-            for item in produto.ficha_tecnica.select_related('componente').all():
-                qtd_componente = item.quantidade_liquida * quantidade_necessaria
-                resultado = StockService.validar_estoque_disponivel(
-                    item.componente,
-                    deposito,
-                    qtd_componente,
-                    usar_lotes
-                )
-                if not resultado['disponivel']:
-                    return resultado
+            resultado = StockService.validar_estoque_itens(
+                [(produto, quantidade_necessaria)], deposito, usar_lotes
+            )
+            if resultado['deficits']:
+                deficit = resultado['deficits'][0]
+                return {
+                    'disponivel': False,
+                    'quantidade_disponivel': deficit['quantidade_disponivel'],
+                    'quantidade_necessaria': deficit['quantidade_necessaria'],
+                    'deficit': deficit['deficit']
+                }
             
             return {'disponivel': True, 'quantidade_disponivel': quantidade_necessaria}
         
         # Produto simples
         if usar_lotes:
-            # Soma saldo em lotes
-            qtd_total = Lote.objects.filter(
+            # Saldo em lotes pré-calculado no índice de disponibilidade
+            qtd_total = DisponibilidadeEstoque.objects.filter(
                 empresa=deposito.empresa,
                 produto=produto,
-                deposito=deposito,
-                quantidade_atual__gt=0
-            ).aggregate(
-                total=models.Sum('quantidade_atual')
-            )['total'] or Decimal('0')
+                deposito=deposito
+            ).values_list('quantidade_lotes', flat=True).first() or Decimal('0')
         else:
             # Verifica saldo geral
             try:
@@ -367,3 +605,549 @@ class StockService:
             'quantidade_necessaria': quantidade_necessaria,
             'deficit': deficit
         }
+    
+    @staticmethod
+    def validar_estoque_itens(itens, deposito, usar_lotes=True, explosao=None):
+        """
+        Valida o estoque de uma venda inteira em uma única passada.
+        
+        Diferente de validar_estoque_disponivel (por produto), consolida a
+        demanda de todos os itens por insumo antes de comparar com o saldo.
+        Assim dois itens que consomem o mesmo insumo não enxergam, cada um,
+        o saldo inteiro.
+        
+        Args:
+            itens: Lista de tuplas (produto, quantidade) ou de ItemVenda
+            deposito: Depósito
+            usar_lotes: Se True, soma saldo em lotes. Se False, usa Saldo
+            explosao: Retorno de explodir_necessidades já calculado (opcional)
+        
+        Returns:
+            dict: {
+                'disponivel': bool,
+                'deficits': list[dict] apenas com os insumos insuficientes,
+                'detalhes': list[dict] com todos os insumos
+            }
+            Cada detalhe contém produto_id, produto, quantidade_necessaria,
+            quantidade_disponivel e deficit.
+        """
+        if explosao is None:
+            explosao = StockService.explodir_necessidades([
+                item if isinstance(item, tuple) else (item.produto, item.quantidade)
+                for item in itens
+            ])
+        necessidades, produtos = explosao
+        disponiveis = StockService._obter_disponibilidade(
+            necessidades.keys(), deposito, usar_lotes
+        )
+        
+        detalhes = []
+        deficits = []
+        for produto_id, qtd_necessaria in necessidades.items():
+            qtd_disponivel = disponiveis.get(produto_id, Decimal('0'))
+            deficit = max(Decimal('0'), qtd_necessaria - qtd_disponivel)
+            
+            detalhe = {
+                'produto_id': produto_id,
+                'produto': produtos[produto_id].nome,
+                'quantidade_necessaria': qtd_necessaria,
+                'quantidade_disponivel': qtd_disponivel,
+                'deficit': deficit
+            }
+            detalhes.append(detalhe)
+            if deficit > 0:
+                deficits.append(detalhe)
+        
+        detalhes.sort(key=lambda d: d['produto'])
+        deficits.sort(key=lambda d: d['produto'])
+        
+        return {
+            'disponivel': not deficits,
+            'deficits': deficits,
+            'detalhes': detalhes
+        }
+    
+    @staticmethod
+    def _obter_disponibilidade(produto_ids, deposito, usar_lotes):
+        """
+        Quantidade disponível de vários produtos com uma única query.
+        
+        Com lotes, lê o índice de disponibilidade (uma linha por produto).
+        
+        Returns:
+            dict: {produto_id: Decimal}
+        """
+        from stock.models import Saldo, DisponibilidadeEstoque
+        
+        produto_ids = list(produto_ids)
+        if not produto_ids:
+            return {}
+        
+        if usar_lotes:
+            linhas = DisponibilidadeEstoque.objects.filter(
+                empresa=deposito.empresa,
+                deposito=deposito,
+                produto_id__in=produto_ids
+            ).values('produto_id', total=models.F('quantidade_lotes'))
+        else:
+            linhas = Saldo.objects.filter(
+                empresa=deposito.empresa,
+                deposito=deposito,
+                produto_id__in=produto_ids
+            ).values('produto_id').annotate(total=models.Sum('quantidade'))
+        
+        return {linha['produto_id']: linha['total'] or Decimal('0') for linha in linhas}
+    
+    @staticmethod
+    def _calcular_disponibilidade(**filtros):
+        """
+        Calcula saldo em lotes e próximo lote FEFO a partir da tabela Lote.
+        
+        Percorre apenas lotes com saldo, na ordem do índice parcial FEFO.
+        
+        Args:
+            **filtros: Filtros adicionais sobre Lote
+        
+        Returns:
+            dict: {(empresa_id, produto_id, deposito_id): [Decimal, lote_id]}
+        """
+        from stock.models import Lote
+        
+        resultado = {}
+        lotes = Lote.objects.filter(quantidade_atual__gt=0, **filtros).order_by(
+            'empresa_id', 'produto_id', 'deposito_id',
+            'data_validade', 'data_fabricacao', 'id'
+        ).values_list('id', 'empresa_id', 'produto_id', 'deposito_id', 'quantidade_atual')
+        
+        for lote_id, empresa_id, produto_id, deposito_id, quantidade in lotes:
+            chave = (empresa_id, produto_id, deposito_id)
+            if chave not in resultado:
+                resultado[chave] = [Decimal('0.000'), lote_id]
+            resultado[chave][0] += quantidade
+        
+        return resultado
+    
+    @staticmethod
+    def atualizar_disponibilidade(deposito, produto_ids):
+        """
+        Recalcula o índice de disponibilidade de produtos em um depósito.
+        
+        Deve ser chamado na mesma transação que alterou os lotes
+        (a baixa em lote chama diretamente; Lote.save dispara via signal).
+        
+        Args:
+            deposito: Depósito
+            produto_ids: IDs dos produtos cujos lotes mudaram
+        
+        Returns:
+            dict: {produto_id: DisponibilidadeEstoque}
+        """
+        from stock.models import DisponibilidadeEstoque
+        
+        produto_ids = sorted(set(produto_ids), key=str)
+        if not produto_ids:
+            return {}
+        
+        calculado = StockService._calcular_disponibilidade(
+            empresa_id=deposito.empresa_id,
+            deposito_id=deposito.id,
+            produto_id__in=produto_ids
+        )
+        existentes = {
+            disp.produto_id: disp
+            for disp in DisponibilidadeEstoque.all_objects.select_for_update().filter(
+                empresa_id=deposito.empresa_id,
+                deposito_id=deposito.id,
+                produto_id__in=produto_ids
+            ).order_by('produto_id')
+        }
+        
+        agora = timezone.now()
+        novos = []
+        alterados = []
+        for produto_id in produto_ids:
+            quantidade, proximo_id = calculado.get(
+                (deposito.empresa_id, produto_id, deposito.id),
+                (Decimal('0.000'), None)
+            )
+            disp = existentes.get(produto_id)
+            if disp is None:
+                disp = DisponibilidadeEstoque(
+                    empresa_id=deposito.empresa_id,
+                    produto_id=produto_id,
+                    deposito_id=deposito.id,
+                    quantidade_lotes=quantidade,
+                    proximo_lote_id=proximo_id
+                )
+                existentes[produto_id] = disp
+                novos.append(disp)
+            elif disp.quantidade_lotes != quantidade or disp.proximo_lote_id != proximo_id:
+                disp.quantidade_lotes = quantidade
+                disp.proximo_lote_id = proximo_id
+                disp.updated_at = agora
+                alterados.append(disp)
+        
+        if novos:
+            DisponibilidadeEstoque.all_objects.bulk_create(novos)
+        if alterados:
+            DisponibilidadeEstoque.all_objects.bulk_update(
+                alterados, ['quantidade_lotes', 'proximo_lote', 'updated_at']
+            )
+        
+        return existentes
+    
+    @staticmethod
+    def proximo_lote_fefo(produto, deposito):
+        """
+        Próximo lote a ser consumido (FEFO) com leitura de uma única linha.
+        
+        Returns:
+            Lote ou None se não houver lote com saldo
+        """
+        from stock.models import DisponibilidadeEstoque
+        
+        disp = DisponibilidadeEstoque.objects.select_related('proximo_lote').filter(
+            empresa_id=deposito.empresa_id,
+            produto=produto,
+            deposito=deposito
+        ).first()
+        return disp.proximo_lote if disp else None
+    
+    @staticmethod
+    def _liquido_movimentacoes(agrupar_por, *condicoes, **filtros):
+        """
+        Soma líquida do razão de movimentações, com o mesmo sinal usado em Saldo.
+        
+        TRANSFERENCIA não altera o saldo (ver Movimentacao.save).
+        """
+        from stock.models import Movimentacao, TipoMovimentacao
+        
+        liquido = models.Sum(
+            models.Case(
+                models.When(
+                    tipo__in=[TipoMovimentacao.ENTRADA, TipoMovimentacao.BALANCO],
+                    then=models.F('quantidade')
+                ),
+                models.When(
+                    tipo__in=[TipoMovimentacao.SAIDA, TipoMovimentacao.AJUSTE],
+                    then=-models.F('quantidade')
+                ),
+                default=models.Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=15, decimal_places=3)
+            )
+        )
+        linhas = Movimentacao.objects.filter(*condicoes, **filtros).values(*agrupar_por).annotate(
+            liquido=liquido
+        ).order_by()
+        return {
+            tuple(linha[campo] for campo in agrupar_por): linha['liquido'] or Decimal('0.000')
+            for linha in linhas
+        }
+    
+    @staticmethod
+    def _liquido_razao(agrupar_por, ate=None, **filtros):
+        """
+        Posição do razão: último fechamento de cada empresa (encerrado até
+        `ate`, se informado) + movimentações posteriores a ele.
+        
+        Sem fechamento, soma todo o razão. Os filtros valem para
+        SaldoFechamento e Movimentacao (mesmos nomes de campo).
+        """
+        from stock.models import FechamentoEstoque, SaldoFechamento
+        
+        fechamentos = FechamentoEstoque.objects.all()
+        if 'empresa_id' in filtros:
+            fechamentos = fechamentos.filter(empresa_id=filtros['empresa_id'])
+        if ate is not None:
+            # fim da competência <= ate
+            fechamentos = fechamentos.filter(competencia__lt=timezone.localdate(ate).replace(day=1))
+        ultimos = {}
+        for fechamento in fechamentos.order_by('competencia'):
+            ultimos[fechamento.empresa_id] = fechamento
+        
+        posicao = defaultdict(Decimal)
+        if ultimos:
+            linhas = SaldoFechamento.objects.filter(
+                fechamento__in=list(ultimos.values()), **filtros
+            ).values(*agrupar_por).annotate(total=models.Sum('quantidade')).order_by()
+            for linha in linhas:
+                posicao[tuple(linha[campo] for campo in agrupar_por)] += linha['total']
+        
+        janela = ~models.Q(empresa_id__in=list(ultimos))
+        for empresa_id, fechamento in ultimos.items():
+            janela |= models.Q(empresa_id=empresa_id, created_at__gte=fechamento.fim)
+        if ate is not None:
+            filtros['created_at__lt'] = ate
+        for chave, liquido in StockService._liquido_movimentacoes(agrupar_por, janela, **filtros).items():
+            posicao[chave] += liquido
+        return dict(posicao)
+    
+    @staticmethod
+    def saldo_em(empresa_id, data, produto_id=None, deposito_id=None, por_lote=False):
+        """
+        Posição do estoque ao fim do dia `data`.
+        
+        Combina o último fechamento encerrado até a data com as
+        movimentações seguintes, lendo só a janela recente do razão.
+        
+        Args:
+            empresa_id: UUID da empresa
+            data: date
+            produto_id / deposito_id: Filtros opcionais
+            por_lote: Se True, detalha por lote (None = sem lote)
+        
+        Returns:
+            dict: {(produto_id, deposito_id[, lote_id]): quantidade}, sem zeros
+        
+        Raises:
+            ValidationError: Se a data cair dentro de um mês arquivado
+        """
+        from stock.models import FechamentoEstoque
+        
+        limite = timezone.make_aware(datetime.combine(data + timedelta(days=1), time.min))
+        arquivado = FechamentoEstoque.objects.filter(
+            empresa_id=empresa_id, arquivado_em__isnull=False
+        ).order_by('-competencia').first()
+        if arquivado and limite < arquivado.fim and timezone.localdate(limite).day != 1:
+            raise ValidationError(
+                f"Movimentações até {arquivado.competencia:%m/%Y} foram arquivadas. "
+                "Consulte o último dia de um mês fechado ou uma data posterior."
+            )
+        
+        filtros = {'empresa_id': empresa_id}
+        if produto_id:
+            filtros['produto_id'] = produto_id
+        if deposito_id:
+            filtros['deposito_id'] = deposito_id
+        agrupar_por = ('produto_id', 'deposito_id', 'lote_id') if por_lote else ('produto_id', 'deposito_id')
+        posicao = StockService._liquido_razao(agrupar_por, ate=limite, **filtros)
+        return {
+            chave: quantidade.quantize(QUANTIDADE_ESTOQUE)
+            for chave, quantidade in posicao.items() if quantidade
+        }
+    
+    @staticmethod
+    @transaction.atomic
+    def fechar_estoque(empresa_id, competencia):
+        """
+        Fecha o razão de estoque até a competência (mês) informada.
+        
+        Fecha, em ordem, todos os meses ainda abertos desde o último
+        fechamento (ou desde a primeira movimentação), gravando a posição
+        acumulada por Produto × Depósito × Lote de cada mês. Cada mês lê
+        apenas as próprias movimentações.
+        
+        Returns:
+            list[FechamentoEstoque]: Fechamentos criados
+        
+        Raises:
+            ValidationError: Mês ainda não encerrado ou já fechado
+        """
+        from stock.models import FechamentoEstoque, SaldoFechamento, Movimentacao
+        
+        competencia = competencia.replace(day=1)
+        if FechamentoEstoque.inicio_competencia(FechamentoEstoque.proxima_competencia(competencia)) > timezone.now():
+            raise ValidationError(f"O mês {competencia:%m/%Y} ainda não terminou.")
+        
+        ultimo = FechamentoEstoque.objects.filter(empresa_id=empresa_id).order_by('-competencia').first()
+        if ultimo and ultimo.competencia >= competencia:
+            raise ValidationError(f"Estoque já fechado até {ultimo.competencia:%m/%Y}.")
+        
+        if ultimo:
+            mes = FechamentoEstoque.proxima_competencia(ultimo.competencia)
+            posicao = {
+                (s.produto_id, s.deposito_id, s.lote_id): s.quantidade
+                for s in ultimo.saldos.all()
+            }
+        else:
+            primeira = Movimentacao.objects.filter(empresa_id=empresa_id).order_by('created_at').first()
+            mes = timezone.localdate(primeira.created_at).replace(day=1) if primeira else competencia
+            mes = min(mes, competencia)
+            posicao = {}
+        
+        campos = ('produto_id', 'deposito_id', 'lote_id')
+        criados = []
+        while mes <= competencia:
+            fechamento = FechamentoEstoque(empresa_id=empresa_id, competencia=mes)
+            movimento = StockService._liquido_movimentacoes(
+                campos, empresa_id=empresa_id,
+                created_at__gte=fechamento.inicio, created_at__lt=fechamento.fim
+            )
+            for chave, liquido in movimento.items():
+                posicao[chave] = posicao.get(chave, Decimal('0.000')) + liquido
+            posicao = {chave: quantidade for chave, quantidade in posicao.items() if quantidade}
+            
+            fechamento.save()
+            SaldoFechamento.objects.bulk_create([
+                SaldoFechamento(
+                    empresa_id=empresa_id, fechamento=fechamento,
+                    produto_id=chave[0], deposito_id=chave[1], lote_id=chave[2],
+                    quantidade=quantidade
+                )
+                for chave, quantidade in posicao.items()
+            ])
+            criados.append(fechamento)
+            mes = FechamentoEstoque.proxima_competencia(mes)
+        return criados
+    
+    @staticmethod
+    def remover_movimentacoes_arquivadas(fechamento, arquivo, lote=5000):
+        """
+        Remove do razão as movimentações do mês fechado, já gravadas em
+        arquivo, e marca o fechamento como arquivado.
+        
+        A remoção é feita em lotes de `lote` linhas (transações curtas).
+        
+        Returns:
+            int: Movimentações removidas
+        """
+        from stock.models import Movimentacao
+        
+        if fechamento.arquivado_em:
+            raise ValidationError(f"Fechamento {fechamento.competencia:%m/%Y} já arquivado.")
+        
+        movimentacoes = Movimentacao.objects.filter(
+            empresa_id=fechamento.empresa_id,
+            created_at__gte=fechamento.inicio,
+            created_at__lt=fechamento.fim
+        )
+        removidas = 0
+        while True:
+            ids = list(movimentacoes.values_list('id', flat=True)[:lote])
+            if not ids:
+                break
+            with transaction.atomic():
+                _, por_modelo = Movimentacao.objects.filter(id__in=ids).delete()
+            removidas += por_modelo.get(Movimentacao._meta.label, 0)
+        
+        fechamento.arquivado_em = timezone.now()
+        fechamento.arquivo = arquivo
+        fechamento.save(update_fields=['arquivado_em', 'arquivo', 'updated_at'])
+        return removidas
+    
+    @staticmethod
+    @transaction.atomic
+    def reconciliar_estoque(empresa_id=None, corrigir=False):
+        """
+        Detecta (e opcionalmente corrige) divergências entre Movimentacao,
+        Saldo, Lote e o índice de disponibilidade.
+        
+        Fontes da verdade:
+        - Saldo e lotes com movimentação: o razão de Movimentacao (append-only),
+          a partir do último fechamento de estoque
+        - Índice de disponibilidade: os lotes (após a correção acima)
+        
+        Lotes cuja soma ultrapassa o Saldo são apenas reportados em alertas,
+        pois saídas sem lote reduzem o Saldo legitimamente.
+        
+        Args:
+            empresa_id: Restringe a uma empresa (padrão: todas)
+            corrigir: Se True, grava os valores esperados
+        
+        Returns:
+            dict: {'saldos': [...], 'lotes': [...], 'disponibilidades': [...], 'alertas': [...]}
+        """
+        from stock.models import Saldo, Lote, Deposito, DisponibilidadeEstoque
+        
+        filtros = {'empresa_id': empresa_id} if empresa_id else {}
+        agora = timezone.now()
+        resultado = {'saldos': [], 'lotes': [], 'disponibilidades': [], 'alertas': []}
+        
+        # 1. Saldo × razão de movimentações
+        esperado_saldo = StockService._liquido_razao(
+            ('empresa_id', 'produto_id', 'deposito_id'), **filtros
+        )
+        saldos = {
+            (saldo.empresa_id, saldo.produto_id, saldo.deposito_id): saldo
+            for saldo in Saldo.objects.filter(**filtros)
+        }
+        saldos_novos = []
+        saldos_alterados = []
+        for chave in set(esperado_saldo) | set(saldos):
+            esperado = esperado_saldo.get(chave, Decimal('0.000'))
+            saldo = saldos.get(chave)
+            atual = saldo.quantidade if saldo else Decimal('0.000')
+            if atual == esperado:
+                continue
+            resultado['saldos'].append({
+                'empresa_id': chave[0], 'produto_id': chave[1], 'deposito_id': chave[2],
+                'atual': atual, 'esperado': esperado
+            })
+            if saldo is None:
+                saldos_novos.append(Saldo(
+                    empresa_id=chave[0], produto_id=chave[1], deposito_id=chave[2],
+                    quantidade=esperado
+                ))
+            else:
+                saldo.quantidade = esperado
+                saldo.updated_at = agora
+                saldos_alterados.append(saldo)
+        
+        # 2. Lote × movimentações do próprio lote
+        esperado_lote = StockService._liquido_razao(
+            ('lote_id',), lote__isnull=False, **filtros
+        )
+        lotes_alterados = []
+        for lote in Lote.objects.filter(id__in=[chave[0] for chave in esperado_lote]):
+            esperado = esperado_lote[(lote.id,)]
+            if lote.quantidade_atual == esperado:
+                continue
+            divergencia = {
+                'lote_id': lote.id, 'codigo_lote': lote.codigo_lote,
+                'atual': lote.quantidade_atual, 'esperado': esperado
+            }
+            if esperado < 0:
+                resultado['alertas'].append({**divergencia, 'motivo': 'Razão do lote negativo'})
+                continue
+            resultado['lotes'].append(divergencia)
+            lote.quantidade_atual = esperado
+            lote.updated_at = agora
+            lotes_alterados.append(lote)
+        
+        if corrigir:
+            Saldo.objects.bulk_create(saldos_novos)
+            Saldo.objects.bulk_update(saldos_alterados, ['quantidade', 'updated_at'])
+            Lote.objects.bulk_update(lotes_alterados, ['quantidade_atual', 'updated_at'])
+        
+        # 3. Índice de disponibilidade × lotes
+        calculado = StockService._calcular_disponibilidade(**filtros)
+        indice = {
+            (disp.empresa_id, disp.produto_id, disp.deposito_id): disp
+            for disp in DisponibilidadeEstoque.all_objects.filter(**filtros)
+        }
+        pendentes = defaultdict(set)
+        for chave in set(calculado) | set(indice):
+            esperado, proximo_id = calculado.get(chave, (Decimal('0.000'), None))
+            disp = indice.get(chave)
+            if disp and disp.quantidade_lotes == esperado and disp.proximo_lote_id == proximo_id:
+                continue
+            if disp is None and not esperado:
+                continue
+            resultado['disponibilidades'].append({
+                'empresa_id': chave[0], 'produto_id': chave[1], 'deposito_id': chave[2],
+                'atual': disp.quantidade_lotes if disp else None, 'esperado': esperado
+            })
+            pendentes[chave[2]].add(chave[1])
+        
+        if corrigir and pendentes:
+            depositos = Deposito.all_objects.in_bulk(list(pendentes))
+            for deposito_id, produto_ids in pendentes.items():
+                StockService.atualizar_disponibilidade(depositos[deposito_id], produto_ids)
+        
+        # 4. Lotes acima do saldo (somente alerta)
+        saldos_finais = {chave: saldo.quantidade for chave, saldo in saldos.items()}
+        if corrigir:
+            saldos_finais.update({
+                (d['empresa_id'], d['produto_id'], d['deposito_id']): d['esperado']
+                for d in resultado['saldos']
+            })
+        for chave, (quantidade, _) in calculado.items():
+            saldo_atual = saldos_finais.get(chave, Decimal('0.000'))
+            if quantidade > saldo_atual:
+                resultado['alertas'].append({
+                    'empresa_id': chave[0], 'produto_id': chave[1], 'deposito_id': chave[2],
+                    'lotes': quantidade, 'saldo': saldo_atual,
+                    'motivo': 'Soma dos lotes acima do saldo'
+                })
+        
+        return resultado
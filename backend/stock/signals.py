@@ -0,0 +1,28 @@
+"""
+Signals para o módulo de estoque.
+Mantém o índice de disponibilidade sincronizado com os lotes.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Lote
+from .services import StockService
+
+
+@receiver(post_save, sender=Lote)
+def atualizar_disponibilidade_lote(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Recalcula o índice do produto/depósito na mesma transação do save.
+    
+    A baixa em lote (bulk_update) não dispara signals e atualiza o
+    índice diretamente em StockService._baixar_necessidades.
+    """
+    if created and not instance.quantidade_atual:
+        return  # Lote vazio não altera a disponibilidade
+    
+    if update_fields is not None and not {
+        'quantidade_atual', 'data_validade', 'data_fabricacao', 'is_active'
+    } & set(update_fields):
+        return
+    
+    StockService.atualizar_disponibilidade(instance.deposito, [instance.produto_id])
@@ -0,0 +1,136 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+from types import SimpleNamespace
+from tenant.models import Empresa
+from catalog.models import Categoria, Produto, TipoProduto, FichaTecnicaItem
+from stock.models import Deposito, Movimentacao, TipoMovimentacao, Lote, Saldo
+from stock.services import StockService
+from django.core.exceptions import ValidationError
+from datetime import date, timedelta
+
+class BaixaVendaLoteTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa BOM',
+            razao_social='Empresa BOM LTDA',
+            cnpj='11222333000181',
+            email='bom@empresa.test',
+        )
+        self.categoria = Categoria.objects.create(
+            empresa=self.empresa,
+            nome='Cat BOM',
+        )
+        self.deposito = Deposito.objects.create(
+            empresa=self.empresa,
+            nome='Depósito BOM',
+            is_padrao=True,
+        )
+        self.pao = self._produto('Pão', TipoProduto.INSUMO)
+        self.carne = self._produto('Carne', TipoProduto.INSUMO)
+        self.molho = self._produto('Molho', TipoProduto.COMPOSTO)
+        self.burger = self._produto('Burger', TipoProduto.COMPOSTO)
+        FichaTecnicaItem.objects.create(
+            empresa=self.empresa, produto_pai=self.molho,
+            componente=self.carne, quantidade_liquida=Decimal('0.0500'),
+        )
+        FichaTecnicaItem.objects.create(
+            empresa=self.empresa, produto_pai=self.burger,
+            componente=self.pao, quantidade_liquida=Decimal('1.0000'),
+        )
+        FichaTecnicaItem.objects.create(
+            empresa=self.empresa, produto_pai=self.burger,
+            componente=self.carne, quantidade_liquida=Decimal('0.1500'),
+        )
+        FichaTecnicaItem.objects.create(
+            empresa=self.empresa, produto_pai=self.burger,
+            componente=self.molho, quantidade_liquida=Decimal('1.0000'),
+        )
+        for produto, codigo, qtd, dias in [
+            (self.pao, 'PAO-A', '3.000', 10),
+            (self.pao, 'PAO-B', '20.000', 40),
+            (self.carne, 'CARNE-A', '5.000', 20),
+        ]:
+            StockService.dar_entrada_com_lote(
+                produto=produto,
+                deposito=self.deposito,
+                quantidade=Decimal(qtd),
+                codigo_lote=codigo,
+                data_validade=date.today() + timedelta(days=dias),
+            )
+
+    def _produto(self, nome, tipo):
+        return Produto.objects.create(
+            empresa=self.empresa,
+            nome=nome,
+            codigo_barras=f'789{len(nome)}{ord(nome[0])}',
+            categoria=self.categoria,
+            tipo=tipo,
+            preco_venda=Decimal('10.00'),
+            preco_custo=Decimal('1.00'),
+        )
+
+    def _itens(self, n):
+        burger = Produto.objects.get(id=self.burger.id)
+        return [SimpleNamespace(produto=burger, quantidade=Decimal('1.000')) for _ in range(n)]
+
+    def test_explode_venda_inteira_com_fefo(self):
+        StockService.processar_baixa_itens(
+            itens=self._itens(5),
+            deposito=self.deposito,
+            origem='VENDA-TESTE',
+        )
+        movs = Movimentacao.objects.filter(documento='VENDA-TESTE', tipo=TipoMovimentacao.SAIDA)
+        qtd_pao_a = sum(m.quantidade for m in movs if m.lote.codigo_lote == 'PAO-A')
+        qtd_pao_b = sum(m.quantidade for m in movs if m.lote.codigo_lote == 'PAO-B')
+        qtd_carne = sum(m.quantidade for m in movs if m.produto_id == self.carne.id)
+        self.assertEqual(qtd_pao_a, Decimal('3.000'))
+        self.assertEqual(qtd_pao_b, Decimal('2.000'))
+        # 5 × (0.15 direto + 0.05 via molho)
+        self.assertEqual(qtd_carne, Decimal('1.000'))
+        self.assertEqual(Lote.objects.get(codigo_lote='PAO-A').quantidade_atual, Decimal('0.000'))
+        saldo_pao = Saldo.objects.get(produto=self.pao, deposito=self.deposito)
+        self.assertEqual(saldo_pao.quantidade, Decimal('18.000'))
+        self.assertIsNotNone(saldo_pao.ultima_movimentacao_id)
+
+    def test_queries_constantes_no_numero_de_itens(self):
+        with CaptureQueriesContext(connection) as poucos:
+            StockService.processar_baixa_itens(self._itens(1), self.deposito, 'VENDA-1')
+        with CaptureQueriesContext(connection) as muitos:
+            StockService.processar_baixa_itens(self._itens(12), self.deposito, 'VENDA-12')
+        self.assertEqual(len(poucos), len(muitos))
+
+    def test_estoque_insuficiente_nao_grava_nada(self):
+        with self.assertRaises(ValidationError):
+            StockService.processar_baixa_itens(self._itens(30), self.deposito, 'VENDA-FALTA')
+        self.assertFalse(Movimentacao.objects.filter(documento='VENDA-FALTA').exists())
+        self.assertEqual(Lote.objects.get(codigo_lote='PAO-A').quantidade_atual, Decimal('3.000'))
+
+    def test_validacao_consolida_insumo_compartilhado(self):
+        pao = Produto.objects.get(id=self.pao.id)
+        burger = Produto.objects.get(id=self.burger.id)
+        # 20 burgers + 5 pães avulsos: cada item isolado caberia nos 23 pães
+        resultado = StockService.validar_estoque_itens(
+            [(burger, Decimal('20')), (pao, Decimal('5'))],
+            self.deposito,
+        )
+        self.assertFalse(resultado['disponivel'])
+        deficit_pao = [d for d in resultado['deficits'] if d['produto_id'] == self.pao.id][0]
+        self.assertEqual(deficit_pao['quantidade_necessaria'], Decimal('25.000'))
+        self.assertEqual(deficit_pao['deficit'], Decimal('2.000'))
+        self.assertEqual(len(resultado['detalhes']), 2)
+
+    def test_necessidade_arredondada_para_zero_e_ignorada(self):
+        sal = self._produto('Sal', TipoProduto.INSUMO)  # sem Saldo
+        FichaTecnicaItem.objects.create(
+            empresa=self.empresa, produto_pai=self.molho,
+            componente=sal, quantidade_liquida=Decimal('0.0004'),
+        )
+        necessidades, _ = StockService.explodir_necessidades([(Produto.objects.get(id=self.molho.id), Decimal('1'))])
+        self.assertNotIn(sal.id, necessidades)
+
+        movs = StockService._baixar_necessidades(
+            {sal.id: Decimal('0.000')}, {sal.id: sal}, self.deposito, 'VENDA-SAL', usar_lotes=False
+        )
+        self.assertEqual(movs, [])
@@ -0,0 +1,73 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+from datetime import date, timedelta
+from types import SimpleNamespace
+from tenant.models import Empresa
+from catalog.models import Categoria, Produto, TipoProduto
+from stock.models import Deposito, Lote, Saldo, DisponibilidadeEstoque
+from stock.services import StockService
+
+
+class DisponibilidadeEstoqueTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Disp',
+            razao_social='Empresa Disp LTDA',
+            cnpj='11222333000181',
+            email='disp@empresa.test',
+        )
+        categoria = Categoria.objects.create(empresa=self.empresa, nome='Cat Disp')
+        self.deposito = Deposito.objects.create(
+            empresa=self.empresa, nome='Depósito Disp', is_padrao=True,
+        )
+        self.leite = Produto.objects.create(
+            empresa=self.empresa, nome='Leite', codigo_barras='7891000',
+            categoria=categoria, tipo=TipoProduto.INSUMO,
+            preco_venda=Decimal('5.00'), preco_custo=Decimal('3.00'),
+        )
+        for codigo, qtd, dias in [('L-B', '8.000', 30), ('L-A', '2.000', 5)]:
+            StockService.dar_entrada_com_lote(
+                produto=self.leite, deposito=self.deposito, quantidade=Decimal(qtd),
+                codigo_lote=codigo, data_validade=date.today() + timedelta(days=dias),
+            )
+
+    def _disp(self):
+        return DisponibilidadeEstoque.objects.get(produto=self.leite, deposito=self.deposito)
+
+    def test_indice_acompanha_entrada_e_baixa(self):
+        disp = self._disp()
+        self.assertEqual(disp.quantidade_lotes, Decimal('10.000'))
+        self.assertEqual(disp.proximo_lote.codigo_lote, 'L-A')
+
+        StockService.processar_baixa_itens(
+            [SimpleNamespace(produto=self.leite, quantidade=Decimal('3.000'))], self.deposito, 'VENDA-DISP'
+        )
+        disp = self._disp()
+        self.assertEqual(disp.quantidade_lotes, Decimal('7.000'))
+        self.assertEqual(disp.proximo_lote.codigo_lote, 'L-B')
+
+        with CaptureQueriesContext(connection) as queries:
+            resultado = StockService.validar_estoque_disponivel(
+                self.leite, self.deposito, Decimal('8')
+            )
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(resultado['disponivel'])
+        self.assertEqual(resultado['deficit'], Decimal('1.000'))
+
+    def test_reconciliacao_corrige_drift(self):
+        Saldo.objects.filter(produto=self.leite).update(quantidade=Decimal('99.000'))
+        Lote.objects.filter(codigo_lote='L-B').update(quantidade_atual=Decimal('1.000'))
+        DisponibilidadeEstoque.objects.update(quantidade_lotes=Decimal('0.000'))
+
+        resultado = StockService.reconciliar_estoque(self.empresa.id)
+        self.assertEqual(len(resultado['saldos']), 1)
+        self.assertEqual(len(resultado['lotes']), 1)
+        self.assertEqual(Saldo.objects.get(produto=self.leite).quantidade, Decimal('99.000'))
+
+        StockService.reconciliar_estoque(self.empresa.id, corrigir=True)
+        self.assertEqual(Saldo.objects.get(produto=self.leite).quantidade, Decimal('10.000'))
+        self.assertEqual(Lote.objects.get(codigo_lote='L-B').quantidade_atual, Decimal('8.000'))
+        self.assertEqual(self._disp().quantidade_lotes, Decimal('10.000'))
+        self.assertFalse(any(StockService.reconciliar_estoque(self.empresa.id).values()))
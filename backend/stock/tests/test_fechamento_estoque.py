@@ -0,0 +1,128 @@
+import gzip
+import io
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from tenant.models import Empresa
+from catalog.models import Categoria, Produto, TipoProduto
+from stock.models import Deposito, Movimentacao, TipoMovimentacao, FechamentoEstoque
+from stock.services import StockService
+
+
+def mes_anterior(data, meses=1):
+    data = data.replace(day=1)
+    for _ in range(meses):
+        data = (data - timedelta(days=1)).replace(day=1)
+    return data
+
+
+class FechamentoEstoqueTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Empresa Razão',
+            razao_social='Empresa Razão LTDA',
+            cnpj='11222333000181',
+            email='razao@empresa.test',
+        )
+        self.deposito = Deposito.objects.create(empresa=self.empresa, nome='Loja', is_padrao=True)
+        self.produto = Produto.objects.create(
+            empresa=self.empresa,
+            nome='Farinha',
+            categoria=Categoria.objects.create(empresa=self.empresa, nome='Insumos'),
+            tipo=TipoProduto.INSUMO,
+            preco_venda=Decimal('5.00'),
+        )
+        hoje = timezone.localdate()
+        self.m3, self.m2, self.m1 = (mes_anterior(hoje, n) for n in (3, 2, 1))
+
+        # m3: +10 (lote), m2: -3, m1: +5 (lote), mês atual: -2
+        _, entrada = StockService.dar_entrada_com_lote(
+            self.produto, self.deposito, Decimal('10.000'), 'FAR-1', hoje + timedelta(days=90)
+        )
+        self._datar(entrada, self.m3.replace(day=10))
+        self._datar(self._saida('3.000'), self.m2.replace(day=5))
+        _, entrada = StockService.dar_entrada_com_lote(
+            self.produto, self.deposito, Decimal('5.000'), 'FAR-2', hoje + timedelta(days=90)
+        )
+        self._datar(entrada, self.m1.replace(day=20))
+        self._saida('2.000')
+
+    def _saida(self, quantidade):
+        return Movimentacao.objects.create(
+            empresa=self.empresa, produto=self.produto, deposito=self.deposito,
+            tipo=TipoMovimentacao.SAIDA, quantidade=Decimal(quantidade),
+        )
+
+    def _datar(self, movimentacao, data):
+        momento = timezone.make_aware(datetime.combine(data, time(12)))
+        Movimentacao.objects.filter(id=movimentacao.id).update(created_at=momento)
+
+    def _saldo(self, data):
+        posicao = StockService.saldo_em(self.empresa.id, data)
+        return posicao.get((self.produto.id, self.deposito.id), Decimal('0'))
+
+    def test_fechamento_e_saldo_na_data(self):
+        fechamentos = StockService.fechar_estoque(self.empresa.id, self.m1)
+        self.assertEqual([f.competencia for f in fechamentos], [self.m3, self.m2, self.m1])
+
+        fim_m2 = self.m1 - timedelta(days=1)
+        self.assertEqual(self._saldo(fim_m2), Decimal('7.000'))
+        self.assertEqual(self._saldo(self.m1.replace(day=25)), Decimal('12.000'))
+        self.assertEqual(self._saldo(timezone.localdate()), Decimal('10.000'))
+        self.assertEqual(self._saldo(self.m3 - timedelta(days=1)), Decimal('0'))
+
+        with self.assertRaises(ValidationError):
+            StockService.fechar_estoque(self.empresa.id, self.m2)
+        with self.assertRaises(ValidationError):
+            StockService.fechar_estoque(self.empresa.id, timezone.localdate())
+
+    def test_arquivamento_preserva_saldos(self):
+        StockService.fechar_estoque(self.empresa.id, self.m1)
+
+        with tempfile.TemporaryDirectory() as pasta:
+            call_command('arquivar_movimentacoes', destino=pasta, meses=1, stdout=io.StringIO())
+
+            arquivo = os.path.join(pasta, str(self.empresa.id), f"movimentacoes-{self.m3:%Y-%m}.ndjson.gz")
+            with gzip.open(arquivo, 'rt') as f:
+                self.assertEqual(len(f.readlines()), 1)
+
+        # m3 e m2 saíram do razão; m1 e o mês atual continuam
+        self.assertEqual(Movimentacao.objects.filter(empresa=self.empresa).count(), 2)
+        self.assertEqual(
+            FechamentoEstoque.objects.filter(arquivado_em__isnull=False).count(), 2
+        )
+
+        self.assertEqual(self._saldo(timezone.localdate()), Decimal('10.000'))
+        self.assertEqual(self._saldo(self.m1 - timedelta(days=1)), Decimal('7.000'))
+        with self.assertRaises(ValidationError):
+            self._saldo(self.m2.replace(day=15))
+
+        resultado = StockService.reconciliar_estoque(self.empresa.id)
+        self.assertEqual(resultado['saldos'], [])
+        self.assertEqual(resultado['lotes'], [])
+
+    def test_api_saldo_na_data(self):
+        from rest_framework.test import APIClient
+        from authentication.models import CustomUser
+
+        StockService.fechar_estoque(self.empresa.id, self.m1)
+        usuario = CustomUser.objects.create_user(
+            username='estoquista', email='estoquista@empresa.test', password='123456',
+            empresa=self.empresa,
+        )
+        client = APIClient()
+        client.force_authenticate(usuario)
+
+        resposta = client.get('/api/v1/saldos/na-data/', {'data': self.m1.isoformat(), 'por_lote': '1'})
+        self.assertEqual(resposta.status_code, 200)
+        por_lote = {item['lote_id']: item['quantidade'] for item in resposta.json()['saldos']}
+        self.assertEqual(sorted(por_lote.values()), ['-3.000', '10.000'])
+
+        self.assertEqual(client.get('/api/v1/saldos/na-data/').status_code, 400)
@@ -8,3 +8,7 @@ class TenantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tenant'
     verbose_name = 'Multi-Tenancy'
+    
+    def ready(self):
+        """Importa signals quando o app estiver pronto."""
+        import tenant.signals  # noqa
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.14 on 2026-10-17 12:49
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def semear_sequencias(apps, schema_editor):
+    """Inicializa os contadores a partir das vendas e notas existentes."""
+    Empresa = apps.get_model('tenant', 'Empresa')
+    Venda = apps.get_model('sales', 'Venda')
+    NotaFiscal = apps.get_model('nfe', 'NotaFiscal')
+    SequenciaNumeracao = apps.get_model('tenant', 'SequenciaNumeracao')
+
+    sequencias = []
+    for linha in Venda.objects.values('empresa_id').annotate(ultimo=Max('numero')):
+        sequencias.append(SequenciaNumeracao(
+            empresa_id=linha['empresa_id'],
+            chave='VENDA',
+            ultimo_numero=linha['ultimo'] or 1000,
+        ))
+
+    # numero_nfe_atual (contador global antigo) só vale para a série padrão
+    # da empresa no modelo 55; as demais séries partem das próprias notas
+    padrao = {
+        (empresa_id, f"NFE-55-{int(serie or 1)}"): numero
+        for empresa_id, serie, numero in Empresa.objects.filter(
+            numero_nfe_atual__gt=0
+        ).values_list('id', 'serie_nfe', 'numero_nfe_atual')
+    }
+    for linha in NotaFiscal.objects.values('empresa_id', 'modelo', 'serie').annotate(ultimo=Max('numero')):
+        chave = (linha['empresa_id'], f"NFE-{linha['modelo']}-{int(linha['serie'])}")
+        sequencias.append(SequenciaNumeracao(
+            empresa_id=chave[0],
+            chave=chave[1],
+            ultimo_numero=max(linha['ultimo'] or 0, padrao.pop(chave, 0)),
+        ))
+    for (empresa_id, chave), numero in padrao.items():
+        sequencias.append(SequenciaNumeracao(empresa_id=empresa_id, chave=chave, ultimo_numero=numero))
+
+    SequenciaNumeracao.objects.bulk_create(sequencias, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenant', '0004_empresa_ambiente_nfe_empresa_certificado_digital_and_more'),
+        ('sales', '0005_alter_venda_tipo_pagamento'),
+        ('nfe', '0006_notafiscal_finalidade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaNumeracao',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(help_text='Identificador da numeração (ex: VENDA, NFE-55-1)', max_length=30, verbose_name='Chave')),
+                ('ultimo_numero', models.PositiveBigIntegerField(default=0, help_text='Último número entregue por esta sequência', verbose_name='Último Número')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizada em')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sequencias', to='tenant.empresa', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Sequência de Numeração',
+                'verbose_name_plural': 'Sequências de Numeração',
+                'unique_together': {('empresa', 'chave')},
+            },
+        ),
+        migrations.RunPython(semear_sequencias, migrations.RunPython.noop),
+    ]
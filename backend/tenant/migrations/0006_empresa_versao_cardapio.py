@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenant', '0005_sequencia_numeracao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='versao_cardapio',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incrementada a cada alteração do catálogo (invalida o cardápio público em cache)', verbose_name='Versão do Cardápio'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-17 14:08
+
+from django.db import migrations
+
+
+def copiar_versoes(apps, schema_editor):
+    """
+    Leva a versão atual para a sequência CARDAPIO: recomeçar do zero
+    reaproveitaria chaves de cardápios antigos ainda em cache.
+    """
+    Empresa = apps.get_model('tenant', 'Empresa')
+    SequenciaNumeracao = apps.get_model('tenant', 'SequenciaNumeracao')
+
+    SequenciaNumeracao.objects.bulk_create([
+        SequenciaNumeracao(empresa_id=empresa_id, chave='CARDAPIO', ultimo_numero=versao)
+        for empresa_id, versao in Empresa.objects.filter(
+            versao_cardapio__gt=0
+        ).values_list('id', 'versao_cardapio')
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenant', '0006_empresa_versao_cardapio'),
+    ]
+
+    operations = [
+        migrations.RunPython(copiar_versoes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='empresa',
+            name='versao_cardapio',
+        ),
+    ]
@@ -288,6 +288,7 @@ class Empresa(models.Model):
         
         self.full_clean()
         super().save(*args, **kwargs)
+        self.__dict__.pop('_perfil_fiscal', None)
     
     @property
     def cnpj_numerico(self):
@@ -306,52 +307,115 @@ class Empresa(models.Model):
 
     @property
     def endereco_principal(self):
-        """Retorna o primeiro endereço encontrado (GenericRelation simulada)."""
+        """
+        Retorna o primeiro endereço encontrado (GenericRelation simulada).
+        
+        Consulta o banco a cada acesso; para os dados do emitente use
+        perfil_fiscal (memorizado).
+        """
         from locations.models import Endereco
         from django.contrib.contenttypes.models import ContentType
         
         ct = ContentType.objects.get_for_model(self)
         return Endereco.objects.filter(content_type=ct, object_id=self.id).first()
 
+    @property
+    def perfil_fiscal(self):
+        """
+        Perfil fiscal do emitente (endereço, IBGE, regime, série, certificado).
+        
+        Montado uma vez por instância; o endereço vem do cache (ver
+        tenant.perfil_fiscal). save() descarta o perfil memorizado.
+        """
+        perfil = self.__dict__.get('_perfil_fiscal')
+        if perfil is None:
+            from .perfil_fiscal import PerfilFiscal
+            perfil = self._perfil_fiscal = PerfilFiscal.da_empresa(self)
+        return perfil
+
     @property
     def logradouro(self):
-        return self.endereco_principal.logradouro if self.endereco_principal else None
+        return self.perfil_fiscal.logradouro
 
     @property
     def numero(self):
-        return self.endereco_principal.numero if self.endereco_principal else None
+        return self.perfil_fiscal.numero
 
     @property
     def bairro(self):
-        return self.endereco_principal.bairro if self.endereco_principal else None
+        return self.perfil_fiscal.bairro
 
     @property
     def cidade(self):
-        return self.endereco_principal.cidade if self.endereco_principal else None
+        return self.perfil_fiscal.cidade
 
     @property
     def uf(self):
-        return self.endereco_principal.uf if self.endereco_principal else None
+        return self.perfil_fiscal.uf
 
     @property
     def cep(self):
-        return self.endereco_principal.cep if self.endereco_principal else None
+        return self.perfil_fiscal.cep
 
     @property
     def endereco_municipio_ibge(self):
-        return self.endereco_principal.codigo_municipio_ibge if self.endereco_principal else None
+        return self.perfil_fiscal.codigo_municipio_ibge
 
     @property
     def endereco_uf_ibge_code(self):
         """Retorna código IBGE da UF (2 dígitos)."""
-        if not self.uf:
-            return None
-        
-        # Mapa simplificado de códigos IBGE para UFs
-        codigos = {
-            'RO': '11', 'AC': '12', 'AM': '13', 'RR': '14', 'PA': '15', 'AP': '16', 'TO': '17',
-            'MA': '21', 'PI': '22', 'CE': '23', 'RN': '24', 'PB': '25', 'PE': '26', 'AL': '27',
-            'SE': '28', 'BA': '29', 'MG': '31', 'ES': '32', 'RJ': '33', 'SP': '35', 'PR': '41',
-            'SC': '42', 'RS': '43', 'MS': '50', 'MT': '51', 'GO': '52', 'DF': '53'
-        }
-        return codigos.get(self.uf)
+        return self.perfil_fiscal.codigo_uf_ibge
+
+
+class SequenciaNumeracao(models.Model):
+    """
+    Contador de numeração por empresa e série.
+    
+    Substitui o MAX(numero) sob lock na tabela de documentos: cada
+    numeração (vendas, NF-e por modelo/série) tem uma única linha,
+    travada apenas pelo tempo da transação que consome o número.
+    
+    Chaves usadas:
+    - VENDA: número sequencial das vendas
+    - NFE-<modelo>-<serie>: ex: NFE-55-1, NFE-65-1
+    - CARDAPIO: versão do catálogo (invalida o cardápio público em cache)
+    """
+    
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        verbose_name='ID'
+    )
+    
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name='sequencias',
+        verbose_name='Empresa'
+    )
+    
+    chave = models.CharField(
+        max_length=30,
+        verbose_name='Chave',
+        help_text='Identificador da numeração (ex: VENDA, NFE-55-1)'
+    )
+    
+    ultimo_numero = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Último Número',
+        help_text='Último número entregue por esta sequência'
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Atualizada em'
+    )
+    
+    class Meta:
+        verbose_name = 'Sequência de Numeração'
+        verbose_name_plural = 'Sequências de Numeração'
+        unique_together = ('empresa', 'chave')
+    
+    def __str__(self):
+        return f"{self.chave}: {self.ultimo_numero}"
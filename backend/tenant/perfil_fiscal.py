@@ -0,0 +1,101 @@
+"""
+Perfil fiscal da empresa (emitente): endereço, códigos IBGE, regime,
+série e metadados do certificado.
+
+O endereço principal é a parte cara (ContentType + Endereco via
+GenericForeignKey). Ele fica no cache do Django por empresa e o perfil
+montado é memorizado na instância de Empresa (Empresa.perfil_fiscal),
+de modo que NFeBuilder, NFeService e a API pública consultam o banco no
+máximo uma vez por empresa.
+
+O cache pode ser local ao processo (LocMemCache), então a entrada guarda
+a versão da empresa com que foi montada (Empresa.updated_at). Alterar um
+endereço da empresa avança Empresa.updated_at (tenant/signals.py), e uma
+instância de Empresa carregada depois disso não aceita a entrada antiga
+em nenhum processo (workers web e processar_jobs).
+
+Invalidação (tenant/signals.py):
+- save/delete de Endereco da empresa avança Empresa.updated_at e descarta
+  o endereço em cache do processo
+- delete de Empresa descarta o endereço em cache
+- Empresa.save descarta o perfil memorizado na instância
+"""
+from django.core.cache import cache
+
+
+# Segundos no cache (rede de segurança: a invalidação é feita pelos signals)
+PERFIL_FISCAL_TIMEOUT = 60 * 60
+
+# Códigos IBGE das UFs
+CODIGOS_UF_IBGE = {
+    'RO': '11', 'AC': '12', 'AM': '13', 'RR': '14', 'PA': '15', 'AP': '16', 'TO': '17',
+    'MA': '21', 'PI': '22', 'CE': '23', 'RN': '24', 'PB': '25', 'PE': '26', 'AL': '27',
+    'SE': '28', 'BA': '29', 'MG': '31', 'ES': '32', 'RJ': '33', 'SP': '35', 'PR': '41',
+    'SC': '42', 'RS': '43', 'MS': '50', 'MT': '51', 'GO': '52', 'DF': '53'
+}
+
+CAMPOS_ENDERECO = (
+    'logradouro', 'numero', 'complemento', 'bairro', 'cidade', 'uf', 'cep', 'codigo_municipio_ibge'
+)
+
+
+def chave_endereco(empresa_id):
+    return f"perfil_fiscal:endereco:{empresa_id}"
+
+
+def obter_endereco(empresa):
+    """
+    Endereço principal da empresa como dict (CAMPOS_ENDERECO), do cache.
+
+    Returns:
+        dict | None: None se a empresa não tiver endereço
+    """
+    chave = chave_endereco(empresa.pk)
+    versao = empresa.updated_at
+    item = cache.get(chave)
+    if item is None or item[0] < versao:
+        principal = empresa.endereco_principal
+        # {} marca "sem endereço" no cache (None é ausência da chave)
+        endereco = {campo: getattr(principal, campo) for campo in CAMPOS_ENDERECO} if principal else {}
+        item = (versao, endereco)
+        cache.set(chave, item, PERFIL_FISCAL_TIMEOUT)
+    return item[1] or None
+
+
+def invalidar(empresa_id):
+    """Descarta o endereço em cache da empresa (apenas neste processo)."""
+    cache.delete(chave_endereco(empresa_id))
+
+
+class PerfilFiscal:
+    """
+    Dados do emitente usados na NF-e e nas APIs públicas (somente leitura).
+
+    Os campos da própria Empresa vêm da instância; os do endereço, do
+    cache (obter_endereco).
+    """
+
+    def __init__(self, empresa, endereco):
+        self.empresa_id = empresa.pk
+        self.cnpj = empresa.cnpj_numerico
+        self.razao_social = empresa.razao_social
+        self.nome_fantasia = empresa.nome_fantasia
+        self.inscricao_estadual = empresa.inscricao_estadual
+        self.inscricao_municipal = empresa.inscricao_municipal
+        self.regime_tributario = empresa.regime_tributario
+        self.ambiente_nfe = empresa.ambiente_nfe
+        self.serie_nfe = empresa.serie_nfe
+        self.certificado_nome = empresa.certificado_digital.name if empresa.certificado_digital else ''
+
+        self.endereco = endereco
+        for campo in CAMPOS_ENDERECO:
+            setattr(self, campo, endereco[campo] if endereco else None)
+        self.codigo_uf_ibge = CODIGOS_UF_IBGE.get(self.uf)
+
+    @property
+    def possui_certificado(self):
+        return bool(self.certificado_nome)
+
+    @classmethod
+    def da_empresa(cls, empresa):
+        return cls(empresa, obter_endereco(empresa))
@@ -0,0 +1,126 @@
+"""
+Serviços do módulo Tenant (Projeto Nix).
+
+Responsabilidades:
+- Numeração sequencial por empresa (vendas, NF-e por série)
+"""
+from django.db import transaction, IntegrityError
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class SequenciaService:
+    """
+    Entrega números sequenciais por empresa/chave em O(1).
+    
+    Trava apenas a linha do contador (select_for_update), e não as
+    linhas dos documentos. O lock dura até o fim da transação corrente:
+    se ela for desfeita, o incremento também é, e o número não é perdido.
+    """
+    
+    CHAVE_VENDA = 'VENDA'
+    CHAVE_CARDAPIO = 'CARDAPIO'
+    
+    @staticmethod
+    def chave_nfe(modelo, serie):
+        """Chave da sequência de NF-e/NFC-e (ex: NFE-55-1)."""
+        return f"NFE-{modelo}-{int(serie)}"
+    
+    @staticmethod
+    @transaction.atomic
+    def proximo_numero(empresa, chave, semente=None, minimo=0):
+        """
+        Reserva e retorna o próximo número da sequência.
+        
+        Args:
+            empresa: Empresa (tenant)
+            chave: Identificador da sequência
+            semente: Callable que retorna o último número já usado; chamado
+                apenas na primeira vez, quando o contador ainda não existe
+            minimo: Último número mínimo considerado já usado. Se maior que
+                o contador, a sequência avança até ele (nunca retrocede)
+        
+        Returns:
+            int: Número reservado
+        """
+        from tenant.models import SequenciaNumeracao
+        
+        sequencia = SequenciaNumeracao.objects.select_for_update().filter(
+            empresa=empresa,
+            chave=chave
+        ).first()
+        
+        if sequencia is None:
+            try:
+                with transaction.atomic():
+                    sequencia = SequenciaNumeracao.objects.create(
+                        empresa=empresa,
+                        chave=chave,
+                        ultimo_numero=semente() if semente else 0
+                    )
+            except IntegrityError:
+                # Criada por outra transação concorrente
+                pass
+            sequencia = SequenciaNumeracao.objects.select_for_update().get(
+                empresa=empresa,
+                chave=chave
+            )
+        
+        sequencia.ultimo_numero = max(sequencia.ultimo_numero, minimo or 0) + 1
+        sequencia.save(update_fields=['ultimo_numero', 'updated_at'])
+        
+        return sequencia.ultimo_numero
+    
+    @staticmethod
+    def incrementar(empresa_id, chave):
+        """
+        Incrementa o contador sem lê-lo (UPDATE atômico com F()).
+        
+        Usado por contadores de versão, em que ninguém precisa do número
+        entregue: só a linha do contador é travada, nunca a da Empresa.
+        """
+        from tenant.models import SequenciaNumeracao
+        
+        def atualizar():
+            return SequenciaNumeracao.objects.filter(
+                empresa_id=empresa_id,
+                chave=chave
+            ).update(ultimo_numero=F('ultimo_numero') + 1, updated_at=timezone.now())
+        
+        if atualizar():
+            return
+        try:
+            with transaction.atomic():
+                SequenciaNumeracao.objects.create(empresa_id=empresa_id, chave=chave, ultimo_numero=1)
+        except IntegrityError:
+            # Criada por outra transação concorrente
+            atualizar()
+    
+    @staticmethod
+    def subquery_ultimo_numero(chave, empresa_ref='pk'):
+        """
+        Expressão com o último número da sequência (0 se não existir),
+        para anotar querysets sem consulta extra.
+        """
+        from tenant.models import SequenciaNumeracao
+        
+        return Coalesce(
+            Subquery(
+                SequenciaNumeracao.objects.filter(
+                    empresa=OuterRef(empresa_ref),
+                    chave=chave
+                ).values('ultimo_numero')[:1]
+            ),
+            0
+        )
+    
+    @staticmethod
+    def ultimo_numero(empresa, chave):
+        """Retorna o último número entregue (0 se a sequência não existe)."""
+        from tenant.models import SequenciaNumeracao
+        
+        return SequenciaNumeracao.objects.filter(
+            empresa=empresa,
+            chave=chave
+        ).values_list('ultimo_numero', flat=True).first() or 0
@@ -0,0 +1,33 @@
+"""
+Signals do app Tenant: invalidação do perfil fiscal em cache.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from locations.models import Endereco
+from .models import Empresa
+from . import perfil_fiscal
+
+
+@receiver(post_delete, sender=Empresa)
+def invalidar_perfil_fiscal_empresa(sender, instance, **kwargs):
+    """
+    Empresa excluída: descarta o endereço em cache. O save não precisa de
+    signal: o novo updated_at já torna a entrada antiga obsoleta.
+    """
+    perfil_fiscal.invalidar(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Endereco)
+def invalidar_perfil_fiscal_endereco(sender, instance, **kwargs):
+    """
+    Endereço de empresa alterado/excluído (inclusive soft delete).
+
+    Avança Empresa.updated_at (sem save: não dispara os signals de
+    Empresa), o que invalida o endereço em cache de todos os processos.
+    """
+    if instance.content_type_id == ContentType.objects.get_for_model(Empresa).id:
+        Empresa.objects.filter(pk=instance.object_id).update(updated_at=timezone.now())
+        perfil_fiscal.invalidar(instance.object_id)
@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from locations.models import Endereco
+from tenant.models import Empresa
+
+
+class PerfilFiscalTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Padaria Fiscal',
+            razao_social='Padaria Fiscal LTDA',
+            cnpj='11222333000181',
+            email='fiscal@empresa.test',
+        )
+        self.endereco = Endereco.objects.create(
+            empresa=self.empresa,
+            content_object=self.empresa,
+            logradouro='Av. Paulista',
+            numero='1000',
+            bairro='Bela Vista',
+            cidade='São Paulo',
+            uf='SP',
+            cep='01310-100',
+            codigo_municipio_ibge='3550308',
+        )
+
+    def test_endereco_consultado_uma_vez(self):
+        empresa = Empresa.objects.get(pk=self.empresa.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(empresa.uf, 'SP')
+            self.assertEqual(empresa.endereco_uf_ibge_code, '35')
+            self.assertEqual(empresa.perfil_fiscal.codigo_municipio_ibge, '3550308')
+            self.assertEqual(empresa.cidade, 'São Paulo')
+        primeira = len(ctx.captured_queries)
+        self.assertGreater(primeira, 0)
+
+        # Outra instância da mesma empresa: endereço vem do cache
+        outra = Empresa.objects.get(pk=self.empresa.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(outra.logradouro, 'Av. Paulista')
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_info_publica_sem_consultar_endereco(self):
+        client = APIClient()
+        url = f'/api/v1/public/menu/{self.empresa.slug}/info/'
+        primeira = client.get(url)
+        self.assertEqual(primeira.status_code, 200)
+        self.assertEqual(primeira.json()['endereco_principal']['cep'], '01310-100')
+
+        with CaptureQueriesContext(connection) as ctx:
+            segunda = client.get(url)
+        self.assertEqual(segunda.content, primeira.content)
+        self.assertEqual(len(ctx.captured_queries), 1)  # apenas a Empresa
+
+    def test_salvar_endereco_invalida_perfil(self):
+        self.assertEqual(Empresa.objects.get(pk=self.empresa.pk).cidade, 'São Paulo')
+
+        self.endereco.cidade = 'Campinas'
+        self.endereco.codigo_municipio_ibge = '3509502'
+        self.endereco.save()
+
+        empresa = Empresa.objects.get(pk=self.empresa.pk)
+        self.assertEqual(empresa.cidade, 'Campinas')
+        self.assertEqual(empresa.perfil_fiscal.codigo_municipio_ibge, '3509502')
+
+    def test_salvar_empresa_rele_endereco_uma_vez(self):
+        empresa = Empresa.objects.get(pk=self.empresa.pk)
+        self.assertEqual(empresa.uf, 'SP')
+
+        # Nova versão da empresa (updated_at): o endereço é relido uma vez
+        empresa.razao_social = 'Padaria Fiscal ME'
+        empresa.save()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(empresa.perfil_fiscal.razao_social, 'Padaria Fiscal ME')
+            self.assertEqual(empresa.cidade, 'São Paulo')
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(Empresa.objects.get(pk=self.empresa.pk).cidade, 'São Paulo')
+        self.assertEqual(len(ctx.captured_queries), 1)  # apenas a Empresa
+
+    def test_entrada_de_outro_processo_desatualizada_pela_versao(self):
+        from tenant.perfil_fiscal import chave_endereco
+
+        self.assertEqual(Empresa.objects.get(pk=self.empresa.pk).cidade, 'São Paulo')
+        antiga = cache.get(chave_endereco(self.empresa.pk))
+
+        self.endereco.cidade = 'Campinas'
+        self.endereco.save()
+        # Outro processo: a invalidação local não alcança o cache dele
+        cache.set(chave_endereco(self.empresa.pk), antiga)
+
+        self.assertEqual(Empresa.objects.get(pk=self.empresa.pk).cidade, 'Campinas')